@@ -3,26 +3,54 @@
 import os
 import re
 import random
-import PyPDF2
-from PyPDF2 import errors as PyPDF2Errors
-import docx
-from flask import Flask, request, render_template, redirect, url_for, flash, session, send_from_directory, jsonify, make_response
+from flask import Flask, request, render_template, redirect, url_for, flash, session, send_from_directory, send_file, jsonify, Response, copy_current_request_context, g
 from werkzeug.utils import secure_filename
+from itsdangerous import URLSafeTimedSerializer, BadSignature
 from dotenv import load_dotenv
-import google.generativeai as genai
 import json
-import traceback
 import secrets # Import the secrets module
-
-try:
-    import weasyprint
-    WEASYPRINT_AVAILABLE = True
-except OSError as e: print("*"*60+"\nWARNING: WeasyPrint Import Error...\n"+"*"*60); WEASYPRINT_AVAILABLE = False
-except ImportError: print("*"*60+"\nWARNING: WeasyPrint Not Found...\n"+"*"*60); WEASYPRINT_AVAILABLE = False
+import time
+import logging
+import threading
+import queue
+import functools
+import importlib.util
+from collections import namedtuple
+
+# LOG_LEVEL=DEBUG adds per-turn detail; hot-path messages are formatted lazily, so they cost ~nothing when off
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+log = logging.getLogger("app")
+
+# WeasyPrint and google.generativeai are slow to import; they load on first use or in the warm-up thread
+weasyprint = None
+WEASYPRINT_AVAILABLE = importlib.util.find_spec("weasyprint") is not None # Cheap check, no import
+if not WEASYPRINT_AVAILABLE: log.warning("WeasyPrint not found; PDF download disabled.")
+_lazy_import_lock = threading.Lock()
+
+def get_weasyprint():
+    """Imports WeasyPrint on first use. Returns the module, or None if it can't be loaded."""
+    global weasyprint, WEASYPRINT_AVAILABLE
+    if weasyprint is not None or not WEASYPRINT_AVAILABLE: return weasyprint
+    with _lazy_import_lock:
+        if weasyprint is None and WEASYPRINT_AVAILABLE:
+            try: import weasyprint as _weasyprint; weasyprint = _weasyprint
+            except OSError as e: log.warning("WeasyPrint import error (%s); PDF download disabled.", e); WEASYPRINT_AVAILABLE = False
+            except ImportError: log.warning("WeasyPrint not found; PDF download disabled."); WEASYPRINT_AVAILABLE = False
+    return weasyprint
 
 # --- Local Module Imports ---
 from interview_manager import InterviewManager # Use the simpler manager
+from interview_store import create_store, StaleStateError, InterviewNotFound
+from interview_flow import InterviewState, Event, Action, TransitionError, FlowTimings, transition_for, upcoming_actions, AWAITS_INPUT, AUTO_ADVANCE, TERMINAL_STATES
 import tts_interface
+from tts_prefetch import QuestionAudioPrefetcher
+from llm_client import LLMClient, CircuitBreaker, LLMUnavailableError
+from evaluation_pipeline import EvaluationPipeline
+import resume_cache as resume_cache_module
+from resume_extractor import ResumeExtractor
+from report_renderer import ReportRenderer
+import metrics
+import moderation
 
 # --- Configuration & Setup ---
 load_dotenv()
@@ -34,9 +62,8 @@ app.config['UPLOAD_FOLDER'] = 'uploads'; app.config['TTS_AUDIO_FOLDER'] = tts_in
 SECRET_KEY = os.getenv('FLASK_SECRET_KEY')
 if not SECRET_KEY:
     # If not found, generate a new one for this run
-    print("WARNING: FLASK_SECRET_KEY not set in environment. Generating temporary key for this session.")
-    print("         User sessions will NOT persist across server restarts.")
-    print("         For persistent sessions, set FLASK_SECRET_KEY in your .env file.")
+    log.warning("FLASK_SECRET_KEY not set in environment. Generating temporary key for this session. "
+                "User sessions will NOT persist across server restarts; set FLASK_SECRET_KEY in your .env file.")
     SECRET_KEY = secrets.token_hex(32) # Generate a 32-byte hex key
     # You could optionally write this generated key to a .env file here if it doesn't exist,
     # but simply using it for the current run is often sufficient for dev.
@@ -46,7 +73,7 @@ if not SECRET_KEY:
     #        f.write(f"\nFLASK_SECRET_KEY='{SECRET_KEY}'\n")
     #        print("   -> Wrote generated key to new .env file.")
 else:
-    print("Using FLASK_SECRET_KEY from environment.")
+    log.info("Using FLASK_SECRET_KEY from environment.")
 
 # Set the Flask secret key config
 app.config['SECRET_KEY'] = SECRET_KEY
@@ -56,114 +83,510 @@ app.config['SECRET_KEY'] = SECRET_KEY
 if not os.path.exists(app.config['UPLOAD_FOLDER']): os.makedirs(app.config['UPLOAD_FOLDER'])
 if not os.path.exists(app.config['TTS_AUDIO_FOLDER']): os.makedirs(app.config['TTS_AUDIO_FOLDER'])
 
+# Question audio is rendered in the background right after upload (see tts_prefetch.py)
+TTS_PREFETCH_WORKERS = int(os.getenv("TTS_PREFETCH_WORKERS", "1"))
+# Pool workers started with "spawn" (resume extraction) re-import this script as __mp_main__;
+# they must not start the reaper or warm-up, which belong to the web process only
+IS_WEB_PROCESS = __name__ != "__mp_main__"
+if IS_WEB_PROCESS: tts_interface.audio_store.start_reaper() # Deletes audio of finished/expired interviews, enforces the disk quota
+question_audio_prefetcher = QuestionAudioPrefetcher(tts_interface.text_to_speech, max_workers=TTS_PREFETCH_WORKERS) if tts_interface.ENABLE_HF_TTS and TTS_PREFETCH_WORKERS > 0 else None
+
+# Streaming mode: uncached lines are vocoded sentence-by-sentence from /audio/stream instead of inline
+ENABLE_TTS_STREAMING = os.getenv("TTS_STREAMING", "0") == "1"
+STREAM_TOKEN_MAX_AGE = 600 # Seconds a stream URL stays valid
+AUDIO_MAX_AGE = int(os.getenv("AUDIO_MAX_AGE", "86400")) # Browser cache lifetime for generated audio (files never change)
+AUDIO_MIMETYPES = {'wav': 'audio/wav', 'ogg': 'audio/ogg'}
+
+# Resume text is extracted from the uploaded bytes in a process pool with page/size caps and a hard timeout
+resume_extractor = ResumeExtractor()
+
+# Interview state lives server-side; the session cookie only carries the interview id.
+# memory:// (single process), sqlite:///file.db (default; all workers on one host) or redis://host:port/db
+interview_store = create_store(os.getenv("INTERVIEW_STORE", "sqlite:///interviews.db"), ttl=float(os.getenv("INTERVIEW_TTL_HOURS", "24")) * 3600)
+
+# Re-uploads of the same resume skip extraction and question generation
+ENABLE_RESUME_CACHE = os.getenv("RESUME_CACHE_ENABLED", "1") == "1"
+RESUME_EXTRACTOR_VERSION = "2" # Bump when text extraction changes
+QUESTION_PROMPT_VERSION = "1" # Bump when the question-generation prompt changes
+resume_cache = resume_cache_module.ResumeCache(
+    os.getenv("RESUME_CACHE_PATH", "resume_cache.db"), ttl=float(os.getenv("RESUME_CACHE_TTL_HOURS", "168")) * 3600,
+    max_bytes=int(os.getenv("RESUME_CACHE_MAX_MB", "64")) * 1024 * 1024) if ENABLE_RESUME_CACHE else None
+
+# "inline" (default): evaluate each answer with Gemini before acknowledging it
+# "pipelined": acknowledge at once from a pre-rendered template, evaluate in the background and
+#              return the next question in the same response (one round trip per answer)
+# "deferred": template acks during the interview; all answers are evaluated in one batched
+#             Gemini request when the report is built
+EVALUATION_MODE = os.getenv("EVALUATION_MODE", "inline")
+if EVALUATION_MODE not in ("inline", "pipelined", "deferred"): log.warning("Unknown EVALUATION_MODE '%s', using 'inline'.", EVALUATION_MODE); EVALUATION_MODE = "inline"
+CLOSING_TEXT = "Okay, that was the last question. Thanks for your time! The report is being generated."
+ACK_TEMPLATES = ["Thanks, got it.", "Okay, thank you for that.", "Great, thanks for sharing.", "Alright, noted.", "Thank you, that's helpful."]
+SKIP_ACK_TEMPLATES = ["No problem, let's move on.", "That's okay, let's keep going."] # Empty / "don't know" answers
+stream_token_serializer = URLSafeTimedSerializer(SECRET_KEY, salt="tts-stream")
+
 GEMINI_API_KEY = os.getenv("GOOGLE_API_KEY"); gemini_model = None
-if not GEMINI_API_KEY: print("!!! WARNING: GOOGLE_API_KEY not set. Gemini disabled. !!!")
-else:
-    try: genai.configure(api_key=GEMINI_API_KEY); gemini_model = genai.GenerativeModel('gemini-1.5-flash-latest'); print("Gemini configured.")
-    except Exception as e: print(f"Error configuring Gemini: {e}. Disabled."); GEMINI_API_KEY = None
+GEMINI_BACKEND = os.getenv("GEMINI_BACKEND", "google") # "fake": deterministic offline replies (fake_backends.py)
+if GEMINI_BACKEND == "fake": GEMINI_API_KEY = GEMINI_API_KEY or "fake"
+elif not GEMINI_API_KEY: log.warning("GOOGLE_API_KEY not set. Gemini disabled.")
+
+def get_gemini_model():
+    """Configures the Gemini client on first use. Returns None if Gemini is disabled."""
+    global gemini_model, GEMINI_API_KEY
+    if gemini_model is not None or not GEMINI_API_KEY: return gemini_model
+    with _lazy_import_lock:
+        if gemini_model is None and GEMINI_BACKEND == "fake":
+            import fake_backends; gemini_model = fake_backends.FakeGenerativeModel(); log.info("Using fake Gemini backend.")
+        elif gemini_model is None and GEMINI_API_KEY:
+            try:
+                import google.generativeai as genai
+                genai.configure(api_key=GEMINI_API_KEY); gemini_model = genai.GenerativeModel('gemini-1.5-flash-latest'); log.info("Gemini configured.")
+            except Exception as e: log.error("Error configuring Gemini: %s. Disabled.", e); GEMINI_API_KEY = None
+    return gemini_model
+
+# All Gemini calls go through one client: per-attempt timeout, overall deadline, jittered retries,
+# a process-wide concurrency cap and a circuit breaker (failures fall back to the canned replies below)
+llm_client = LLMClient(
+    get_gemini_model, max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
+    timeout=float(os.getenv("LLM_TIMEOUT", "20")), deadline=float(os.getenv("LLM_DEADLINE", "45")),
+    max_retries=int(os.getenv("LLM_MAX_RETRIES", "2")),
+    breaker=CircuitBreaker(int(os.getenv("LLM_BREAKER_THRESHOLD", "5")), float(os.getenv("LLM_BREAKER_RESET", "30"))))
+
+# "background" (default): load TTS models, Gemini and WeasyPrint in a thread at startup
+# "eager": load them before serving (old behaviour); "lazy": load each on first use
+WARMUP_MODE = os.getenv("WARMUP_MODE", "background")
+
+def warm_up_dependencies():
+    """Loads the heavy dependencies ahead of the first request that needs them."""
+    start_time = time.time()
+    get_gemini_model(); get_weasyprint(); moderation.get_moderator(); tts_interface.load_models()
+    if EVALUATION_MODE != "inline" and tts_interface.ENABLE_TTS_CACHE:
+        # Fixed lines land in the shared audio cache, so every interview gets them without synthesis
+        for line in ACK_TEMPLATES + SKIP_ACK_TEMPLATES + [CLOSING_TEXT]: tts_interface.text_to_speech(line, "ack")
+    tts_interface.prerender_phrases() # Most used questions/acks across the fleet, from the phrase usage log
+    log.info("Warm-up finished in %.2fs.", time.time() - start_time)
+
+if not IS_WEB_PROCESS: pass
+elif WARMUP_MODE == "eager": warm_up_dependencies()
+elif WARMUP_MODE == "background": threading.Thread(target=warm_up_dependencies, name="app-warmup", daemon=True).start()
 
 # --- Helper Functions (Keep as is) ---
 def allowed_file(filename): return '.' in filename and filename.rsplit('.', 1)[1].lower() in {'pdf', 'docx'}
-def extract_text_from_pdf(filepath):
-    text = "";
+def parse_resume_bytes(data, filename):
+    """Extracts resume text from uploaded bytes in the extractor pool (no temp file)."""
+    file_type = filename.rsplit('.', 1)[-1].lower()
+    log.debug("Starting text extraction for: %s (%s bytes)", filename, len(data))
     try:
-        with open(filepath, 'rb') as file:
-            try: reader = PyPDF2.PdfReader(file, strict=False)
-            except PyPDF2Errors.PyPdfError as init_err: raise ValueError(f"PDF reader init error: {init_err}")
-            num_pages = len(reader.pages); print(f"Reading {num_pages} pages from PDF...")
-            for i, page in enumerate(reader.pages):
-                try: page_text = page.extract_text(); text += (page_text + " ") if page_text else ""
-                except Exception as page_exc: print(f"  - Error page {i+1}: {page_exc}")
-        text = re.sub(r'\s+', ' ', text).strip(); print(f"Extracted text from PDF: {os.path.basename(filepath)}")
-    except PyPDF2Errors.PdfReadError as pe: raise ValueError(f"Could not read PDF structure: {pe}")
-    except FileNotFoundError: raise
-    except Exception as e: print(f"Unexpected error reading PDF: {e}"); traceback.print_exc(); raise ValueError(f"PDF processing error: {e}")
-    return text
-def extract_text_from_docx(filepath):
-    text = "";
-    try: doc = docx.Document(filepath); full_text = [p.text for p in doc.paragraphs if p.text]; text = ' '.join(full_text)
-    except Exception as e: raise ValueError(f"Could not read DOCX: {e}")
-    text = re.sub(r'\s+', ' ', text).strip(); print(f"Extracted text from DOCX: {os.path.basename(filepath)}")
-    return text
+        with metrics.span(f"resume_parse_{file_type}", state="UPLOAD"): text = resume_extractor.extract(data, file_type)
+        if not text: raise ValueError(f"No text extracted: {filename}")
+        log.debug("Text extraction complete. Length: %s chars.", len(text))
+        return text
+    except Exception as e: log.error("Error during parse_resume: %s", e); raise
+
 def parse_resume(filepath):
-    print(f"Starting text extraction for: {filepath}")
     if not os.path.exists(filepath): raise FileNotFoundError(f"Resume file not found: {filepath}")
-    try:
-        if filepath.lower().endswith(".pdf"): text = extract_text_from_pdf(filepath)
-        elif filepath.lower().endswith(".docx"): text = extract_text_from_docx(filepath)
-        else: raise ValueError(f"Unsupported type: {filepath}")
-        if not text: raise ValueError(f"No text extracted: {filepath}")
-        print(f"Text extraction complete. Length: {len(text)} chars.")
-        return text
-    except Exception as e: print(f"Error during parse_resume: {e}"); raise
+    with open(filepath, 'rb') as f: return parse_resume_bytes(f.read(), os.path.basename(filepath))
 
 # --- Gemini Interaction Functions (Keep as is - using simpler evaluation) ---
-def generate_questions_with_gemini(resume_text):
-    print("Generating 10 questions (incl. behavioral)...")
-    if not gemini_model: return ["Gemini unavailable.", "Default Q."]
+# Each prompt is described by a GeminiRequest, so the sync routes (call_gemini) and the async ones
+# (asgi.acall_gemini) share prompts and parsing. parse(response) -> result; fallback(error) -> result
+# on errors/blocked replies; unavailable is the result when no Gemini model is configured.
+GeminiRequest = namedtuple("GeminiRequest", "prompt_type prompt kwargs parse fallback unavailable")
+SAFETY_SETTINGS = [ {"category": c, "threshold": "BLOCK_MEDIUM_AND_ABOVE"} for c in ["HARM_CATEGORY_HARASSMENT", "HARM_CATEGORY_HATE_SPEECH", "HARM_CATEGORY_SEXUALLY_EXPLICIT", "HARM_CATEGORY_DANGEROUS_CONTENT"] ]
+
+def call_gemini(gemini_request):
+    if not get_gemini_model(): return gemini_request.unavailable
+    try: return gemini_request.parse(llm_client.generate_content(gemini_request.prompt_type, gemini_request.prompt, **gemini_request.kwargs))
+    except Exception as e: return gemini_failed(gemini_request, e)
+
+def gemini_failed(gemini_request, error):
+    # Outages and timeouts are expected (and counted by llm_client); anything else gets a traceback
+    log.error("Error Gemini %s: %s", gemini_request.prompt_type, error, exc_info=not isinstance(error, LLMUnavailableError))
+    return gemini_request.fallback(error)
+
+def cached_questions(resume_text):
+    """(cache key, cached questions or None) for a resume's text."""
+    if not resume_cache: return None, None
+    questions_key = resume_cache_module.text_key(resume_text, QUESTION_PROMPT_VERSION)
+    questions = resume_cache.get_questions(questions_key)
+    if questions: log.info("Using %s cached questions.", len(questions))
+    return questions_key, questions
+
+def parse_questions(response, questions_key=None):
+    if not response.parts: raise ValueError(f"Gemini Q-gen blocked: {response.prompt_feedback.block_reason}.")
+    raw_questions = response.text.strip().split('\n'); questions = [re.match(r'^\s*\d+[.)]?\s*(.*)', l).group(1).strip() if re.match(r'^\s*\d+[.)]?\s*(.*)', l) else l.strip() for l in raw_questions if l.strip()]
+    if not questions: raise ValueError("Gemini Q-gen parsing failed.")
+    if resume_cache and questions_key: resume_cache.put_questions(questions_key, questions) # Only successful generations are cached
+    log.info("Generated %s questions.", len(questions)); return questions
+
+def questions_request(resume_text, questions_key=None):
     prompt = f"""Act as recruiter reviewing resume:\n---\n{resume_text}\n---\nGenerate exactly 10 insightful interview questions (mix technical & behavioral). Format ONLY numbered list:\n1. Q1?\n...\n10. Q10?"""
-    try:
-        safety_settings = [ {"category": c, "threshold": "BLOCK_MEDIUM_AND_ABOVE"} for c in ["HARM_CATEGORY_HARASSMENT", "HARM_CATEGORY_HATE_SPEECH", "HARM_CATEGORY_SEXUALLY_EXPLICIT", "HARM_CATEGORY_DANGEROUS_CONTENT"] ]
-        response = gemini_model.generate_content(prompt, safety_settings=safety_settings)
-        if not response.parts: raise ValueError(f"Gemini Q-gen blocked: {response.prompt_feedback.block_reason}.")
-        raw_questions = response.text.strip().split('\n'); questions = [re.match(r'^\s*\d+[.)]?\s*(.*)', l).group(1).strip() if re.match(r'^\s*\d+[.)]?\s*(.*)', l) else l.strip() for l in raw_questions if l.strip()]
-        if not questions: raise ValueError("Gemini Q-gen parsing failed.")
-        print(f"Generated {len(questions)} questions."); return questions
-    except Exception as e: print(f"Error Gemini Q-gen: {e}"); traceback.print_exc(); return [f"Error Q-gen: {e}", "Fallback Q."]
+    return GeminiRequest("questions", prompt, {"safety_settings": SAFETY_SETTINGS}, functools.partial(parse_questions, questions_key=questions_key),
+                         lambda e: [f"Error Q-gen: {e}", "Fallback Q."], ["Gemini unavailable.", "Default Q."])
 
-def evaluate_and_respond_gemini_simple(question_asked, user_answer):
-    print(f"Evaluating answer simply for Q: '{question_asked[:50]}...'")
-    if not gemini_model: return "Okay.", "Evaluation skipped."
+def generate_questions_with_gemini(resume_text):
+    questions_key, questions = cached_questions(resume_text)
+    if questions: return questions
+    log.info("Generating 10 questions (incl. behavioral)...")
+    return call_gemini(questions_request(resume_text, questions_key))
+
+def parse_evaluation(response):
+    if not response.parts: raise ValueError(f"Gemini eval blocked: {response.prompt_feedback.block_reason}.")
+    response_text = response.text.strip(); log.debug("Gemini Simple Eval Raw:\n%s", response_text)
+    ack_match = re.search(r"ACKNOWLEDGEMENT:\s*(.*?)(?:\nEVALUATION:|$)", response_text, re.I | re.S); eval_match = re.search(r"EVALUATION:\s*(.*)", response_text, re.I)
+    ack_text = ack_match.group(1).strip() if ack_match else "Got it."; eval_note = eval_match.group(1).strip() if eval_match else "Eval parse error."
+    if eval_match and ack_text.endswith(eval_match.group(0)): ack_text = ack_text[:-len(eval_match.group(0))].strip()
+    log.debug("Simple Eval -> Ack: '%s', Eval Note: '%s'", ack_text, eval_note); return ack_text, eval_note
+
+def evaluation_request(question_asked, user_answer):
+    log.debug("Evaluating answer simply for Q: '%s...'", question_asked[:50])
     prompt = f"""As AI interviewer 'Rose'. Question: "{question_asked}" Answer: "{user_answer}" Provide: 1. Short conversational acknowledgement (1 sentence, friendly/neutral). 2. Concise evaluation note (max 10 words) for a report. Handle "don't know"/refusals neutrally. Format *exactly*: ACKNOWLEDGEMENT: [Ack] EVALUATION: [Eval Note]"""
-    try:
-        safety_settings = [ {"category": c, "threshold": "BLOCK_MEDIUM_AND_ABOVE"} for c in ["HARM_CATEGORY_HARASSMENT", "HARM_CATEGORY_HATE_SPEECH", "HARM_CATEGORY_SEXUALLY_EXPLICIT", "HARM_CATEGORY_DANGEROUS_CONTENT"] ]
-        response = gemini_model.generate_content(prompt, safety_settings=safety_settings)
-        if not response.parts: raise ValueError(f"Gemini eval blocked: {response.prompt_feedback.block_reason}.")
-        response_text = response.text.strip(); print(f"Gemini Simple Eval Raw:\n{response_text}")
-        ack_match = re.search(r"ACKNOWLEDGEMENT:\s*(.*?)(?:\nEVALUATION:|$)", response_text, re.I | re.S); eval_match = re.search(r"EVALUATION:\s*(.*)", response_text, re.I)
-        ack_text = ack_match.group(1).strip() if ack_match else "Got it."; eval_note = eval_match.group(1).strip() if eval_match else "Eval parse error."
-        if eval_match and ack_text.endswith(eval_match.group(0)): ack_text = ack_text[:-len(eval_match.group(0))].strip()
-        print(f"Simple Eval -> Ack: '{ack_text}', Eval Note: '{eval_note}'"); return ack_text, eval_note
-    except Exception as e: print(f"Error Gemini simple eval: {e}"); traceback.print_exc(); return "Alright.", f"Eval error: {e}"
-
-def generate_greeting_with_gemini():
-    print("Generating greeting...")
-    if not gemini_model:
-        return "Hello! Let's begin."
-    
-    prompt = "You are 'Rose', a friendly AI interviewer. Generate 1-2 cheery opening sentences."
-    try:
-        response = gemini_model.generate_content(prompt)
-        greeting = response.text.strip()
-        greeting = re.sub(r'^"|"$|^(Greeting|Response|Rose):\s*', '', greeting, flags=re.I)
-    except Exception as e:
-        print(f"Error Gemini greeting: {e}")
-        return "Hi! Ready?"
-    
-    print(f"Generated Greeting: {greeting}")
+    return GeminiRequest("evaluation", prompt, {"safety_settings": SAFETY_SETTINGS}, parse_evaluation,
+                         lambda e: ("Alright.", f"Eval error: {e}"), ("Okay.", "Evaluation skipped."))
+
+def question_being_answered(manager):
+    """Text of the question the candidate is answering (usable before the state moves to PROCESSING_ANSWER)."""
+    index = manager.current_question_index
+    return manager.questions[index] if 0 <= index < len(manager.questions) else "N/A"
+
+def evaluate_and_respond_gemini_simple(question_asked, user_answer):
+    return call_gemini(evaluation_request(question_asked, user_answer))
+
+def parse_greeting(response):
+    greeting = re.sub(r'^"|"$|^(Greeting|Response|Rose):\s*', '', response.text.strip(), flags=re.I)
+    log.debug("Generated Greeting: %s", greeting)
     return greeting if greeting else "Hi! I'm Rose! Ready?"
 
-def generate_greeting_ack_with_gemini(user_greeting_response):
-    print("Generating greeting ack...")
-    if not gemini_model:
-        return "Okay, great!"
-    
-    prompt = f"You are 'Rose'. Candidate replied to greeting: \"{user_greeting_response}\". Generate 1 brief, positive acknowledgement."
-    try:
-        response = gemini_model.generate_content(prompt)
-        ack = response.text.strip()
-        ack = re.sub(r'^"|"$|^(Acknowledgement|Response|Rose):\s*', '', ack, flags=re.I)
-    except Exception as e:
-        print(f"Error Gemini greeting ack: {e}")
-        return "Okay!"
-    
-    print(f"Generated Greeting Ack: {ack}")
+def greeting_request():
+    prompt = "You are 'Rose', a friendly AI interviewer. Generate 1-2 cheery opening sentences."
+    return GeminiRequest("greeting", prompt, {}, parse_greeting, lambda e: "Hi! Ready?", "Hello! Let's begin.")
+
+def parse_greeting_ack(response):
+    ack = re.sub(r'^"|"$|^(Acknowledgement|Response|Rose):\s*', '', response.text.strip(), flags=re.I)
+    log.debug("Generated Greeting Ack: %s", ack)
     return ack if ack else "Great!"
 
+def greeting_ack_request(user_greeting_response):
+    prompt = f"You are 'Rose'. Candidate replied to greeting: \"{user_greeting_response}\". Generate 1 brief, positive acknowledgement."
+    return GeminiRequest("greeting_ack", prompt, {}, parse_greeting_ack, lambda e: "Okay!", "Okay, great!")
+
+# Structured output for the deferred batch evaluation (Gemini response_schema; also checked locally)
+BATCH_EVALUATION_SCHEMA = {
+    "type": "OBJECT", "required": ["evaluations"],
+    "properties": {"evaluations": {"type": "ARRAY", "items": {
+        "type": "OBJECT", "required": ["index", "evaluation"],
+        "properties": {"index": {"type": "INTEGER"}, "evaluation": {"type": "STRING"}}}}},
+}
+BATCH_EVALUATION_MAX_ITEMS = 20 # Answers per request; longer interviews are split
+BATCH_ANSWER_MAX_CHARS = 2000 # Bounds prompt size for rambling answers
+
+def parse_batch_evaluations(response_text, count):
+    """Maps the JSON reply onto `count` notes; entries that are missing or malformed stay None."""
+    text = re.sub(r'^```(?:json)?\s*|\s*```$', '', response_text.strip()) # Tolerate fenced output
+    data = json.loads(text); notes = [None] * count
+    items = data.get("evaluations") if isinstance(data, dict) else None
+    if not isinstance(items, list): raise ValueError("Batch eval: 'evaluations' array missing.")
+    for item in items:
+        if not isinstance(item, dict): continue
+        index, note = item.get("index"), item.get("evaluation")
+        if isinstance(index, int) and 1 <= index <= count and isinstance(note, str) and note.strip(): notes[index - 1] = note.strip()
+    return notes
+
+def evaluate_answers_batch_gemini(qa_pairs):
+    """Evaluates many (question, answer) pairs in one Gemini request. Returns one note per pair."""
+    log.debug("Evaluating %s answers in one batch...", len(qa_pairs))
+    gemini = get_gemini_model()
+    if not gemini: return ["Evaluation skipped."] * len(qa_pairs)
+    items = "\n".join(f"{i}. Question: {json.dumps(q)}\n   Answer: {json.dumps((a or '')[:BATCH_ANSWER_MAX_CHARS])}" for i, (q, a) in enumerate(qa_pairs, 1))
+    prompt = f"""As AI interviewer 'Rose', write a concise evaluation note (max 10 words) for a report on each numbered answer below. Handle "don't know"/refusals neutrally. Reply ONLY with JSON: {{"evaluations": [{{"index": <number>, "evaluation": "<note>"}}, ...]}} with one entry per answer.\n{items}"""
+    try:
+        generation_config = {"response_mime_type": "application/json", "response_schema": BATCH_EVALUATION_SCHEMA}
+        response = llm_client.generate_content("evaluation_batch", prompt, timeout=llm_client.timeout * 2, safety_settings=SAFETY_SETTINGS, generation_config=generation_config)
+        if not response.parts: raise ValueError(f"Gemini batch eval blocked: {response.prompt_feedback.block_reason}.")
+        notes = parse_batch_evaluations(response.text, len(qa_pairs))
+        missing = notes.count(None)
+        if missing: log.warning("Batch eval: %s of %s notes missing from reply.", missing, len(qa_pairs))
+        return [note or "Evaluation unavailable." for note in notes]
+    except Exception as e: log.exception("Error Gemini batch eval: %s", e); return [f"Eval error: {e}"] * len(qa_pairs)
+
+def choose_ack(user_answer, q_index):
+    """Picks a template acknowledgement (no Gemini call), rotating so consecutive answers differ."""
+    skipped = len(user_answer.split()) < 3 or re.search(r"\b(don'?t know|not sure|no idea|skip|pass)\b", user_answer, re.I)
+    templates = SKIP_ACK_TEMPLATES if skipped else ACK_TEMPLATES
+    return templates[q_index % len(templates)]
+
+evaluation_pipeline = EvaluationPipeline(evaluate_and_respond_gemini_simple, interview_store, max_workers=int(os.getenv("EVALUATION_WORKERS", "4"))) if EVALUATION_MODE == "pipelined" else None
+
+
+def speak(text, filename_prefix, interview_id=None):
+    """Returns an audio filename for text. In streaming mode only cached audio is returned inline."""
+    if ENABLE_TTS_STREAMING: return tts_interface.cached_audio(text)
+    return tts_interface.text_to_speech(text, filename_prefix, interview_id=interview_id)
+
+def question_audio(manager, q_index, question_text):
+    """Returns audio for a question, preferring a file pre-rendered in the background."""
+    if question_audio_prefetcher:
+        # In streaming mode don't block on a render in progress; streaming gets first audio out sooner
+        audio_filename = question_audio_prefetcher.take(manager.interview_id, q_index, question_text, timeout=0 if ENABLE_TTS_STREAMING else 30.0)
+        question_audio_prefetcher.prioritize(manager.interview_id, q_index + 1) # Next one up
+        if audio_filename: return audio_filename
+    return speak(question_text, f"question_{q_index}", manager.interview_id)
+
+def audio_fields(text, audio_filename):
+    """Builds the audio_url/stream_url part of a turn response."""
+    stream_url = None
+    if not audio_filename and ENABLE_TTS_STREAMING and tts_interface.ENABLE_HF_TTS and text:
+        stream_url = url_for('stream_audio', token=stream_token_serializer.dumps(text))
+    return {"audio_url": url_for('get_audio', filename=audio_filename) if audio_filename else None, "stream_url": stream_url}
+
+def cancel_background_work(interview_id, finished=False):
+    """Stops pre-synthesis for an interview that was abandoned or has finished and releases its audio."""
+    if not interview_id: return
+    if question_audio_prefetcher: question_audio_prefetcher.cancel(interview_id)
+    if evaluation_pipeline and not finished: evaluation_pipeline.discard(interview_id) # Finished interviews still need them for the report
+    if finished: tts_interface.audio_store.finish_session(interview_id) # Reaped once the closing line has played
+    else: tts_interface.audio_store.release_session(interview_id)
+
+def complete_evaluations(manager):
+    """Makes sure every recorded answer has its evaluation note before the report is built."""
+    if evaluation_pipeline: evaluation_pipeline.apply(manager, wait=True) # Last answers may still be evaluating
+    elif EVALUATION_MODE == "deferred":
+        pending = [i for i, r in enumerate(manager.responses) if r.evaluation is None]
+        for start in range(0, len(pending), BATCH_EVALUATION_MAX_ITEMS):
+            chunk = pending[start:start + BATCH_EVALUATION_MAX_ITEMS]
+            notes = evaluate_answers_batch_gemini([(manager.questions[manager.responses[i].q_index], manager.responses[i].answer) for i in chunk])
+            for i, note in zip(chunk, notes): manager.set_evaluation(i, note)
+
+def prepare_report(interview_id):
+    """Report data for a finished interview, with every evaluation filled in and saved."""
+    token = metrics.current_state.set(InterviewState.FINISHED) # Tags the evaluation and store spans
+    try:
+        with metrics.span("store_load"): manager = interview_store.load(interview_id)
+        complete_evaluations(manager)
+        save_interview(manager) # Later page views and other workers reuse the notes
+        if evaluation_pipeline: evaluation_pipeline.confirm(manager)
+        return manager.get_final_data()
+    finally: metrics.current_state.reset(token)
+
+def render_report_pdf(report_data):
+    with app.app_context(), metrics.span("report_template", state=InterviewState.FINISHED): # Runs in a report worker thread, outside any request
+        html_string = render_template('report.html', report=report_data, is_pdf_render=True, WEASYPRINT_AVAILABLE=True)
+    with metrics.span("report_pdf", state=InterviewState.FINISHED): return get_weasyprint().HTML(string=html_string).write_pdf()
+
+# Reports are built once, in the background, as soon as the interview finishes; PDFs are kept
+# on disk keyed by interview id + content hash and served with an ETag
+REPORT_RENDER_WAIT = float(os.getenv("REPORT_RENDER_WAIT", "20")) # Max seconds a download waits for a render in progress
+report_renderer = ReportRenderer(prepare_report, render_report_pdf if WEASYPRINT_AVAILABLE else None, os.getenv("REPORT_DIR", "reports"),
+                                 max_workers=int(os.getenv("REPORT_RENDER_WORKERS", "1")), ttl=float(os.getenv("INTERVIEW_TTL_HOURS", "24")) * 3600)
+
+def turn_payload(state, transcript, audio_filename, is_finished):
+    """JSON body for one interviewer turn."""
+    audio = audio_fields(transcript, audio_filename)
+    payload = { "status": "OK", **audio, "transcript": transcript, "state": state, "is_finished": is_finished, "awaits_input": state in AWAITS_INPUT }
+    if transcript and not (audio_filename or audio["stream_url"]) and tts_interface.ENABLE_HF_TTS: payload["transcript"] += " (Audio unavailable)"
+    return payload
+
+def load_interview():
+    """InterviewManager for this browser session, or None if there is none (or it expired)."""
+    interview_id = session.get('interview_id')
+    if not interview_id: return None
+    try:
+        with metrics.span("store_load"): return interview_store.load(interview_id)
+    except InterviewNotFound: session.pop('interview_id', None); return None
+
+def save_interview(manager):
+    with metrics.span("store_save", state=manager.get_state()): interview_store.save(manager)
+
+def begin_turn(manager):
+    """Keeps the interview's audio alive and applies evaluation notes finished since the last turn."""
+    tts_interface.audio_store.touch_session(manager.interview_id)
+    if evaluation_pipeline: evaluation_pipeline.apply(manager)
+
+def end_turn(manager):
+    save_interview(manager) # Appends the new response; fails if another request got there first
+    if evaluation_pipeline: evaluation_pipeline.confirm(manager) # Notes applied by begin_turn are saved now; the new answer is evaluated
+    if manager.get_state() in TERMINAL_STATES: report_renderer.submit(manager.interview_id) # Build the report while the closing line plays
+
+def resume_text(data, filename):
+    """Text of an uploaded resume, from the resume cache when the same file was seen before."""
+    extracted_text = None
+    if resume_cache:
+        text_cache_key = resume_cache_module.content_key(data, filename.rsplit('.', 1)[1].lower(), RESUME_EXTRACTOR_VERSION)
+        extracted_text = resume_cache.get_text(text_cache_key)
+        if extracted_text: log.debug("Using cached resume text (%s chars).", len(extracted_text))
+    if not extracted_text:
+        extracted_text = parse_resume_bytes(data, filename)
+        if resume_cache: resume_cache.put_text(text_cache_key, extracted_text)
+    return extracted_text
+
+def begin_interview(questions):
+    """Creates and stores the interview for this browser session and starts pre-rendering its questions."""
+    manager = InterviewManager(questions=questions)
+    interview_store.create(manager); session['interview_id'] = manager.interview_id
+    if question_audio_prefetcher: question_audio_prefetcher.schedule(manager.interview_id, questions)
+    log.info("Setup complete.")
+    return manager
+
+# --- Turn handlers: one per transition in interview_flow.TRANSITIONS ---
+# Each takes (manager, user_text, trace, emit, llm_reply), performs the transition and returns the turn payload.
+# emit(name, data) is set for streamed turns (/interview/turn) and receives the line before its audio.
+# llm_reply is the parsed result of the handler's Gemini request (TURN_LLM_REQUESTS), or None if it makes none.
+flow_timings = FlowTimings(slow_seconds=float(os.getenv("FLOW_SLOW_TRANSITION_MS", "2000")) / 1000)
+
+def announce(emit, text):
+    """Streams the interviewer's line as soon as it is known, ahead of its audio."""
+    if emit and text: emit("text", {"transcript": text})
+
+def turn_greet(manager, user_text, trace, emit=None, llm_reply=None):
+    greeting_text = llm_reply; announce(emit, greeting_text)
+    audio_filename = speak(greeting_text, "greeting", manager.interview_id); trace.step("tts")
+    manager.set_state(InterviewState.AWAITING_GREETING_RESPONSE)
+    payload = turn_payload(manager.get_state(), greeting_text, audio_filename, False)
+    if not (audio_filename or payload["stream_url"]): payload["transcript"] = greeting_text + "."
+    return payload
+
+def turn_greeting_reply(manager, user_text, trace, emit=None, llm_reply=None):
+    log.debug("Got greeting response: %s...", user_text[:50]); manager.record_greeting_response(user_text)
+    ack_text = llm_reply; announce(emit, ack_text)
+    audio_filename = speak(ack_text, "greeting_ack", manager.interview_id); trace.step("tts")
+    manager.set_state(InterviewState.GREETING_ACKNOWLEDGED)
+    return turn_payload(manager.get_state(), ack_text, audio_filename, False)
+
+def turn_first_question(manager, user_text, trace, emit=None, llm_reply=None):
+    log.debug("Proceeding to first question..."); q_index = manager.prepare_first_question()
+    if q_index is None: raise TransitionError("Could not prep first Q")
+    question_text = manager.get_current_question()
+    if not question_text: raise TransitionError("Could not get first Q text")
+    announce(emit, question_text)
+    audio_filename = question_audio(manager, q_index, question_text); trace.step("tts")
+    manager.set_state(InterviewState.LISTENING)
+    return turn_payload(manager.get_state(), question_text, audio_filename, False)
+
+def turn_answer(manager, user_text, trace, emit=None, llm_reply=None):
+    log.debug("Got answer: %s...", user_text[:50]); manager.set_state(InterviewState.PROCESSING_ANSWER)
+    question_asked = question_being_answered(manager)
+    if llm_reply: ack_text, eval_note = llm_reply # Inline evaluation
+    else: ack_text, eval_note = choose_ack(user_text, manager.current_question_index), None # Filled in later (pipeline or report-time batch)
+    if not manager.record_answer_and_evaluation(user_text, eval_note): raise TransitionError("Failed recording answer")
+    if evaluation_pipeline: evaluation_pipeline.queue(manager, len(manager.responses) - 1, question_asked, user_text) # Submitted by end_turn once saved
+    announce(emit, ack_text)
+    audio_filename = speak(ack_text, f"ack_{manager.current_question_index}", manager.interview_id); trace.step("tts")
+    manager.set_state(InterviewState.ACKNOWLEDGED_ANSWER)
+    if emit is None and EVALUATION_MODE != "inline" and manager.get_state() in AUTO_ADVANCE:
+        # The next transition needs no input: run it now and send the next question along with the ack
+        # (streamed turns run it from stream_turns instead, as a separate event)
+        payload = turn_payload(InterviewState.ACKNOWLEDGED_ANSWER, ack_text, audio_filename, False)
+        payload["next"] = run_transition(manager, Event.CONTINUE)
+        return payload
+    return turn_payload(manager.get_state(), ack_text, audio_filename, False)
+
+def turn_next_question(manager, user_text, trace, emit=None, llm_reply=None):
+    """ACKNOWLEDGED_ANSWER -> next question (LISTENING) or closing (FINISHED)."""
+    next_q_result = manager.prepare_next_question()
+    if not next_q_result: raise TransitionError("Failed preparing next Q")
+    next_state = next_q_result.get("state")
+    if next_state == InterviewState.ASKING_QUESTION:
+        question_text = manager.get_current_question()
+        if not question_text: raise TransitionError("Could not get next Q text")
+        announce(emit, question_text)
+        audio_filename = question_audio(manager, manager.current_question_index, question_text); trace.step("tts")
+        manager.set_state(InterviewState.LISTENING)
+        return turn_payload(manager.get_state(), question_text, audio_filename, False)
+    if next_state == InterviewState.CLOSING:
+        announce(emit, CLOSING_TEXT)
+        audio_filename = speak(CLOSING_TEXT, "closing", manager.interview_id); trace.step("tts")
+        manager.set_state(InterviewState.FINISHED); cancel_background_work(manager.interview_id, finished=True)
+        return turn_payload(manager.get_state(), CLOSING_TEXT, audio_filename, True)
+    raise TransitionError(f"Unexpected state after prep next: {next_state}")
+
+TURN_HANDLERS = {"greet": turn_greet, "greeting_reply": turn_greeting_reply, "first_question": turn_first_question,
+                 "answer": turn_answer, "next_question": turn_next_question}
+# Gemini request each LLM-calling handler needs, built before the handler runs so the async routes can
+# await it instead of holding a thread (handler name -> fn(manager, user_text) -> GeminiRequest or None)
+TURN_LLM_REQUESTS = {"greet": lambda manager, user_text: greeting_request(),
+                     "greeting_reply": lambda manager, user_text: greeting_ack_request(user_text),
+                     "answer": lambda manager, user_text: evaluation_request(question_being_answered(manager), user_text) if EVALUATION_MODE == "inline" else None}
+
+def llm_request_for(transition, manager, user_text):
+    build = TURN_LLM_REQUESTS.get(transition.handler)
+    return build(manager, user_text) if build and Action.LLM in transition.actions else None
+
+def run_transition(manager, event=None, user_text="", emit=None, llm_reply=None):
+    """Runs the table transition out of the manager's current state and returns the turn payload.
+
+    llm_reply, if given, is the transition's Gemini result already fetched by the caller (asgi.py);
+    otherwise the call is made here.
+    """
+    transition = transition_for(manager.get_state(), event)
+    token = metrics.current_state.set(transition.source) # Spans inside the handler (LLM, TTS) are tagged with it
+    try:
+        with flow_timings.trace(transition.source, transition.event) as trace:
+            gemini_request = llm_request_for(transition, manager, user_text) if llm_reply is None else None
+            if gemini_request: llm_reply = call_gemini(gemini_request); trace.step("llm")
+            payload = TURN_HANDLERS[transition.handler](manager, user_text, trace, emit, llm_reply)
+            trace.target = manager.get_state()
+    finally: metrics.current_state.reset(token)
+    if trace.target not in transition.targets: log.warning("%s -> %s is not in the transition table", transition.source, trace.target)
+    actions, prefetchable = upcoming_actions(manager.get_state())
+    if prefetchable and Action.TTS in actions and question_audio_prefetcher: # Next line is known: render it first
+        question_audio_prefetcher.prioritize(manager.interview_id, manager.current_question_index + 1)
+    return payload
+
+def stream_turns(manager, user_text, emit):
+    """Runs the candidate's transition (START in INIT, otherwise the reply), then every following
+    transition that needs no input, saving and emitting a "turn" event after each one."""
+    begin_turn(manager)
+    while True:
+        payload = run_transition(manager, user_text=user_text, emit=emit); user_text = ""
+        end_turn(manager)
+        emit("turn", payload) # Audio (or stream URL) is ready
+        state = manager.get_state()
+        if state not in AUTO_ADVANCE: break
+    emit("done", {"state": state, "awaits_input": state in AWAITS_INPUT, "is_finished": state in TERMINAL_STATES})
+
+def sse_event(name, data):
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+SSE_KEEPALIVE_SECONDS = 15 # Comment line sent while a slow LLM/TTS step runs, so proxies keep the stream open
+
+# --- Request timing, /metrics and the slow-request profiler ---
+request_seconds = metrics.HistogramFamily(label_names=("endpoint", "method", "status"))
+# PROFILE_SLOW_REQUEST_MS > 0 samples the stacks of requests running longer than that (logged, and listed in /ready)
+PROFILE_SLOW_REQUEST_MS = float(os.getenv("PROFILE_SLOW_REQUEST_MS", "0"))
+slow_request_profiler = metrics.SlowRequestProfiler(PROFILE_SLOW_REQUEST_MS / 1000) if PROFILE_SLOW_REQUEST_MS > 0 else None
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    if slow_request_profiler: slow_request_profiler.start_request(f"{request.method} {request.path}")
+
+@app.after_request
+def record_request_time(response):
+    started = g.get('request_started')
+    if started is not None: request_seconds.observe((request.endpoint or "unknown", request.method, str(response.status_code)), time.perf_counter() - started)
+    return response
+
+@app.teardown_request
+def stop_request_profiler(exc=None):
+    if slow_request_profiler: slow_request_profiler.end_request()
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus text format. Streamed turns are timed until the response starts; their stages are in interview_stage_seconds."""
+    body = metrics.render_prometheus([
+        ("http_request_seconds", "Request latency by endpoint", request_seconds),
+        ("interview_stage_seconds", "Time in expensive stages (parsing, LLM, TTS, state store, PDF) by interview state", metrics.STAGES),
+        ("interview_transition_seconds", "Interview state transition latency", flow_timings.latency),
+        ("interview_transition_step_seconds", "LLM/TTS steps inside transitions", flow_timings.steps),
+        ("llm_call_seconds", "Successful Gemini call latency by prompt type", llm_client.latency),
+    ])
+    return Response(body, mimetype="text/plain; version=0.0.4")
 
 # --- Flask Routes (Keep routes as they were in the reverted simple version) ---
 @app.route('/')
-def index(): session.pop('interview_data', None); return render_template('index.html')
+def index():
+    abandoned = session.pop('interview_id', None)
+    if abandoned: cancel_background_work(abandoned); interview_store.delete(abandoned); report_renderer.discard(abandoned)
+    return render_template('index.html')
 
 @app.route('/upload', methods=['POST'])
 def upload_resume():
@@ -172,7 +595,6 @@ def upload_resume():
         return redirect(url_for('index'))
     
     file = request.files['resume']
-    filepath = None
 
     if file.filename == '':
         flash('No file selected.')
@@ -180,199 +602,222 @@ def upload_resume():
     
     if file and allowed_file(file.filename):
         filename = secure_filename(file.filename)
-        upload_dir = app.config['UPLOAD_FOLDER']
-
-        if not os.path.exists(upload_dir):
-            os.makedirs(upload_dir)
-
-        filepath = os.path.join(upload_dir, filename)
 
         try:
-            file.save(filepath)
-            extracted_text = parse_resume(filepath)
+            # Read at most one byte past the cap so an oversized upload isn't buffered whole
+            data = file.stream.read(resume_extractor.max_bytes + 1)
+            extracted_text = resume_text(data, filename)
             generated_questions = generate_questions_with_gemini(extracted_text)
 
             if generated_questions and not generated_questions[0].startswith("Error"):
-                manager = InterviewManager(questions=generated_questions)
-                session['interview_data'] = manager.to_dict()
-                print("Setup complete.")
+                begin_interview(generated_questions)
                 return redirect(url_for('interview_page'))
             else:
                 flash(f"Failed Q-gen: {generated_questions[0] if generated_questions else '?'}")
                 return redirect(url_for('index'))
 
-        except (ValueError, FileNotFoundError, PyPDF2Errors.PdfReadError) as parse_err:
-            print(f"File processing error: {parse_err}")
+        except (ValueError, FileNotFoundError) as parse_err:
+            log.error("File processing error: %s", parse_err)
             flash(f"Error processing resume: {parse_err}")
             return redirect(url_for('index'))
 
         except Exception as e:
-            print(f"Upload Error: {e}")
-            traceback.print_exc()
+            log.exception("Upload Error: %s", e)
             flash(f"Error: {e}")
             return redirect(url_for('index'))
 
-        finally:
-            if filepath and os.path.exists(filepath):
-                try:
-                    os.remove(filepath)
-                    print(f"Removed: {filepath}")
-                except OSError as e:
-                    print(f"Error removing {filepath}: {e}")
-
     else:
         flash('Invalid file type.')
         return redirect(url_for('index'))
 
 @app.route('/interview')
 def interview_page():
-    if 'interview_data' not in session: flash("No interview found."); return redirect(url_for('index'))
+    if 'interview_id' not in session: flash("No interview found."); return redirect(url_for('index'))
     return render_template('interview.html')
 
 @app.route('/interview/start', methods=['POST'])
 def start_interview():
-    if 'interview_data' not in session: return jsonify({"error": "No session"}), 400
+    if 'interview_id' not in session: return jsonify({"error": "No session"}), 400
     try:
-        manager_data = session.get('interview_data')
-        if not manager_data: return jsonify({"error": "Invalid session data"}), 400
-        manager = InterviewManager.from_dict(manager_data); state = manager.get_state()
-        if state != "INIT": return jsonify({"error": f"Interview already active (state: {state})"}), 400
-        greeting_text = generate_greeting_with_gemini(); audio_filename = tts_interface.text_to_speech(greeting_text, "greeting")
-        manager.set_state("AWAITING_GREETING_RESPONSE"); session['interview_data'] = manager.to_dict()
-        return jsonify({"status": "OK", "audio_url": url_for('get_audio', filename=audio_filename) if audio_filename else None, "transcript": greeting_text + ("." if not audio_filename else ""), "state": manager.get_state() })
-    except Exception as e: print(f"/start Error: {e}"); traceback.print_exc(); return jsonify({"error": f"Server error: {e}"}), 500
+        manager = load_interview()
+        if not manager: return jsonify({"error": "Invalid session data"}), 400
+        state = manager.get_state()
+        if state != InterviewState.INIT: return jsonify({"error": f"Interview already active (state: {state})"}), 400
+        payload = run_transition(manager, Event.START); save_interview(manager)
+        return jsonify(payload)
+    except StaleStateError: return jsonify({"error": "Interview was updated by another request. Please retry."}), 409
+    except Exception as e: log.exception("/start Error: %s", e); return jsonify({"error": f"Server error: {e}"}), 500
 
 @app.route('/interview/next_step', methods=['POST'])
 def handle_interview_step(): # Using simpler state logic
-    if 'interview_data' not in session: return jsonify({"error": "No session"}), 400
+    if 'interview_id' not in session: return jsonify({"error": "No session"}), 400
     data = request.get_json(); user_text = data.get('text', '').strip() if data else ""
     try:
-        manager = InterviewManager.from_dict(session['interview_data'])
-        current_state = manager.get_state()
-        audio_filename = None; transcript = ""; is_finished = False; response_data = {}
-
-        if current_state == "AWAITING_GREETING_RESPONSE":
-            print(f"Got greeting response: {user_text[:50]}..."); manager.record_greeting_response(user_text)
-            ack_text = generate_greeting_ack_with_gemini(user_text)
-            transcript = ack_text; audio_filename = tts_interface.text_to_speech(ack_text, "greeting_ack")
-            manager.set_state("GREETING_ACKNOWLEDGED")
-
-        elif current_state == "GREETING_ACKNOWLEDGED":
-            print("Proceeding to first question..."); q_index = manager.prepare_first_question()
-            if q_index is None: return jsonify({"error": "Could not prep first Q"}), 500
-            question_text = manager.get_current_question()
-            if question_text: transcript = question_text; audio_filename = tts_interface.text_to_speech(question_text, f"question_{q_index}"); manager.set_state("LISTENING")
-            else: return jsonify({"error": "Could not get first Q text"}), 500
-
-        elif current_state == "LISTENING":
-            print(f"Got answer: {user_text[:50]}..."); manager.set_state("PROCESSING_ANSWER")
-            question_asked = manager.get_last_question_asked()
-            ack_text, eval_note = evaluate_and_respond_gemini_simple(question_asked, user_text)
-            record_result = manager.record_answer_and_evaluation(user_text, eval_note)
-            if not record_result: return jsonify({"error": "Failed recording answer"}), 500
-            transcript = ack_text; audio_filename = tts_interface.text_to_speech(ack_text, f"ack_{manager.current_question_index}")
-            manager.set_state("ACKNOWLEDGED_ANSWER"); print("State -> ACKNOWLEDGED_ANSWER")
-
-        elif current_state == "ACKNOWLEDGED_ANSWER":
-            print("Acknowledged answer, preparing next question.");
-            next_q_result = manager.prepare_next_question()
-            if not next_q_result: return jsonify({"error": "Failed preparing next Q"}), 500
-            next_state = next_q_result.get("state")
-            if next_state == "ASKING_QUESTION":
-                question_text = manager.get_current_question()
-                if question_text: transcript = question_text; audio_filename = tts_interface.text_to_speech(question_text, f"question_{manager.current_question_index}"); manager.set_state("LISTENING")
-                else: return jsonify({"error": "Could not get next Q text"}), 500
-            elif next_state == "CLOSING":
-                closing_text = "Okay, that was the last question. Thanks for your time! The report is being generated."
-                transcript = closing_text; audio_filename = tts_interface.text_to_speech(closing_text, "closing")
-                manager.set_state("FINISHED"); is_finished = True
-            else: return jsonify({"error": f"Unexpected state after prep next: {next_state}"}), 500
-        else: print(f"Warning: Request in unexpected state: {current_state}"); return jsonify({"error": f"Unexpected state: {current_state}"}), 400
-
-        session['interview_data'] = manager.to_dict()
-        response_data = { "status": "OK", "audio_url": url_for('get_audio', filename=audio_filename) if audio_filename else None, "transcript": transcript, "state": manager.get_state(), "is_finished": is_finished }
-        if transcript and not audio_filename and tts_interface.ENABLE_HF_TTS: response_data["transcript"] += " (Audio unavailable)"
+        manager = load_interview()
+        if not manager: return jsonify({"error": "Interview expired"}), 400
+        begin_turn(manager)
+        if manager.get_state() == InterviewState.INIT: raise TransitionError("Interview not started", 400)
+        response_data = run_transition(manager, user_text=user_text) # Reply or continue, per the transition table
+        end_turn(manager)
         return jsonify(response_data)
-    except Exception as e: print(f"Error in /next_step: {e}"); traceback.print_exc(); return jsonify({"error": f"Internal server error: {str(e)}"}), 500
+    except TransitionError as e: log.warning("/next_step: %s", e); return jsonify({"error": str(e)}), e.status
+    except StaleStateError: return jsonify({"error": "Interview was updated by another request. Please retry."}), 409
+    except Exception as e: log.exception("Error in /next_step: %s", e); return jsonify({"error": f"Internal server error: {str(e)}"}), 500
+
+@app.route('/interview/turn', methods=['POST'])
+def interview_turn():
+    """One candidate turn as a stream of server-sent events (read with fetch, since EventSource can't POST).
+
+    Events: "text" (an interviewer line, before its audio), "turn" (the turn payload once its audio
+    is ready), "error" ({"error", "status"}) and finally "done" ({"state", "awaits_input", "is_finished"}).
+    Acks are followed by the next question in the same stream, so the client only posts answers.
+    """
+    if 'interview_id' not in session: return jsonify({"error": "No session"}), 400
+    data = request.get_json(silent=True) or {}; user_text = (data.get('text') or '').strip()
+    manager = load_interview()
+    if not manager: return jsonify({"error": "Interview expired"}), 400
+    events = queue.Queue()
+
+    @copy_current_request_context # url_for/session in the worker thread
+    def drive():
+        try: stream_turns(manager, user_text, lambda name, payload: events.put(sse_event(name, payload)))
+        except TransitionError as e: log.warning("/interview/turn: %s", e); events.put(sse_event("error", {"error": str(e), "status": e.status}))
+        except StaleStateError: events.put(sse_event("error", {"error": "Interview was updated by another request. Please retry.", "status": 409}))
+        except Exception as e: log.exception("Error in /interview/turn: %s", e); events.put(sse_event("error", {"error": f"Internal server error: {e}", "status": 500}))
+        finally: events.put(None)
+
+    # The turn runs in its own thread so events go out while LLM/TTS calls are still in progress;
+    # it finishes (and saves) even if the client disconnects
+    threading.Thread(target=drive, name="interview-turn", daemon=True).start()
+
+    def stream():
+        while True:
+            try: item = events.get(timeout=SSE_KEEPALIVE_SECONDS)
+            except queue.Empty: yield ": keep-alive\n\n"; continue
+            if item is None: return
+            yield item
+
+    response = Response(stream(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'; response.headers['X-Accel-Buffering'] = 'no' # Don't let proxies buffer
+    return response
 
 @app.route('/audio/<path:filename>')
 def get_audio(filename):
-    directory = os.path.abspath(app.config['TTS_AUDIO_FOLDER']); safe_filename = secure_filename(filename)
+    safe_filename = secure_filename(filename)
     if not safe_filename or safe_filename != filename: return jsonify({"error": "Invalid fn"}), 400
-    try: return send_from_directory(directory, safe_filename, as_attachment=False)
+    tts_interface.wait_for_audio(safe_filename) # Encoding may still be finishing on the encoder pool
+    filepath = tts_interface.get_audio_filepath(safe_filename) # Files live in sharded subdirectories
+    if not filepath: return jsonify({"error": "Audio not found"}), 404
+    directory = os.path.abspath(os.path.dirname(filepath)); tts_interface.audio_store.touch(safe_filename)
+    try:
+        # conditional=True gives ETag/Last-Modified validation (304) and HTTP Range (206) support
+        response = send_from_directory(directory, safe_filename, as_attachment=False, conditional=True, etag=True, max_age=AUDIO_MAX_AGE,
+                                       mimetype=AUDIO_MIMETYPES.get(safe_filename.rsplit('.', 1)[-1].lower()))
+        response.headers['Accept-Ranges'] = 'bytes'
+        if safe_filename.startswith('tts_'): response.cache_control.immutable = True # Content-addressed cache entries
+        return response
     except FileNotFoundError: return jsonify({"error": "Audio not found"}), 404
-    except Exception as e: print(f"Audio serve error: {e}"); return jsonify({"error": "Server error"}), 500
+    except Exception as e: log.error("Audio serve error: %s", e); return jsonify({"error": "Server error"}), 500
+
+@app.route('/audio/stream/<token>')
+def stream_audio(token):
+    """Streams sentence-chunked TTS for a signed text token issued by a turn response."""
+    try: text = stream_token_serializer.loads(token, max_age=STREAM_TOKEN_MAX_AGE)
+    except BadSignature: return jsonify({"error": "Invalid or expired stream"}), 404
+    if not tts_interface.ENABLE_HF_TTS: return jsonify({"error": "TTS disabled"}), 503
+    response = Response(tts_interface.stream_wav(text), mimetype='audio/wav', direct_passthrough=True)
+    response.headers['Cache-Control'] = 'no-store'; response.headers['X-Accel-Buffering'] = 'no' # Don't let proxies buffer
+    return response
+
+@app.route('/ready')
+def readiness():
+    """Reports which heavy components are loaded. 503 until the TTS models are warm."""
+    tts_status = tts_interface.get_status()
+    components = {
+        "tts": tts_status,
+        "gemini": {"enabled": bool(GEMINI_API_KEY) or gemini_model is not None, "ready": gemini_model is not None or not GEMINI_API_KEY, "client": llm_client.stats()},
+        "weasyprint": {"available": WEASYPRINT_AVAILABLE, "ready": weasyprint is not None or not WEASYPRINT_AVAILABLE, "reports": report_renderer.stats()},
+    }
+    ready = all(c["ready"] for c in components.values())
+    caches = {"tts": tts_interface.get_cache_stats(), "phrases": tts_interface.get_phrase_stats(), "resume": resume_cache.stats() if resume_cache else None}
+    return jsonify({"ready": ready, "warmup": WARMUP_MODE, "components": components, "caches": caches, "interview_store": interview_store.stats(), "flow": flow_timings.stats(), "moderation": moderation.get_moderator().stats(),
+                    "slow_requests": list(slow_request_profiler.profiles) if slow_request_profiler else None}), 200 if ready else 503
 
 @app.route('/report')
 def report_page():
-    manager_data = session.get('interview_data')
-    if not manager_data:
+    manager = load_interview()
+    if not manager:
         flash("No interview data for report.")
         return redirect(url_for('index'))
     
     try:
-        manager = InterviewManager.from_dict(manager_data)
-
-        if manager.get_state() not in ["CLOSING", "FINISHED"]:
+        if manager.get_state() not in (InterviewState.CLOSING, InterviewState.FINISHED):
             flash("Interview not completed yet.")
             return redirect(url_for('interview_page'))
         
-        session.pop('interview_data', None)
-        final_data = manager.get_final_data()
+        # The id stays in the session so the PDF download still works; visiting / ends the interview
+        final_data = report_renderer.report_data(manager.interview_id, timeout=REPORT_RENDER_WAIT) # Shares the background build
+        if final_data is None: complete_evaluations(manager); final_data = manager.get_final_data() # Build failed or is slow: inline
 
         if not final_data:
             flash("Could not retrieve final report data.")
             return redirect(url_for('index'))
 
-        return render_template('report.html', report=final_data, WEASYPRINT_AVAILABLE=WEASYPRINT_AVAILABLE)
+        return render_template('report.html', report=final_data, WEASYPRINT_AVAILABLE=WEASYPRINT_AVAILABLE,
+                               report_status=report_renderer.status(manager.interview_id)["status"])
 
     except Exception as e:
-        print(f"Report page error: {e}")
-        traceback.print_exc()
+        log.exception("Report page error: %s", e)
         flash("Error generating report.")
         return redirect(url_for('index'))
 
 @app.route('/download_report')
 def download_report():
-    manager_data = session.get('interview_data')
-    if not manager_data:
+    manager = load_interview()
+    if not manager:
         flash("Session expired for download.")
         return redirect(url_for('index'))
     
-    if not WEASYPRINT_AVAILABLE:
+    if not WEASYPRINT_AVAILABLE or not get_weasyprint():
         flash("PDF generation unavailable.")
         return redirect(url_for('report_page', _anchor='download_unavailable'))
     
     try:
-        manager = InterviewManager.from_dict(manager_data)
-
-        if manager.get_state() not in ["CLOSING", "FINISHED"]:
+        if manager.get_state() not in (InterviewState.CLOSING, InterviewState.FINISHED):
             flash("Interview not complete.")
             return redirect(url_for('interview_page'))
         
-        final_data = manager.get_final_data()
-
-        if not final_data:
-            flash("Could not get data for PDF.")
+        status = report_renderer.wait(manager.interview_id, timeout=REPORT_RENDER_WAIT)
+        if status["status"] != "ready":
+            flash("Failed PDF generation." if status["status"] == "failed" else "The PDF is still being prepared. Please try again in a moment.")
             return redirect(url_for('report_page'))
-        
-        html_string = render_template('report.html', report=final_data, is_pdf_render=True, WEASYPRINT_AVAILABLE=True)
-        pdf_bytes = weasyprint.HTML(string=html_string).write_pdf()
-        
-        response = make_response(pdf_bytes)
-        response.headers['Content-Type'] = 'application/pdf'
-        response.headers['Content-Disposition'] = 'attachment; filename=interview_report.pdf'
 
-        print("Generated and sending PDF report.")
+        # conditional=True answers a matching If-None-Match with 304 and no body
+        response = send_file(status["path"], mimetype='application/pdf', as_attachment=True, download_name='interview_report.pdf',
+                             etag=status["key"], conditional=True, max_age=0)
+        response.headers['Cache-Control'] = 'private, no-cache' # Revalidate (cheap 304) rather than reuse blindly
         return response
 
     except Exception as e:
-        print(f"Error generating PDF: {e}")
-        traceback.print_exc()
+        log.exception("Error generating PDF: %s", e)
         flash("Failed PDF generation.")
         return redirect(url_for('report_page'))
 
+@app.route('/report/status')
+def report_status():
+    """Polled by the report page while the PDF is built in the background."""
+    interview_id = session.get('interview_id')
+    if not interview_id: return jsonify({"error": "No session"}), 400
+    status = report_renderer.status(interview_id)
+    if status["status"] == "missing":
+        manager = load_interview() # e.g. built by a worker that has since restarted: start again
+        if manager and manager.get_state() in TERMINAL_STATES: report_renderer.submit(interview_id); status = report_renderer.status(interview_id)
+    body = {"status": status["status"], "error": status["error"]}
+    if status["status"] == "ready": body["download_url"] = url_for('download_report')
+    response = jsonify(body); response.headers['Cache-Control'] = 'no-store'
+    return response
+
 # --- Main Execution ---
 if __name__ == '__main__':
-    print("Starting Flask dev server...")
+    log.info("Starting Flask dev server...")
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
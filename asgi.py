@@ -0,0 +1,203 @@
+# asgi.py (ASGI entry point: async interview routes, everything else through the Flask app)
+#
+# Serve with `python serve.py` (uvicorn). /upload, /interview/start and /interview/next_step run as
+# coroutines: their Gemini calls are awaited on the event loop (LLMClient.agenerate_content), and
+# the blocking parts (resume parsing, state store, TTS) run on a bounded thread pool. An interview
+# waiting on Gemini therefore holds no thread, so concurrent interviews per worker are no longer
+# capped by thread count. Every other route (audio, report, PDF, /interview/turn, /ready, /metrics)
+# is the unchanged Flask view, served through asgiref's WSGI adapter.
+#
+# Sessions, url_for and flash work as in Flask: each async request runs inside a Flask request
+# context built from the ASGI scope, and the response goes through app.process_response (after_request
+# hooks, session cookie). On shutdown (lifespan), new turns get 503 while turns in flight finish.
+import os
+import time
+import asyncio
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.wsgi import WsgiToAsgi
+from flask import request, session, redirect, url_for, flash, jsonify, g
+from werkzeug.exceptions import HTTPException
+from werkzeug.test import EnvironBuilder
+from werkzeug.utils import secure_filename
+
+import app as web
+from interview_flow import InterviewState, Event, TransitionError, transition_for
+from interview_store import StaleStateError
+import metrics
+
+log = logging.getLogger(__name__)
+
+# Threads for the blocking parts of async requests; an interview only holds one while it runs them
+ASGI_BLOCKING_THREADS = int(os.getenv("ASGI_BLOCKING_THREADS", "32"))
+ASGI_DRAIN_SECONDS = float(os.getenv("ASGI_DRAIN_SECONDS", "30")) # Max wait for in-flight turns on shutdown
+MAX_BODY_BYTES = web.app.config.get('MAX_CONTENT_LENGTH') or web.resume_extractor.max_bytes + 64 * 1024 # Upload plus form overhead
+
+blocking_pool = ThreadPoolExecutor(max_workers=ASGI_BLOCKING_THREADS, thread_name_prefix="asgi-blocking")
+wsgi_app = WsgiToAsgi(web.app)
+_in_flight = set() # Tasks of async requests still running
+_draining = False
+
+
+async def offload(fn, *args):
+    """Runs fn on the blocking pool with this task's context (Flask request context, interview state tag)."""
+    return await asyncio.get_running_loop().run_in_executor(blocking_pool, contextvars.copy_context().run, fn, *args)
+
+
+# --- Gemini and transitions ---
+async def acall_gemini(gemini_request):
+    """app.call_gemini, awaited."""
+    if not (web.gemini_model or await offload(web.get_gemini_model)): return gemini_request.unavailable
+    try: return gemini_request.parse(await web.llm_client.agenerate_content(gemini_request.prompt_type, gemini_request.prompt, **gemini_request.kwargs))
+    except Exception as e: return web.gemini_failed(gemini_request, e)
+
+
+async def agenerate_questions(resume_text):
+    questions_key, questions = await offload(web.cached_questions, resume_text)
+    if questions: return questions
+    log.info("Generating 10 questions (incl. behavioral)...")
+    return await acall_gemini(web.questions_request(resume_text, questions_key))
+
+
+async def arun_transition(manager, event=None, user_text=""):
+    """app.run_transition with its Gemini call awaited first; the handler (state changes, TTS) runs on the pool.
+
+    The flow trace of such a transition starts after the Gemini call; the call itself is timed in
+    interview_stage_seconds (stage llm_<prompt type>).
+    """
+    transition = transition_for(manager.get_state(), event)
+    gemini_request = web.llm_request_for(transition, manager, user_text); llm_reply = None
+    if gemini_request:
+        token = metrics.current_state.set(transition.source)
+        try: llm_reply = await acall_gemini(gemini_request)
+        finally: metrics.current_state.reset(token)
+    return await offload(web.run_transition, manager, event, user_text, None, llm_reply)
+
+
+# --- Async views (same behaviour as the Flask views of the same name) ---
+async def upload_resume():
+    if 'resume' not in request.files: flash('No file part.'); return redirect(url_for('index'))
+    file = request.files['resume']
+    if file.filename == '': flash('No file selected.'); return redirect(url_for('index'))
+    if not (file and web.allowed_file(file.filename)): flash('Invalid file type.'); return redirect(url_for('index'))
+    filename = secure_filename(file.filename)
+    try:
+        data = file.stream.read(web.resume_extractor.max_bytes + 1)
+        extracted_text = await offload(web.resume_text, data, filename)
+        generated_questions = await agenerate_questions(extracted_text)
+        if generated_questions and not generated_questions[0].startswith("Error"):
+            await offload(web.begin_interview, generated_questions)
+            return redirect(url_for('interview_page'))
+        flash(f"Failed Q-gen: {generated_questions[0] if generated_questions else '?'}")
+        return redirect(url_for('index'))
+    except (ValueError, FileNotFoundError) as parse_err:
+        log.error("File processing error: %s", parse_err); flash(f"Error processing resume: {parse_err}"); return redirect(url_for('index'))
+    except Exception as e: log.exception("Upload Error: %s", e); flash(f"Error: {e}"); return redirect(url_for('index'))
+
+
+async def start_interview():
+    if 'interview_id' not in session: return jsonify({"error": "No session"}), 400
+    try:
+        manager = await offload(web.load_interview)
+        if not manager: return jsonify({"error": "Invalid session data"}), 400
+        state = manager.get_state()
+        if state != InterviewState.INIT: return jsonify({"error": f"Interview already active (state: {state})"}), 400
+        payload = await arun_transition(manager, Event.START); await offload(web.save_interview, manager)
+        return jsonify(payload)
+    except StaleStateError: return jsonify({"error": "Interview was updated by another request. Please retry."}), 409
+    except Exception as e: log.exception("/start Error: %s", e); return jsonify({"error": f"Server error: {e}"}), 500
+
+
+async def handle_interview_step():
+    if 'interview_id' not in session: return jsonify({"error": "No session"}), 400
+    data = request.get_json(); user_text = data.get('text', '').strip() if data else ""
+    try:
+        manager = await offload(web.load_interview)
+        if not manager: return jsonify({"error": "Interview expired"}), 400
+        await offload(web.begin_turn, manager)
+        if manager.get_state() == InterviewState.INIT: raise TransitionError("Interview not started", 400)
+        response_data = await arun_transition(manager, user_text=user_text)
+        await offload(web.end_turn, manager)
+        return jsonify(response_data)
+    except TransitionError as e: log.warning("/next_step: %s", e); return jsonify({"error": str(e)}), e.status
+    except StaleStateError: return jsonify({"error": "Interview was updated by another request. Please retry."}), 409
+    except Exception as e: log.exception("Error in /next_step: %s", e); return jsonify({"error": f"Internal server error: {str(e)}"}), 500
+
+
+ASYNC_ROUTES = {("POST", "/upload"): upload_resume, ("POST", "/interview/start"): start_interview,
+                ("POST", "/interview/next_step"): handle_interview_step}
+
+
+# --- ASGI plumbing ---
+def wsgi_environ(scope, body):
+    """WSGI environ for a Flask request context, built from an ASGI HTTP scope and its body."""
+    headers = [(k.decode('latin-1'), v.decode('latin-1')) for k, v in scope["headers"]]
+    host = next((v for k, v in headers if k.lower() == "host"), None) or "%s:%s" % tuple(scope.get("server") or ("localhost", 80))
+    root_path = scope.get("root_path", ""); path = scope["path"]
+    if root_path and path.startswith(root_path): path = path[len(root_path):]
+    builder = EnvironBuilder(path=path, base_url=f"{scope.get('scheme', 'http')}://{host}{root_path}", method=scope["method"],
+                             query_string=scope.get("query_string", b"").decode('latin-1'), headers=headers, data=body,
+                             environ_overrides={"REMOTE_ADDR": (scope.get("client") or ("", 0))[0]})
+    try: return builder.get_environ()
+    finally: builder.close()
+
+
+async def read_body(receive):
+    """The request body, or None if it exceeds MAX_BODY_BYTES or the client went away."""
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect": return None
+        chunk = message.get("body", b""); size += len(chunk)
+        if size > MAX_BODY_BYTES: return None
+        chunks.append(chunk)
+        if not message.get("more_body"): return b"".join(chunks)
+
+
+async def send_response(send, status, headers, body):
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def run_view(view, scope, body):
+    """Runs an async view in a Flask request context. Returns (status, headers, body)."""
+    with web.app.request_context(wsgi_environ(scope, body)):
+        g.request_started = time.perf_counter() # Read by the app's after_request timing hook
+        try: rv = await view()
+        except HTTPException as e: rv = e # e.g. malformed JSON -> 400, as Flask would answer
+        response = web.app.process_response(web.app.make_response(rv))
+        headers = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in response.headers.items()]
+        return response.status_code, headers, response.get_data()
+
+
+async def lifespan(receive, send):
+    global _draining
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            log.info("ASGI worker %s ready (%s blocking threads).", os.getpid(), ASGI_BLOCKING_THREADS)
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            _draining = True
+            if _in_flight:
+                log.info("Draining %s in-flight requests (up to %.0fs)...", len(_in_flight), ASGI_DRAIN_SECONDS)
+                _, pending = await asyncio.wait(set(_in_flight), timeout=ASGI_DRAIN_SECONDS)
+                if pending: log.warning("%s requests still running after %.0fs; shutting down anyway.", len(pending), ASGI_DRAIN_SECONDS)
+            blocking_pool.shutdown(wait=False)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan": await lifespan(receive, send); return
+    view = ASYNC_ROUTES.get((scope["method"], scope["path"])) if scope["type"] == "http" else None
+    if view is None: await wsgi_app(scope, receive, send); return
+    if _draining: await send_response(send, 503, [(b"content-type", b"application/json"), (b"retry-after", b"1")], b'{"error": "Server restarting, please retry."}'); return
+    body = await read_body(receive)
+    if body is None: await send_response(send, 413, [(b"content-type", b"application/json")], b'{"error": "Request too large."}'); return
+    # Shielded: a client that disconnects mid-turn doesn't cancel it halfway through saving the interview
+    task = asyncio.ensure_future(run_view(view, scope, body))
+    _in_flight.add(task); task.add_done_callback(_in_flight.discard)
+    await send_response(send, *await asyncio.shield(task))
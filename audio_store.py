@@ -0,0 +1,182 @@
+# audio_store.py (Lifecycle management for generated audio files)
+import os
+import time
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+
+log = logging.getLogger(__name__)
+
+SHARED_PREFIX = "tts_" # Content-addressed cache files; shared between sessions
+
+
+class _Entry:
+    __slots__ = ("size", "owners", "shared", "created")
+
+    def __init__(self, size, shared, created):
+        self.size = size; self.owners = set(); self.shared = shared; self.created = created
+
+
+class AudioStore:
+    """Sharded on-disk storage for generated audio with per-session ownership.
+
+    Files live in ``<root>/<shard>/<filename>`` (shard = first hex chars of a hash of the
+    filename) so no directory grows without bound. Session-owned files are deleted by the
+    reaper once their interview finishes (after a grace period for the last playback) or
+    goes idle past session_ttl. Shared cache files are only removed by the global quota,
+    least recently used first.
+    """
+
+    def __init__(self, root, quota_bytes, session_ttl=3600, finished_grace=300, shard_chars=2):
+        self.root = root; self.quota_bytes = quota_bytes
+        self.session_ttl = session_ttl; self.finished_grace = finished_grace; self.shard_chars = shard_chars
+        self._files = OrderedDict() # filename -> _Entry, least recently used first
+        self._sessions = {} # interview_id -> {"files": set, "last_seen": float, "finished_at": float | None}
+        self._lock = threading.RLock()
+        self._reaper = None
+        self.metrics = {"bytes_stored": 0, "bytes_reclaimed": 0, "files_reclaimed": 0, "quota_evictions": 0}
+        os.makedirs(root, exist_ok=True)
+        self._scan()
+
+    # --- Paths ---
+    def _shard(self, filename): return hashlib.sha1(filename.encode('utf-8')).hexdigest()[:self.shard_chars]
+
+    def path_for(self, filename):
+        """Path a new file should be written to (creates its shard directory)."""
+        shard_dir = os.path.join(self.root, self._shard(filename))
+        os.makedirs(shard_dir, exist_ok=True)
+        return os.path.join(shard_dir, filename)
+
+    def resolve(self, filename):
+        """Existing path for filename, or None. Also finds files from before sharding."""
+        for path in (os.path.join(self.root, self._shard(filename), filename), os.path.join(self.root, filename)):
+            if os.path.isfile(path): return path
+        return None
+
+    def list_files(self):
+        """(filename, path) for every stored file, sharded or legacy flat."""
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            if dirpath != self.root: dirnames[:] = [] # Only one shard level
+            for name in filenames:
+                if not name.endswith('.tmp'): yield name, os.path.join(dirpath, name)
+
+    def _scan(self):
+        """Indexes files left by earlier runs, oldest first. Unowned non-shared files are reaped as orphans."""
+        found = []
+        for name, path in self.list_files():
+            try: st = os.stat(path)
+            except OSError: continue
+            found.append((st.st_mtime, name, st.st_size))
+        with self._lock:
+            for mtime, name, size in sorted(found):
+                self._files[name] = _Entry(size, name.startswith(SHARED_PREFIX), mtime)
+                self.metrics["bytes_stored"] += size
+        if found: log.info("Audio Store: Indexed %s existing files (%s bytes).", len(found), self.metrics['bytes_stored'])
+
+    # --- Registration / access ---
+    def register(self, filename, interview_id=None):
+        """Records a newly written file, owned by interview_id unless it is a shared cache file."""
+        path = self.resolve(filename)
+        if not path: return
+        size = os.path.getsize(path)
+        with self._lock:
+            old = self._files.pop(filename, None)
+            if old: self.metrics["bytes_stored"] -= old.size
+            entry = _Entry(size, filename.startswith(SHARED_PREFIX), time.time())
+            if old: entry.owners = old.owners
+            self._files[filename] = entry; self.metrics["bytes_stored"] += size
+            if interview_id: self.track(interview_id, filename)
+            self._enforce_quota_locked(keep=filename)
+
+    def track(self, interview_id, filename):
+        """Marks filename as used by an interview and refreshes the session's activity time."""
+        with self._lock:
+            session = self._session_locked(interview_id)
+            session["files"].add(filename)
+            entry = self._files.get(filename)
+            if entry: entry.owners.add(interview_id)
+
+    def touch(self, filename):
+        """Moves a file to the most-recently-used end (called when it is served)."""
+        with self._lock:
+            if filename in self._files: self._files.move_to_end(filename)
+
+    def _session_locked(self, interview_id):
+        session = self._sessions.setdefault(interview_id, {"files": set(), "last_seen": 0.0, "finished_at": None})
+        session["last_seen"] = time.time()
+        return session
+
+    def touch_session(self, interview_id):
+        if not interview_id: return
+        with self._lock: self._session_locked(interview_id)
+
+    def finish_session(self, interview_id):
+        """Interview reached FINISHED; its files are reaped after the grace period."""
+        if not interview_id: return
+        with self._lock: self._session_locked(interview_id)["finished_at"] = time.time()
+
+    def release_session(self, interview_id):
+        """Deletes files owned only by this interview right away (e.g. the candidate left)."""
+        with self._lock:
+            session = self._sessions.pop(interview_id, None)
+            if not session: return
+            for filename in session["files"]:
+                entry = self._files.get(filename)
+                if not entry: continue
+                entry.owners.discard(interview_id)
+                if not entry.owners and not entry.shared: self._delete_locked(filename)
+
+    # --- Deletion ---
+    def _delete_locked(self, filename):
+        entry = self._files.pop(filename, None)
+        path = self.resolve(filename)
+        if path:
+            try: os.remove(path)
+            except OSError as e: log.error("Audio Store: Could not delete %s: %s", filename, e)
+        if entry:
+            self.metrics["bytes_stored"] -= entry.size
+            self.metrics["bytes_reclaimed"] += entry.size; self.metrics["files_reclaimed"] += 1
+
+    def delete(self, filename):
+        with self._lock: self._delete_locked(filename)
+
+    def _enforce_quota_locked(self, keep=None):
+        """Evicts least-recently-used files until under quota. Files of live sessions go last."""
+        if self.metrics["bytes_stored"] <= self.quota_bytes: return
+        live = set().union(*(s["files"] for s in self._sessions.values() if not s["finished_at"])) if self._sessions else set()
+        for protect_live in (True, False):
+            for filename in list(self._files):
+                if self.metrics["bytes_stored"] <= self.quota_bytes: return
+                if filename == keep or (protect_live and filename in live): continue
+                self._delete_locked(filename); self.metrics["quota_evictions"] += 1
+
+    def reap(self):
+        """Deletes audio of finished/expired sessions and orphaned files, then enforces the quota."""
+        now = time.time(); done = []
+        with self._lock:
+            for interview_id, session in self._sessions.items():
+                finished_at = session["finished_at"]
+                if (finished_at and now - finished_at > self.finished_grace) or now - session["last_seen"] > self.session_ttl:
+                    done.append(interview_id)
+            for interview_id in done: self.release_session(interview_id)
+            # Orphans: session-style files nobody owns (e.g. from before a restart) that are past the TTL
+            for filename, entry in list(self._files.items()):
+                if not entry.shared and not entry.owners and now - entry.created > self.session_ttl: self._delete_locked(filename)
+            self._enforce_quota_locked()
+        if done: log.info("Audio Store: Reaped %s sessions. %s", len(done), self.stats())
+
+    def start_reaper(self, interval=60):
+        """Runs reap() every interval seconds on a daemon thread (idempotent)."""
+        if self._reaper is not None: return
+        def loop():
+            while True:
+                time.sleep(interval)
+                try: self.reap()
+                except Exception as e: log.error("Audio Store: Reaper error: %s", e)
+        self._reaper = threading.Thread(target=loop, name="audio-reaper", daemon=True); self._reaper.start()
+
+    def stats(self):
+        with self._lock:
+            return dict(self.metrics, files=len(self._files), quota_bytes=self.quota_bytes,
+                        sessions=len(self._sessions), finished_sessions=sum(1 for s in self._sessions.values() if s["finished_at"]))
@@ -0,0 +1,232 @@
+# batch_prepare.py (Bulk offline preparation: question sets and question audio for a directory of resumes)
+#
+# Usage: python batch_prepare.py RESUME_DIR [--manifest RESUME_DIR/batch_manifest.jsonl] [--recursive]
+#            [--extract-workers 4] [--llm-concurrency 8] [--llm-rpm 300] [--tts-batch 8] [--no-audio] [--limit N]
+# Files stream through three stages that run at the same time:
+#   extract   - resume text via app.resume_text (the upload path: resume cache, then parse_resume_bytes
+#               on the extractor's process pool, --extract-workers processes, with its hard timeout)
+#   questions - app.generate_questions_with_gemini on --llm-concurrency threads, starting at most
+#               --llm-rpm Gemini calls a minute (token bucket); cached question sets skip the limiter
+#   audio     - one thread rendering the questions of several resumes at a time with
+#               tts_interface.text_to_speech_batch (--tts-batch texts per synthesis pass)
+# Everything lands in the app's caches, so when a candidate later uploads the same resume the questions
+# come from the resume cache and each question's audio is a TTS cache hit (same TTS settings needed).
+# One JSON line per file is appended to the manifest as soon as it finishes (status, questions, audio
+# filenames, seconds per stage). A rerun skips files already "done" with the same size and mtime, so an
+# interrupted batch carries on where it stopped; failed files are tried again.
+import os
+import sys
+import json
+import time
+import queue
+import argparse
+import threading
+import logging
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+log = logging.getLogger("batch_prepare")
+
+
+class RateLimiter:
+    """Token bucket: acquire() blocks so that at most per_minute calls start in any minute (bursts up to burst)."""
+
+    def __init__(self, per_minute, burst=None):
+        self.rate = per_minute / 60.0; self.burst = burst or max(1, min(per_minute // 6, 20))
+        self._tokens = float(self.burst); self._last = time.monotonic(); self._lock = threading.Lock()
+        self.waited = 0.0 # Total seconds callers spent waiting for a token
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate); self._last = now
+                if self._tokens >= 1: self._tokens -= 1; return
+                wait = (1 - self._tokens) / self.rate
+                self.waited += wait
+            time.sleep(wait)
+
+
+class Manifest:
+    """Append-only JSONL results; the last line for a file wins."""
+
+    def __init__(self, path):
+        self.path = path; self._lock = threading.Lock(); self.entries = {}
+        try:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try: entry = json.loads(line)
+                    except ValueError: continue # Torn line from an interrupted run
+                    self.entries[entry["file"]] = entry
+        except FileNotFoundError: pass
+        self._file = open(path, "a+", encoding="utf-8")
+        if self._file.tell(): # Make sure a torn last line doesn't swallow the first new entry
+            self._file.seek(self._file.tell() - 1)
+            if self._file.read(1) != "\n": self._file.write("\n")
+
+    def is_done(self, item):
+        entry = self.entries.get(item["file"])
+        return bool(entry) and entry.get("status") == "done" and entry.get("size") == item["size"] and entry.get("mtime_ns") == item["mtime_ns"]
+
+    def write(self, entry):
+        with self._lock: self._file.write(json.dumps(entry) + "\n"); self._file.flush()
+
+    def close(self): self._file.close()
+
+
+def find_resumes(directory, recursive, allowed_file):
+    """(relative path, stat) of the resumes under directory, in name order, without listing everything first."""
+    for entry in sorted(os.scandir(directory), key=lambda e: e.name):
+        if entry.is_dir():
+            if recursive:
+                for path, stat in find_resumes(entry.path, recursive, allowed_file): yield os.path.join(entry.name, path), stat
+        elif entry.is_file() and allowed_file(entry.name): yield entry.name, entry.stat()
+
+
+class BatchPipeline:
+    """Runs files through extract -> questions -> audio; every file ends with exactly one manifest line."""
+
+    def __init__(self, web, tts, manifest, args):
+        self.web = web; self.tts = tts; self.manifest = manifest; self.args = args
+        self.limiter = RateLimiter(args.llm_rpm) if args.llm_rpm > 0 else None
+        self.extract_pool = ThreadPoolExecutor(max_workers=args.extract_workers, thread_name_prefix="batch-extract") # Each waits on a pool process
+        self.llm_pool = ThreadPoolExecutor(max_workers=args.llm_concurrency, thread_name_prefix="batch-llm")
+        self.audio_queue = queue.Queue()
+        # Files in flight; bounds memory on huge directories while keeping every stage busy
+        self._slots = threading.BoundedSemaphore(args.extract_workers + args.llm_concurrency + 4 * args.tts_batch)
+        self.counts = {"done": 0, "failed": 0, "skipped": 0}; self._count_lock = threading.Lock()
+        self.timings = {"extract": [], "questions": [], "audio": [], "total": []}
+
+    def run(self, items, limit=None):
+        audio_thread = threading.Thread(target=self._audio_loop, name="batch-audio", daemon=True)
+        audio_thread.start(); submitted = 0
+        for item in items:
+            if self.manifest.is_done(item): self.counts["skipped"] += 1; continue
+            if limit is not None and submitted >= limit: break
+            self._slots.acquire(); submitted += 1
+            item["started"] = time.perf_counter(); self.extract_pool.submit(self._extract, item)
+        self.extract_pool.shutdown(wait=True); self.llm_pool.shutdown(wait=True)
+        self.audio_queue.put(None); audio_thread.join()
+
+    def _stage(self, item, stage, fn, *args):
+        start = time.perf_counter()
+        try: return fn(*args)
+        finally: item["timings"][stage] = round(time.perf_counter() - start, 3)
+
+    def _extract(self, item):
+        try:
+            with open(os.path.join(self.args.directory, item["file"]), "rb") as f: data = f.read(self.web.resume_extractor.max_bytes + 1)
+            item["text"] = self._stage(item, "extract", self.web.resume_text, data, os.path.basename(item["file"]))
+            item["text_chars"] = len(item["text"])
+        except Exception as e: self._finish(item, "extract", e); return
+        self.llm_pool.submit(self._questions, item)
+
+    def _questions(self, item):
+        try: item["questions"] = self._stage(item, "questions", self._generate_questions, item, item.pop("text"))
+        except Exception as e: self._finish(item, "questions", e); return
+        if not item["questions"] or item["questions"][0].startswith("Error") or item["questions"][0] == "Gemini unavailable.":
+            self._finish(item, "questions", item["questions"][0] if item["questions"] else "No questions generated"); return
+        if self.args.no_audio: self._finish(item)
+        else: self.audio_queue.put(item)
+
+    def _generate_questions(self, item, resume_text):
+        _, cached = self.web.cached_questions(resume_text); item["questions_cached"] = bool(cached)
+        if cached: return cached
+        if self.limiter:
+            start = time.perf_counter(); self.limiter.acquire(); item["timings"]["rate_limit_wait"] = round(time.perf_counter() - start, 3)
+        return self.web.generate_questions_with_gemini(resume_text)
+
+    def _audio_loop(self):
+        """Collects finished question sets until a batch's worth of text is waiting, then renders them together."""
+        batch, texts, closing = [], 0, False
+        while not closing:
+            try: item = self.audio_queue.get(timeout=0.5 if batch else None)
+            except queue.Empty: item = False # Nothing more arriving for now: render what we have
+            if item is None: closing = True
+            elif item: batch.append(item); texts += len(item["questions"])
+            if batch and (closing or item is False or texts >= self.args.tts_batch):
+                self._render(batch); batch, texts = [], 0
+
+    def _render(self, batch):
+        texts = [q for item in batch for q in item["questions"]]; start = time.perf_counter()
+        try:
+            filenames = self.tts.text_to_speech_batch(texts, "question", batch_size=self.args.tts_batch)
+            written = {f: self.tts.wait_for_audio(f, timeout=60.0) for f in set(filenames) if f} # On disk before the manifest says so
+            filenames = [f if f and written[f] else None for f in filenames]
+        except Exception as e:
+            for item in batch: self._finish(item, "audio", e)
+            return
+        share = (time.perf_counter() - start) / len(texts) # Batch time, split by question count
+        for item in batch:
+            item["audio"] = filenames[:len(item["questions"])]; filenames = filenames[len(item["questions"]):]
+            item["timings"]["audio"] = round(share * len(item["questions"]), 3)
+            missing = item["audio"].count(None)
+            self._finish(item, "audio", f"{missing} of {len(item['audio'])} questions not rendered") if missing else self._finish(item)
+
+    def _finish(self, item, stage=None, error=None):
+        item["timings"]["total"] = round(time.perf_counter() - item.pop("started"), 3)
+        status = "failed" if error else "done"
+        entry = {"file": item["file"], "size": item["size"], "mtime_ns": item["mtime_ns"], "status": status}
+        if error: entry.update(stage=stage, error=str(error)); log.warning("%s: %s failed: %s", item["file"], stage, error)
+        for key in ("text_chars", "questions", "questions_cached", "audio", "timings"):
+            if key in item: entry[key] = item[key]
+        entry["finished_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        self.manifest.write(entry)
+        with self._count_lock:
+            self.counts[status] += 1
+            for stage_name, values in self.timings.items():
+                if stage_name in item["timings"]: values.append(item["timings"][stage_name])
+            processed = self.counts["done"] + self.counts["failed"]
+        if processed % 50 == 0: log.info("%s files processed (%s failed).", processed, self.counts["failed"])
+        self._slots.release()
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prepare interview questions and question audio for a directory of resumes")
+    parser.add_argument("directory", help="directory of .pdf/.docx resumes")
+    parser.add_argument("--manifest", help="JSONL results file (default: DIRECTORY/batch_manifest.jsonl)")
+    parser.add_argument("--recursive", action="store_true", help="include subdirectories")
+    parser.add_argument("--extract-workers", type=int, default=os.cpu_count() or 2, help="resume extraction processes")
+    parser.add_argument("--llm-concurrency", type=int, default=8, help="concurrent Gemini calls")
+    parser.add_argument("--llm-rpm", type=int, default=int(os.getenv("BATCH_LLM_RPM", "300")), help="max Gemini calls started per minute (0 = no limit)")
+    parser.add_argument("--tts-batch", type=int, default=8, help="question texts per TTS synthesis pass")
+    parser.add_argument("--no-audio", action="store_true", help="only generate questions")
+    parser.add_argument("--limit", type=int, help="process at most this many files (after skipping finished ones)")
+    parser.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "INFO"))
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if not os.path.isdir(args.directory): parser.error(f"not a directory: {args.directory}")
+    args.extract_workers = max(1, args.extract_workers); args.llm_concurrency = max(1, args.llm_concurrency); args.tts_batch = max(1, args.tts_batch)
+
+    # Read by app/llm_client/resume_extractor at import: no warm-up thread, pools sized for this run
+    os.environ.setdefault("WARMUP_MODE", "lazy")
+    os.environ["RESUME_EXTRACT_WORKERS"] = str(args.extract_workers); os.environ["LLM_MAX_CONCURRENCY"] = str(args.llm_concurrency)
+    import app as web
+    import tts_interface as tts
+    if not web.resume_cache: log.warning("RESUME_CACHE_ENABLED=0: questions won't be reused by later uploads.")
+    if not args.no_audio and not tts.ENABLE_HF_TTS: log.warning("TTS is disabled; skipping audio."); args.no_audio = True
+    if not args.no_audio and tts.audio_cache is None: log.warning("TTS_CACHE_ENABLED=0: rendered audio won't be reused by interviews.")
+
+    manifest = Manifest(args.manifest or os.path.join(args.directory, "batch_manifest.jsonl"))
+    items = ({"file": path, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "timings": {}} for path, stat in find_resumes(args.directory, args.recursive, web.allowed_file))
+    pipeline = BatchPipeline(web, tts, manifest, args); start = time.perf_counter()
+    try: pipeline.run(items, args.limit)
+    except KeyboardInterrupt: log.warning("Interrupted; finished files are in the manifest, rerun to continue."); sys.exit(130)
+    finally: manifest.close(); web.resume_extractor.close()
+
+    wall = time.perf_counter() - start; counts = pipeline.counts; processed = counts["done"] + counts["failed"]
+    print(f"{processed} files in {wall:.1f}s ({processed / wall * 60 if wall else 0:.0f}/min): {counts['done']} done, {counts['failed']} failed, "
+          f"{counts['skipped']} already done. Manifest: {manifest.path}")
+    for stage, values in pipeline.timings.items():
+        if values: print(f"  {stage:<10} p50 {percentile(values, 0.5):.2f}s  p95 {percentile(values, 0.95):.2f}s")
+    if pipeline.limiter: print(f"  rate limit waits: {pipeline.limiter.waited:.1f}s total")
+    sys.exit(1 if counts["failed"] else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+# benchmarks/bench_asgi.py (Sync Flask vs ASGI serving of the interview endpoints, offline)
+#
+# Usage: python benchmarks/bench_asgi.py [--concurrency 50 200] [--server-threads 32]
+#            [--llm-latency-ms 800] [--llm-jitter-ms 200] [--tts-latency-ms 150] [--output results.json]
+# Every candidate uploads a resume, starts the interview and answers every question through
+# /interview/next_step, all candidates at once, with the fake Gemini/TTS backends (fake_backends.py).
+# Each (mode, concurrency) runs in a fresh process with its own work dir:
+#   sync - the Flask views through the test client, with at most --server-threads requests being
+#          served at a time (a threaded WSGI server); queueing for a thread counts in the latency
+#   asgi - asgi.application called in-process from one event loop, with --server-threads threads
+#          for the blocking parts (ASGI_BLOCKING_THREADS)
+# Reports interviews/s, p50/p95/p99 per route, peak thread count and RSS per run.
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import tempfile
+import argparse
+import importlib
+import threading
+import subprocess
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+from load_test import ANSWERS, GREETING_REPLY, Recorder, rss_mb, summarize, worker_env # noqa: E402
+
+ROUTES = {"POST /upload": "upload", "POST /interview/start": "start", "POST /interview/next_step": "next_step"} # Label -> column
+
+
+class ThreadPeak:
+    """Samples threading.active_count() in the background and keeps the maximum."""
+
+    def __init__(self, interval=0.05):
+        self.peak = threading.active_count(); self.interval = interval; self._stop = threading.Event()
+        threading.Thread(target=self._loop, name="thread-peak", daemon=True).start()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval): self.peak = max(self.peak, threading.active_count())
+
+    def stop(self):
+        self._stop.set(); return self.peak
+
+
+def reply_for(data, answers):
+    """Text for the next /interview/next_step, following the client's rules (interview.js)."""
+    if not data.get("awaits_input"): return "" # Continue after an ack
+    return GREETING_REPLY if data.get("state") == "AWAITING_GREETING_RESPONSE" else next(answers)
+
+
+def multipart(pdf, boundary="bench-boundary"):
+    head = f'--{boundary}\r\nContent-Disposition: form-data; name="resume"; filename="resume.pdf"\r\nContent-Type: application/pdf\r\n\r\n'
+    return head.encode() + pdf + f"\r\n--{boundary}--\r\n".encode(), f"multipart/form-data; boundary={boundary}"
+
+
+# --- sync: Flask test client, bounded request threads ---
+def run_sync(args, recorder, pdf):
+    import app as web
+    slots = threading.BoundedSemaphore(args.server_threads)
+
+    def call(label, fn):
+        start = time.perf_counter()
+        with slots: response = fn()
+        ok = response.status_code in (200, 302); recorder.add(label, time.perf_counter() - start, ok)
+        if not ok: raise RuntimeError(f"{label}: HTTP {response.status_code}")
+        return response
+
+    def candidate(candidate_id):
+        client = web.app.test_client(); answers = iter(ANSWERS[(candidate_id + i) % len(ANSWERS)] for i in range(1000))
+        body, content_type = multipart(pdf); started = time.perf_counter()
+        try:
+            call("POST /upload", lambda: client.post('/upload', data=body, content_type=content_type))
+            data = call("POST /interview/start", lambda: client.post('/interview/start')).get_json()
+            while not data.get("is_finished"):
+                if data.get("next"): data = data["next"]; continue
+                text = reply_for(data, answers)
+                data = call("POST /interview/next_step", lambda: client.post('/interview/next_step', json={"text": text})).get_json()
+            recorder.add("interview (total)", time.perf_counter() - started); return True
+        except Exception as e:
+            recorder.add("interview (total)", time.perf_counter() - started, ok=False); print(f"candidate {candidate_id} failed: {e}", file=sys.stderr); return False
+
+    with ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix="candidate") as pool:
+        return list(pool.map(candidate, range(args.concurrency)))
+
+
+# --- asgi: in-process ASGI calls from one event loop ---
+async def asgi_call(application, method, path, cookies, body=b"", content_type="application/json"):
+    headers = [(b"host", b"bench.local"), (b"content-type", content_type.encode()), (b"content-length", str(len(body)).encode())]
+    if cookies: headers.append((b"cookie", "; ".join(f"{k}={v}" for k, v in cookies.items()).encode()))
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method, "scheme": "http", "path": path,
+             "raw_path": path.encode(), "query_string": b"", "root_path": "", "headers": headers, "client": ("127.0.0.1", 0), "server": ("bench.local", 80)}
+    messages = []; request = [{"type": "http.request", "body": body, "more_body": False}]
+
+    async def receive():
+        if request: return request.pop()
+        await asyncio.Event().wait() # The client never disconnects
+
+    async def send(message): messages.append(message)
+    await application(scope, receive, send)
+    for name, value in messages[0]["headers"]:
+        if name == b"set-cookie": key, _, rest = value.decode().partition("="); cookies[key] = rest.split(";", 1)[0]
+    return messages[0]["status"], b"".join(m.get("body", b"") for m in messages[1:])
+
+
+async def run_asgi_candidates(args, recorder, pdf):
+    import asgi
+
+    async def call(label, method, path, cookies, body=b"", content_type="application/json"):
+        start = time.perf_counter()
+        status, response_body = await asgi_call(asgi.application, method, path, cookies, body, content_type)
+        ok = status in (200, 302); recorder.add(label, time.perf_counter() - start, ok)
+        if not ok: raise RuntimeError(f"{label}: HTTP {status}")
+        return json.loads(response_body) if status == 200 else None
+
+    async def candidate(candidate_id):
+        cookies = {}; answers = iter(ANSWERS[(candidate_id + i) % len(ANSWERS)] for i in range(1000)); started = time.perf_counter()
+        try:
+            await call("POST /upload", "POST", "/upload", cookies, *multipart(pdf))
+            data = await call("POST /interview/start", "POST", "/interview/start", cookies)
+            while not data.get("is_finished"):
+                if data.get("next"): data = data["next"]; continue
+                body = json.dumps({"text": reply_for(data, answers)}).encode()
+                data = await call("POST /interview/next_step", "POST", "/interview/next_step", cookies, body)
+            recorder.add("interview (total)", time.perf_counter() - started); return True
+        except Exception as e:
+            recorder.add("interview (total)", time.perf_counter() - started, ok=False); print(f"candidate {candidate_id} failed: {e}", file=sys.stderr); return False
+
+    return await asyncio.gather(*(candidate(i) for i in range(args.concurrency)))
+
+
+def run_worker(args):
+    sys.path.insert(0, REPO_ROOT)
+    from bench_resume_extraction import synthetic_pdf
+    pdf = synthetic_pdf(2); recorder = Recorder()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        importlib.import_module("asgi" if args.run == "asgi" else "app") # Import cost stays out of the timing
+        peak = ThreadPeak(); start = time.perf_counter()
+        results = run_sync(args, recorder, pdf) if args.run == "sync" else asyncio.run(run_asgi_candidates(args, recorder, pdf))
+        wall = time.perf_counter() - start; threads = peak.stop()
+    print(json.dumps({"wall_seconds": wall, "completed": sum(results), "failed": len(results) - sum(results), "peak_threads": threads,
+                      "rss_mb": rss_mb(), "samples": recorder.samples, "errors": recorder.errors}))
+
+
+def run_one(args, mode, concurrency):
+    work_dir = tempfile.mkdtemp(prefix="bench_asgi_")
+    settings = argparse.Namespace(llm_latency_ms=args.llm_latency_ms, llm_jitter_ms=args.llm_jitter_ms, tts_latency_ms=args.tts_latency_ms,
+                                  tts_rtf=0, store="sqlite:///interviews.db", evaluation_mode=args.evaluation_mode)
+    env = dict(worker_env(settings, work_dir), ASGI_BLOCKING_THREADS=str(args.server_threads))
+    command = [sys.executable, os.path.abspath(__file__), "--run", mode, "--concurrency", str(concurrency), "--server-threads", str(args.server_threads)]
+    try: proc = subprocess.run(command, cwd=work_dir, env=env, capture_output=True, text=True)
+    finally: shutil.rmtree(work_dir, ignore_errors=True)
+    lines = [l for l in proc.stdout.splitlines() if l.startswith("{")]
+    if proc.returncode or not lines: print(f"{mode} @ {concurrency} failed:\n{proc.stderr[-2000:]}"); return None
+    result = json.loads(lines[-1]); wall = result["wall_seconds"]
+    routes = summarize(result.pop("samples"), result.pop("errors"), wall)
+    return {"mode": mode, "concurrency": concurrency, "wall_seconds": round(wall, 3), "completed": result["completed"], "failed": result["failed"],
+            "interviews_per_second": round(result["completed"] / wall, 3), "peak_threads": result["peak_threads"], "rss_mb": result["rss_mb"], "routes": routes}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync vs ASGI serving benchmark with fake Gemini/TTS backends")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[50, 200], help="concurrent interviews per run")
+    parser.add_argument("--server-threads", type=int, default=32, help="sync request threads / ASGI blocking threads")
+    parser.add_argument("--llm-latency-ms", type=float, default=800); parser.add_argument("--llm-jitter-ms", type=float, default=200)
+    parser.add_argument("--tts-latency-ms", type=float, default=150)
+    parser.add_argument("--evaluation-mode", choices=["inline", "pipelined", "deferred"], default="inline")
+    parser.add_argument("--output", help="Optional path to write JSON results")
+    parser.add_argument("--run", choices=["sync", "asgi"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.run: args.concurrency = args.concurrency[0]; run_worker(args); return
+
+    results = [r for concurrency in args.concurrency for mode in ("sync", "asgi") if (r := run_one(args, mode, concurrency))]
+    print(f"{'mode':<6}{'conc':>6}{'done':>6}{'fail':>6}{'intv/s':>9}{'threads':>9}{'RSS MB':>8}" + "".join(f"{name + ' p95 ms':>18}" for name in ROUTES.values()))
+    for r in results:
+        p95 = "".join(f"{r['routes'].get(route, {}).get('p95_ms', '-'):>18}" for route in ROUTES)
+        print(f"{r['mode']:<6}{r['concurrency']:>6}{r['completed']:>6}{r['failed']:>6}{r['interviews_per_second']:>9}{r['peak_threads']:>9}{r['rss_mb']:>8}{p95}")
+    if args.output:
+        with open(args.output, "w") as f: json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+# benchmarks/bench_manager_state.py (Interview state size and per-turn (de)serialization cost)
+#
+# Usage: python benchmarks/bench_manager_state.py [--sizes 10 50 200] [--repeats 2000]
+# Compares, for a fully answered interview of each size:
+#   v1       - the old dict-per-response state (question text copied into every response),
+#              loaded and re-serialized whole on every turn
+#   v2       - InterviewManager.to_dict()/from_dict() with compact records
+#   v2 diff  - only the per-turn patch from InterviewManager.diff(), which is what the
+#              interview store writes (v2 turn time = load + transition + diff)
+import os
+import sys
+import json
+import time
+import argparse
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from interview_manager import InterviewManager, ResponseRecord # noqa: E402
+
+QUESTION = "Tell me about a project where you designed and shipped a backend service end to end; what trade-offs did you make? "
+ANSWER = "I led the rebuild of our ingestion pipeline, moving it from cron jobs to a queue-based service with retries and metrics. "
+
+
+def build_manager(size):
+    manager = InterviewManager([f"Q{i + 1}: {QUESTION}" for i in range(size)])
+    manager.responses = [ResponseRecord(i, ANSWER * 2, "Clear, structured answer with concrete results.") for i in range(size - 1)]
+    manager.current_question_index = size - 1; manager.state = "LISTENING"
+    return manager
+
+
+def legacy_state(manager):
+    return {'interview_id': manager.interview_id, 'questions': manager.questions, 'current_question_index': manager.current_question_index,
+            'user_responses': manager.user_responses, 'state': manager.state}
+
+
+def legacy_turn(blob):
+    """What every request paid before: decode everything, walk the responses, encode everything."""
+    data = json.loads(blob)
+    for resp in data['user_responses']: resp.pop('follow_ups', None)
+    data['user_responses'].append({"question": data['questions'][-1], "answer": ANSWER, "evaluation": None, "flag": None})
+    data['state'] = "ACKNOWLEDGED_ANSWER"
+    return json.dumps(data)
+
+
+def v2_turn(blob):
+    manager = InterviewManager.from_dict(json.loads(blob)); snapshot = manager.snapshot()
+    manager.state = "PROCESSING_ANSWER"; manager.record_answer_and_evaluation(ANSWER, None); manager.state = "ACKNOWLEDGED_ANSWER"
+    return json.dumps(manager.diff(snapshot))
+
+
+def per_call_us(fn, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats): fn()
+    return round((time.perf_counter() - start) / repeats * 1e6, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Interview state size and serialization benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--repeats", type=int, default=2000)
+    parser.add_argument("--output", help="Optional path to write JSON results")
+    args = parser.parse_args()
+
+    results = [] # The manager's per-call logging is at DEBUG, so it is off here
+    for size in args.sizes:
+        manager = build_manager(size)
+        v1_blob = json.dumps(legacy_state(manager)); v2_blob = json.dumps(manager.to_dict())
+        diff_blob = v2_turn(v2_blob)
+        results.append({
+            "questions": size,
+            "v1_bytes": len(v1_blob), "v2_bytes": len(v2_blob), "diff_bytes": len(diff_blob),
+            "v1_turn_us": per_call_us(lambda: legacy_turn(v1_blob), args.repeats),
+            "v2_turn_us": per_call_us(lambda: v2_turn(v2_blob), args.repeats),
+        })
+
+    print(f"{'questions':>10}{'v1 bytes':>10}{'v2 bytes':>10}{'diff bytes':>12}{'v1 turn us':>12}{'v2 turn us':>12}")
+    for r in results:
+        print(f"{r['questions']:>10}{r['v1_bytes']:>10}{r['v2_bytes']:>10}{r['diff_bytes']:>12}{r['v1_turn_us']:>12}{r['v2_turn_us']:>12}")
+    if args.output:
+        with open(args.output, "w") as f: json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+# benchmarks/bench_moderation.py (Answer moderation: old keyword loop vs combined regex vs Aho-Corasick)
+#
+# Usage: python benchmarks/bench_moderation.py [--terms 10000] [--chars 1000 10000 100000 1000000]
+#            [--baseline-max-chars 100000] [--output results.json]
+# Builds a synthetic categorized term list (some multi-word terms) and transcripts of each length
+# with a few leetspeak-disguised terms mixed into ordinary words, then times:
+#   old        - the previous check: any(term in text.lower() for term in terms)
+#   regex      - one \b(?:t1|t2|...)\b alternation over the lowercased text
+#   automaton  - moderation.TermModerator (normalize + Aho-Corasick over word tokens)
+# The automaton's time per KB should stay flat as the text grows, independent of --terms;
+# the baselines are skipped above --baseline-max-chars since they scale with terms x length.
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from moderation import TermModerator # noqa: E402
+
+CATEGORIES = ["profanity", "harassment", "hate_speech", "self_harm", "spam"]
+WORDS = ("i led the team that rebuilt our ingestion service we moved from cron jobs to a queue with retries and metrics "
+         "the hardest part was testing under load so we wrote a replay tool and fixed two slow queries before launch "
+         "my manager asked me to mentor a new engineer and we paired every day for two weeks on code reviews").split()
+LEET = {"a": "4", "e": "3", "o": "0", "s": "$", "t": "7"}
+
+
+def make_terms(count, rng):
+    vocabulary = set(WORDS); terms = set()
+    while len(terms) < count:
+        word = "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(5, 9)))
+        if word in vocabulary: continue
+        if rng.random() < 0.1: word += " " + rng.choice(WORDS) # Phrase
+        terms.add(word)
+    return [(CATEGORIES[i % len(CATEGORIES)], term) for i, term in enumerate(sorted(terms))]
+
+
+def disguise(term, rng):
+    return "".join(LEET.get(c, c) if rng.random() < 0.5 else c.upper() for c in term)
+
+
+def make_transcript(chars, terms, rng, hits):
+    words, size = [], 0
+    while size < chars:
+        word = rng.choice(WORDS); words.append(word); size += len(word) + 1
+    for position in rng.sample(range(len(words)), min(hits, len(words))): words[position] = disguise(rng.choice(terms)[1], rng) + ","
+    return " ".join(words)
+
+
+def timed(fn, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats): result = fn()
+    return (time.perf_counter() - start) / repeats, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Moderation term matching benchmark")
+    parser.add_argument("--terms", type=int, default=10000)
+    parser.add_argument("--chars", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+    parser.add_argument("--hits", type=int, default=5, help="disguised terms inserted per transcript")
+    parser.add_argument("--baseline-max-chars", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Optional path to write JSON results")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed); terms = make_terms(args.terms, rng)
+    build_seconds, moderator = timed(lambda: TermModerator(terms), 1)
+    words = [term for _, term in terms]
+    regex_build_seconds, combined = timed(lambda: re.compile(r"\b(?:" + "|".join(map(re.escape, sorted(words, key=len, reverse=True))) + r")\b"), 1)
+    print(f"{args.terms} terms: automaton built in {build_seconds * 1000:.0f} ms ({moderator.stats()['automaton_nodes']} nodes), "
+          f"regex compiled in {regex_build_seconds * 1000:.0f} ms")
+
+    results = {"terms": args.terms, "automaton_build_ms": round(build_seconds * 1000, 1), "regex_build_ms": round(regex_build_seconds * 1000, 1), "runs": []}
+    for chars in args.chars:
+        text = make_transcript(chars, terms, rng, args.hits); kb = len(text) / 1024
+        repeats = max(1, 200000 // len(text))
+        seconds, found = timed(lambda: moderator.matches(text), repeats)
+        run = {"chars": len(text), "inserted": args.hits, "automaton_found": len(found), "automaton_ms": round(seconds * 1000, 3), "automaton_us_per_kb": round(seconds * 1e6 / kb, 1)}
+        if chars <= args.baseline_max_chars:
+            old_seconds, _ = timed(lambda: [t for t in words if t in text.lower()], 1) # Every term, as if none matched early
+            regex_seconds, regex_found = timed(lambda: combined.findall(text.lower()), 1)
+            run.update(old_ms=round(old_seconds * 1000, 3), old_us_per_kb=round(old_seconds * 1e6 / kb, 1),
+                       regex_ms=round(regex_seconds * 1000, 3), regex_us_per_kb=round(regex_seconds * 1e6 / kb, 1), regex_found=len(regex_found))
+        results["runs"].append(run)
+
+    print(f"{'chars':>10}{'found':>7}{'automaton ms':>14}{'us/KB':>8}{'regex ms':>11}{'us/KB':>9}{'old ms':>11}{'us/KB':>10}")
+    for r in results["runs"]:
+        print(f"{r['chars']:>10}{r['automaton_found']:>4}/{r['inserted']:<2}{r['automaton_ms']:>14}{r['automaton_us_per_kb']:>8}"
+              f"{r.get('regex_ms', '-'):>11}{r.get('regex_us_per_kb', '-'):>9}{r.get('old_ms', '-'):>11}{r.get('old_us_per_kb', '-'):>10}")
+    if args.output:
+        with open(args.output, "w") as f: json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
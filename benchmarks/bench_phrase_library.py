@@ -0,0 +1,92 @@
+# benchmarks/bench_phrase_library.py (Question audio reuse across candidates: exact cache key vs phrase library)
+#
+# Usage: python benchmarks/bench_phrase_library.py [--candidates 1000] [--questions 10] [--shared 0.4]
+#            [--render-ms 900] [--output results.json]
+# Each simulated candidate gets --questions generated questions; a --shared fraction come from a bank
+# of common questions, as Gemini writes them with small variations (case, punctuation, contractions,
+# "please"/"so" fillers), the rest are unique to the candidate. Compares how many renders are needed:
+#   exact    - the TTS cache alone (key = whitespace-normalized text)
+#   library  - phrase_library.PhraseLibrary.resolve() before the cache lookup
+# and reports the share of TTS seconds saved (from the library's own usage log) and resolve() cost.
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from phrase_library import PhraseLibrary # noqa: E402
+from tts_cache import normalize_text # noqa: E402
+
+COMMON = ["Tell me about a time you faced a conflict with a coworker and how you resolved it.",
+          "What is your greatest professional achievement so far?",
+          "Describe a project where you had to learn a new technology quickly.",
+          "How do you prioritize your work when you have several deadlines at once?",
+          "Tell me about a time you made a mistake at work. What did you learn?",
+          "Why are you interested in this role?",
+          "Where do you see yourself in five years?",
+          "Describe a situation where you had to persuade a stakeholder.",
+          "How do you handle feedback that you disagree with?",
+          "Tell me about a time you led a team through a difficult deadline."]
+TOPICS = "kubernetes react postgres kafka airflow terraform spark django rust graphql pandas tableau salesforce figma".split()
+
+
+def variant(question, rng):
+    """The same question as an LLM might phrase it on another run."""
+    text = question
+    if rng.random() < 0.3: text = text.replace("What is", "What's").replace("you are", "you're")
+    if rng.random() < 0.3: text = text.rstrip(".?") + ("?" if text.endswith("?") else ".")
+    if rng.random() < 0.2: text = "Please " + text[0].lower() + text[1:]
+    if rng.random() < 0.2: text = "So, " + text[0].lower() + text[1:]
+    if rng.random() < 0.2: text = text.lower()
+    if rng.random() < 0.1: text = text.replace(" ", "  ", 1)
+    return text
+
+
+def unique_question(rng):
+    topic, other = rng.sample(TOPICS, 2)
+    return rng.choice([f"Walk me through how you used {topic} together with {other} in project {rng.randint(1, 10**6)}.",
+                       f"Your resume mentions {topic} at company {rng.randint(1, 10**6)}; what was the hardest problem you solved with it?"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Phrase library reuse benchmark")
+    parser.add_argument("--candidates", type=int, default=1000)
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--shared", type=float, default=0.4, help="fraction of questions drawn from the common bank")
+    parser.add_argument("--render-ms", type=float, default=900, help="assumed synthesis time per question")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Optional path to write JSON results")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    lines = [variant(rng.choice(COMMON), rng) if rng.random() < args.shared else unique_question(rng)
+             for _ in range(args.candidates) for _ in range(args.questions)]
+    with tempfile.TemporaryDirectory() as work_dir:
+        library = PhraseLibrary(os.path.join(work_dir, "phrases.db"), flush_seconds=3600)
+        exact, cached, resolve_seconds = set(), set(), 0.0
+        for text in lines:
+            exact.add(normalize_text(text))
+            start = time.perf_counter(); spoken = library.resolve(text); resolve_seconds += time.perf_counter() - start
+            reused = spoken in cached; cached.add(spoken)
+            library.record(spoken, reused, audio_seconds=len(spoken) / 15, synth_seconds=0 if reused else args.render_ms / 1000)
+        report = library.report(max_age=0)
+    results = {"lines": len(lines), "renders_exact": len(exact), "renders_library": len(cached),
+               "saved_fraction_exact": round(1 - len(exact) / len(lines), 4), "saved_fraction_library": round(1 - len(cached) / len(lines), 4),
+               "resolve_us": round(resolve_seconds * 1e6 / len(lines), 1), "near_duplicates": library.metrics["near_duplicates"], "report": report}
+    print(f"{len(lines)} question lines from {args.candidates} candidates ({args.shared:.0%} from the common bank)")
+    print(f"  exact cache key : {len(exact):>7} renders, {results['saved_fraction_exact']:.1%} of TTS saved")
+    print(f"  phrase library  : {len(cached):>7} renders, {results['saved_fraction_library']:.1%} of TTS saved "
+          f"({results['near_duplicates']} near-duplicate wordings, resolve {results['resolve_us']} us/line)")
+    print(f"  usage log report: {report['tts_seconds_saved']}s saved of {report['tts_seconds_saved'] + report['tts_seconds_spent']:.1f}s "
+          f"({report['tts_seconds_saved_fraction']:.1%})")
+    if args.output:
+        with open(args.output, "w") as f: json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+# benchmarks/bench_resume_extraction.py (Resume text extraction: old per-page concatenation vs resume_extractor)
+#
+# Usage: python benchmarks/bench_resume_extraction.py [--pages 100] [--repeats 5] [--pdf uploads/resume.pdf]
+# Compares the previous extractor (all pages, `text +=`, whole-string re.sub) with
+# resume_extractor in-process and through the worker pool, on the bundled resume and a
+# synthetic many-page PDF.
+import io
+import os
+import re
+import sys
+import json
+import time
+import argparse
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import resume_extractor # noqa: E402
+
+
+def synthetic_pdf(pages, lines_per_page=45, tag=""):
+    """Builds a text-only PDF by hand (no writer library needed). tag varies the text (and so the hash)."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for p in range(pages):
+        lines = [f"{tag}Page {p + 1} line {l + 1}: Built and operated Python services, REST APIs and data pipelines at scale." for l in range(lines_per_page)]
+        stream = "BT /F1 9 Tf 11 TL 40 800 Td " + " ".join(f"({line}) Tj T*" for line in lines) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        content_ref = len(objects)
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >> /Contents {content_ref} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>"
+    out = io.BytesIO(); out.write(b"%PDF-1.4\n"); offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(out.tell()); out.write(f"{number} 0 obj\n{body}\nendobj\n".encode('latin-1'))
+    xref = out.tell()
+    out.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode('latin-1'))
+    for offset in offsets: out.write(f"{offset:010d} 00000 n \n".encode('latin-1'))
+    out.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode('latin-1'))
+    return out.getvalue()
+
+
+def legacy_extract(data):
+    """The extractor app.py used before: every page, string concatenation, one regex pass at the end."""
+    import PyPDF2
+    text = ""; reader = PyPDF2.PdfReader(io.BytesIO(data), strict=False)
+    for page in reader.pages:
+        page_text = page.extract_text(); text += (page_text + " ") if page_text else ""
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def time_it(fn, repeats):
+    fn() # Warm-up (imports, pool start)
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter(); result = fn(); samples.append(time.perf_counter() - start)
+    samples.sort()
+    return {"median_ms": round(samples[len(samples) // 2] * 1000, 2), "best_ms": round(samples[0] * 1000, 2), "chars": len(result)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resume extraction benchmark")
+    parser.add_argument("--pages", type=int, default=100, help="pages in the synthetic PDF")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--pdf", default=os.path.join(REPO_ROOT, "uploads", "resume.pdf"))
+    parser.add_argument("--output", help="Optional path to write JSON results")
+    args = parser.parse_args()
+
+    inputs = {f"synthetic_{args.pages}p": synthetic_pdf(args.pages)}
+    if os.path.exists(args.pdf):
+        with open(args.pdf, "rb") as f: inputs[os.path.basename(args.pdf)] = f.read()
+    inline = resume_extractor.ResumeExtractor(workers=0, max_bytes=1 << 40)
+    pooled = resume_extractor.ResumeExtractor(workers=2, max_bytes=1 << 40)
+    results = []
+    try:
+        for name, data in inputs.items():
+            for label, fn in (("legacy", lambda: legacy_extract(data)),
+                              ("extractor", lambda: inline.extract(data, "pdf")),
+                              ("extractor+pool", lambda: pooled.extract(data, "pdf"))):
+                results.append(dict(time_it(fn, args.repeats), input=name, bytes=len(data), method=label))
+    finally: pooled.close()
+
+    print(f"{'input':<22}{'method':<16}{'median ms':>11}{'best ms':>10}{'chars':>9}")
+    for r in results: print(f"{r['input']:<22}{r['method']:<16}{r['median_ms']:>11}{r['best_ms']:>10}{r['chars']:>9}")
+    if args.output:
+        with open(args.output, "w") as f: json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
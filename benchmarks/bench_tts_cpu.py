@@ -0,0 +1,79 @@
+# benchmarks/bench_tts_cpu.py (Real-time factor of the TTS path, fp32 vs CPU-optimized)
+#
+# Usage: python benchmarks/bench_tts_cpu.py [--threads 4] [--vocoder trace] [--repeats 3]
+# Each configuration runs in a fresh subprocess (models load once per process), and the
+# parent prints a comparison. RTF = synthesis seconds / seconds of audio produced (lower is better).
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SENTENCES = [
+    "Hello! I'm Rose, and I'll be your interviewer today.",
+    "Tell me about a time you faced a conflict with a teammate and how you resolved it.",
+    "Walk me through your experience with building and deploying REST APIs in production.",
+    "Okay, that was the last question. Thanks for your time! The report is being generated.",
+]
+
+
+def run_worker(repeats):
+    """Runs inside the subprocess: loads models with the env-configured mode and times synthesis."""
+    sys.path.insert(0, REPO_ROOT); os.chdir(REPO_ROOT)
+    import tts_interface
+    load_start = time.time()
+    if not tts_interface.load_models(): print(json.dumps({"error": "TTS models failed to load"})); return
+    load_seconds = time.time() - load_start
+    tts_interface._synthesize(SENTENCES[0]) # Warm-up pass (allocator, traced graph)
+    synth_seconds = 0.0; audio_seconds = 0.0
+    for _ in range(repeats):
+        for sentence in SENTENCES:
+            start = time.perf_counter(); samples = tts_interface._synthesize(sentence)
+            synth_seconds += time.perf_counter() - start; audio_seconds += len(samples) / tts_interface.SAMPLE_RATE
+    print(json.dumps({
+        "load_seconds": round(load_seconds, 2), "synth_seconds": round(synth_seconds, 3), "audio_seconds": round(audio_seconds, 3),
+        "rtf": round(synth_seconds / audio_seconds, 4) if audio_seconds else None,
+        "optimizations": tts_interface.get_status().get("optimizations", {}),
+    }))
+
+
+def run_config(name, env_overrides, repeats):
+    env = dict(os.environ, TTS_CACHE_ENABLED="0", **env_overrides)
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", "--repeats", str(repeats)],
+                          env=env, capture_output=True, text=True)
+    lines = [l for l in proc.stdout.splitlines() if l.startswith("{")]
+    if proc.returncode or not lines:
+        print(f"[{name}] failed:\n{proc.stderr[-2000:]}"); return None
+    result = json.loads(lines[-1]); result["config"] = name
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TTS real-time factor: fp32 vs CPU-optimized")
+    parser.add_argument("--threads", type=int, default=int(os.getenv("TTS_NUM_THREADS", "0")), help="intra-op threads (0 = torch default)")
+    parser.add_argument("--vocoder", choices=["eager", "trace", "compile"], default="trace")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", help="Optional path to write JSON results")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker: run_worker(args.repeats); return
+
+    threads = {"TTS_NUM_THREADS": str(args.threads)}
+    configs = [
+        ("fp32", dict(threads, TTS_CPU_OPTIMIZE="0")),
+        (f"int8+{args.vocoder}", dict(threads, TTS_CPU_OPTIMIZE="1", TTS_VOCODER_MODE=args.vocoder)),
+    ]
+    results = [r for r in (run_config(name, env, args.repeats) for name, env in configs) if r]
+    print(f"{'config':<16}{'load s':>9}{'synth s':>10}{'audio s':>10}{'RTF':>9}")
+    for r in results: print(f"{r['config']:<16}{r['load_seconds']:>9}{r['synth_seconds']:>10}{r['audio_seconds']:>10}{r['rtf']:>9}")
+    if len(results) == 2 and results[1]["rtf"]: print(f"Speed-up: {results[0]['rtf'] / results[1]['rtf']:.2f}x")
+    for r in results:
+        if r.get("optimizations"): print(f"{r['config']} optimizations: {json.dumps(r['optimizations'])}")
+    if args.output:
+        with open(args.output, "w") as f: json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+# benchmarks/load_test.py (Offline load test: simulated candidates against the Flask app with fake Gemini/TTS)
+#
+# Usage: python benchmarks/load_test.py [--candidates 200] [--concurrency 50] [--processes 2]
+#            [--llm-latency-ms 800] [--tts fake|off] [--tts-latency-ms 300] [--stream]
+#            [--output results.json] [--compare baseline.json]
+# Each worker process imports app.py with GEMINI_BACKEND=fake (and TTS_BACKEND=fake unless
+# --tts off) and drives its share of candidates through /upload, /interview/start, every
+# /interview/next_step state (or the /interview/turn event stream), the audio files and
+# /report, each candidate on its own test client (own session cookie) in its own thread.
+# Workers share one working directory, so the SQLite interview store, resume cache and
+# report directory see the same contention as a multi-worker deployment.
+# Reports throughput, p50/p95/p99 per route and interview state, and RSS per worker.
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import argparse
+import threading
+import subprocess
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+ANSWERS = [
+    "I built a queue-based ingestion service in Python with retries, idempotent writes and dashboards for lag and errors.",
+    "We had an outage from a slow query; I added an index, a timeout and a load test to keep it from coming back.",
+    "I don't know that one, to be honest.",
+    "I paired with the new engineer daily for two weeks, then moved to code reviews with written feedback.",
+]
+GREETING_REPLY = "Hi Rose, I'm doing well, thanks. Ready to start."
+
+
+class Recorder:
+    """Raw latency samples (seconds) and error counts per label, shared by the candidate threads."""
+
+    def __init__(self):
+        self.samples = {}; self.errors = {}; self._lock = threading.Lock()
+
+    def add(self, label, seconds, ok=True):
+        with self._lock:
+            self.samples.setdefault(label, []).append(seconds)
+            if not ok: self.errors[label] = self.errors.get(label, 0) + 1
+
+    def timed(self, label, fn, ok_statuses=(200, 302, 304)):
+        start = time.perf_counter(); response = fn(); elapsed = time.perf_counter() - start
+        self.add(label, elapsed, response.status_code in ok_statuses)
+        if response.status_code not in ok_statuses: raise RuntimeError(f"{label}: HTTP {response.status_code}")
+        return response
+
+
+# --- Worker process ---
+def rss_mb():
+    """Current resident set size of this process (Linux /proc; falls back to the peak)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"): return round(int(line.split()[1]) / 1024, 1)
+    except OSError: pass
+    import resource
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def fetch_audio(client, recorder, data):
+    url = data.get("audio_url")
+    if url: recorder.timed("GET /audio", lambda: client.get(url))
+
+
+def read_event_stream(response, recorder, label, start):
+    """Yields (name, data) from a streamed /interview/turn response, recording time to first event."""
+    buffer = ""; first = True
+    for chunk in response.response:
+        if first: recorder.add(f"{label} first event", time.perf_counter() - start); first = False
+        buffer += chunk.decode('utf-8') if isinstance(chunk, bytes) else chunk
+        while "\n\n" in buffer:
+            block, buffer = buffer.split("\n\n", 1)
+            name = next((l[6:].strip() for l in block.split("\n") if l.startswith("event:")), None)
+            payload = "".join(l[5:].strip() for l in block.split("\n") if l.startswith("data:"))
+            if name and payload: yield name, json.loads(payload)
+
+
+def run_candidate_next_step(client, recorder, answers, think):
+    data = recorder.timed("POST /interview/start", lambda: client.post('/interview/start')).get_json()
+    while True:
+        fetch_audio(client, recorder, data)
+        if data.get("is_finished"): return
+        if data.get("next"): data = data["next"]; continue # Pipelined: next turn came with the ack
+        state = data.get("state")
+        if data.get("awaits_input"):
+            if think: time.sleep(think)
+            text = GREETING_REPLY if state == "AWAITING_GREETING_RESPONSE" else next(answers)
+        else: text = "" # Client asks for the next step after playing an ack
+        data = recorder.timed(f"POST /interview/next_step {state}", lambda: client.post('/interview/next_step', json={"text": text})).get_json()
+
+
+def run_candidate_stream(client, recorder, answers, think):
+    state, text = "INIT", ""
+    while True:
+        label = f"POST /interview/turn {state}"; start = time.perf_counter()
+        response = client.post('/interview/turn', json={"text": text}, buffered=False)
+        done = None; ok = response.status_code == 200
+        if ok:
+            for name, data in read_event_stream(response, recorder, label, start):
+                if name == "turn": fetch_audio(client, recorder, data)
+                elif name == "done": done = data
+                elif name == "error": ok = False
+        response.close(); recorder.add(label, time.perf_counter() - start, ok and done is not None)
+        if not ok or done is None: raise RuntimeError(f"{label}: stream failed")
+        if done["is_finished"]: return
+        if think: time.sleep(think)
+        state = done["state"]; text = GREETING_REPLY if state == "AWAITING_GREETING_RESPONSE" else next(answers)
+
+
+def run_candidate(app_module, candidate_id, args, recorder, synthetic_pdf):
+    client = app_module.app.test_client()
+    pdf = synthetic_pdf(args.pages, tag=f"Candidate {candidate_id} " if args.unique_resumes else "")
+    answers = iter(ANSWERS[(candidate_id + i) % len(ANSWERS)] for i in range(1000))
+    started = time.perf_counter()
+    try:
+        response = recorder.timed("POST /upload", lambda: client.post('/upload', data={"resume": (io.BytesIO(pdf), "resume.pdf")},
+                                                                        content_type="multipart/form-data"))
+        if not response.headers.get("Location", "").endswith("/interview"): raise RuntimeError("upload did not start an interview")
+        recorder.timed("GET /interview", lambda: client.get('/interview'))
+        (run_candidate_stream if args.stream else run_candidate_next_step)(client, recorder, answers, args.think_ms / 1000)
+        recorder.timed("GET /report", lambda: client.get('/report'))
+        if args.download: recorder.timed("GET /download_report", lambda: client.get('/download_report'))
+        recorder.add("interview (total)", time.perf_counter() - started)
+        return True
+    except Exception as e:
+        recorder.add("interview (total)", time.perf_counter() - started, ok=False)
+        print(f"candidate {candidate_id} failed: {e}", file=sys.stderr)
+        return False
+
+
+def run_worker(args):
+    """Runs inside a worker process (cwd = shared work dir): imports the app and drives candidates."""
+    sys.path.insert(0, REPO_ROOT); sys.path.insert(0, BENCH_DIR)
+    from bench_resume_extraction import synthetic_pdf
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull): # Stray prints from dependencies
+        import tts_interface
+        if args.tts == "off": tts_interface.ENABLE_HF_TTS = False
+        import app as app_module
+        rss_start = rss_mb(); recorder = Recorder()
+        first_id = args.worker_index * args.candidates
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix="candidate") as pool:
+            results = list(pool.map(lambda i: run_candidate(app_module, first_id + i, args, recorder, synthetic_pdf), range(args.candidates)))
+        wall = time.perf_counter() - start
+        llm_calls = app_module.gemini_model.stats() if app_module.gemini_model is not None else {}
+    print(json.dumps({
+        "worker": args.worker_index, "wall_seconds": round(wall, 3), "completed": sum(results), "failed": len(results) - sum(results),
+        "rss_start_mb": rss_start, "rss_end_mb": rss_mb(), "llm_calls": llm_calls,
+        "samples": {label: [round(s, 6) for s in samples] for label, samples in recorder.samples.items()}, "errors": recorder.errors,
+    }))
+
+
+# --- Parent: spawn workers, aggregate, report ---
+def percentile(sorted_samples, q):
+    if not sorted_samples: return None
+    return sorted_samples[min(len(sorted_samples) - 1, int(q * len(sorted_samples)))]
+
+
+def summarize(samples, errors, wall):
+    summary = {}
+    for label, values in sorted(samples.items()):
+        values = sorted(values)
+        summary[label] = {"count": len(values), "errors": errors.get(label, 0), "rps": round(len(values) / wall, 2) if wall else None,
+                          **{f"p{int(q * 100)}_ms": round(percentile(values, q) * 1000, 2) for q in (0.5, 0.95, 0.99)},
+                          "mean_ms": round(sum(values) / len(values) * 1000, 2), "max_ms": round(values[-1] * 1000, 2)}
+    return summary
+
+
+def worker_env(args, work_dir):
+    env = dict(os.environ, GEMINI_BACKEND="fake", TTS_BACKEND="fake", WARMUP_MODE="lazy", FLASK_SECRET_KEY="load-test", LOG_LEVEL="WARNING",
+               FAKE_LLM_LATENCY_MS=str(args.llm_latency_ms), FAKE_LLM_JITTER_MS=str(args.llm_jitter_ms),
+               FAKE_TTS_LATENCY_MS=str(args.tts_latency_ms), FAKE_TTS_RTF=str(args.tts_rtf),
+               INTERVIEW_STORE=args.store, REPORT_DIR=os.path.join(work_dir, "reports"),
+               RESUME_CACHE_PATH=os.path.join(work_dir, "resume_cache.db"), PYTHONPATH=REPO_ROOT)
+    if args.evaluation_mode: env["EVALUATION_MODE"] = args.evaluation_mode
+    return env
+
+
+def worker_command(args, index, candidates, threads):
+    """Latency settings travel in the environment (worker_env); the rest as flags."""
+    command = [sys.executable, os.path.abspath(__file__), "--worker", "--worker-index", str(index), "--candidates", str(candidates),
+               "--concurrency", str(threads), "--tts", args.tts, "--pages", str(args.pages), "--think-ms", str(args.think_ms)]
+    for flag in ("stream", "download", "unique_resumes"):
+        if getattr(args, flag): command.append("--" + flag.replace("_", "-"))
+    return command
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test with fake Gemini/TTS backends")
+    parser.add_argument("--candidates", type=int, default=100, help="simulated interviews in total")
+    parser.add_argument("--concurrency", type=int, default=20, help="candidates in flight at once (split across processes)")
+    parser.add_argument("--processes", type=int, default=1, help="worker processes, each with its own copy of the app")
+    parser.add_argument("--llm-latency-ms", type=float, default=0); parser.add_argument("--llm-jitter-ms", type=float, default=0)
+    parser.add_argument("--tts", choices=["fake", "off"], default="fake")
+    parser.add_argument("--tts-latency-ms", type=float, default=0); parser.add_argument("--tts-rtf", type=float, default=0)
+    parser.add_argument("--evaluation-mode", choices=["inline", "pipelined", "deferred"])
+    parser.add_argument("--store", default="sqlite:///interviews.db", help="INTERVIEW_STORE URL (relative paths are in the work dir)")
+    parser.add_argument("--stream", action="store_true", help="drive turns through the /interview/turn event stream")
+    parser.add_argument("--download", action="store_true", help="also download the PDF report (needs WeasyPrint)")
+    parser.add_argument("--pages", type=int, default=2, help="pages per synthetic resume")
+    parser.add_argument("--unique-resumes", action="store_true", help="different resume per candidate (no resume cache hits)")
+    parser.add_argument("--think-ms", type=float, default=0, help="pause before each answer")
+    parser.add_argument("--output", help="Optional path to write JSON results")
+    parser.add_argument("--compare", help="JSON results of an earlier run to diff p95 against")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--worker-index", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker: run_worker(args); return
+
+    work_dir = tempfile.mkdtemp(prefix="load_test_")
+    per_process = [args.candidates // args.processes + (1 if i < args.candidates % args.processes else 0) for i in range(args.processes)]
+    threads = max(1, args.concurrency // args.processes)
+    start = time.perf_counter()
+    try:
+        procs = [subprocess.Popen(worker_command(args, i, n, threads),
+                                  cwd=work_dir, env=worker_env(args, work_dir), stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+                 for i, n in enumerate(per_process) if n]
+        outputs = [(proc, *proc.communicate()) for proc in procs]
+    finally: shutil.rmtree(work_dir, ignore_errors=True)
+    wall = time.perf_counter() - start
+
+    workers, samples, errors = [], {}, {}
+    for proc, out, err in outputs:
+        lines = [l for l in out.splitlines() if l.startswith("{")]
+        if proc.returncode or not lines: print(f"worker failed:\n{err[-2000:]}"); continue
+        result = json.loads(lines[-1])
+        for label, values in result.pop("samples").items(): samples.setdefault(label, []).extend(values)
+        for label, count in result.pop("errors").items(): errors[label] = errors.get(label, 0) + count
+        workers.append(result)
+    if not workers: sys.exit(1)
+
+    completed = sum(w["completed"] for w in workers); requests = sum(len(v) for k, v in samples.items() if not k.endswith(("first event", "(total)")))
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "config": {k: v for k, v in vars(args).items() if k not in ("worker", "worker_index", "output", "compare")},
+        "wall_seconds": round(wall, 3), "completed": completed, "failed": sum(w["failed"] for w in workers),
+        "interviews_per_second": round(completed / wall, 3), "requests_per_second": round(requests / wall, 2),
+        "workers": workers, "routes": summarize(samples, errors, wall),
+    }
+
+    print(f"{completed} interviews ({results['failed']} failed) in {wall:.1f}s: {results['interviews_per_second']} interviews/s, {results['requests_per_second']} req/s")
+    for w in workers: print(f"  worker {w['worker']}: RSS {w['rss_start_mb']} -> {w['rss_end_mb']} MB, LLM calls {sum(w['llm_calls'].values())}")
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f: baseline = json.load(f).get("routes", {})
+    print(f"{'route / state':<52}{'count':>7}{'err':>5}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}" + (f"{'p95 vs base':>13}" if baseline else ""))
+    for label, r in results["routes"].items():
+        line = f"{label:<52}{r['count']:>7}{r['errors']:>5}{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}"
+        if baseline.get(label): line += f"{(r['p95_ms'] / baseline[label]['p95_ms'] - 1) * 100:>+12.1f}%" if baseline[label]['p95_ms'] else ""
+        print(line)
+    if args.output:
+        with open(args.output, "w") as f: json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+# evaluation_pipeline.py (Background answer evaluation for pipelined interview turns)
+import time
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
+
+log = logging.getLogger(__name__)
+
+TIMED_OUT_NOTE = "Evaluation unavailable (timed out)."
+
+
+class EvaluationPipeline:
+    """Evaluates answers off the request path and hands the notes back to later requests.
+
+    A finished note is written to the interview store next to the interview record
+    (store.add_evaluation), so whichever worker process serves the next request can
+    apply() it to its InterviewManager. confirm() removes the notes from the store once
+    that request's save has succeeded; if the save fails (StaleStateError) they stay
+    there for the next request. Likewise an answer is only evaluated once it is saved:
+    queue() holds it on the manager and confirm() submits it, so an answer lost to a
+    stale save never produces a note for the index a retried answer ends up at.
+    """
+
+    def __init__(self, evaluate, store, max_workers=4):
+        self.evaluate = evaluate # (question, answer) -> (ack_text, eval_note)
+        self.store = store
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="evaluate")
+        self._jobs = {} # interview_id -> {index: future}, evaluations running in this process
+        self._lock = threading.Lock()
+        self.metrics = {"submitted": 0, "applied": 0, "timed_out": 0, "discarded": 0}
+
+    def queue(self, manager, index, question, answer):
+        """Holds an evaluation of manager's answer #index until confirm() (after the save) submits it."""
+        manager.queued_evaluations = getattr(manager, "queued_evaluations", []) + [(index, question, answer)]
+
+    def submit(self, interview_id, index, question, answer):
+        with self._lock:
+            future = self._executor.submit(self._run, interview_id, index, question, answer)
+            self._jobs.setdefault(interview_id, {})[index] = future
+            self.metrics["submitted"] += 1
+        future.add_done_callback(lambda _f: self._forget(interview_id, index))
+        return future
+
+    def _run(self, interview_id, index, question, answer):
+        try: note = self.evaluate(question, answer)[1]
+        except Exception as e: log.error("Evaluation Pipeline: Error evaluating answer: %s", e); note = f"Eval error: {e}"
+        with self._lock: discarded = index not in self._jobs.get(interview_id, {})
+        if not discarded:
+            try: self.store.add_evaluation(interview_id, index, note) # Stored before the future completes, so waiters find it
+            except Exception as e: log.error("Evaluation Pipeline: Could not store note for %s #%s: %s", interview_id, index, e)
+        return note
+
+    def _forget(self, interview_id, index):
+        with self._lock:
+            jobs = self._jobs.get(interview_id, {}); jobs.pop(index, None)
+            if not jobs: self._jobs.pop(interview_id, None)
+
+    def apply(self, manager, wait=False, timeout=30.0):
+        """Writes stored notes into manager. With wait=True blocks (up to timeout) until every
+        unevaluated answer has a note, using TIMED_OUT_NOTE for the ones that don't arrive."""
+        deadline = time.time() + timeout
+        if wait:
+            with self._lock: running = list(self._jobs.get(manager.interview_id, {}).values())
+            wait_futures(running, timeout=timeout) # Local evaluations; ones in other workers are polled for below
+        notes = self.store.evaluations(manager.interview_id)
+        missing = lambda: [i for i, r in enumerate(manager.responses) if r.evaluation is None and i not in notes]
+        while wait and missing() and time.time() < deadline:
+            time.sleep(0.1); notes = self.store.evaluations(manager.interview_id)
+        applied = [index for index, note in sorted(notes.items()) if manager.set_evaluation(index, note)]
+        manager.applied_evaluations = sorted(set(getattr(manager, "applied_evaluations", [])) | set(notes)) # Dropped by confirm()
+        if wait:
+            for index in missing(): manager.set_evaluation(index, TIMED_OUT_NOTE); self.metrics["timed_out"] += 1
+        with self._lock: self.metrics["applied"] += len(applied)
+        return len(applied)
+
+    def confirm(self, manager):
+        """Removes the notes apply() gave manager from the store and submits its queued evaluations.
+        Call after manager was saved."""
+        indexes = getattr(manager, "applied_evaluations", None)
+        if indexes: self.store.drop_evaluations(manager.interview_id, indexes); manager.applied_evaluations = []
+        queued = getattr(manager, "queued_evaluations", None)
+        if queued:
+            manager.queued_evaluations = []
+            for index, question, answer in queued: self.submit(manager.interview_id, index, question, answer)
+
+    def discard(self, interview_id):
+        """Drops results for an abandoned interview (running evaluations finish but aren't stored)."""
+        with self._lock:
+            jobs = self._jobs.pop(interview_id, None) or {}
+            for future in jobs.values(): future.cancel()
+            self.metrics["discarded"] += len(jobs)
+        self.store.drop_evaluations(interview_id, list(self.store.evaluations(interview_id)))
+
+    def stats(self):
+        with self._lock:
+            pending = sum(len(jobs) for jobs in self._jobs.values())
+            return dict(self.metrics, interviews=len(self._jobs), pending=pending)
@@ -0,0 +1,130 @@
+# fake_backends.py (Deterministic offline stand-ins for Gemini and the TTS backend)
+#
+# Used by benchmarks/load_test.py and for running the app without an API key or model
+# downloads: GEMINI_BACKEND=fake and TTS_BACKEND=fake. Latencies are configurable so
+# capacity numbers can be taken with realistic upstream delays.
+import os
+import re
+import json
+import time
+import zlib
+import asyncio
+import random
+import threading
+
+import numpy as np
+
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "0"))
+FAKE_LLM_JITTER_MS = float(os.getenv("FAKE_LLM_JITTER_MS", "0"))
+FAKE_LLM_FAILURE_RATE = float(os.getenv("FAKE_LLM_FAILURE_RATE", "0")) # Fraction of calls raising a retryable error
+FAKE_TTS_LATENCY_MS = float(os.getenv("FAKE_TTS_LATENCY_MS", "0"))
+FAKE_TTS_RTF = float(os.getenv("FAKE_TTS_RTF", "0")) # Synthesis seconds per second of audio produced
+
+QUESTION_TOPICS = [
+    "a backend service you designed end to end", "a production incident you debugged", "how you review code",
+    "a disagreement with a teammate", "scaling a database under load", "a deadline you nearly missed",
+    "testing strategy for a new feature", "mentoring a junior engineer", "an API you would redesign",
+    "learning a new technology quickly", "caching trade-offs you have made", "a project you are proud of",
+]
+
+
+class ServiceUnavailable(Exception):
+    """Same class name as google.api_core's, so LLMClient treats it as retryable."""
+
+
+class FakeResponse:
+    """The parts of a google.generativeai response the app reads."""
+    __slots__ = ("text", "parts", "prompt_feedback")
+
+    def __init__(self, text):
+        self.text = text; self.parts = [text]; self.prompt_feedback = None
+
+
+class FakeGenerativeModel:
+    """Drop-in for genai.GenerativeModel: recognizes the app's prompts and returns well-formed replies.
+
+    Replies depend only on the prompt and seed, so runs are repeatable. latency/jitter are
+    in seconds; failure_rate makes that fraction of calls raise ServiceUnavailable.
+    """
+
+    def __init__(self, latency=FAKE_LLM_LATENCY_MS / 1000, jitter=FAKE_LLM_JITTER_MS / 1000, failure_rate=FAKE_LLM_FAILURE_RATE,
+                 question_count=10, seed=0):
+        self.latency = latency; self.jitter = jitter; self.failure_rate = failure_rate
+        self.question_count = question_count; self.seed = seed
+        self._lock = threading.Lock()
+        self.calls = {}
+
+    def _rng(self, prompt):
+        return random.Random(zlib.crc32(prompt.encode('utf-8')) ^ self.seed)
+
+    def _start(self, prompt):
+        """(kind, rng, delay) for one call, counted."""
+        rng = self._rng(prompt); kind = self.classify(prompt)
+        with self._lock: self.calls[kind] = self.calls.get(kind, 0) + 1
+        return kind, rng, self.latency + (rng.uniform(0, self.jitter) if self.jitter else 0.0)
+
+    def _respond(self, kind, prompt, rng):
+        if self.failure_rate and random.random() < self.failure_rate: raise ServiceUnavailable("fake upstream error")
+        return FakeResponse(self.reply(kind, prompt, rng))
+
+    def generate_content(self, prompt, **kwargs):
+        kind, rng, delay = self._start(prompt)
+        if delay > 0: time.sleep(delay)
+        return self._respond(kind, prompt, rng)
+
+    async def generate_content_async(self, prompt, **kwargs):
+        """Same reply; the latency is awaited, like the real client's async method."""
+        kind, rng, delay = self._start(prompt)
+        if delay > 0: await asyncio.sleep(delay)
+        return self._respond(kind, prompt, rng)
+
+    @staticmethod
+    def classify(prompt):
+        if "interview questions" in prompt: return "questions"
+        if '"evaluations"' in prompt: return "evaluation_batch"
+        if "ACKNOWLEDGEMENT:" in prompt: return "evaluation"
+        if "replied to greeting" in prompt: return "greeting_ack"
+        if "opening sentences" in prompt: return "greeting"
+        return "other"
+
+    def reply(self, kind, prompt, rng):
+        if kind == "questions":
+            topics = rng.sample(QUESTION_TOPICS, min(self.question_count, len(QUESTION_TOPICS)))
+            return "\n".join(f"{i}. Can you tell me about {topic}?" for i, topic in enumerate(topics, 1))
+        if kind == "evaluation":
+            return f"ACKNOWLEDGEMENT: Thanks, that's a clear answer.\nEVALUATION: {rng.choice(['Specific', 'Vague', 'Well structured'])} answer with {rng.randint(1, 3)} examples."
+        if kind == "evaluation_batch":
+            count = len(re.findall(r'^\d+\. Question:', prompt, re.M))
+            return json.dumps({"evaluations": [{"index": i, "evaluation": f"Answer {i}: relevant, could use more detail."} for i in range(1, count + 1)]})
+        if kind == "greeting_ack": return "Great to hear! Let's get started."
+        if kind == "greeting": return "Hello! I'm Rose, and I'll be your interviewer today. How are you doing?"
+        return "Okay."
+
+    def stats(self):
+        with self._lock: return dict(self.calls)
+
+
+class FakeTTSClient:
+    """Same interface as tts_server.TTSServerClient (voice_id, synthesize), producing a quiet tone.
+
+    Audio length follows speaking rate (about 15 characters per second), so file sizes and
+    encode costs stay realistic; synthesis takes latency + rtf * audio seconds.
+    """
+
+    CHARS_PER_SECOND = 15.0
+
+    def __init__(self, latency=FAKE_TTS_LATENCY_MS / 1000, rtf=FAKE_TTS_RTF, sample_rate=16000):
+        self.latency = latency; self.rtf = rtf; self.sample_rate = sample_rate
+        self.calls = 0; self._lock = threading.Lock()
+
+    def voice_id(self): return "fake"
+
+    def synthesize(self, text):
+        seconds = max(0.2, len(text) / self.CHARS_PER_SECOND)
+        delay = self.latency + self.rtf * seconds
+        if delay > 0: time.sleep(delay)
+        with self._lock: self.calls += 1
+        t = np.arange(int(seconds * self.sample_rate), dtype=np.float32) / self.sample_rate
+        return (0.05 * np.sin(2 * np.pi * 220.0 * t)).astype(np.float32)
+
+    def stats(self): return {"calls": self.calls, "latency": self.latency, "rtf": self.rtf}
@@ -0,0 +1,153 @@
+# interview_flow.py (Declarative transition table for the interview flow)
+import time
+import threading
+import logging
+from enum import Enum, Flag, auto
+from collections import namedtuple
+
+from metrics import HistogramFamily
+
+log = logging.getLogger(__name__)
+
+
+class InterviewState(str, Enum):
+    """Interview states. A str subclass, so members compare equal to (and serialize as) the old literals."""
+    INIT = "INIT"
+    GREETING = "GREETING"
+    AWAITING_GREETING_RESPONSE = "AWAITING_GREETING_RESPONSE"
+    GREETING_ACKNOWLEDGED = "GREETING_ACKNOWLEDGED"
+    ASKING_QUESTION = "ASKING_QUESTION"
+    LISTENING = "LISTENING"
+    PROCESSING_ANSWER = "PROCESSING_ANSWER"
+    ACKNOWLEDGED_ANSWER = "ACKNOWLEDGED_ANSWER"
+    CLOSING = "CLOSING"
+    FINISHED = "FINISHED"
+
+    __str__ = str.__str__ # f"{state}" gives "LISTENING", not "InterviewState.LISTENING"
+
+
+class Action(Flag):
+    """Side effects a transition performs."""
+    NONE = 0
+    LLM = auto()    # Gemini call (greeting, ack, evaluation)
+    TTS = auto()    # Audio for the interviewer's line
+    RECORD = auto() # Candidate input is stored on the manager
+
+
+class Event(str, Enum):
+    START = "start"       # POST /interview/start
+    REPLY = "reply"       # Candidate spoke (greeting response or answer)
+    CONTINUE = "continue" # Client finished playing an ack; no input
+
+    __str__ = str.__str__
+
+
+S = InterviewState
+# source, event, possible targets, actions, handler name (looked up by the web layer), via = transient
+# states passed through, prefetchable = its TTS text is known ahead of time (pre-rendered questions/closing)
+Transition = namedtuple("Transition", "source event targets actions handler via prefetchable")
+
+TRANSITIONS = {t.source: t for t in (
+    Transition(S.INIT, Event.START, (S.AWAITING_GREETING_RESPONSE,), Action.LLM | Action.TTS, "greet", (S.GREETING,), False),
+    Transition(S.AWAITING_GREETING_RESPONSE, Event.REPLY, (S.GREETING_ACKNOWLEDGED,), Action.RECORD | Action.LLM | Action.TTS, "greeting_reply", (), False),
+    Transition(S.GREETING_ACKNOWLEDGED, Event.CONTINUE, (S.LISTENING,), Action.TTS, "first_question", (S.ASKING_QUESTION,), True),
+    Transition(S.LISTENING, Event.REPLY, (S.ACKNOWLEDGED_ANSWER, S.LISTENING, S.FINISHED), Action.RECORD | Action.LLM | Action.TTS, "answer", (S.PROCESSING_ANSWER,), False),
+    Transition(S.ACKNOWLEDGED_ANSWER, Event.CONTINUE, (S.LISTENING, S.FINISHED), Action.TTS, "next_question", (S.ASKING_QUESTION, S.CLOSING), True),
+)} # One outgoing transition per stable state, so dispatch is a dict lookup
+
+TERMINAL_STATES = frozenset({S.FINISHED})
+AWAITS_INPUT = frozenset(t.source for t in TRANSITIONS.values() if t.event == Event.REPLY) # Client records audio
+AUTO_ADVANCE = frozenset(t.source for t in TRANSITIONS.values() if t.event == Event.CONTINUE) # Client continues unprompted
+
+
+class TransitionError(Exception):
+    """A turn can't proceed; status is the HTTP status the web layer should return."""
+
+    def __init__(self, message, status=500):
+        super().__init__(message); self.status = status
+
+
+def transition_for(state, event=None):
+    """The transition out of state (checking event if given). Raises TransitionError."""
+    try: transition = TRANSITIONS[InterviewState(state)]
+    except (ValueError, KeyError): raise TransitionError(f"Unexpected state: {state}", 400)
+    if event is not None and transition.event != event:
+        raise TransitionError(f"Event '{event}' not allowed in state {state} (expects '{transition.event}')", 400)
+    return transition
+
+
+def upcoming_actions(state):
+    """Actions of the transition that will run after reaching state, so callers can start them early."""
+    transition = TRANSITIONS.get(state)
+    return (transition.actions, transition.prefetchable) if transition else (Action.NONE, False)
+
+
+def validate_table():
+    """Checks the table is consistent: known states, no dead ends, FINISHED reachable from INIT.
+
+    Runs at import, so a bad edit fails at startup rather than mid-interview.
+    """
+    problems = []
+    for state, transition in TRANSITIONS.items():
+        if state in TERMINAL_STATES: problems.append(f"terminal state {state} has a transition")
+        for target in transition.targets + transition.via:
+            if not isinstance(target, InterviewState): problems.append(f"{state}: unknown state {target!r}")
+        for target in transition.targets:
+            if target not in TRANSITIONS and target not in TERMINAL_STATES: problems.append(f"{state} -> {target} is a dead end")
+    reachable, frontier = {S.INIT}, [S.INIT]
+    while frontier:
+        transition = TRANSITIONS.get(frontier.pop())
+        for target in (transition.targets if transition else ()):
+            if target not in reachable: reachable.add(target); frontier.append(target)
+    if not TERMINAL_STATES <= reachable: problems.append("FINISHED is not reachable from INIT")
+    if problems: raise ValueError("Invalid interview transition table: " + "; ".join(problems))
+
+
+validate_table()
+
+
+# --- Timing ---
+class TransitionTrace:
+    """Times one transition, with optional named steps (e.g. "llm", "tts") inside it."""
+
+    def __init__(self, timings, source, event):
+        self.timings = timings; self.source = source; self.event = event; self.target = None
+        self.steps = []; self._start = self._last = time.perf_counter()
+
+    def step(self, name):
+        """Closes the step that ran since the previous mark."""
+        now = time.perf_counter(); self.steps.append((name, now - self._last)); self._last = now
+
+    def __enter__(self): return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.timings.record(self, time.perf_counter() - self._start, failed=exc_type is not None)
+        return False
+
+
+class FlowTimings:
+    """Per-transition latency histograms; transitions slower than slow_seconds are logged with their steps."""
+
+    def __init__(self, slow_seconds=2.0):
+        self.slow_seconds = slow_seconds
+        self.latency = HistogramFamily(label_names=("transition",)) # "SOURCE -> TARGET"
+        self.steps = HistogramFamily(label_names=("step",))         # "SOURCE:step"
+        self._failures = {}; self._lock = threading.Lock()
+
+    def trace(self, source, event): return TransitionTrace(self, source, event)
+
+    def record(self, trace, seconds, failed=False):
+        label = f"{trace.source} -> {trace.target or '?'}"
+        if failed:
+            with self._lock: self._failures[label] = self._failures.get(label, 0) + 1
+            return
+        self.latency.observe(label, seconds)
+        for name, step_seconds in trace.steps: self.steps.observe(f"{trace.source}:{name}", step_seconds)
+        if seconds >= self.slow_seconds:
+            breakdown = ", ".join(f"{name}={s * 1000:.0f}ms" for name, s in trace.steps)
+            log.warning("Interview Flow: Slow transition %s (%s) took %.0fms [%s]", label, trace.event, seconds * 1000, breakdown)
+
+    def stats(self):
+        with self._lock: failures = dict(self._failures)
+        return {"transitions": {label: h.summary() for label, h in self.latency.items()},
+                "steps": {label: h.summary() for label, h in self.steps.items()}, "failures": failures}
@@ -1,124 +1,204 @@
 # interview_manager.py (Reverted to simpler version)
 import random
+import uuid
+import logging
+
+from interview_flow import InterviewState
+import moderation
+
+log = logging.getLogger(__name__)
+
+# 1: responses were dicts repeating the question text ({'question', 'answer', 'evaluation', 'flag'})
+# 2: responses are compact [q_index, answer, evaluation, flag] lists referencing self.questions
+STATE_SCHEMA_VERSION = 2
+
+
+class ResponseRecord:
+    """One answered question. Refers to the question by index instead of copying its text."""
+    __slots__ = ("q_index", "answer", "evaluation", "flag")
+
+    def __init__(self, q_index, answer, evaluation=None, flag=None):
+        self.q_index = q_index; self.answer = answer; self.evaluation = evaluation; self.flag = flag
+
+    def to_list(self): return [self.q_index, self.answer, self.evaluation, self.flag]
+
+    @classmethod
+    def from_list(cls, values): return cls(*values)
+
+    def to_report_dict(self, questions):
+        """The v1 dict shape the report template renders."""
+        question = questions[self.q_index] if 0 <= self.q_index < len(questions) else "N/A"
+        return {"question": question, "answer": self.answer, "evaluation": self.evaluation, "flag": self.flag}
+
+
+def migrate_state(data):
+    """Upgrades serialized state to the current schema. v1 response dicts become compact records."""
+    version = data.get('schema', 1)
+    if version > STATE_SCHEMA_VERSION: raise ValueError(f"Interview state schema {version} is newer than supported ({STATE_SCHEMA_VERSION})")
+    questions = data['questions']; first_index = {}
+    for i, question in enumerate(questions): first_index.setdefault(question, i)
+    responses = []
+    for position, resp in enumerate(data.get('responses', data.get('user_responses', []))):
+        if isinstance(resp, dict): # v1; answers were recorded in question order, so try the position first
+            question = resp.get('question')
+            q_index = position if position < len(questions) and questions[position] == question else first_index.get(question, position)
+            resp = [q_index, resp.get('answer'), resp.get('evaluation'), resp.get('flag')] # Drops legacy 'follow_ups'
+        responses.append(resp)
+    migrated = {k: v for k, v in data.items() if k != 'user_responses'}
+    migrated.update(schema=STATE_SCHEMA_VERSION, responses=responses)
+    return migrated
+
 
 class InterviewManager:
     """Manages state for a simple Q&A flow without complex follow-ups."""
 
-    def __init__(self, questions):
+    def __init__(self, questions, interview_id=None):
         if not questions or not isinstance(questions, list):
             raise ValueError("Requires a list of questions.")
         self.questions = questions
+        self.interview_id = interview_id or uuid.uuid4().hex # Keys per-interview background work
         self.current_question_index = -1 # -1: Before Q0
-        # Structure: {'question': str, 'answer': str | None, 'evaluation': str | None, 'flag': str | None}
-        self.user_responses = []
-        # Simpler States: INIT, GREETING, AWAITING_GREETING_RESPONSE, GREETING_ACKNOWLEDGED,
-        #                 ASKING_QUESTION, LISTENING, PROCESSING_ANSWER, ACKNOWLEDGED_ANSWER,
-        #                 CLOSING, FINISHED
-        self.state = "INIT"
+        self.responses = [] # ResponseRecord per answered question, in order
+        # States and allowed transitions: see interview_flow.InterviewState / TRANSITIONS
+        self.state = InterviewState.INIT
         # No follow-up specific fields needed in this version
 
+    # Fields a transition can change (besides responses); diff() and apply_patch() only touch these
+    SCALAR_FIELDS = ('state', 'current_question_index')
+
+    @property
+    def user_responses(self):
+        """Responses as report dicts (question text resolved). Read-only view."""
+        return [r.to_report_dict(self.questions) for r in self.responses]
+
     def to_dict(self):
-        """Serializes state."""
+        """Serializes state (current schema)."""
         return {
+            'schema': STATE_SCHEMA_VERSION, 'interview_id': self.interview_id,
             'questions': self.questions, 'current_question_index': self.current_question_index,
-            'user_responses': self.user_responses, 'state': self.state,
+            'responses': [r.to_list() for r in self.responses], 'state': self.state,
         }
 
     @classmethod
     def from_dict(cls, data):
-        """Deserializes state."""
+        """Deserializes state, migrating older schemas."""
         if not data or 'questions' not in data: raise ValueError("Invalid data for Manager")
-        manager = cls(data['questions'])
+        if data.get('schema') != STATE_SCHEMA_VERSION: data = migrate_state(data)
+        manager = cls(data['questions'], interview_id=data.get('interview_id'))
         manager.current_question_index = data.get('current_question_index', -1)
-        manager.user_responses = data.get('user_responses', [])
-        manager.state = data.get('state', "INIT")
-        # Ensure backward compatibility if 'follow_ups' exists in old session data, ignore it
-        for resp in manager.user_responses:
-            resp.pop('follow_ups', None)
+        manager.responses = [ResponseRecord.from_list(values) for values in data.get('responses', [])]
+        manager.state = InterviewState(data.get('state', InterviewState.INIT))
         return manager
 
+    def snapshot(self):
+        """Cheap copy of the mutable state, to diff() against after a transition."""
+        return {f: getattr(self, f) for f in self.SCALAR_FIELDS}, [r.to_list() for r in self.responses]
+
+    def diff(self, snapshot):
+        """Patch with only what changed since snapshot (empty dict if nothing did).
+
+        {"set": {field: value}, "update": {index: {field: value}}, "append": [record lists]}
+        """
+        scalars, records = snapshot; patch = {}
+        changed = {f: getattr(self, f) for f in self.SCALAR_FIELDS if getattr(self, f) != scalars.get(f)}
+        if changed: patch["set"] = changed
+        updates = {}
+        for index, (record, old) in enumerate(zip(self.responses, records)):
+            fields = {name: value for name, value, old_value in zip(ResponseRecord.__slots__, record.to_list(), old) if value != old_value}
+            if fields: updates[index] = fields
+        if updates: patch["update"] = updates
+        if len(self.responses) > len(records): patch["append"] = [r.to_list() for r in self.responses[len(records):]]
+        return patch
+
+    def apply_patch(self, patch):
+        """Applies a diff() result (also after a JSON round trip, where indices become strings)."""
+        for field, value in patch.get("set", {}).items():
+            if field not in self.SCALAR_FIELDS: raise ValueError(f"Unknown field in patch: {field}")
+            setattr(self, field, value)
+        for index, fields in patch.get("update", {}).items():
+            record = self.responses[int(index)]
+            for name, value in fields.items(): setattr(record, name, value)
+        for values in patch.get("append", []): self.responses.append(ResponseRecord.from_list(values))
+
     def _log_state_change(self, new_state):
         """Logs state transitions."""
         if self.state != new_state:
-            print(f"InterviewManager: State {self.state} -> {new_state}")
-            self.state = new_state
+            log.debug("InterviewManager: State %s -> %s", self.state, new_state)
+            self.state = InterviewState(new_state)
 
     def start_interview(self):
         """Transitions from INIT to GREETING."""
-        if self.state == "INIT":
-            self._log_state_change("GREETING"); return {"state": self.state}
+        if self.state == InterviewState.INIT:
+            self._log_state_change(InterviewState.GREETING); return {"state": self.state}
         return None
 
     def record_greeting_response(self, greeting_response):
          """Records the user's response to the initial greeting."""
          # We might not store this in the final report in this version
-         if self.state == "AWAITING_GREETING_RESPONSE":
-            print(f"InterviewManager: Recorded greeting response (not stored in log).")
+         if self.state == InterviewState.AWAITING_GREETING_RESPONSE:
+            log.debug("InterviewManager: Recorded greeting response (not stored in log).")
             # Optionally store if needed:
-            # self.user_responses.append({"question": "Initial Greeting", "answer": greeting_response, "evaluation": "N/A", "flag": None})
+            # self.responses.append(ResponseRecord(-1, greeting_response, "N/A"))
             return True
          return False
 
     def prepare_first_question(self):
         """Moves state to ASKING_QUESTION for the first question."""
-        if self.state == "GREETING_ACKNOWLEDGED":
-            if not self.questions: self._log_state_change("CLOSING"); return None
+        if self.state == InterviewState.GREETING_ACKNOWLEDGED:
+            if not self.questions: self._log_state_change(InterviewState.CLOSING); return None
             self.current_question_index = 0
-            self._log_state_change("ASKING_QUESTION")
-            print(f"Prep Q{self.current_question_index}")
+            self._log_state_change(InterviewState.ASKING_QUESTION)
+            log.debug("Prep Q%s", self.current_question_index)
             return self.current_question_index
-        print(f"Err: prep first Q in state {self.state}"); return None
+        log.error("Err: prep first Q in state %s", self.state); return None
 
     def get_current_question(self):
         """Gets the text of the scheduled question to be asked."""
-        if self.state == "ASKING_QUESTION" and 0 <= self.current_question_index < len(self.questions):
+        if self.state == InterviewState.ASKING_QUESTION and 0 <= self.current_question_index < len(self.questions):
             return self.questions[self.current_question_index]
         return None
 
     def record_answer_and_evaluation(self, answer_text, evaluation_note):
         """Records answer and simple evaluation note. State set by caller."""
-        if self.state == "PROCESSING_ANSWER":
+        if self.state == InterviewState.PROCESSING_ANSWER:
             if not (0 <= self.current_question_index < len(self.questions)): return None
-            question_asked = self.questions[self.current_question_index]
-            flag = "inappropriate" if self._is_inappropriate(answer_text) else None
-            self.user_responses.append({
-                "question": question_asked, "answer": answer_text,
-                "evaluation": evaluation_note, # Store simple note
-                "flag": flag
-                # No 'follow_ups' field needed here
-            })
-            print(f"Recorded answer for Q{self.current_question_index}. Eval: '{evaluation_note}'")
+            flag = moderation.flag_for(answer_text) # Matched categories (e.g. "harassment, profanity") for the report
+            self.responses.append(ResponseRecord(self.current_question_index, answer_text, evaluation_note, flag))
+            log.debug("Recorded answer for Q%s. Eval: '%s'", self.current_question_index, evaluation_note)
             return {"recorded": True}
-        print(f"Err: record_answer in state {self.state}"); return None
+        log.error("Err: record_answer in state %s", self.state); return None
+
+    def set_evaluation(self, response_index, evaluation_note):
+        """Fills in an evaluation note computed after the answer was recorded (pipelined turns)."""
+        if 0 <= response_index < len(self.responses):
+            self.responses[response_index].evaluation = evaluation_note; return True
+        return False
 
     def prepare_next_question(self):
         """Moves state to next scheduled question or closing."""
         # Called when previous cycle acknowledged
-        if self.state == "ACKNOWLEDGED_ANSWER":
+        if self.state == InterviewState.ACKNOWLEDGED_ANSWER:
              next_index = self.current_question_index + 1
              if next_index < len(self.questions):
                  self.current_question_index = next_index
-                 self._log_state_change("ASKING_QUESTION")
+                 self._log_state_change(InterviewState.ASKING_QUESTION)
                  return {"state": self.state, "next_question_index": self.current_question_index}
              else: # All questions done
                  self.current_question_index = len(self.questions)
-                 self._log_state_change("CLOSING")
+                 self._log_state_change(InterviewState.CLOSING)
                  return {"state": self.state}
-        print(f"Error: prep_next_q called in state {self.state}"); return None
-
-    def _is_inappropriate(self, text):
-        keywords = ["badword1", "offensive2"]; return any(k in text.lower() for k in keywords)
+        log.error("Error: prep_next_q called in state %s", self.state); return None
 
     def get_final_data(self):
         """Returns report data and ensures state is FINISHED."""
-        if self.state in ["CLOSING", "FINISHED"]: self._log_state_change("FINISHED"); return {"responses": self.user_responses}
-        print(f"Warn: get_final_data called in state {self.state}"); return None
+        if self.state in (InterviewState.CLOSING, InterviewState.FINISHED): self._log_state_change(InterviewState.FINISHED); return {"responses": self.user_responses}
+        log.warning("Warn: get_final_data called in state %s", self.state); return None
 
     def get_state(self): return self.state
     def set_state(self, new_state): self._log_state_change(new_state)
 
     def get_last_question_asked(self):
          """Gets text of question whose answer is being processed."""
-         if self.state == "PROCESSING_ANSWER" and 0 <= self.current_question_index < len(self.questions):
+         if self.state == InterviewState.PROCESSING_ANSWER and 0 <= self.current_question_index < len(self.questions):
               return self.questions[self.current_question_index]
          return "N/A"
\ No newline at end of file
@@ -0,0 +1,320 @@
+# interview_store.py (Server-side interview state: memory, SQLite or Redis backends)
+import abc
+import json
+import time
+import sqlite3
+import threading
+
+from interview_manager import InterviewManager
+from metrics import span
+
+
+class StaleStateError(Exception):
+    """Another request saved this interview since it was loaded; reload and retry."""
+
+
+class InterviewNotFound(KeyError):
+    pass
+
+
+class InterviewStore(abc.ABC):
+    """Keeps InterviewManager state on the server so the session cookie only carries the id.
+
+    State is split into a "meta" record (questions, state, question index) and an
+    append-only list of compact response records. save() persists manager.diff() against
+    the state seen by load(): changed scalar fields, appended responses and the responses
+    that changed (e.g. an evaluation filled in later); the question list is written once.
+    Every save is conditional on the version read by load(), so two workers serving the
+    same interview can't silently overwrite each other (StaleStateError).
+
+    load() sets ``store_version`` and ``_store_baseline`` (a manager.snapshot()) on the
+    returned manager; save() uses them to find what changed.
+
+    Evaluation notes computed in the background (evaluation_pipeline) are kept next to the
+    interview, outside the versioned record, so any worker can pick them up: add_evaluation()
+    doesn't bump the version and never conflicts with a request's save().
+    """
+
+    def __init__(self, ttl=24 * 3600):
+        self.ttl = ttl
+
+    # --- Diffing shared by all backends ---
+    @staticmethod
+    def _meta(manager):
+        data = manager.to_dict(); data.pop('responses', None)
+        return data
+
+    @staticmethod
+    def _attach(manager, version):
+        manager.store_version = version
+        manager._store_baseline = manager.snapshot()
+        return manager
+
+    @staticmethod
+    def _changes(manager):
+        """(scalar fields to set, appended records, {index: record}) since load()/create()."""
+        with span("state_encode"): patch = manager.diff(manager._store_baseline)
+        updated = {i: manager.responses[i].to_list() for i in patch.get("update", {})}
+        return patch.get("set", {}), patch.get("append", []), updated
+
+    def _build(self, meta, responses, version):
+        with span("state_decode"): manager = InterviewManager.from_dict(dict(meta, responses=responses)) # from_dict migrates v1 state
+        return self._attach(manager, version)
+
+    # --- Backend API ---
+    @abc.abstractmethod
+    def create(self, manager): ...
+    @abc.abstractmethod
+    def load(self, interview_id): ...
+    @abc.abstractmethod
+    def save(self, manager): ...
+    @abc.abstractmethod
+    def delete(self, interview_id): ...
+    @abc.abstractmethod
+    def add_evaluation(self, interview_id, index, note): ... # Ignored if the interview is gone
+    @abc.abstractmethod
+    def evaluations(self, interview_id): ... # {response index: note}
+    @abc.abstractmethod
+    def drop_evaluations(self, interview_id, indexes): ...
+
+    def stats(self): return {"backend": type(self).__name__, "ttl": self.ttl}
+
+
+class MemoryInterviewStore(InterviewStore):
+    """In-process dict; single worker process only (development, tests, benchmarks)."""
+
+    def __init__(self, ttl=24 * 3600):
+        super().__init__(ttl)
+        self._records = {} # interview_id -> {"meta", "responses", "version", "touched", "evaluations"}
+        self._lock = threading.Lock()
+
+    def _purge_locked(self):
+        cutoff = time.time() - self.ttl
+        for interview_id in [i for i, r in self._records.items() if r["touched"] < cutoff]: del self._records[interview_id]
+
+    def create(self, manager):
+        with self._lock:
+            self._purge_locked()
+            self._records[manager.interview_id] = {"meta": self._meta(manager), "responses": [r.to_list() for r in manager.responses],
+                                                   "version": 1, "touched": time.time(), "evaluations": {}}
+        self._attach(manager, 1)
+
+    def load(self, interview_id):
+        with self._lock:
+            record = self._records.get(interview_id)
+            if not record: raise InterviewNotFound(interview_id)
+            record["touched"] = time.time()
+            meta, responses, version = dict(record["meta"]), [list(r) for r in record["responses"]], record["version"]
+        return self._build(meta, responses, version)
+
+    def save(self, manager):
+        fields, appended, updated = self._changes(manager)
+        if not (fields or appended or updated): return
+        with self._lock:
+            record = self._records.get(manager.interview_id)
+            if not record: raise InterviewNotFound(manager.interview_id)
+            if record["version"] != manager.store_version: raise StaleStateError(manager.interview_id)
+            for i, response in updated.items(): record["responses"][i] = response
+            record["responses"].extend(appended)
+            record["meta"].update(fields); record["version"] += 1; record["touched"] = time.time()
+            version = record["version"]
+        self._attach(manager, version)
+
+    def delete(self, interview_id):
+        with self._lock: self._records.pop(interview_id, None)
+
+    def add_evaluation(self, interview_id, index, note):
+        with self._lock:
+            record = self._records.get(interview_id)
+            if record: record["evaluations"][index] = note
+
+    def evaluations(self, interview_id):
+        with self._lock:
+            record = self._records.get(interview_id)
+            return dict(record["evaluations"]) if record else {}
+
+    def drop_evaluations(self, interview_id, indexes):
+        with self._lock:
+            record = self._records.get(interview_id)
+            for index in (indexes if record else ()): record["evaluations"].pop(index, None)
+
+    def stats(self):
+        with self._lock: return dict(super().stats(), interviews=len(self._records))
+
+
+class SQLiteInterviewStore(InterviewStore):
+    """SQLite file shared by all worker processes on one host (WAL mode, one connection per thread).
+
+    Expired interviews are purged by create() and save(), at most once per purge_interval seconds.
+    """
+
+    def __init__(self, path, ttl=24 * 3600, purge_interval=60.0):
+        super().__init__(ttl)
+        self.path = path; self.purge_interval = purge_interval
+        self._local = threading.local()
+        self._next_purge = 0.0 # time.monotonic() of the next purge
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""CREATE TABLE IF NOT EXISTS interviews (
+                id TEXT PRIMARY KEY, meta TEXT NOT NULL, version INTEGER NOT NULL, updated REAL NOT NULL)""")
+            conn.execute("""CREATE TABLE IF NOT EXISTS responses (
+                interview_id TEXT NOT NULL, idx INTEGER NOT NULL, data TEXT NOT NULL, PRIMARY KEY (interview_id, idx))""")
+            conn.execute("""CREATE TABLE IF NOT EXISTS evaluations (
+                interview_id TEXT NOT NULL, idx INTEGER NOT NULL, note TEXT NOT NULL, PRIMARY KEY (interview_id, idx))""")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0); self._local.conn = conn
+        return conn
+
+    def create(self, manager):
+        now = time.time()
+        with self._connect() as conn:
+            self._purge_if_due(conn, now)
+            conn.execute("INSERT INTO interviews (id, meta, version, updated) VALUES (?, ?, 1, ?)",
+                         (manager.interview_id, json.dumps(self._meta(manager)), now))
+            conn.executemany("INSERT INTO responses (interview_id, idx, data) VALUES (?, ?, ?)",
+                             [(manager.interview_id, i, json.dumps(r.to_list())) for i, r in enumerate(manager.responses)])
+        self._attach(manager, 1)
+
+    def _purge_if_due(self, conn, now):
+        if time.monotonic() < self._next_purge: return
+        self._next_purge = time.monotonic() + self.purge_interval # Racing threads at worst purge twice
+        expired = [row[0] for row in conn.execute("SELECT id FROM interviews WHERE updated < ?", (now - self.ttl,))]
+        for interview_id in expired: self._delete(conn, interview_id)
+
+    def load(self, interview_id):
+        conn = self._connect()
+        row = conn.execute("SELECT meta, version FROM interviews WHERE id = ?", (interview_id,)).fetchone()
+        if not row: raise InterviewNotFound(interview_id)
+        responses = [json.loads(data) for (data,) in conn.execute("SELECT data FROM responses WHERE interview_id = ? ORDER BY idx", (interview_id,))]
+        return self._build(json.loads(row[0]), responses, row[1])
+
+    def save(self, manager):
+        fields, appended, updated = self._changes(manager)
+        if not (fields or appended or updated): return
+        base = len(manager._store_baseline[1])
+        # json_set rewrites only the changed fields inside meta (field names come from SCALAR_FIELDS)
+        meta_sql = "json_set(meta" + ", ?, json(?)" * len(fields) + ")" if fields else "meta"
+        meta_args = [arg for field, value in fields.items() for arg in (f"$.{field}", json.dumps(value))]
+        with self._connect() as conn: # One transaction: the version check and all writes commit together
+            self._purge_if_due(conn, time.time())
+            cursor = conn.execute(f"UPDATE interviews SET meta = {meta_sql}, version = version + 1, updated = ? WHERE id = ? AND version = ?",
+                                  (*meta_args, time.time(), manager.interview_id, manager.store_version))
+            if cursor.rowcount != 1:
+                exists = conn.execute("SELECT 1 FROM interviews WHERE id = ?", (manager.interview_id,)).fetchone()
+                raise StaleStateError(manager.interview_id) if exists else InterviewNotFound(manager.interview_id)
+            rows = [(manager.interview_id, i, json.dumps(r)) for i, r in updated.items()]
+            rows += [(manager.interview_id, base + i, json.dumps(r)) for i, r in enumerate(appended)]
+            if rows: conn.executemany("INSERT OR REPLACE INTO responses (interview_id, idx, data) VALUES (?, ?, ?)", rows)
+        self._attach(manager, manager.store_version + 1)
+
+    def _delete(self, conn, interview_id):
+        conn.execute("DELETE FROM responses WHERE interview_id = ?", (interview_id,))
+        conn.execute("DELETE FROM evaluations WHERE interview_id = ?", (interview_id,))
+        conn.execute("DELETE FROM interviews WHERE id = ?", (interview_id,))
+
+    def delete(self, interview_id):
+        with self._connect() as conn: self._delete(conn, interview_id)
+
+    def add_evaluation(self, interview_id, index, note):
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO evaluations (interview_id, idx, note) SELECT ?, ?, ? WHERE EXISTS (SELECT 1 FROM interviews WHERE id = ?)",
+                         (interview_id, index, note, interview_id))
+
+    def evaluations(self, interview_id):
+        return dict(self._connect().execute("SELECT idx, note FROM evaluations WHERE interview_id = ?", (interview_id,)))
+
+    def drop_evaluations(self, interview_id, indexes):
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM evaluations WHERE interview_id = ? AND idx = ?", [(interview_id, index) for index in indexes])
+
+    def stats(self):
+        count = self._connect().execute("SELECT COUNT(*) FROM interviews").fetchone()[0]
+        return dict(super().stats(), interviews=count, path=self.path)
+
+
+class RedisInterviewStore(InterviewStore):
+    """Redis (or any client with the redis-py API, e.g. fakeredis) shared by every worker and host.
+
+    Keys: ``<prefix><id>:meta`` is a hash holding the meta JSON (written once), the
+    version and one JSON-encoded field per changed scalar; ``<prefix><id>:responses`` is a
+    list; ``<prefix><id>:evaluations`` is a hash of background evaluation notes by response
+    index. Saves use WATCH/MULTI so a concurrent writer aborts the transaction.
+    """
+
+    def __init__(self, client, ttl=24 * 3600, prefix="interview:"):
+        super().__init__(ttl)
+        self.client = client; self.prefix = prefix
+
+    def _keys(self, interview_id): return f"{self.prefix}{interview_id}:meta", f"{self.prefix}{interview_id}:responses"
+    def _evaluations_key(self, interview_id): return f"{self.prefix}{interview_id}:evaluations"
+
+    def create(self, manager):
+        meta_key, responses_key = self._keys(manager.interview_id)
+        pipe = self.client.pipeline()
+        pipe.delete(responses_key)
+        pipe.hset(meta_key, mapping={"meta": json.dumps(self._meta(manager)), "version": 1})
+        if manager.responses: pipe.rpush(responses_key, *[json.dumps(r.to_list()) for r in manager.responses])
+        pipe.expire(meta_key, int(self.ttl)); pipe.expire(responses_key, int(self.ttl))
+        pipe.execute()
+        self._attach(manager, 1)
+
+    def load(self, interview_id):
+        meta_key, responses_key = self._keys(interview_id)
+        pipe = self.client.pipeline()
+        pipe.hmget(meta_key, "meta", "version", *InterviewManager.SCALAR_FIELDS); pipe.lrange(responses_key, 0, -1)
+        pipe.expire(meta_key, int(self.ttl)); pipe.expire(responses_key, int(self.ttl))
+        (meta, version, *scalars), responses, _, _ = pipe.execute()
+        if meta is None: raise InterviewNotFound(interview_id)
+        meta = json.loads(meta)
+        for field, value in zip(InterviewManager.SCALAR_FIELDS, scalars):
+            if value is not None: meta[field] = json.loads(value) # Newer than the copy inside meta
+        return self._build(meta, [json.loads(r) for r in responses], int(version))
+
+    def save(self, manager):
+        fields, appended, updated = self._changes(manager)
+        if not (fields or appended or updated): return
+        meta_key, responses_key = self._keys(manager.interview_id)
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(meta_key)
+                version = pipe.hget(meta_key, "version")
+                if version is None: raise InterviewNotFound(manager.interview_id)
+                if int(version) != manager.store_version: raise StaleStateError(manager.interview_id)
+                pipe.multi()
+                pipe.hset(meta_key, mapping={"version": manager.store_version + 1, **{f: json.dumps(v) for f, v in fields.items()}})
+                for i, response in updated.items(): pipe.lset(responses_key, i, json.dumps(response))
+                if appended: pipe.rpush(responses_key, *[json.dumps(r) for r in appended])
+                pipe.expire(meta_key, int(self.ttl)); pipe.expire(responses_key, int(self.ttl))
+                pipe.execute()
+            except Exception as e:
+                if type(e).__name__ == "WatchError": raise StaleStateError(manager.interview_id) from e
+                raise
+        self._attach(manager, manager.store_version + 1)
+
+    def delete(self, interview_id): self.client.delete(*self._keys(interview_id), self._evaluations_key(interview_id))
+
+    def add_evaluation(self, interview_id, index, note):
+        if not self.client.exists(self._keys(interview_id)[0]): return
+        pipe = self.client.pipeline()
+        pipe.hset(self._evaluations_key(interview_id), index, note); pipe.expire(self._evaluations_key(interview_id), int(self.ttl))
+        pipe.execute()
+
+    def evaluations(self, interview_id):
+        return {int(index): note.decode("utf-8") if isinstance(note, bytes) else note
+                for index, note in self.client.hgetall(self._evaluations_key(interview_id)).items()}
+
+    def drop_evaluations(self, interview_id, indexes):
+        if indexes: self.client.hdel(self._evaluations_key(interview_id), *indexes)
+
+
+def create_store(url, ttl=24 * 3600):
+    """Builds a store from a URL: ``memory://``, ``sqlite:///path/to/file.db`` or ``redis://host:port/db``."""
+    if url.startswith("memory://"): return MemoryInterviewStore(ttl)
+    if url.startswith("sqlite:///"): return SQLiteInterviewStore(url[len("sqlite:///"):], ttl)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        import redis # Optional dependency, only needed for this backend
+        return RedisInterviewStore(redis.Redis.from_url(url), ttl)
+    raise ValueError(f"Unsupported interview store URL: {url}")
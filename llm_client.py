@@ -0,0 +1,218 @@
+# llm_client.py (Shared LLM call layer: deadlines, retries, concurrency cap, circuit breaker)
+import time
+import random
+import asyncio
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from metrics import HistogramFamily, span
+
+log = logging.getLogger(__name__)
+
+# Exception class names (from google.api_core / grpc / requests) worth retrying; matched by name so
+# this module doesn't need the Google client libraries installed
+RETRYABLE_ERROR_NAMES = {
+    "ServiceUnavailable", "ResourceExhausted", "DeadlineExceeded", "InternalServerError", "TooManyRequests",
+    "GatewayTimeout", "BadGateway", "RetryError", "ConnectionError", "ConnectTimeout", "ReadTimeout",
+}
+
+
+class LLMUnavailableError(Exception):
+    """Raised when a call can't be made or didn't finish in time. Callers fall back to canned text."""
+
+
+class CircuitOpenError(LLMUnavailableError):
+    """The breaker is open after repeated failures; the call was not attempted."""
+
+
+class ConcurrencyLimitError(LLMUnavailableError):
+    """No concurrency slot freed up before the deadline. This process is saturated; the backend wasn't
+    asked, so it doesn't count against the breaker."""
+
+
+class CircuitBreaker:
+    """Opens after failure_threshold consecutive failures; after reset_timeout one trial call is let through."""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold; self.reset_timeout = reset_timeout
+        self._failures = 0; self._opened_at = None; self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None: return "closed"
+            return "half_open" if time.monotonic() - self._opened_at >= self.reset_timeout else "open"
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None: return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_in_flight: return False
+            self._trial_in_flight = True # Half-open: a single probe
+            return True
+
+    def record_success(self):
+        with self._lock: self._failures = 0; self._opened_at = None; self._trial_in_flight = False
+
+    def record_skipped(self):
+        """The allowed call never reached the backend: a half-open probe may be tried by the next caller."""
+        with self._lock: self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1; self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                if self._opened_at is None: log.warning("LLM Client: Circuit OPEN after %s consecutive failures.", self._failures)
+                self._opened_at = time.monotonic() # (Re)open; half-open probe failed or threshold reached
+
+
+class LLMClient:
+    """Runs model.generate_content calls on a bounded thread pool off the request path.
+
+    model_getter returns any object with a ``generate_content(prompt, **kwargs)`` method
+    (the Gemini GenerativeModel, or a local fake in tests and benchmarks). Each attempt
+    has its own timeout, the whole call has a deadline, transient errors are retried with
+    jittered exponential backoff, at most max_concurrency calls are in flight across the
+    process, and a circuit breaker fails fast while the backend is down.
+    agenerate_content is the coroutine version used by the ASGI entry point (asgi.py).
+    """
+
+    def __init__(self, model_getter, max_concurrency=8, timeout=20.0, deadline=45.0, max_retries=2,
+                 backoff_base=0.5, backoff_max=8.0, breaker=None):
+        self.model_getter = model_getter
+        self.timeout = timeout; self.deadline = deadline; self.max_retries = max_retries
+        self.backoff_base = backoff_base; self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.max_concurrency = max_concurrency
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._async_semaphore = None # asyncio.Semaphore for agenerate_content, created inside the event loop
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm")
+        self.latency = HistogramFamily(label_names=("prompt_type",)) # Successful call latency per prompt type
+        self._counters = {}; self._counter_lock = threading.Lock()
+
+    def _count(self, prompt_type, outcome):
+        with self._counter_lock:
+            per_type = self._counters.setdefault(prompt_type, {})
+            per_type[outcome] = per_type.get(outcome, 0) + 1
+
+    @staticmethod
+    def is_retryable(error):
+        return isinstance(error, (LLMUnavailableError, TimeoutError, ConnectionError)) or type(error).__name__ in RETRYABLE_ERROR_NAMES
+
+    def _run_attempt(self, model, prompt, kwargs, remaining, timeout):
+        """One attempt: waits for a concurrency slot, then for the result, within `remaining` seconds."""
+        started = time.monotonic()
+        if not self._semaphore.acquire(timeout=max(0.0, remaining)):
+            raise ConcurrencyLimitError("LLM concurrency limit reached; no slot before deadline")
+        try: future = self._executor.submit(model.generate_content, prompt, **kwargs)
+        except Exception: self._semaphore.release(); raise
+        future.add_done_callback(lambda _f: self._semaphore.release()) # Slot is held until the call really ends
+        attempt_timeout = min(timeout, remaining - (time.monotonic() - started))
+        try: return future.result(timeout=max(0.0, attempt_timeout))
+        except FutureTimeoutError: raise LLMUnavailableError(f"LLM call timed out after {attempt_timeout:.1f}s")
+
+    def _begin(self, prompt_type, timeout):
+        """(model, per-attempt timeout, deadline) for a new call; raises if there is no model or the circuit is open."""
+        timeout = timeout or self.timeout; deadline = self.deadline * timeout / self.timeout
+        model = self.model_getter()
+        if model is None: raise LLMUnavailableError("No LLM configured")
+        if not self.breaker.allow():
+            self._count(prompt_type, "circuit_open"); raise CircuitOpenError("LLM circuit open; using fallback")
+        return model, timeout, deadline
+
+    def _retry_delay(self, prompt_type, error, attempt, call_started, deadline):
+        """Backoff before the next attempt, or None if error should be raised (the failure is recorded)."""
+        if isinstance(error, ConcurrencyLimitError): # Waited out the deadline for a slot; says nothing about the backend
+            self.breaker.record_skipped(); self._count(prompt_type, "saturated")
+            return None
+        retryable = self.is_retryable(error)
+        backoff = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt))) # Full jitter
+        out_of_time = time.monotonic() - call_started + backoff >= deadline
+        if not retryable or attempt >= self.max_retries or out_of_time:
+            self.breaker.record_failure() if retryable else self.breaker.record_success() # Bad prompt isn't an outage
+            self._count(prompt_type, "timeout" if isinstance(error, LLMUnavailableError) else "error")
+            return None
+        self._count(prompt_type, "retry")
+        log.warning("LLM Client: '%s' attempt %s failed (%s: %s); retrying in %.2fs", prompt_type, attempt + 1, type(error).__name__, error, backoff)
+        return backoff
+
+    def _succeeded(self, prompt_type, attempt_started):
+        self.breaker.record_success()
+        self.latency.observe(prompt_type, time.monotonic() - attempt_started); self._count(prompt_type, "ok")
+
+    def generate_content(self, prompt_type, prompt, timeout=None, **kwargs):
+        """Calls the model's generate_content with retries. Raises LLMUnavailableError (or the model's own error).
+
+        timeout overrides the per-attempt timeout (e.g. for large batched prompts); the deadline scales with it.
+        The whole call, retries included, is timed as stage "llm_<prompt_type>".
+        """
+        with span(f"llm_{prompt_type}"): return self._generate(prompt_type, prompt, timeout, kwargs)
+
+    def _generate(self, prompt_type, prompt, timeout, kwargs):
+        model, timeout, deadline = self._begin(prompt_type, timeout)
+        call_started = time.monotonic(); attempt = 0
+        while True:
+            remaining = deadline - (time.monotonic() - call_started)
+            attempt_started = time.monotonic()
+            try:
+                response = self._run_attempt(model, prompt, kwargs, remaining, timeout)
+            except Exception as e:
+                backoff = self._retry_delay(prompt_type, e, attempt, call_started, deadline)
+                if backoff is None: raise
+                attempt += 1; time.sleep(backoff)
+                continue
+            self._succeeded(prompt_type, attempt_started)
+            return response
+
+    # --- Async (ASGI serving, see asgi.py) ---
+    async def _arun_attempt(self, model, prompt, kwargs, remaining, timeout):
+        """Like _run_attempt, without holding a thread: awaits generate_content_async when the model has it
+        (google-generativeai does), else runs generate_content on the pool. Async calls have their own
+        max_concurrency slots, created on first use in the serving event loop. As in _run_attempt a slot
+        is held until the call really ends: a pool call that timed out keeps its thread busy."""
+        started = time.monotonic(); loop = asyncio.get_running_loop()
+        if self._async_semaphore is None: self._async_semaphore = asyncio.Semaphore(self.max_concurrency)
+        semaphore = self._async_semaphore
+        try: await asyncio.wait_for(semaphore.acquire(), max(0.0, remaining))
+        except asyncio.TimeoutError: raise ConcurrencyLimitError("LLM concurrency limit reached; no slot before deadline")
+        try:
+            if hasattr(model, "generate_content_async"):
+                call = asyncio.ensure_future(model.generate_content_async(prompt, **kwargs)) # Cancelled on timeout
+                call.add_done_callback(lambda _f: semaphore.release())
+            else:
+                future = self._executor.submit(model.generate_content, prompt, **kwargs) # Runs on after a timeout
+                future.add_done_callback(lambda _f: self._release_from_thread(loop, semaphore))
+                call = asyncio.wrap_future(future)
+        except Exception: semaphore.release(); raise
+        attempt_timeout = min(timeout, remaining - (time.monotonic() - started))
+        try: return await asyncio.wait_for(call, max(0.0, attempt_timeout))
+        except asyncio.TimeoutError: raise LLMUnavailableError(f"LLM call timed out after {attempt_timeout:.1f}s")
+
+    @staticmethod
+    def _release_from_thread(loop, semaphore):
+        try: loop.call_soon_threadsafe(semaphore.release)
+        except RuntimeError: pass # Event loop closed; its semaphore went with it
+
+    async def agenerate_content(self, prompt_type, prompt, timeout=None, **kwargs):
+        """generate_content for coroutines: same timeouts, retries, breaker and metrics, awaited on the event loop."""
+        with span(f"llm_{prompt_type}"):
+            model, timeout, deadline = self._begin(prompt_type, timeout)
+            call_started = time.monotonic(); attempt = 0
+            while True:
+                remaining = deadline - (time.monotonic() - call_started)
+                attempt_started = time.monotonic()
+                try:
+                    response = await self._arun_attempt(model, prompt, kwargs, remaining, timeout)
+                except Exception as e:
+                    backoff = self._retry_delay(prompt_type, e, attempt, call_started, deadline)
+                    if backoff is None: raise
+                    attempt += 1; await asyncio.sleep(backoff)
+                    continue
+                self._succeeded(prompt_type, attempt_started)
+                return response
+
+    def stats(self):
+        with self._counter_lock: counters = {k: dict(v) for k, v in self._counters.items()}
+        return {"circuit": self.breaker.state, "calls": counters,
+                "latency": {prompt_type: h.summary() for prompt_type, h in self.latency.items()}}
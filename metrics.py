@@ -0,0 +1,175 @@
+# metrics.py (In-process latency histograms, stage spans, Prometheus export and a slow-request profiler)
+import os
+import sys
+import time
+import bisect
+import logging
+import threading
+import contextvars
+from collections import Counter, deque
+
+log = logging.getLogger(__name__)
+
+# Upper bounds in seconds; covers fast cache hits up to slow LLM/TTS calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Fixed-bucket histogram (Prometheus-style) with approximate quantiles."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1) # Last slot is +Inf
+        self._sum = 0.0; self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1; self._sum += value; self._count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile (None when empty)."""
+        with self._lock:
+            if not self._count: return None
+            target = q * self._count; running = 0
+            for bound, count in zip(self.buckets + (float('inf'),), self._counts):
+                running += count
+                if running >= target: return bound
+        return float('inf')
+
+    def snapshot(self):
+        """Cumulative bucket counts plus count/sum, ready for export."""
+        with self._lock:
+            cumulative = []; running = 0
+            for bound, count in zip(self.buckets + (float('inf'),), self._counts):
+                running += count; cumulative.append((bound, running))
+            return {"buckets": cumulative, "count": self._count, "sum": self._sum}
+
+    def summary(self):
+        snap = self.snapshot()
+        return {"count": snap["count"], "mean": round(snap["sum"] / snap["count"], 4) if snap["count"] else None,
+                "p50": self.quantile(0.5), "p95": self.quantile(0.95), "p99": self.quantile(0.99)}
+
+
+class HistogramFamily:
+    """One histogram per label value, e.g. latency per prompt type.
+
+    With several label_names, label values are tuples in the same order.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, label_names=("label",)):
+        self.buckets = buckets; self.label_names = tuple(label_names)
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def labels(self, label):
+        histogram = self._histograms.get(label)
+        if histogram is None:
+            with self._lock: histogram = self._histograms.setdefault(label, Histogram(self.buckets))
+        return histogram
+
+    def observe(self, label, value): self.labels(label).observe(value)
+
+    def items(self):
+        with self._lock: return list(self._histograms.items())
+
+
+# --- Stage spans ---
+# Interview state of the work running in this context (set per transition); spans are tagged with it.
+# Pool threads don't inherit it: submit with contextvars.copy_context().run to carry it over.
+current_state = contextvars.ContextVar("interview_state", default="none")
+STAGES = HistogramFamily(label_names=("stage", "state")) # Seconds per expensive stage (parse, LLM, TTS, store, PDF)
+
+
+class span:
+    """Times a block into STAGES: ``with span("tts_vocoder"): ...``. state defaults to current_state."""
+    __slots__ = ("stage", "state", "_start")
+
+    def __init__(self, stage, state=None):
+        self.stage = stage; self.state = state
+
+    def __enter__(self):
+        self._start = time.perf_counter(); return self
+
+    def __exit__(self, exc_type, exc, tb):
+        STAGES.observe((self.stage, str(self.state or current_state.get())), time.perf_counter() - self._start)
+        return False
+
+
+# --- Prometheus text export ---
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_prometheus(families):
+    """Text exposition format (0.0.4) for an iterable of (metric name, help text, HistogramFamily)."""
+    lines = []
+    for name, help_text, family in families:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for label, histogram in sorted(family.items(), key=lambda item: str(item[0])):
+            values = label if isinstance(label, tuple) else (label,)
+            labels = ",".join(f'{key}="{_escape(value)}"' for key, value in zip(family.label_names, values))
+            prefix = labels + "," if labels else ""
+            snap = histogram.snapshot()
+            for bound, count in snap["buckets"]:
+                lines.append(f'{name}_bucket{{{prefix}le="{"+Inf" if bound == float("inf") else bound}"}} {count}')
+            lines.append(f"{name}_sum{{{labels}}} {snap['sum']}"); lines.append(f"{name}_count{{{labels}}} {snap['count']}")
+    return "\n".join(lines) + "\n"
+
+
+# --- Sampling profiler for slow requests ---
+def _collapse(frame, max_depth=40):
+    """Root-first "file:function:line;..." stack, the collapsed format flame graph tools read."""
+    parts = []
+    while frame is not None and len(parts) < max_depth:
+        parts.append(f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}:{frame.f_lineno}"); frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+class SlowRequestProfiler:
+    """Samples the stack of any request still running after threshold seconds.
+
+    A request costs a dict insert and pop; only the sampler thread walks stacks, and only
+    for requests already past the threshold, so fast requests are never sampled. When a
+    sampled request ends, its most frequent stacks are logged and kept in ``profiles``.
+    """
+
+    def __init__(self, threshold=1.0, interval=0.01, keep=20):
+        self.threshold = threshold; self.interval = interval
+        self.profiles = deque(maxlen=keep)
+        self._active = {} # thread ident -> [label, start, Counter of stacks or None]
+        self._thread = None; self._lock = threading.Lock()
+
+    def start_request(self, label):
+        if self._thread is None: self._start_thread()
+        self._active[threading.get_ident()] = [label, time.perf_counter(), None]
+
+    def end_request(self):
+        entry = self._active.pop(threading.get_ident(), None)
+        if not entry or not entry[2]: return None
+        label, started, stacks = entry; seconds = time.perf_counter() - started
+        profile = {"request": label, "seconds": round(seconds, 3), "samples": sum(stacks.values()),
+                   "top": [{"stack": stack, "samples": count} for stack, count in stacks.most_common(5)]}
+        self.profiles.append(profile)
+        log.warning("Slow request %s took %.0fms (%d samples); hottest stack: %s", label, seconds * 1000, profile["samples"], profile["top"][0]["stack"])
+        return profile
+
+    def _start_thread(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._sample_loop, name="slow-request-profiler", daemon=True); self._thread.start()
+
+    def _sample_loop(self):
+        own = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            if not self._active: continue
+            now = time.perf_counter(); frames = None
+            for ident, entry in list(self._active.items()):
+                if ident == own or now - entry[1] < self.threshold: continue
+                if frames is None: frames = sys._current_frames() # One snapshot of all threads per tick
+                frame = frames.get(ident)
+                if frame is None: continue
+                if entry[2] is None: entry[2] = Counter()
+                entry[2][_collapse(frame)] += 1
@@ -0,0 +1,169 @@
+# moderation.py (Answer moderation: categorized term lists matched in one pass with Aho-Corasick)
+import os
+import re
+import threading
+import unicodedata
+import logging
+from collections import namedtuple
+
+log = logging.getLogger(__name__)
+
+MODERATION_TERMS_PATH = os.getenv("MODERATION_TERMS_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "moderation_terms.txt"))
+DEFAULT_CATEGORY = "inappropriate" # Terms listed before any [category] header (and the old flag value)
+MIN_TERM_CHARS = 3 # A term that normalize() shrinks below this ("c++" -> "c") would flag every such word
+
+# Leetspeak, mapped only in words that contain a letter ("a55", "sh!t"); numbers ("5 years", "$100") and
+# trailing punctuation ("great!") are left alone
+LEET_TABLE = str.maketrans({"0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t", "8": "b", "@": "a", "$": "s", "!": "i", "|": "i", "+": "t"})
+_WORD = re.compile(r"[a-z0-9@$!|+]+")
+_TOKEN = re.compile(r"[a-z0-9]+")
+_LETTER = re.compile(r"[a-z]")
+_SPACE = re.compile(r"\s+")
+
+ModerationMatch = namedtuple("ModerationMatch", "category term position") # position: index of the match's last word
+
+
+def normalize(text):
+    """Word tokens of text: lowercased, accents stripped, leetspeak mapped; everything else separates words."""
+    text = text.lower()
+    if not text.isascii(): text = "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+    tokens = []
+    for word in _WORD.findall(text):
+        if word.isalpha() or word.isdigit(): tokens.append(word) # Most words: nothing to map
+        elif _LETTER.search(word): tokens.extend(_TOKEN.findall(word.rstrip("!|+").translate(LEET_TABLE)))
+        else: tokens.extend(_TOKEN.findall(word))
+    return tokens
+
+
+class TermAutomaton:
+    """Aho-Corasick automaton over word tokens.
+
+    Terms are token tuples (phrases allowed); scan() reports every occurrence of every term in
+    a single pass, so the cost is linear in the text however many terms there are, and since
+    whole tokens are compared a term never matches inside a longer word.
+    """
+
+    def __init__(self):
+        self._goto = [{}]; self._fail = [0]; self._out = [()] # Per node; node 0 is the root
+        self._built = False
+
+    def add(self, tokens, value):
+        node = 0
+        for token in tokens:
+            next_node = self._goto[node].get(token)
+            if next_node is None:
+                next_node = self._goto[node][token] = len(self._goto)
+                self._goto.append({}); self._fail.append(0); self._out.append(())
+            node = next_node
+        self._out[node] += (value,); self._built = False
+
+    def build(self):
+        """Computes failure links breadth-first and merges each node's outputs with its fallback's."""
+        frontier = list(self._goto[0].values())
+        for node in frontier: self._fail[node] = 0
+        while frontier:
+            next_frontier = []
+            for node in frontier:
+                for token, child in self._goto[node].items():
+                    fallback = self._fail[node]
+                    while fallback and token not in self._goto[fallback]: fallback = self._fail[fallback]
+                    self._fail[child] = self._goto[fallback].get(token, 0)
+                    self._out[child] += self._out[self._fail[child]]
+                    next_frontier.append(child)
+            frontier = next_frontier
+        self._built = True
+
+    def scan(self, tokens):
+        """Yields (token index, value) for every term occurrence ending at that token."""
+        if not self._built: self.build()
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for index, token in enumerate(tokens):
+            while node and token not in goto[node]: node = fail[node]
+            node = goto[node].get(token, 0)
+            for value in out[node]: yield index, value
+
+    def __len__(self): return len(self._goto)
+
+
+def load_terms(path):
+    """(category, term) pairs from a term file: one term per line under [category] headers, '#' comments."""
+    category = DEFAULT_CATEGORY; terms = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if not line: continue
+            if line.startswith("[") and line.endswith("]"): category = line[1:-1].strip().lower() or DEFAULT_CATEGORY
+            else: terms.append((category, line))
+    return terms
+
+
+class TermModerator:
+    """Flags text containing listed terms and reports their categories.
+
+    Terms and text go through the same normalize(), so "B@dword" matches the term "badword";
+    multi-word terms match as phrases. Terms whose symbols normalize away to under
+    MIN_TERM_CHARS characters are skipped with a warning. Any object with categories(text)
+    and stats() can be installed instead with set_moderator().
+    """
+
+    def __init__(self, terms, source=None):
+        self.source = source; self._automaton = TermAutomaton()
+        self.term_count = 0; self.skipped_terms = []; self.category_names = set()
+        for category, term in terms:
+            tokens = normalize(term); length = len("".join(tokens))
+            if not tokens or (length < MIN_TERM_CHARS and length < len(_SPACE.sub("", term))):
+                log.warning("Moderation: Skipping term %r: it normalizes to %r, which would match unrelated words.", term, " ".join(tokens))
+                self.skipped_terms.append(term); continue
+            self._automaton.add(tuple(tokens), (category, term)); self.term_count += 1; self.category_names.add(category)
+        self._automaton.build()
+        self.metrics = {"scanned": 0, "flagged": 0}; self._lock = threading.Lock() # categories() runs on every request thread
+
+    @classmethod
+    def from_file(cls, path):
+        return cls(load_terms(path), source=path)
+
+    def matches(self, text):
+        return [ModerationMatch(category, term, index) for index, (category, term) in self._automaton.scan(normalize(text))]
+
+    def categories(self, text):
+        """Sorted categories of the terms found in text (empty if none)."""
+        found = sorted({category for _, (category, _) in self._automaton.scan(normalize(text))})
+        with self._lock:
+            self.metrics["scanned"] += 1
+            if found: self.metrics["flagged"] += 1
+        return found
+
+    def stats(self):
+        with self._lock: metrics = dict(self.metrics)
+        return dict(metrics, source=self.source, terms=self.term_count, skipped_terms=len(self.skipped_terms), categories=sorted(self.category_names), automaton_nodes=len(self._automaton))
+
+
+_moderator = None
+_moderator_lock = threading.Lock()
+
+
+def get_moderator():
+    """The process-wide moderator, loaded from MODERATION_TERMS_PATH on first use."""
+    global _moderator
+    if _moderator is None:
+        with _moderator_lock:
+            if _moderator is None:
+                try: _moderator = TermModerator.from_file(MODERATION_TERMS_PATH)
+                except OSError as e:
+                    log.warning("Moderation: Could not read %s (%s); answers will not be flagged.", MODERATION_TERMS_PATH, e)
+                    _moderator = TermModerator([])
+                log.info("Moderation: Loaded %s terms in %s categories.", _moderator.term_count, len(_moderator.category_names))
+    return _moderator
+
+
+def set_moderator(moderator):
+    """Replaces the process-wide moderator (e.g. a different term list or an external service client)."""
+    global _moderator
+    with _moderator_lock: _moderator = moderator
+
+
+def flag_for(text):
+    """Report flag for an answer: its matched categories joined by ", ", or None."""
+    if not text: return None
+    return ", ".join(get_moderator().categories(text)) or None
@@ -0,0 +1,232 @@
+# phrase_library.py (Shared phrase library: text fingerprints, near-duplicate reuse and a fleet-wide TTS usage log)
+#
+# Usage: python phrase_library.py [--path phrase_library.db] [--top 20]   (prints the fleet report)
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+import unicodedata
+import logging
+from collections import OrderedDict
+
+log = logging.getLogger(__name__)
+
+# Expanded before fingerprinting so "What's" and "What is" are one phrase
+CONTRACTIONS = {"what's": "what is", "that's": "that is", "it's": "it is", "let's": "let us", "there's": "there is", "how's": "how is",
+                "you're": "you are", "you've": "you have", "you'd": "you would", "we're": "we are", "they're": "they are", "i'm": "i am",
+                "i've": "i have", "don't": "do not", "didn't": "did not", "doesn't": "does not", "can't": "cannot", "won't": "will not",
+                "isn't": "is not", "wasn't": "was not"}
+# Words that don't change what a line says; near-duplicates may differ only in these
+FILLER_WORDS = frozenset("a an the please so now okay ok alright well just really briefly quickly also then".split())
+_WORD = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+SHINGLE_SIZE = 2
+
+
+def tokens(text):
+    """Words of a line as spoken: lowercased, accents stripped, contractions expanded."""
+    text = (text or "").lower().replace("’", "'")
+    if not text.isascii(): text = "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+    words = []
+    for word in _WORD.findall(text): words.extend(CONTRACTIONS.get(word, word).split())
+    return words
+
+
+def fingerprint(words):
+    """Identity of a line: lines differing only in case, punctuation, spacing or contractions share it."""
+    return hashlib.sha1(" ".join(words).encode("utf-8")).hexdigest()[:20]
+
+
+def shingles(words, size=SHINGLE_SIZE):
+    """Overlapping word n-grams, with start/end markers so short lines still compare by word order."""
+    padded = ["^"] + list(words) + ["$"]
+    return {tuple(padded[i:i + size]) for i in range(max(1, len(padded) - size + 1))}
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+class PhraseLibrary:
+    """Maps the lines the interviewer speaks to one representative wording, and logs their use.
+
+    resolve(text) returns the wording whose audio should be played: the first-seen text with
+    the same fingerprint, or a near-duplicate that has the same content words (everything but
+    FILLER_WORDS) in nearly the same order (word-shingle Jaccard >= near_dup_threshold), so the
+    audio says what the transcript shows, give or take a filler word. Audio itself stays in the TTS cache, keyed by
+    the representative text, so every interview and worker shares it.
+
+    record() counts uses, reuses (cache hits), renders and synthesis seconds per phrase; the
+    counts are flushed every flush_seconds into a SQLite table shared by all worker processes
+    (WAL mode, one connection per thread). report() turns the table into the fleet-wide share
+    of TTS seconds saved, and top() gives the most used phrases for pre-rendering at startup.
+    """
+
+    def __init__(self, path, near_dup_threshold=0.8, max_phrases=20000, flush_seconds=30.0):
+        self.path = path; self.near_dup_threshold = near_dup_threshold; self.max_phrases = max_phrases; self.flush_seconds = flush_seconds
+        self._local = threading.local(); self._lock = threading.Lock()
+        self._phrases = OrderedDict() # fingerprint -> {"text", "content", "bucket", "audio_seconds"}; least recently used first
+        self._buckets = {} # sorted content words -> fingerprints sharing them (near-duplicate candidates)
+        self._aliases = {} # fingerprint of a near-duplicate -> fingerprint of its representative
+        self._pending = {} # fingerprint -> counts not yet flushed
+        self._loaded = False; self._last_flush = time.monotonic()
+        self._report = None; self._report_time = 0.0
+        self.metrics = {"resolved": 0, "near_duplicates": 0, "new_phrases": 0, "uses": 0, "reuses": 0, "renders": 0, "flushes": 0, "flush_errors": 0}
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""CREATE TABLE IF NOT EXISTS phrases (
+                fingerprint TEXT PRIMARY KEY, text TEXT NOT NULL, audio_seconds REAL, uses INTEGER NOT NULL DEFAULT 0,
+                reuses INTEGER NOT NULL DEFAULT 0, renders INTEGER NOT NULL DEFAULT 0, synth_seconds REAL NOT NULL DEFAULT 0,
+                last_used REAL NOT NULL)""")
+            conn.execute("CREATE INDEX IF NOT EXISTS phrases_uses ON phrases (uses)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0); self._local.conn = conn
+        return conn
+
+    def _ensure_loaded(self):
+        """Loads the most used phrases of the whole fleet on first use, so representatives agree across workers."""
+        if self._loaded: return
+        try:
+            with self._connect() as conn:
+                rows = conn.execute("SELECT fingerprint, text, audio_seconds FROM phrases ORDER BY uses DESC LIMIT ?", (self.max_phrases,)).fetchall()
+        except sqlite3.Error as e: log.warning("Phrase Library: Could not load %s: %s", self.path, e); rows = []
+        with self._lock:
+            if self._loaded: return
+            for fp, text, audio_seconds in reversed(rows): self._add_locked(fp, text, tokens(text), audio_seconds) # Most used end up most recent
+            self._loaded = True
+        if rows: log.info("Phrase Library: Loaded %s phrases.", len(rows))
+
+    def _add_locked(self, fp, text, words, audio_seconds=None):
+        content = [w for w in words if w not in FILLER_WORDS]; bucket = " ".join(sorted(set(content)))
+        self._phrases[fp] = {"text": text, "content": content, "bucket": bucket, "audio_seconds": audio_seconds}
+        self._buckets.setdefault(bucket, []).append(fp)
+        while len(self._phrases) > self.max_phrases:
+            old_fp, old = self._phrases.popitem(last=False)
+            siblings = self._buckets[old["bucket"]]; siblings.remove(old_fp)
+            if not siblings: del self._buckets[old["bucket"]]
+        if len(self._aliases) > self.max_phrases: self._aliases.clear() # Rebuilt on demand
+        return self._phrases[fp]
+
+    def _entry_locked(self, text, words):
+        """(fingerprint, entry) of the representative for text, adding text as a new phrase if it has none."""
+        fp = fingerprint(words); rep = self._aliases.get(fp, fp); entry = self._phrases.get(rep)
+        if entry: self._phrases.move_to_end(rep); return rep, entry
+        content = [w for w in words if w not in FILLER_WORDS]; query = shingles(content); best, best_score = None, 0.0
+        for candidate in self._buckets.get(" ".join(sorted(set(content))), ()):
+            score = jaccard(query, shingles(self._phrases[candidate]["content"]))
+            if score > best_score: best, best_score = candidate, score
+        if best and best_score >= self.near_dup_threshold:
+            self._aliases[fp] = best; self.metrics["near_duplicates"] += 1; self._phrases.move_to_end(best)
+            return best, self._phrases[best]
+        self.metrics["new_phrases"] += 1
+        return fp, self._add_locked(fp, text, words)
+
+    def resolve(self, text):
+        """The wording to synthesize/look up for text (text itself unless an equivalent line is known)."""
+        words = tokens(text)
+        if not words: return text
+        self._ensure_loaded()
+        with self._lock: self.metrics["resolved"] += 1; return self._entry_locked(text, words)[1]["text"]
+
+    def duration(self, text):
+        """Known clip length in seconds for text's phrase, or None."""
+        words = tokens(text)
+        if not words: return None
+        self._ensure_loaded()
+        with self._lock: return self._entry_locked(text, words)[1]["audio_seconds"]
+
+    def record(self, text, reused, audio_seconds=None, synth_seconds=0.0):
+        """Logs one use of text: reused=True for audio served from the cache, False for a fresh render."""
+        words = tokens(text)
+        if not words: return
+        self._ensure_loaded()
+        with self._lock:
+            fp, entry = self._entry_locked(text, words)
+            if audio_seconds: entry["audio_seconds"] = audio_seconds
+            counts = self._pending.setdefault(fp, {"uses": 0, "reuses": 0, "renders": 0, "synth_seconds": 0.0})
+            counts["uses"] += 1; self.metrics["uses"] += 1
+            if reused: counts["reuses"] += 1; self.metrics["reuses"] += 1
+            else: counts["renders"] += 1; counts["synth_seconds"] += synth_seconds; self.metrics["renders"] += 1
+            due = time.monotonic() - self._last_flush >= self.flush_seconds
+        if due: self.flush()
+
+    def flush(self):
+        """Adds the pending counts to the shared table."""
+        with self._lock:
+            pending, self._pending = self._pending, {}; self._last_flush = time.monotonic(); now = time.time()
+            rows = [(fp, entry["text"], entry["audio_seconds"], c["uses"], c["reuses"], c["renders"], c["synth_seconds"], now)
+                    for fp, c in pending.items() for entry in [self._phrases.get(fp)] if entry]
+        if not rows: return
+        try:
+            with self._connect() as conn:
+                conn.executemany("""INSERT INTO phrases (fingerprint, text, audio_seconds, uses, reuses, renders, synth_seconds, last_used)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(fingerprint) DO UPDATE SET
+                    audio_seconds = COALESCE(excluded.audio_seconds, audio_seconds), uses = uses + excluded.uses, reuses = reuses + excluded.reuses,
+                    renders = renders + excluded.renders, synth_seconds = synth_seconds + excluded.synth_seconds, last_used = excluded.last_used""", rows)
+            self.metrics["flushes"] += 1
+        except sqlite3.Error as e:
+            log.warning("Phrase Library: Could not write usage log: %s", e); self.metrics["flush_errors"] += 1
+            with self._lock: # Keep the counts for the next flush
+                for fp, _, _, uses, reuses, renders, synth_seconds, _ in rows:
+                    counts = self._pending.setdefault(fp, {"uses": 0, "reuses": 0, "renders": 0, "synth_seconds": 0.0})
+                    counts["uses"] += uses; counts["reuses"] += reuses; counts["renders"] += renders; counts["synth_seconds"] += synth_seconds
+
+    def top(self, count, min_uses=2):
+        """Texts of the most used phrases across the fleet, most used first."""
+        self.flush()
+        try:
+            with self._connect() as conn:
+                return [row[0] for row in conn.execute("SELECT text FROM phrases WHERE uses >= ? ORDER BY uses DESC LIMIT ?", (min_uses, count))]
+        except sqlite3.Error as e: log.warning("Phrase Library: Could not read usage log: %s", e); return []
+
+    def report(self, max_age=60.0):
+        """Fleet-wide TTS savings from the usage log (cached for max_age seconds).
+
+        Synthesis time saved by a reuse is the phrase's average measured render time; phrases only
+        ever rendered before the log existed are estimated from their clip length and the fleet's
+        overall synthesis seconds per audio second.
+        """
+        if self._report and time.monotonic() - self._report_time < max_age: return self._report
+        self.flush()
+        try:
+            with self._connect() as conn:
+                row = conn.execute("""SELECT COUNT(*), COALESCE(SUM(uses), 0), COALESCE(SUM(reuses), 0), COALESCE(SUM(renders), 0),
+                    COALESCE(SUM(synth_seconds), 0), COALESCE(SUM(renders * audio_seconds), 0), COALESCE(SUM(uses * audio_seconds), 0),
+                    COALESCE(SUM(reuses * audio_seconds), 0), COALESCE(SUM(CASE WHEN renders > 0 THEN reuses * synth_seconds / renders END), 0),
+                    COALESCE(SUM(CASE WHEN renders = 0 THEN reuses * audio_seconds END), 0) FROM phrases""").fetchone()
+        except sqlite3.Error as e: log.warning("Phrase Library: Could not read usage log: %s", e); return None
+        phrases, uses, reuses, renders, spent, rendered_audio, served_audio, reused_audio, saved_measured, reused_unmeasured = row
+        seconds_per_audio_second = spent / rendered_audio if rendered_audio else 0.0
+        saved = saved_measured + reused_unmeasured * seconds_per_audio_second
+        self._report = {"phrases": phrases, "uses": uses, "reuses": reuses, "renders": renders,
+                        "audio_seconds_served": round(served_audio, 1), "audio_seconds_reused": round(reused_audio, 1),
+                        "tts_seconds_spent": round(spent, 1), "tts_seconds_saved": round(saved, 1),
+                        "tts_seconds_saved_fraction": round(saved / (saved + spent), 4) if saved + spent else 0.0}
+        self._report_time = time.monotonic()
+        return self._report
+
+    def stats(self):
+        with self._lock: return dict(self.metrics, path=self.path, phrases_in_memory=len(self._phrases), pending=len(self._pending))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fleet-wide TTS reuse report from the phrase usage log")
+    parser.add_argument("--path", default=os.getenv("PHRASE_LIBRARY_PATH", "phrase_library.db"))
+    parser.add_argument("--top", type=int, default=20, help="also list this many most used phrases")
+    args = parser.parse_args()
+    if not os.path.exists(args.path): parser.error(f"no usage log at {args.path}")
+    library = PhraseLibrary(args.path)
+    for key, value in library.report().items(): print(f"{key:<28}{value}")
+    with library._connect() as conn:
+        rows = conn.execute("SELECT uses, reuses, audio_seconds, text FROM phrases ORDER BY uses DESC LIMIT ?", (args.top,)).fetchall()
+    if rows: print(f"\n{'uses':>7}{'reuses':>8}{'secs':>7}  text")
+    for uses, reuses, audio_seconds, text in rows: print(f"{uses:>7}{reuses:>8}{audio_seconds or 0:>7.1f}  {text[:90]}")
+
+
+if __name__ == '__main__':
+    main()
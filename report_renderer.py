@@ -0,0 +1,168 @@
+# report_renderer.py (Background PDF report rendering with an on-disk cache)
+import os
+import re
+import json
+import glob
+import time
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from resume_cache import content_key
+
+log = logging.getLogger(__name__)
+
+_SAFE_ID = re.compile(r'^[A-Za-z0-9_-]+$')
+
+
+def report_key(report_data, version):
+    """Content hash of the report data plus the template version; used as file name suffix and ETag."""
+    return content_key(json.dumps(report_data, sort_keys=True, default=str).encode('utf-8'), version)[:32]
+
+
+class ReportJob:
+    """One report build: prepare (data) -> render (PDF). Status moves pending -> preparing -> rendering -> ready."""
+    __slots__ = ("interview_id", "status", "key", "data", "error", "submitted", "finished", "data_ready", "done")
+
+    def __init__(self, interview_id):
+        self.interview_id = interview_id; self.status = "pending"
+        self.key = None; self.data = None; self.error = None
+        self.submitted = time.time(); self.finished = None
+        self.data_ready = threading.Event(); self.done = threading.Event()
+
+
+class ReportRenderer:
+    """Builds each finished interview's report once, off the request path.
+
+    prepare(interview_id) returns the report data (filling in any missing evaluations);
+    render(report_data) returns PDF bytes, or render is None when PDF output is
+    unavailable. PDFs are written to ``<output_dir>/<interview_id>-<key>.pdf``, where key
+    is a hash of the report data, so a repeated download is a file read and the key
+    doubles as the ETag. Jobs live in this process; other workers find the finished file
+    on disk (status() and path_for() only need the shared directory).
+    """
+
+    def __init__(self, prepare, render, output_dir, max_workers=1, ttl=24 * 3600, version="1", purge_interval=60.0):
+        self.prepare = prepare; self.render = render
+        self.output_dir = output_dir; self.ttl = ttl; self.version = version; self.purge_interval = purge_interval
+        os.makedirs(output_dir, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="report")
+        self._jobs = {} # interview_id -> ReportJob
+        self._lock = threading.Lock()
+        self._next_purge = 0.0 # time.monotonic() of the next purge; submit() would otherwise scan the directory every time
+        self.metrics = {"submitted": 0, "rendered": 0, "cache_hits": 0, "failed": 0, "render_seconds": 0.0}
+
+    def _check_id(self, interview_id):
+        if not interview_id or not _SAFE_ID.match(interview_id): raise ValueError(f"Invalid interview id: {interview_id!r}")
+        return interview_id
+
+    def path_for(self, interview_id, key):
+        return os.path.join(self.output_dir, f"{self._check_id(interview_id)}-{key}.pdf")
+
+    def _cached_files(self, interview_id):
+        return glob.glob(os.path.join(self.output_dir, f"{self._check_id(interview_id)}-*.pdf"))
+
+    def _cached_pdf(self, interview_id):
+        """(key, path) of the newest PDF on disk for the interview, or None."""
+        files = self._cached_files(interview_id)
+        if not files: return None
+        path = max(files, key=os.path.getmtime)
+        return os.path.basename(path)[len(interview_id) + 1:-len(".pdf")], path
+
+    # --- Jobs ---
+    def submit(self, interview_id):
+        """Starts building the report unless a build is already running or done, here or (judging
+        by the PDF on disk) in another worker process or before a restart. Returns the job."""
+        self._check_id(interview_id)
+        with self._lock:
+            job = self._jobs.get(interview_id)
+            if job and job.status != "failed": return job
+            self._purge_locked()
+            cached = self._cached_pdf(interview_id) if self.render is not None else None
+            job = self._jobs[interview_id] = ReportJob(interview_id)
+            if cached: # Already rendered: the job is done, its data is prepared on demand by report_data()
+                job.key = cached[0]; job.status = "ready"; job.finished = time.time(); job.done.set()
+                self.metrics["cache_hits"] += 1
+                return job
+            self.metrics["submitted"] += 1
+        self._executor.submit(self._run, job)
+        return job
+
+    def _run(self, job):
+        try:
+            job.status = "preparing"
+            job.data = self.prepare(job.interview_id); job.key = report_key(job.data, self.version)
+            job.data_ready.set()
+            path = self.path_for(job.interview_id, job.key)
+            if self.render is None: job.status = "unavailable"; return
+            if os.path.exists(path):
+                with self._lock: self.metrics["cache_hits"] += 1
+                job.status = "ready"; return
+            job.status = "rendering"; start_time = time.perf_counter()
+            pdf_bytes = self.render(job.data)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f: f.write(pdf_bytes)
+            os.replace(tmp_path, path) # Readers never see a partial file
+            for stale in self._cached_files(job.interview_id):
+                if stale != path: self._remove(stale) # Superseded by new report data
+            with self._lock: self.metrics["rendered"] += 1; self.metrics["render_seconds"] += time.perf_counter() - start_time
+            job.status = "ready"
+            log.info("Report Renderer: Rendered report for %s (%s KB).", job.interview_id, len(pdf_bytes) // 1024)
+        except Exception as e:
+            log.error("Report Renderer: Error building report for %s: %s", job.interview_id, e)
+            job.error = str(e); job.status = "failed"
+            with self._lock: self.metrics["failed"] += 1
+        finally:
+            job.finished = time.time(); job.data_ready.set(); job.done.set()
+
+    def report_data(self, interview_id, timeout=30.0):
+        """The prepared report data (submitting the job if needed), or None if it failed or timed out."""
+        job = self.submit(interview_id)
+        if job.data is None and job.done.is_set() and job.status == "ready": # PDF found on disk; no data built in this process
+            try: job.data = self.prepare(interview_id)
+            except Exception as e: log.error("Report Renderer: Error preparing report data for %s: %s", interview_id, e)
+            job.data_ready.set()
+        job.data_ready.wait(timeout)
+        return job.data
+
+    def wait(self, interview_id, timeout=30.0):
+        """Submits if needed and blocks up to timeout for the PDF. Returns status()."""
+        self.submit(interview_id).done.wait(timeout)
+        return self.status(interview_id)
+
+    def status(self, interview_id):
+        """{"status": missing|pending|preparing|rendering|ready|failed|unavailable, "key", "path", "error"}."""
+        with self._lock: job = self._jobs.get(self._check_id(interview_id))
+        if job:
+            path = self.path_for(interview_id, job.key) if job.status == "ready" else None
+            return {"status": job.status, "key": job.key if path else None, "path": path, "error": job.error}
+        cached = self._cached_pdf(interview_id) # Rendered by another worker process
+        if cached: return {"status": "ready", "key": cached[0], "path": cached[1], "error": None}
+        return {"status": "missing", "key": None, "path": None, "error": None}
+
+    # --- Cleanup ---
+    def _remove(self, path):
+        try: os.remove(path)
+        except OSError: pass
+
+    def discard(self, interview_id):
+        """Forgets an interview's job and deletes its PDFs."""
+        with self._lock: self._jobs.pop(interview_id, None)
+        for path in self._cached_files(interview_id): self._remove(path)
+
+    def _purge_locked(self):
+        """Drops finished jobs and PDFs older than ttl, at most once per purge_interval seconds."""
+        if time.monotonic() < self._next_purge: return
+        self._next_purge = time.monotonic() + self.purge_interval
+        cutoff = time.time() - self.ttl
+        for interview_id in [i for i, job in self._jobs.items() if job.finished and job.finished < cutoff]: del self._jobs[interview_id]
+        for path in glob.glob(os.path.join(self.output_dir, "*.pdf")):
+            try:
+                if os.path.getmtime(path) < cutoff: os.remove(path)
+            except OSError: pass
+
+    def stats(self):
+        with self._lock:
+            in_progress = sum(1 for job in self._jobs.values() if not job.done.is_set())
+            return dict(self.metrics, render_seconds=round(self.metrics["render_seconds"], 3), jobs=len(self._jobs), in_progress=in_progress,
+                        available=self.render is not None)
@@ -0,0 +1,109 @@
+# resume_cache.py (SQLite cache for extracted resume text and generated question sets)
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import logging
+
+log = logging.getLogger(__name__)
+
+LEVEL_TEXT = "text"           # sha256(uploaded bytes) -> normalized extracted text
+LEVEL_QUESTIONS = "questions" # sha256(prompt version + text) -> JSON list of questions
+
+
+def content_key(data, *extra):
+    """Hash of raw bytes plus anything else that changes the result (file type, extractor version)."""
+    digest = hashlib.sha256()
+    for part in extra: digest.update(str(part).encode('utf-8') + b'\x00')
+    digest.update(data)
+    return digest.hexdigest()
+
+
+def text_key(text, prompt_version):
+    return hashlib.sha256(f"{prompt_version}\x00{text}".encode('utf-8')).hexdigest()
+
+
+class ResumeCache:
+    """Two-level cache so a re-uploaded resume skips both extraction and question generation.
+
+    Entries expire ttl seconds after being written. When the stored values exceed
+    max_bytes, the least recently used entries are evicted. The database is shared
+    safely by threads and by worker processes (WAL mode, one connection per thread).
+    """
+
+    def __init__(self, path, ttl=7 * 24 * 3600, max_bytes=64 * 1024 * 1024):
+        self.path = path; self.ttl = ttl; self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._counts = {level: {"hits": 0, "misses": 0} for level in (LEVEL_TEXT, LEVEL_QUESTIONS)}
+        self.evictions = 0
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""CREATE TABLE IF NOT EXISTS entries (
+                level TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, size INTEGER NOT NULL,
+                created REAL NOT NULL, accessed REAL NOT NULL, PRIMARY KEY (level, key))""")
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0); self._local.conn = conn
+        return conn
+
+    def _get(self, level, key):
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                row = conn.execute("SELECT value, created FROM entries WHERE level = ? AND key = ?", (level, key)).fetchone()
+                if row and now - row[1] > self.ttl:
+                    conn.execute("DELETE FROM entries WHERE level = ? AND key = ?", (level, key)); row = None
+                if row: conn.execute("UPDATE entries SET accessed = ? WHERE level = ? AND key = ?", (now, level, key))
+        except sqlite3.Error as e: log.error("Resume Cache: Read error: %s", e); row = None
+        with self._lock: self._counts[level]["hits" if row else "misses"] += 1
+        return row[0] if row else None
+
+    def _put(self, level, key, value):
+        now = time.time(); size = len(value.encode('utf-8'))
+        try:
+            with self._connect() as conn:
+                conn.execute("INSERT OR REPLACE INTO entries (level, key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?, ?)",
+                             (level, key, value, size, now, now))
+                self._evict(conn, now)
+        except sqlite3.Error as e: log.error("Resume Cache: Write error: %s", e)
+
+    def _evict(self, conn, now):
+        """Drops expired entries, then least recently used ones until under max_bytes."""
+        conn.execute("DELETE FROM entries WHERE created < ?", (now - self.ttl,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes: return
+        evicted = 0
+        for level, key, size in conn.execute("SELECT level, key, size FROM entries ORDER BY accessed").fetchall():
+            if total <= self.max_bytes: break
+            conn.execute("DELETE FROM entries WHERE level = ? AND key = ?", (level, key)); total -= size; evicted += 1
+        with self._lock: self.evictions += evicted
+
+    # --- Level one: extracted text ---
+    def get_text(self, key): return self._get(LEVEL_TEXT, key)
+    def put_text(self, key, text): self._put(LEVEL_TEXT, key, text)
+
+    # --- Level two: question sets ---
+    def get_questions(self, key):
+        value = self._get(LEVEL_QUESTIONS, key)
+        return json.loads(value) if value else None
+
+    def put_questions(self, key, questions): self._put(LEVEL_QUESTIONS, key, json.dumps(questions))
+
+    def stats(self):
+        try:
+            with self._connect() as conn:
+                rows = conn.execute("SELECT level, COUNT(*), COALESCE(SUM(size), 0) FROM entries GROUP BY level").fetchall()
+        except sqlite3.Error: rows = []
+        stored = {level: {"entries": count, "bytes": size} for level, count, size in rows}
+        with self._lock:
+            result = {"max_bytes": self.max_bytes, "ttl": self.ttl, "evictions": self.evictions}
+            for level, counts in self._counts.items():
+                lookups = counts["hits"] + counts["misses"]
+                result[level] = dict(stored.get(level, {"entries": 0, "bytes": 0}), **counts,
+                                     hit_rate=round(counts["hits"] / lookups, 4) if lookups else 0.0)
+            return result
@@ -0,0 +1,120 @@
+# resume_extractor.py (Bounded resume text extraction in a worker process pool)
+import io
+import os
+import re
+import time
+import threading
+import multiprocessing
+import logging
+
+log = logging.getLogger(__name__)
+
+MAX_UPLOAD_BYTES = int(os.getenv("RESUME_MAX_MB", "5")) * 1024 * 1024
+MAX_PAGES = int(os.getenv("RESUME_MAX_PAGES", "20"))
+MAX_CHARS = int(os.getenv("RESUME_MAX_CHARS", "20000")) # Plenty for question generation; the rest is never parsed
+EXTRACT_TIMEOUT = float(os.getenv("RESUME_EXTRACT_TIMEOUT", "10"))
+EXTRACT_WORKERS = int(os.getenv("RESUME_EXTRACT_WORKERS", "2")) # 0 = extract in the calling thread (no hard timeout)
+
+
+class ExtractionTimeout(ValueError):
+    """The file took longer than the wall-clock limit; the worker was killed."""
+
+
+# --- Pure extraction (runs inside the worker processes) ---
+def _pdf_chunks(data, max_pages):
+    """Yields text page by page straight from the uploaded bytes."""
+    import PyPDF2
+    from PyPDF2 import errors as PyPDF2Errors
+    try: reader = PyPDF2.PdfReader(io.BytesIO(data), strict=False)
+    except PyPDF2Errors.PdfReadError as pe: raise ValueError(f"Could not read PDF structure: {pe}")
+    except PyPDF2Errors.PyPdfError as init_err: raise ValueError(f"PDF reader init error: {init_err}")
+    for i, page in enumerate(reader.pages):
+        if i >= max_pages: log.info("Resume Extractor: Page cap reached (%s pages).", max_pages); return
+        try: page_text = page.extract_text()
+        except Exception as page_exc: log.error("  - Error page %s: %s", i+1, page_exc); continue
+        if page_text: yield page_text
+
+
+def _docx_chunks(data):
+    import docx
+    try: document = docx.Document(io.BytesIO(data))
+    except Exception as e: raise ValueError(f"Could not read DOCX: {e}")
+    for paragraph in document.paragraphs:
+        if paragraph.text: yield paragraph.text
+
+
+def _collect(chunks, max_chars):
+    """Joins chunks once, stopping as soon as max_chars of text has been gathered."""
+    parts = []; total = 0
+    for chunk in chunks:
+        chunk = re.sub(r'\s+', ' ', chunk).strip() # Per chunk, so no whole-document regex pass
+        if not chunk: continue
+        parts.append(chunk); total += len(chunk) + 1
+        if total >= max_chars: break # Closing the generator skips the remaining pages
+    return ' '.join(parts)[:max_chars]
+
+
+def extract_text(data, file_type, max_pages=MAX_PAGES, max_chars=MAX_CHARS):
+    """Extracts normalized text from PDF/DOCX bytes. Raises ValueError for unreadable files."""
+    if file_type == 'pdf': chunks = _pdf_chunks(data, max_pages)
+    elif file_type == 'docx': chunks = _docx_chunks(data)
+    else: raise ValueError(f"Unsupported type: {file_type}")
+    try: return _collect(chunks, max_chars)
+    except ValueError: raise
+    except Exception as e: raise ValueError(f"{file_type.upper()} processing error: {e}") # Parser bugs on malformed files
+
+
+# --- Pool management (runs in the web process) ---
+class ResumeExtractor:
+    """Runs extract_text in a process pool with a hard wall-clock timeout.
+
+    A pathological file can't pin a web worker: on timeout the pool is terminated
+    (killing the stuck process) and recreated for the next upload.
+    """
+
+    def __init__(self, workers=EXTRACT_WORKERS, timeout=EXTRACT_TIMEOUT, max_pages=MAX_PAGES, max_chars=MAX_CHARS, max_bytes=MAX_UPLOAD_BYTES):
+        self.workers = workers; self.timeout = timeout
+        self.max_pages = max_pages; self.max_chars = max_chars; self.max_bytes = max_bytes
+        self._pool = None
+        self._lock = threading.Lock()
+        self.metrics = {"extractions": 0, "timeouts": 0, "errors": 0, "seconds": 0.0}
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                # spawn: forking a threaded web server can deadlock; workers are recycled to cap memory
+                self._pool = multiprocessing.get_context("spawn").Pool(self.workers, maxtasksperchild=50)
+            return self._pool
+
+    def _reset_pool(self, pool):
+        with self._lock:
+            if self._pool is pool: self._pool = None
+        pool.terminate()
+
+    def extract(self, data, file_type):
+        """Returns the extracted text. Raises ValueError (ExtractionTimeout on timeout)."""
+        if len(data) > self.max_bytes: raise ValueError(f"File too large ({len(data) // 1024} KB; limit {self.max_bytes // 1024} KB).")
+        if not data: raise ValueError("Uploaded file is empty.")
+        start_time = time.perf_counter()
+        try:
+            if self.workers <= 0: text = extract_text(data, file_type, self.max_pages, self.max_chars)
+            else:
+                pool = self._get_pool()
+                result = pool.apply_async(extract_text, (data, file_type, self.max_pages, self.max_chars))
+                try: text = result.get(timeout=self.timeout)
+                except multiprocessing.TimeoutError:
+                    self._reset_pool(pool); self.metrics["timeouts"] += 1
+                    raise ExtractionTimeout(f"Resume took longer than {self.timeout:.0f}s to read.")
+        except ExtractionTimeout: raise
+        except Exception: self.metrics["errors"] += 1; raise
+        finally: self.metrics["seconds"] += time.perf_counter() - start_time
+        self.metrics["extractions"] += 1
+        return text
+
+    def close(self):
+        with self._lock: pool, self._pool = self._pool, None
+        if pool: pool.terminate()
+
+    def stats(self):
+        return dict(self.metrics, seconds=round(self.metrics["seconds"], 3), workers=self.workers, timeout=self.timeout,
+                    max_pages=self.max_pages, max_chars=self.max_chars)
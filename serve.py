@@ -0,0 +1,37 @@
+# serve.py (Production launcher: the ASGI app under uvicorn with several worker processes)
+#
+# Usage: python serve.py [--host 0.0.0.0] [--port 5000] [--workers 4] [--drain-seconds 30]
+# Each worker is a separate process with its own copy of the app (models, caches, thread pools),
+# so interview state must live in a shared store (INTERVIEW_STORE sqlite:///, the default, or redis://).
+# On SIGTERM/SIGINT uvicorn stops accepting connections, waits up to --drain-seconds for open
+# requests, then runs the app's lifespan shutdown, which lets in-flight turns finish (asgi.py).
+# `python app.py` still starts the Flask development server.
+import os
+import argparse
+import logging
+
+log = logging.getLogger("serve")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the interview app over ASGI (uvicorn)")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "5000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "1")), help="worker processes")
+    parser.add_argument("--drain-seconds", type=float, default=float(os.getenv("ASGI_DRAIN_SECONDS", "30")),
+                        help="how long shutdown waits for in-flight requests")
+    parser.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "INFO"))
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    import uvicorn
+    if args.workers > 1 and os.getenv("INTERVIEW_STORE", "").startswith("memory://"):
+        log.warning("INTERVIEW_STORE is in-memory: each of the %s workers sees only its own interviews.", args.workers)
+    os.environ["ASGI_DRAIN_SECONDS"] = str(args.drain_seconds); os.environ["LOG_LEVEL"] = args.log_level # Read by each worker
+    log.info("Serving asgi:application on %s:%s with %s worker(s).", args.host, args.port, args.workers)
+    uvicorn.run("asgi:application", host=args.host, port=args.port, workers=args.workers, lifespan="on",
+                timeout_graceful_shutdown=args.drain_seconds, log_level=args.log_level.lower())
+
+
+if __name__ == '__main__':
+    main()
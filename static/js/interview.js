@@ -7,9 +7,13 @@ let startButton = null; let recordButton = null; let stopButton = null;
 let messagesDiv = null; let statusDiv = null; let audioPlayer = null;
 
 // --- State Variables ---
-let currentInterviewState = null; let recognition = null; let isRecording = false;
+let currentInterviewState = null; let awaitingInput = false; let recognition = null; let isRecording = false;
 let currentUtteranceTranscript = ''; let silenceTimer = null;
 const SILENCE_TIMEOUT = 3500; let currentMessageElement = null;
+// Turns stream over one POST per answer (/interview/turn); older browsers fall back to /interview/next_step
+const USE_EVENT_STREAM = !!(window.ReadableStream && window.TextDecoder && window.Response && 'body' in Response.prototype);
+let audioQueue = []; let audioPlaying = false; let onAudioQueueDrained = null; let turnTextShown = false;
+const AUTO_ADVANCE_STATES = ['GREETING_ACKNOWLEDGED', 'ACKNOWLEDGED_ANSWER']; // Server continues on an empty request
 
 // --- Web Speech API Setup ---
 const SpeechRecognition = window.SpeechRecognition || window.webkitSpeechRecognition;
@@ -59,8 +63,8 @@ function resetSilenceTimer() { clearTimeout(silenceTimer); silenceTimer = setTim
 // --- Control & State Update ---
 function disableAllControls() { if(startButton) startButton.disabled = true; if(recordButton) recordButton.disabled = true; if(stopButton) stopButton.disabled = true; }
 function enableRecordingIfNeeded() {
-    // Enable recording only if expecting greeting response OR question answer
-    const shouldBeEnabled = (currentInterviewState === 'AWAITING_GREETING_RESPONSE' || currentInterviewState === 'LISTENING');
+    // Enable recording only when the server says the current state expects candidate input
+    const shouldBeEnabled = awaitingInput;
     if(recordButton) recordButton.disabled = !shouldBeEnabled;
     console.log(`Record button ${recordButton?.disabled ? 'disabled' : 'enabled'} (State: ${currentInterviewState})`);
 }
@@ -69,6 +73,10 @@ function enableRecordingIfNeeded() {
 function startInterview() {
     console.log('startInterview called!'); if (!startButton || !statusDiv) return;
     disableAllControls(); statusDiv.textContent = 'Initializing...';
+    if (USE_EVENT_STREAM) {
+        streamTurn({}).catch(e => streamFailed(e));
+        return;
+    }
     fetch('/interview/start', { method: 'POST' })
         .then(r => { if (!r.ok) throw new Error(`HTTP ${r.status}`); return r.json(); })
         .then(data => { if (data.error) throw new Error(data.error); handleServerResponse(data); })
@@ -81,40 +89,123 @@ function stopRecognitionInternal() { clearTimeout(silenceTimer); if (recognition
 function sendAnswerToServer(answerText) {
     console.log(`Sending to server (State: ${currentInterviewState}): ${answerText.substring(0, 50)}...`);
     if(statusDiv) statusDiv.textContent = 'Processing...'; disableAllControls();
+    if (USE_EVENT_STREAM) {
+        streamTurn({ text: answerText }).catch(error => streamFailed(error));
+        return;
+    }
     fetch('/interview/next_step', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ text: answerText }) })
     .then(response => { if (!response.ok) throw new Error(`HTTP ${response.status}`); return response.json(); })
     .then(data => { console.log('Server response:', data); if (data.error) throw new Error(data.error); handleServerResponse(data); })
     .catch(error => { console.error('Send error:', error); if(statusDiv) statusDiv.textContent = `Error: ${error.message}. Try again?`; enableRecordingIfNeeded(); });
 }
 
+// --- Streamed Turns (server-sent events read from a fetch body) ---
+function streamTurn(body) {
+    // Resolves after the "done" event; rejects on HTTP errors, "error" events and streams that close before "done"
+    return fetch('/interview/turn', { method: 'POST', headers: { 'Content-Type': 'application/json', 'Accept': 'text/event-stream' }, body: JSON.stringify(body) })
+        .then(response => {
+            if (!response.ok || !response.body) throw new Error(`HTTP ${response.status}`);
+            const reader = response.body.getReader(); const decoder = new TextDecoder(); let buffer = ''; let finished = false;
+            const pump = () => reader.read().then(({ done, value }) => {
+                if (done) { if (!finished) throw new Error('Connection closed before the turn finished'); return; }
+                buffer += decoder.decode(value, { stream: true });
+                let boundary;
+                while ((boundary = buffer.indexOf('\n\n')) >= 0) {
+                    const event = parseStreamEvent(buffer.slice(0, boundary)); buffer = buffer.slice(boundary + 2);
+                    handleStreamEvent(event); if (event.name === 'done') finished = true;
+                }
+                return pump();
+            });
+            return pump().catch(e => { reader.cancel().catch(() => {}); throw e; });
+        });
+}
+function streamFailed(error, retriesLeft = 1) {
+    // No "done" will come, so nothing else re-enables the controls: do it from the last state the stream reported
+    console.error('Stream error:', error); if(statusDiv) statusDiv.textContent = `Error: ${error.message}. Try again?`;
+    whenAudioDone(() => {
+        if (awaitingInput) { enableRecordingIfNeeded(); return; } // Answer again (or for the first time, if a question arrived)
+        if (AUTO_ADVANCE_STATES.includes(currentInterviewState) && retriesLeft > 0) { // Answer was recorded; fetch the next line
+            if(statusDiv) statusDiv.textContent = 'Reconnecting...';
+            streamTurn({}).catch(e => streamFailed(e, retriesLeft - 1)); return;
+        }
+        if (currentInterviewState === 'FINISHED') { window.location.href = '/report'; return; }
+        if(startButton) startButton.disabled = false; // Start sends the same empty request, so it also resumes a started interview
+    });
+}
+function parseStreamEvent(block) {
+    let name = 'message'; let data = '';
+    for (const line of block.split('\n')) {
+        if (line.startsWith('event:')) name = line.slice(6).trim();
+        else if (line.startsWith('data:')) data += line.slice(5).trim();
+    } // Lines starting with ':' are keep-alives
+    return { name, data: data ? JSON.parse(data) : null };
+}
+function handleStreamEvent({ name, data }) {
+    if (!data) return;
+    console.log('Stream event:', name, data);
+    if (name === 'text') {
+        // The line arrives before its audio is synthesized: show it right away
+        appendMessage(data.transcript, 'interviewer'); turnTextShown = true;
+        if(statusDiv && !audioPlaying) statusDiv.textContent = 'Interviewer speaking...';
+    } else if (name === 'turn') {
+        currentInterviewState = data.state; awaitingInput = !!data.awaits_input;
+        if (data.transcript && !turnTextShown) appendMessage(data.transcript, 'interviewer');
+        turnTextShown = false;
+        const audioUrl = data.audio_url || data.stream_url;
+        if (audioUrl) enqueueAudio(audioUrl);
+    } else if (name === 'done') {
+        currentInterviewState = data.state; awaitingInput = !!data.awaits_input;
+        whenAudioDone(() => {
+            if (data.is_finished) { if(statusDiv) statusDiv.textContent = 'Redirecting...'; window.location.href = '/report'; return; }
+            if(statusDiv) statusDiv.textContent = 'Ready for your response.'; enableRecordingIfNeeded();
+        });
+    } else if (name === 'error') {
+        throw new Error(data.error || `HTTP ${data.status}`);
+    }
+}
+
+// --- Audio Queue (lines of one streamed turn play back to back) ---
+function enqueueAudio(url) { audioQueue.push(url); if (!audioPlaying) playNextInQueue(); }
+function playNextInQueue() {
+    const url = audioQueue.shift();
+    if (!url) { audioPlaying = false; const drained = onAudioQueueDrained; onAudioQueueDrained = null; if (drained) drained(); return; }
+    audioPlaying = true; if(statusDiv) statusDiv.textContent = 'Interviewer speaking...';
+    playAudio(url, playNextInQueue);
+}
+function whenAudioDone(callback) { if (!audioPlaying && audioQueue.length === 0) callback(); else onAudioQueueDrained = callback; }
+
 // --- Central Response Handler (SIMPLIFIED) ---
 function handleServerResponse(data) {
     currentInterviewState = data.state; // Update state FIRST
+    awaitingInput = data.awaits_input ?? (data.state === 'AWAITING_GREETING_RESPONSE' || data.state === 'LISTENING'); // Fallback for older servers
+    const audioUrl = data.audio_url || data.stream_url; // stream_url: chunked TTS, playback starts on first sentence
 
     if (data.transcript) { appendMessage(data.transcript, 'interviewer'); }
 
     if (data.is_finished) {
         if(statusDiv) statusDiv.textContent = 'Interview finished.'; disableAllControls();
-        if (data.audio_url) { playAudio(data.audio_url, () => { if(statusDiv) statusDiv.textContent = 'Redirecting...'; window.location.href = '/report'; }); }
+        if (audioUrl) { playAudio(audioUrl, () => { if(statusDiv) statusDiv.textContent = 'Redirecting...'; window.location.href = '/report'; }); }
         else { if(statusDiv) statusDiv.textContent = 'Redirecting...'; window.location.href = '/report'; }
 
     } else if (data.state === 'AWAITING_GREETING_RESPONSE' || data.state === 'LISTENING') {
         // Received greeting OR a question, expect user input next
         if(statusDiv) statusDiv.textContent = 'Interviewer speaking...'; disableAllControls(); // Keep disabled during audio
-        if (data.audio_url) { playAudio(data.audio_url, () => { if(statusDiv) statusDiv.textContent = 'Ready for your response.'; enableRecordingIfNeeded(); }); } // Enable recording AFTER audio
+        if (audioUrl) { playAudio(audioUrl, () => { if(statusDiv) statusDiv.textContent = 'Ready for your response.'; enableRecordingIfNeeded(); }); } // Enable recording AFTER audio
         else { if(statusDiv) statusDiv.textContent = 'Ready for response (no audio).'; enableRecordingIfNeeded(); } // Enable immediately
 
     } else if (data.state === 'GREETING_ACKNOWLEDGED' || data.state === 'ACKNOWLEDGED_ANSWER') {
         // Received an acknowledgement, trigger next step automatically
         if(statusDiv) statusDiv.textContent = 'Acknowledged... Getting next step...'; disableAllControls();
-        if (data.audio_url) { playAudio(data.audio_url, () => sendAnswerToServer("")); }
-        else { sendAnswerToServer(""); }
+        // Pipelined mode sends the next turn along with the ack (data.next), so no extra request is needed
+        const proceed = data.next ? () => handleServerResponse(data.next) : () => sendAnswerToServer("");
+        if (audioUrl) { playAudio(audioUrl, proceed); }
+        else { proceed(); }
 
     } else if (data.state === 'ASKING_QUESTION') {
          // This state might be momentarily passed through from backend but JS mainly reacts to LISTENING
          if(statusDiv) statusDiv.textContent = 'Interviewer asking...'; disableAllControls();
-         if (data.audio_url) { playAudio(data.audio_url, () => { if(statusDiv) statusDiv.textContent = 'Ready for your answer.'; currentInterviewState = 'LISTENING'; enableRecordingIfNeeded(); }); } // Set LISTENING after audio
-         else { if(statusDiv) statusDiv.textContent = 'Ready for answer (no audio).'; currentInterviewState = 'LISTENING'; enableRecordingIfNeeded(); }
+         if (audioUrl) { playAudio(audioUrl, () => { if(statusDiv) statusDiv.textContent = 'Ready for your answer.'; currentInterviewState = 'LISTENING'; awaitingInput = true; enableRecordingIfNeeded(); }); } // Set LISTENING after audio
+         else { if(statusDiv) statusDiv.textContent = 'Ready for answer (no audio).'; currentInterviewState = 'LISTENING'; awaitingInput = true; enableRecordingIfNeeded(); }
 
     } else {
          console.warn("Unexpected state in simple handler:", data.state); if(statusDiv) statusDiv.textContent = `Error: Unexpected state ${data.state}.`; disableAllControls();
@@ -141,7 +232,7 @@ function finalizeCurrentMessageVisual(text) { // Keep as is
 }
 function playAudio(url, callback) { // Keep as is
     if (!audioPlayer) { console.error("Audio player missing!"); if(callback) callback(); return; } if (!url) { console.warn("playAudio no URL."); if(callback) callback(); return; }
-    console.log(`Playing audio: ${url}`); audioPlayer.src = url;
+    console.log(`Playing audio: ${url}`); audioPlayer.preload = 'auto'; audioPlayer.src = url;
     const onEnded = () => { console.log(`Audio ended: ${url}`); cleanupListeners(); if (callback) callback(); };
     const onError = (e) => { console.error(`Audio error ${url}:`, e); if(statusDiv) statusDiv.textContent = 'Audio error.'; cleanupListeners(); if (callback) callback(); };
     const onCanPlay = () => { console.log(`Audio can play: ${url}`); audioPlayer.play().then(() => console.log("Playback started.")).catch(onError); };
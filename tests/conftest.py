@@ -0,0 +1,71 @@
+# tests/conftest.py (Runs the app offline: fake Gemini/TTS backends, in-memory store, scratch working directory)
+import os
+import sys
+import tempfile
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+# Read at import by app.py and its modules, so they must be set before the first `import app`
+os.environ.update(GEMINI_BACKEND="fake", TTS_BACKEND="fake", WARMUP_MODE="lazy", FLASK_SECRET_KEY="tests", LOG_LEVEL="WARNING",
+                  INTERVIEW_STORE="memory://", RESUME_CACHE_ENABLED="0", PHRASE_LIBRARY_ENABLED="0", RESUME_EXTRACT_WORKERS="0")
+os.chdir(tempfile.mkdtemp(prefix="interview_tests_")) # generated_audio/, uploads/ and reports/ are relative to the working directory
+
+QUESTIONS = ["Tell me about a backend service you designed.", "How do you review code?", "Describe a production incident you debugged."]
+GREETING_REPLY = "I'm doing well, thank you."
+ANSWERS = ["I built an ingestion service with queues and retries.", "I look for tests first, then naming and edge cases.",
+           "A slow query took the site down; we added an index and an alert."]
+
+
+@pytest.fixture(scope="session")
+def web():
+    import app
+    return app
+
+
+@pytest.fixture(params=["inline", "pipelined", "deferred"])
+def evaluation_mode(request, web, monkeypatch):
+    """Runs the test once per EVALUATION_MODE (a module constant in app.py, read per turn)."""
+    from evaluation_pipeline import EvaluationPipeline
+    monkeypatch.setattr(web, "EVALUATION_MODE", request.param)
+    monkeypatch.setattr(web, "evaluation_pipeline", EvaluationPipeline(web.evaluate_and_respond_gemini_simple, web.interview_store, max_workers=2) if request.param == "pipelined" else None)
+    return request.param
+
+
+@pytest.fixture
+def client(web):
+    return web.app.test_client()
+
+
+@pytest.fixture
+def new_interview(web, client):
+    """Creates an interview for the test client's session (as /upload would) and returns its id."""
+    def create(questions=QUESTIONS):
+        manager = web.InterviewManager(questions=list(questions)); web.interview_store.create(manager)
+        with client.session_transaction() as session: session['interview_id'] = manager.interview_id
+        return manager.interview_id
+    return create
+
+
+def reply_for(payload, answers):
+    """What the candidate sends after an interviewer turn, following static/js/interview.js."""
+    if not payload.get("awaits_input"): return ""
+    return GREETING_REPLY if payload["state"] == "AWAITING_GREETING_RESPONSE" else next(answers)
+
+
+@pytest.fixture
+def run_interview(client):
+    """Plays a whole interview through /interview/start and /interview/next_step; returns every turn payload."""
+    def run(answers=ANSWERS):
+        answers = iter(answers)
+        response = client.post('/interview/start'); assert response.status_code == 200, response.get_json()
+        payload = response.get_json(); payloads = [payload]
+        while not payload["is_finished"]:
+            if payload.get("next"): payload = payload["next"]; payloads.append(payload); continue
+            response = client.post('/interview/next_step', json={"text": reply_for(payload, answers)})
+            assert response.status_code == 200, response.get_json()
+            payload = response.get_json(); payloads.append(payload)
+        return payloads
+    return run
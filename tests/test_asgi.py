@@ -0,0 +1,122 @@
+# tests/test_asgi.py (asgi.application: async interview routes, the Flask fallback and shutdown draining)
+import io
+import json
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from conftest import ANSWERS, reply_for
+from interview_flow import InterviewState as S
+
+pytest.importorskip("asgiref")
+
+
+@pytest.fixture
+def asgi(web, monkeypatch):
+    import asgi
+    monkeypatch.setattr(asgi, "blocking_pool", ThreadPoolExecutor(max_workers=4)) # Shutdown tests close the pool
+    monkeypatch.setattr(asgi, "_draining", False)
+    return asgi
+
+
+def session_cookie(web, interview_id):
+    serializer = web.app.session_interface.get_signing_serializer(web.app)
+    return f"session={serializer.dumps({'interview_id': interview_id})}"
+
+
+async def call(application, method, path, body=b"", headers=()):
+    """One HTTP request through the ASGI app. Returns (status, {header: value}, body)."""
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method, "scheme": "http", "path": path,
+             "raw_path": path.encode(), "root_path": "", "query_string": b"", "server": ("testserver", 80), "client": ("127.0.0.1", 5000),
+             "headers": [(b"host", b"testserver")] + [(k.encode(), v.encode()) for k, v in headers]}
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    async def receive(): return messages.pop(0) if messages else await asyncio.Event().wait()
+    sent = []
+    async def send(message): sent.append(message)
+    await application(scope, receive, send)
+    start = next(m for m in sent if m["type"] == "http.response.start")
+    return start["status"], {k.decode(): v.decode() for k, v in start["headers"]}, b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body")
+
+
+async def post_json(application, path, cookie, data=None):
+    status, _, body = await call(application, "POST", path, json.dumps(data or {}).encode(), [("cookie", cookie), ("content-type", "application/json")])
+    return status, json.loads(body)
+
+
+def multipart(field, filename, data, boundary="interviewtestboundary"):
+    body = (f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n').encode() + data + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def test_interview_runs_on_the_async_routes(web, asgi, monkeypatch):
+    docx = pytest.importorskip("docx")
+    document = docx.Document(); document.add_paragraph("Jane Doe, backend engineer. Built queues and caches.")
+    buffer = io.BytesIO(); document.save(buffer)
+    awaited, agenerate = [], web.llm_client.agenerate_content
+    async def recording_agenerate(prompt_type, prompt, **kwargs): awaited.append(prompt_type); return await agenerate(prompt_type, prompt, **kwargs)
+    monkeypatch.setattr(web.llm_client, "agenerate_content", recording_agenerate)
+    monkeypatch.setattr(web.llm_client, "generate_content", lambda *args, **kwargs: pytest.fail("Gemini called from a thread"))
+
+    async def interview():
+        body, content_type = multipart("resume", "resume.docx", buffer.getvalue())
+        status, headers, _ = await call(asgi.application, "POST", "/upload", body, [("content-type", content_type)])
+        assert status == 302 and headers["location"].endswith("/interview")
+        cookie = headers["set-cookie"].split(";")[0]
+        status, payload = await post_json(asgi.application, "/interview/start", cookie); payloads = [payload]
+        answers = iter(ANSWERS * 4)
+        while status == 200 and not payload["is_finished"]:
+            if payload.get("next"): payload = payload["next"]; payloads.append(payload); continue
+            status, payload = await post_json(asgi.application, "/interview/next_step", cookie, {"text": reply_for(payload, answers)})
+            payloads.append(payload)
+        return status, payloads
+
+    status, payloads = asyncio.run(interview())
+    assert status == 200 and payloads[-1]["state"] == S.FINISHED and payloads[-1]["transcript"] == web.CLOSING_TEXT
+    questions = sum(1 for p in payloads if p["state"] == S.LISTENING)
+    assert awaited == ["questions", "greeting", "greeting_ack"] + ["evaluation"] * questions
+
+
+def test_other_routes_fall_back_to_flask(web, asgi):
+    status, headers, body = asyncio.run(call(asgi.application, "GET", "/metrics"))
+    assert status == 200 and headers["content-type"].startswith("text/plain") and b"# TYPE http_request_seconds histogram" in body
+    assert asyncio.run(call(asgi.application, "GET", "/no-such-page"))[0] == 404
+
+
+def test_async_routes_keep_flask_session_handling(web, asgi):
+    status, payload = asyncio.run(post_json(asgi.application, "/interview/start", "session=not-signed"))
+    assert status == 400 and payload == {"error": "No session"}
+
+
+def test_oversized_bodies_are_rejected(asgi, monkeypatch):
+    monkeypatch.setattr(asgi, "MAX_BODY_BYTES", 10)
+    assert asyncio.run(call(asgi.application, "POST", "/interview/next_step", b'{"text": "a long answer"}'))[0] == 413
+
+
+def test_shutdown_drains_turns_in_flight(web, asgi, new_interview, monkeypatch):
+    cookie = session_cookie(web, new_interview())
+    agenerate = web.llm_client.agenerate_content
+
+    async def scenario():
+        release = asyncio.Event()
+        async def slow_agenerate(prompt_type, prompt, **kwargs): await release.wait(); return await agenerate(prompt_type, prompt, **kwargs)
+        monkeypatch.setattr(web.llm_client, "agenerate_content", slow_agenerate)
+        lifespan_messages, lifespan_sent = asyncio.Queue(), []
+        async def send(message): lifespan_sent.append(message["type"])
+        lifespan = asyncio.ensure_future(asgi.application({"type": "lifespan"}, lifespan_messages.get, send))
+        await lifespan_messages.put({"type": "lifespan.startup"})
+        turn = asyncio.ensure_future(post_json(asgi.application, "/interview/start", cookie))
+        while not asgi._in_flight: await asyncio.sleep(0.001) # Greeting is waiting on Gemini
+        await lifespan_messages.put({"type": "lifespan.shutdown"})
+        while not asgi._draining: await asyncio.sleep(0.001)
+        refused = await post_json(asgi.application, "/interview/next_step", cookie, {"text": "Hello"})
+        assert "lifespan.shutdown.complete" not in lifespan_sent # Still waiting for the turn
+        release.set()
+        started = await turn; await lifespan
+        return refused, started, lifespan_sent
+
+    refused, started, lifespan_sent = asyncio.run(scenario())
+    assert refused == (503, {"error": "Server restarting, please retry."})
+    assert started[0] == 200 and started[1]["state"] == S.AWAITING_GREETING_RESPONSE
+    assert lifespan_sent == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
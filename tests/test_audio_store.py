@@ -0,0 +1,51 @@
+# tests/test_audio_store.py (Sharded storage and lifecycle of generated audio)
+import os
+import time
+
+from audio_store import AudioStore
+
+
+def write(store, filename, size=100, interview_id=None):
+    with open(store.path_for(filename), "wb") as f: f.write(b"\0" * size)
+    store.register(filename, interview_id)
+    return store.resolve(filename)
+
+
+def test_files_are_sharded_and_old_flat_files_still_resolve(tmp_path):
+    (tmp_path / "legacy.wav").write_bytes(b"x" * 10)
+    store = AudioStore(str(tmp_path), quota_bytes=10_000)
+    path = write(store, "question_0_1.wav")
+    assert os.path.dirname(path) == str(tmp_path / store._shard("question_0_1.wav"))
+    assert store.resolve("legacy.wav") == str(tmp_path / "legacy.wav") and store.resolve("missing.wav") is None
+    assert sorted(name for name, _ in store.list_files()) == ["legacy.wav", "question_0_1.wav"]
+    assert store.stats()["bytes_stored"] == 110
+
+
+def test_released_session_keeps_shared_and_co_owned_files(tmp_path):
+    store = AudioStore(str(tmp_path), quota_bytes=10_000)
+    own = write(store, "ack_0_1.wav", interview_id="a")
+    shared = write(store, "tts_abc.wav", interview_id="a")
+    both = write(store, "ack_1_1.wav", interview_id="a"); store.track("b", "ack_1_1.wav")
+    store.release_session("a")
+    assert not os.path.exists(own) and os.path.exists(shared) and os.path.exists(both)
+    assert store.stats()["files_reclaimed"] == 1
+
+
+def test_finished_sessions_are_reaped_after_the_grace_period(tmp_path):
+    store = AudioStore(str(tmp_path), quota_bytes=10_000, session_ttl=3600, finished_grace=0)
+    finished = write(store, "closing_1.wav", interview_id="done")
+    active = write(store, "question_0_1.wav", interview_id="active")
+    store.finish_session("done"); time.sleep(0.01)
+    store.reap()
+    assert not os.path.exists(finished) and os.path.exists(active)
+    assert store.stats()["sessions"] == 1
+
+
+def test_quota_evicts_least_recently_used_and_live_sessions_last(tmp_path):
+    store = AudioStore(str(tmp_path), quota_bytes=300)
+    live = write(store, "question_0_1.wav", interview_id="live")
+    old = write(store, "tts_old.wav"); recent = write(store, "tts_recent.wav")
+    store.touch("tts_old.wav") # Served again: "recent" is now the least recently used unowned file
+    newest = write(store, "tts_new.wav")
+    assert os.path.exists(live) and os.path.exists(old) and os.path.exists(newest) and not os.path.exists(recent)
+    assert store.stats()["quota_evictions"] == 1
@@ -0,0 +1,40 @@
+# tests/test_background_work.py (Question pre-synthesis stops when an interview ends or is abandoned)
+import pytest
+
+from interview_manager import InterviewManager
+from interview_store import InterviewNotFound
+from tts_prefetch import QuestionAudioPrefetcher
+
+
+@pytest.fixture
+def cancelled(web, monkeypatch):
+    """Interview ids QuestionAudioPrefetcher.cancel is called with."""
+    prefetcher = QuestionAudioPrefetcher(lambda text, filename_prefix: None)
+    calls = []; monkeypatch.setattr(prefetcher, "cancel", calls.append)
+    monkeypatch.setattr(web, "question_audio_prefetcher", prefetcher)
+    return calls
+
+
+def store_interview(web, client, manager):
+    web.interview_store.create(manager)
+    with client.session_transaction() as session: session['interview_id'] = manager.interview_id
+
+
+def test_closing_turn_stops_prefetch_for_the_interview(web, client, cancelled):
+    manager = InterviewManager(["Only question?"]); manager.current_question_index = 0; manager.set_state("ACKNOWLEDGED_ANSWER")
+    store_interview(web, client, manager)
+    response = client.post('/interview/next_step', json={"text": ""})
+    assert response.status_code == 200 and response.get_json()["is_finished"]
+    assert cancelled == [manager.interview_id]
+
+
+def test_home_page_stops_prefetch_for_the_abandoned_interview(web, client, cancelled):
+    manager = InterviewManager(["Only question?"]); store_interview(web, client, manager)
+    assert client.get('/').status_code == 200
+    assert cancelled == [manager.interview_id]
+    with client.session_transaction() as session: assert 'interview_id' not in session
+    with pytest.raises(InterviewNotFound): web.interview_store.load(manager.interview_id)
+
+
+def test_home_page_without_an_interview(client, cancelled):
+    assert client.get('/').status_code == 200 and cancelled == []
@@ -0,0 +1,81 @@
+# tests/test_batch_evaluation.py (Deferred mode: all answers scored in one structured Gemini request)
+import json
+
+import pytest
+
+from interview_manager import InterviewManager
+
+
+class Reply:
+    """Stands in for a Gemini response."""
+
+    def __init__(self, text): self.text = text; self.parts = [text]
+
+
+@pytest.fixture
+def gemini_replies(web, monkeypatch):
+    """Queues raw reply texts for the batch prompt and records the prompts sent."""
+    replies, prompts = [], []
+    def generate_content(prompt_type, prompt, **kwargs):
+        assert prompt_type == "evaluation_batch" and kwargs["generation_config"]["response_schema"] is web.BATCH_EVALUATION_SCHEMA
+        prompts.append(prompt); return Reply(replies.pop(0))
+    monkeypatch.setattr(web, "get_gemini_model", lambda: object())
+    monkeypatch.setattr(web.llm_client, "generate_content", generate_content)
+    return replies, prompts
+
+
+def finished(answers):
+    manager = InterviewManager(questions=[f"Q{i}?" for i in range(len(answers))])
+    for i, answer in enumerate(answers):
+        manager.current_question_index = i; manager.state = "PROCESSING_ANSWER"; manager.record_answer_and_evaluation(answer, None)
+    return manager
+
+
+def reply(*pairs): return json.dumps({"evaluations": [{"index": i, "evaluation": note} for i, note in pairs]})
+
+
+def test_parse_maps_notes_by_index(web):
+    assert web.parse_batch_evaluations(reply((2, " b "), (1, "a")), 2) == ["a", "b"]
+    assert web.parse_batch_evaluations("```json\n" + reply((1, "a")) + "\n```", 1) == ["a"] # Fenced output
+
+
+def test_parse_leaves_missing_extra_and_malformed_entries_empty(web):
+    text = json.dumps({"evaluations": [{"index": 1, "evaluation": "a"}, {"index": 3, "evaluation": "extra"}, {"index": "2", "evaluation": "x"},
+                                       {"index": 2, "evaluation": "  "}, "junk", {"evaluation": "no index"}]})
+    assert web.parse_batch_evaluations(text, 2) == ["a", None]
+
+
+@pytest.mark.parametrize("text", ["not json", "[]", json.dumps({"evaluations": {}})])
+def test_parse_rejects_replies_without_an_evaluations_array(web, text):
+    with pytest.raises(ValueError): web.parse_batch_evaluations(text, 1) # json.JSONDecodeError is a ValueError
+
+
+def test_complete_evaluations_fills_every_answer(web, monkeypatch, gemini_replies):
+    replies, prompts = gemini_replies; monkeypatch.setattr(web, "EVALUATION_MODE", "deferred")
+    manager = finished(["A0", "A1", "A2"]); manager.set_evaluation(1, "already scored")
+    replies.append(reply((1, "good"), (2, "fine")))
+    web.complete_evaluations(manager)
+    assert [r["evaluation"] for r in manager.user_responses] == ["good", "already scored", "fine"]
+    assert len(prompts) == 1 and "A1" not in prompts[0]
+
+
+def test_missing_index_falls_back_to_a_placeholder(web, monkeypatch, gemini_replies):
+    replies, _ = gemini_replies; monkeypatch.setattr(web, "EVALUATION_MODE", "deferred")
+    manager = finished(["A0", "A1"]); replies.append(reply((2, "fine"), (7, "extra")))
+    web.complete_evaluations(manager)
+    assert [r["evaluation"] for r in manager.user_responses] == ["Evaluation unavailable.", "fine"]
+
+
+def test_malformed_reply_marks_the_whole_batch(web, monkeypatch, gemini_replies):
+    replies, _ = gemini_replies; monkeypatch.setattr(web, "EVALUATION_MODE", "deferred")
+    manager = finished(["A0", "A1"]); replies.append("{truncated")
+    web.complete_evaluations(manager)
+    assert all(r["evaluation"].startswith("Eval error:") for r in manager.user_responses)
+
+
+def test_long_interviews_are_split_into_batches(web, monkeypatch, gemini_replies):
+    replies, prompts = gemini_replies; monkeypatch.setattr(web, "EVALUATION_MODE", "deferred")
+    monkeypatch.setattr(web, "BATCH_EVALUATION_MAX_ITEMS", 2)
+    manager = finished(["A0", "A1", "A2"]); replies.extend([reply((1, "n0"), (2, "n1")), reply((1, "n2"))])
+    web.complete_evaluations(manager)
+    assert len(prompts) == 2 and [r["evaluation"] for r in manager.user_responses] == ["n0", "n1", "n2"]
@@ -0,0 +1,83 @@
+# tests/test_batch_prepare.py (Bulk preparation: rate limiting, the manifest, and a run over a resume directory)
+import io
+import json
+import time
+import argparse
+
+import numpy as np
+import pytest
+
+from batch_prepare import BatchPipeline, Manifest, RateLimiter, find_resumes
+
+
+def test_rate_limiter_allows_a_burst_then_paces():
+    limiter = RateLimiter(per_minute=1200, burst=2) # 20 calls a second
+    start = time.monotonic()
+    for _ in range(4): limiter.acquire()
+    assert 0.08 <= time.monotonic() - start < 1.0 and limiter.waited > 0
+
+
+def test_manifest_survives_a_torn_line_and_checks_file_identity(tmp_path):
+    path = tmp_path / "manifest.jsonl"
+    path.write_text(json.dumps({"file": "a.pdf", "size": 10, "mtime_ns": 1, "status": "failed"}) + "\n"
+                    + json.dumps({"file": "a.pdf", "size": 10, "mtime_ns": 1, "status": "done"}) + "\n" + '{"file": "b.p', encoding="utf-8")
+    manifest = Manifest(str(path))
+    assert manifest.is_done({"file": "a.pdf", "size": 10, "mtime_ns": 1}) # Last line wins
+    assert not manifest.is_done({"file": "a.pdf", "size": 11, "mtime_ns": 1}) and not manifest.is_done({"file": "b.pdf", "size": 1, "mtime_ns": 1})
+    manifest.write({"file": "c.pdf", "status": "done"}); manifest.close()
+    assert Manifest(str(path)).entries["c.pdf"]["status"] == "done" # Not glued onto the torn line
+
+
+def test_find_resumes(tmp_path):
+    (tmp_path / "sub").mkdir()
+    for name in ("b.pdf", "a.docx", "notes.txt", "sub/c.pdf"): (tmp_path / name).write_bytes(b"x")
+    allowed = lambda name: name.rsplit(".", 1)[-1] in ("pdf", "docx")
+    assert [path for path, _ in find_resumes(str(tmp_path), False, allowed)] == ["a.docx", "b.pdf"]
+    assert [path for path, _ in find_resumes(str(tmp_path), True, allowed)] == ["a.docx", "b.pdf", "sub/c.pdf"]
+
+
+def run_batch(web, directory, manifest_path, **overrides):
+    args = argparse.Namespace(directory=str(directory), extract_workers=2, llm_concurrency=2, llm_rpm=0, tts_batch=4, no_audio=False)
+    vars(args).update(overrides)
+    manifest = Manifest(str(manifest_path))
+    items = ({"file": path, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "timings": {}} for path, stat in find_resumes(str(directory), False, web.allowed_file))
+    pipeline = BatchPipeline(web, web.tts_interface, manifest, args)
+    try: pipeline.run(items)
+    finally: manifest.close()
+    return pipeline
+
+
+def test_batch_run_prepares_questions_and_audio(web, tmp_path):
+    docx = pytest.importorskip("docx")
+    resumes = tmp_path / "resumes"; resumes.mkdir()
+    for name in ("alice", "bob"):
+        document = docx.Document(); document.add_paragraph(f"{name.title()}, backend engineer.")
+        buffer = io.BytesIO(); document.save(buffer); (resumes / f"{name}.docx").write_bytes(buffer.getvalue())
+    (resumes / "broken.pdf").write_bytes(b"%PDF-garbage")
+    manifest_path = tmp_path / "manifest.jsonl"
+
+    pipeline = run_batch(web, resumes, manifest_path)
+    assert pipeline.counts == {"done": 2, "failed": 1, "skipped": 0}
+    entries = {entry["file"]: entry for entry in map(json.loads, manifest_path.read_text(encoding="utf-8").splitlines())}
+    assert entries["broken.pdf"]["status"] == "failed" and entries["broken.pdf"]["stage"] == "extract"
+    for name in ("alice.docx", "bob.docx"):
+        entry = entries[name]
+        assert entry["status"] == "done" and entry["questions"] and len(entry["audio"]) == len(entry["questions"])
+        assert all(web.tts_interface.get_audio_filepath(f) for f in entry["audio"])
+        assert {"extract", "questions", "audio", "total"} <= set(entry["timings"])
+
+    rerun = run_batch(web, resumes, manifest_path) # Finished files are skipped, failed ones retried
+    assert rerun.counts == {"done": 0, "failed": 1, "skipped": 2}
+
+
+def test_text_to_speech_batch_synthesizes_each_text_once(web, monkeypatch):
+    tts = web.tts_interface; passes = []
+    monkeypatch.setattr(tts, "tts_client", None); monkeypatch.setattr(tts, "voice_id", "batch-test")
+    monkeypatch.setattr(tts, "_models_ready", lambda: True)
+    monkeypatch.setattr(tts, "synthesize_batch", lambda texts: passes.append(list(texts)) or [np.zeros(1600, dtype=np.float32) for _ in texts])
+    texts = ["Question one?", "Question two?", "Question one?", "", "Question three?"]
+    filenames = tts.text_to_speech_batch(texts, "question", batch_size=2)
+    assert passes == [["Question one?", "Question two?"], ["Question three?"]]
+    assert filenames[0] == filenames[2] and filenames[3] is None and len({filenames[0], filenames[1], filenames[4]}) == 3
+    assert all(tts.wait_for_audio(f) for f in filenames if f)
+    assert tts.text_to_speech_batch(["Question two?"], "question", batch_size=2) == [filenames[1]] and len(passes) == 2 # Cache hit
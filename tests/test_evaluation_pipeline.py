@@ -0,0 +1,127 @@
+# tests/test_evaluation_pipeline.py (Background evaluation notes reach any worker through the interview store)
+import threading
+
+import pytest
+
+from evaluation_pipeline import EvaluationPipeline, TIMED_OUT_NOTE
+from interview_flow import InterviewState
+from interview_manager import InterviewManager
+from interview_store import MemoryInterviewStore, SQLiteInterviewStore, StaleStateError
+
+QUESTIONS = ["Q1?", "Q2?"]
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    return MemoryInterviewStore() if request.param == "memory" else SQLiteInterviewStore(str(tmp_path / "interviews.db"))
+
+
+def answered(store, answers=("A1",)):
+    """Stored interview with the given answers recorded and no evaluations yet."""
+    manager = InterviewManager(questions=list(QUESTIONS)); store.create(manager)
+    manager.current_question_index = 0; manager.set_state(InterviewState.PROCESSING_ANSWER)
+    for answer in answers: manager.record_answer_and_evaluation(answer, None)
+    store.save(manager)
+    return store.load(manager.interview_id)
+
+
+def evaluate(question, answer): return "ack", f"note for {answer}"
+
+
+def test_store_keeps_notes_next_to_the_interview(store):
+    manager = answered(store)
+    store.add_evaluation(manager.interview_id, 0, "good")
+    assert store.evaluations(manager.interview_id) == {0: "good"}
+    store.drop_evaluations(manager.interview_id, [0]); assert store.evaluations(manager.interview_id) == {}
+    store.add_evaluation("gone", 0, "late"); assert store.evaluations("gone") == {} # Interview deleted meanwhile
+    store.add_evaluation(manager.interview_id, 0, "good"); store.delete(manager.interview_id)
+    assert store.evaluations(manager.interview_id) == {}
+
+
+def test_note_evaluated_in_one_worker_is_applied_by_another(tmp_path):
+    path = str(tmp_path / "interviews.db")
+    store_a, store_b = SQLiteInterviewStore(path), SQLiteInterviewStore(path) # Two worker processes sharing the file
+    worker_a, worker_b = EvaluationPipeline(evaluate, store_a), EvaluationPipeline(evaluate, store_b)
+    manager = answered(store_a)
+    worker_a.submit(manager.interview_id, 0, QUESTIONS[0], "A1").result(timeout=5)
+
+    manager = store_b.load(manager.interview_id)
+    assert worker_b.apply(manager) == 1 and manager.responses[0].evaluation == "note for A1"
+    store_b.save(manager); worker_b.confirm(manager)
+    assert store_b.evaluations(manager.interview_id) == {}
+    assert store_a.load(manager.interview_id).responses[0].evaluation == "note for A1"
+
+
+def test_notes_survive_a_stale_save(store):
+    pipeline = EvaluationPipeline(evaluate, store)
+    manager = answered(store); interview_id = manager.interview_id
+    pipeline.submit(interview_id, 0, QUESTIONS[0], "A1").result(timeout=5)
+
+    pipeline.apply(manager)
+    other = store.load(interview_id); other.set_state(InterviewState.ACKNOWLEDGED_ANSWER); store.save(other) # Another request saved first
+    with pytest.raises(StaleStateError): store.save(manager)
+    assert store.evaluations(interview_id) == {0: "note for A1"} # Not confirmed, so still there
+
+    retry = store.load(interview_id); pipeline.apply(retry); store.save(retry); pipeline.confirm(retry)
+    assert store.load(interview_id).responses[0].evaluation == "note for A1" and store.evaluations(interview_id) == {}
+
+
+
+def test_answer_lost_to_a_stale_save_is_never_evaluated(store):
+    pipeline = EvaluationPipeline(evaluate, store)
+    manager = InterviewManager(questions=list(QUESTIONS)); store.create(manager); interview_id = manager.interview_id
+    stale, other = store.load(interview_id), store.load(interview_id)
+    stale.current_question_index = 0; stale.set_state(InterviewState.PROCESSING_ANSWER)
+    stale.record_answer_and_evaluation("Old answer", None); pipeline.queue(stale, 0, QUESTIONS[0], "Old answer")
+    other.set_state(InterviewState.GREETING_ACKNOWLEDGED); store.save(other) # Another request saved first
+    with pytest.raises(StaleStateError): store.save(stale)
+    assert pipeline.stats()["submitted"] == 0 # Not confirmed, so nothing was submitted
+
+    retry = store.load(interview_id); retry.current_question_index = 0; retry.set_state(InterviewState.PROCESSING_ANSWER)
+    retry.record_answer_and_evaluation("New answer", None); pipeline.queue(retry, 0, QUESTIONS[0], "New answer")
+    store.save(retry); pipeline.confirm(retry)
+    manager = store.load(interview_id); pipeline.apply(manager, wait=True, timeout=5)
+    assert manager.responses[0].evaluation == "note for New answer" and pipeline.stats()["submitted"] == 1
+
+def test_wait_picks_up_notes_finished_in_another_worker(tmp_path):
+    path = str(tmp_path / "interviews.db")
+    release = threading.Event()
+    def slow_evaluate(question, answer): release.wait(5); return evaluate(question, answer)
+    evaluating, reporting = EvaluationPipeline(slow_evaluate, SQLiteInterviewStore(path)), EvaluationPipeline(evaluate, SQLiteInterviewStore(path))
+    manager = answered(reporting.store)
+    evaluating.submit(manager.interview_id, 0, QUESTIONS[0], "A1")
+    threading.Timer(0.2, release.set).start()
+    reporting.apply(manager, wait=True, timeout=5)
+    assert manager.responses[0].evaluation == "note for A1"
+
+
+def test_wait_gives_up_with_a_placeholder(store):
+    pipeline = EvaluationPipeline(evaluate, store)
+    manager = answered(store) # Answer never submitted, e.g. its worker died
+    pipeline.apply(manager, wait=True, timeout=0.3)
+    assert manager.responses[0].evaluation == TIMED_OUT_NOTE and pipeline.stats()["timed_out"] == 1
+
+
+def test_discarded_interview_notes_are_not_stored(store):
+    release = threading.Event()
+    def slow_evaluate(question, answer): release.wait(5); return evaluate(question, answer)
+    pipeline = EvaluationPipeline(slow_evaluate, store, max_workers=1)
+    manager = answered(store)
+    future = pipeline.submit(manager.interview_id, 0, QUESTIONS[0], "A1")
+    pipeline.discard(manager.interview_id); release.set()
+    if not future.cancelled(): future.result(timeout=5)
+    assert store.evaluations(manager.interview_id) == {} and pipeline.stats()["pending"] == 0
+
+
+def test_evaluation_errors_become_the_note(store):
+    def failing_evaluate(question, answer): raise RuntimeError("quota")
+    pipeline = EvaluationPipeline(failing_evaluate, store); manager = answered(store)
+    pipeline.submit(manager.interview_id, 0, QUESTIONS[0], "A1")
+    pipeline.apply(manager, wait=True)
+    assert manager.responses[0].evaluation == "Eval error: quota"
+
+
+def test_choose_ack_rotates_and_spots_skipped_answers(web):
+    assert web.choose_ack("I don't know", 0) in web.SKIP_ACK_TEMPLATES and web.choose_ack("", 1) in web.SKIP_ACK_TEMPLATES
+    acks = [web.choose_ack("I designed the ingestion service.", i) for i in range(2)]
+    assert acks[0] != acks[1] and set(acks) <= set(web.ACK_TEMPLATES)
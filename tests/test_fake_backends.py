@@ -0,0 +1,32 @@
+# tests/test_fake_backends.py (Offline Gemini/TTS stand-ins give the app well-formed, repeatable replies)
+import pytest
+
+from fake_backends import FakeGenerativeModel, FakeTTSClient, ServiceUnavailable
+from llm_client import LLMClient
+
+
+def test_replies_are_repeatable_and_counted():
+    model = FakeGenerativeModel()
+    prompt = "Generate 10 interview questions based on this resume: ..."
+    assert model.generate_content(prompt).text == FakeGenerativeModel().generate_content(prompt).text
+    assert len(model.generate_content(prompt).text.splitlines()) == model.question_count
+    assert model.stats() == {"questions": 2}
+
+
+def test_app_prompts_parse(web):
+    assert web.evaluate_answers_batch_gemini([("Q1?", "A1"), ("Q2?", "A2")]) == ["Answer 1: relevant, could use more detail.",
+                                                                                  "Answer 2: relevant, could use more detail."]
+    ack, note = web.evaluate_and_respond_gemini_simple("Q1?", "A1")
+    assert ack == "Thanks, that's a clear answer." and note.endswith("examples.")
+
+
+def test_failures_are_retryable():
+    model = FakeGenerativeModel(failure_rate=1.0)
+    with pytest.raises(ServiceUnavailable) as error: model.generate_content("Hello")
+    assert LLMClient.is_retryable(error.value)
+
+
+def test_tts_audio_length_follows_the_text():
+    tts = FakeTTSClient()
+    short, long = tts.synthesize("Hi."), tts.synthesize("A much longer sentence for the candidate to hear.")
+    assert len(short) == int(0.2 * tts.sample_rate) and len(long) > len(short) and tts.stats()["calls"] == 2
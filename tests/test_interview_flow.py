@@ -0,0 +1,173 @@
+# tests/test_interview_flow.py (Every transition-table entry and turn handler, and the interview over HTTP)
+import json
+
+import pytest
+
+from conftest import QUESTIONS, ANSWERS, GREETING_REPLY, reply_for
+import interview_flow
+from interview_flow import (TRANSITIONS, AWAITS_INPUT, TERMINAL_STATES, Action, Event,
+                            InterviewState as S, Transition, TransitionError, transition_for, validate_table)
+from interview_store import InterviewNotFound
+
+
+def drive_to(web, state):
+    """A stored interview in state, reached by running the real transitions (streamed, so acks don't auto-advance)."""
+    manager = web.InterviewManager(questions=list(QUESTIONS)); web.interview_store.create(manager)
+    answers, payload = iter(ANSWERS), {"state": S.INIT, "awaits_input": False}
+    while manager.get_state() != state: payload = web.run_transition(manager, user_text=reply_for(payload, answers), emit=lambda name, data: None)
+    return manager
+
+
+def check_payload(payload):
+    assert payload["status"] == "OK" and payload["transcript"]
+    assert payload["audio_url"] # Fake TTS always produces a file
+    assert payload["awaits_input"] == (payload["state"] in AWAITS_INPUT)
+    assert payload["is_finished"] == (payload["state"] in TERMINAL_STATES)
+
+
+# --- The table ---
+def test_every_transition_has_a_handler(web):
+    for transition in TRANSITIONS.values():
+        assert transition.handler in web.TURN_HANDLERS
+        if Action.LLM in transition.actions: assert transition.handler in web.TURN_LLM_REQUESTS
+
+
+@pytest.mark.parametrize("source", list(TRANSITIONS))
+def test_transition_reaches_a_listed_target(web, evaluation_mode, source):
+    transition = TRANSITIONS[source]
+    with web.app.test_request_context():
+        manager = drive_to(web, source)
+        payload = web.run_transition(manager, transition.event, reply_for({"state": source, "awaits_input": source in AWAITS_INPUT}, iter(ANSWERS)))
+    assert manager.get_state() in transition.targets
+    check_payload(payload)
+    if "next" in payload: # Ack with the next question attached (non-inline evaluation, unstreamed)
+        assert evaluation_mode != "inline" and payload["state"] == S.ACKNOWLEDGED_ANSWER
+        check_payload(payload["next"]); assert payload["next"]["state"] == manager.get_state()
+    else: assert payload["state"] == manager.get_state()
+
+
+@pytest.mark.parametrize("state,event", [(state, event) for state, t in TRANSITIONS.items() for event in Event if event != t.event])
+def test_wrong_event_is_rejected(state, event):
+    with pytest.raises(TransitionError) as error: transition_for(state, event)
+    assert error.value.status == 400
+
+
+@pytest.mark.parametrize("state", [S.FINISHED, S.GREETING, S.ASKING_QUESTION, S.PROCESSING_ANSWER, S.CLOSING, "BOGUS"])
+def test_states_without_a_transition_are_rejected(state):
+    with pytest.raises(TransitionError) as error: transition_for(state)
+    assert error.value.status == 400
+
+
+def test_dead_ends_fail_validation(monkeypatch):
+    table = dict(TRANSITIONS)
+    table[S.LISTENING] = Transition(S.LISTENING, Event.REPLY, (S.CLOSING,), Action.RECORD, "answer", (), False)
+    monkeypatch.setattr(interview_flow, "TRANSITIONS", table)
+    with pytest.raises(ValueError, match="dead end"): validate_table()
+
+
+# --- Over HTTP ---
+def test_full_interview(web, client, new_interview, run_interview, evaluation_mode):
+    interview_id = new_interview(); payloads = run_interview()
+    states = [p["state"] for p in payloads]
+    assert states[:3] == [S.AWAITING_GREETING_RESPONSE, S.GREETING_ACKNOWLEDGED, S.LISTENING]
+    assert states.count(S.LISTENING) == len(QUESTIONS) and states.count(S.ACKNOWLEDGED_ANSWER) == len(QUESTIONS)
+    assert states[-1] == S.FINISHED and payloads[-1]["transcript"] == web.CLOSING_TEXT
+    asked = [p["transcript"] for p in payloads if p["state"] == S.LISTENING][1:] # First LISTENING payload is the first question
+    assert asked == QUESTIONS[1:]
+
+    report = web.report_renderer.report_data(interview_id) # Shares the build started when the interview finished
+    assert [r["answer"] for r in report["responses"]] == ANSWERS
+    assert all(r["evaluation"] for r in report["responses"])
+
+
+def test_closing_turn(web, client, new_interview, run_interview):
+    interview_id = new_interview(); payloads = run_interview()
+    closing = payloads[-1]
+    assert closing["is_finished"] and not closing["awaits_input"] and closing["transcript"] == web.CLOSING_TEXT
+    assert web.interview_store.load(interview_id).get_state() == S.FINISHED
+    assert web.report_renderer.status(interview_id)["status"] != "missing" # Submitted when the interview finished
+    assert client.get('/report').status_code == 200
+
+
+def test_next_step_before_start_is_rejected(client, new_interview):
+    new_interview()
+    response = client.post('/interview/next_step', json={"text": "hello"})
+    assert response.status_code == 400
+
+
+def test_start_twice_is_rejected(client, new_interview):
+    new_interview()
+    assert client.post('/interview/start').status_code == 200
+    assert client.post('/interview/start').status_code == 400
+
+
+def test_next_step_after_finish_is_rejected(client, new_interview, run_interview):
+    new_interview(); run_interview()
+    assert client.post('/interview/next_step', json={"text": ""}).status_code == 400
+
+
+def test_home_page_cancels_the_interview(web, client, new_interview):
+    interview_id = new_interview(); client.post('/interview/start')
+    assert client.get('/').status_code == 200
+    with pytest.raises(InterviewNotFound): web.interview_store.load(interview_id)
+    with client.session_transaction() as session: assert 'interview_id' not in session
+    assert client.post('/interview/next_step', json={"text": "hello"}).status_code == 400
+
+
+# --- Inline evaluation prompts ---
+def test_inline_evaluation_prompt_names_the_question(web, client, new_interview, run_interview, monkeypatch):
+    monkeypatch.setattr(web, "EVALUATION_MODE", "inline"); monkeypatch.setattr(web, "evaluation_pipeline", None)
+    prompts, generate = [], web.llm_client.generate_content
+    def recording_generate(prompt_type, prompt, **kwargs):
+        if prompt_type == "evaluation": prompts.append(prompt)
+        return generate(prompt_type, prompt, **kwargs)
+    monkeypatch.setattr(web.llm_client, "generate_content", recording_generate)
+    new_interview(); run_interview()
+    assert len(prompts) == len(QUESTIONS)
+    for prompt, question in zip(prompts, QUESTIONS): assert f'Question: "{question}"' in prompt
+
+
+def test_llm_request_is_built_before_the_answer_is_processed(web, monkeypatch):
+    """asgi.py builds the request (and awaits it) before turn_answer moves the state to PROCESSING_ANSWER."""
+    monkeypatch.setattr(web, "EVALUATION_MODE", "inline")
+    with web.app.test_request_context(): manager = drive_to(web, S.LISTENING)
+    request = web.llm_request_for(TRANSITIONS[S.LISTENING], manager, ANSWERS[0])
+    assert f'Question: "{QUESTIONS[0]}"' in request.prompt and "N/A" not in request.prompt
+
+
+# --- Streamed turns (/interview/turn) ---
+def sse_events(response):
+    """[(event, data)] from a text/event-stream body, skipping keep-alive comments."""
+    events = []
+    for block in response.get_data(as_text=True).split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if lines: events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_streamed_turns_end_with_done(web, client, new_interview, evaluation_mode):
+    interview_id = new_interview()
+    response = client.post('/interview/turn', json={})
+    assert response.mimetype == "text/event-stream"
+    events = sse_events(response)
+    assert [name for name, _ in events] == ["text", "turn", "done"] and events[0][1]["transcript"] == events[1][1]["transcript"]
+    assert events[2][1] == {"state": S.AWAITING_GREETING_RESPONSE, "awaits_input": True, "is_finished": False}
+
+    events = sse_events(client.post('/interview/turn', json={"text": GREETING_REPLY})) # Ack, then the first question unprompted
+    assert [name for name, _ in events] == ["text", "turn", "text", "turn", "done"]
+    assert [data["state"] for name, data in events if name == "turn"] == [S.GREETING_ACKNOWLEDGED, S.LISTENING]
+    assert events[3][1]["transcript"] == QUESTIONS[0] and events[-1][1]["awaits_input"]
+
+    for answer in ANSWERS:
+        events = sse_events(client.post('/interview/turn', json={"text": answer}))
+        assert [name for name, _ in events] == ["text", "turn", "text", "turn", "done"]
+        assert all(data["audio_url"] for name, data in events if name == "turn")
+    assert events[-1][1] == {"state": S.FINISHED, "awaits_input": False, "is_finished": True}
+    assert events[-2][1]["transcript"] == web.CLOSING_TEXT
+    assert web.interview_store.load(interview_id).get_state() == S.FINISHED
+
+
+def test_streamed_turn_errors_end_the_stream_without_done(client, new_interview, run_interview):
+    new_interview(); run_interview()
+    events = sse_events(client.post('/interview/turn', json={"text": "One more thing."}))
+    assert events == [("error", {"error": "Unexpected state: FINISHED", "status": 400})]
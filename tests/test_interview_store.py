@@ -0,0 +1,94 @@
+# tests/test_interview_store.py (Server-side interview store backends)
+import time
+
+import pytest
+
+from interview_manager import InterviewManager
+from interview_store import (InterviewNotFound, InterviewStore, MemoryInterviewStore, RedisInterviewStore, SQLiteInterviewStore,
+                             StaleStateError, create_store)
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def store(request, tmp_path):
+    if request.param == "memory": return MemoryInterviewStore()
+    if request.param == "sqlite": return SQLiteInterviewStore(str(tmp_path / "interviews.db"))
+    fakeredis = pytest.importorskip("fakeredis")
+    return RedisInterviewStore(fakeredis.FakeRedis())
+
+
+def answer(manager, text, note=None):
+    manager.current_question_index += 1; manager.state = "PROCESSING_ANSWER"
+    manager.record_answer_and_evaluation(text, note); manager.state = "ASKING_QUESTION"
+
+
+def test_create_then_load_round_trips(store):
+    manager = InterviewManager(["First?", "Second?"]); manager.start_interview()
+    store.create(manager)
+    loaded = store.load(manager.interview_id)
+    assert loaded.to_dict() == manager.to_dict() and loaded.store_version == manager.store_version == 1
+
+
+def test_save_appends_and_updates_responses(store):
+    manager = InterviewManager(["First?", "Second?"]); store.create(manager)
+    answer(manager, "One")
+    store.save(manager)
+    loaded = store.load(manager.interview_id)
+    assert [r["answer"] for r in loaded.user_responses] == ["One"] and loaded.current_question_index == 0
+    loaded.set_evaluation(0, "Good"); answer(loaded, "Two", "Fine")
+    store.save(loaded)
+    again = store.load(manager.interview_id)
+    assert [(r["answer"], r["evaluation"]) for r in again.user_responses] == [("One", "Good"), ("Two", "Fine")]
+    assert again.store_version == 3
+
+
+def test_concurrent_save_is_stale(store):
+    manager = InterviewManager(["First?"]); store.create(manager)
+    first, second = store.load(manager.interview_id), store.load(manager.interview_id)
+    answer(first, "From one worker"); store.save(first)
+    answer(second, "From another worker")
+    with pytest.raises(StaleStateError): store.save(second)
+    assert [r["answer"] for r in store.load(manager.interview_id).user_responses] == ["From one worker"]
+
+
+def test_delete(store):
+    manager = InterviewManager(["First?"]); store.create(manager)
+    store.delete(manager.interview_id)
+    with pytest.raises(InterviewNotFound): store.load(manager.interview_id)
+    answer(manager, "Too late")
+    with pytest.raises(InterviewNotFound): store.save(manager)
+    store.delete(manager.interview_id) # Deleting twice is harmless
+
+
+def test_sqlite_store_is_shared_between_instances_and_purges_expired(tmp_path):
+    path = str(tmp_path / "interviews.db")
+    old = InterviewManager(["First?"]); SQLiteInterviewStore(path).create(old)
+    assert SQLiteInterviewStore(path).load(old.interview_id).questions == ["First?"]
+    store = SQLiteInterviewStore(path, ttl=0.01); time.sleep(0.02)
+    store.create(InterviewManager(["Second?"]))
+    with pytest.raises(InterviewNotFound): store.load(old.interview_id)
+
+
+def test_sqlite_save_purges_expired_at_most_once_per_interval(tmp_path):
+    store = SQLiteInterviewStore(str(tmp_path / "interviews.db"), ttl=0.2, purge_interval=3600)
+    old, current = InterviewManager(["First?"]), InterviewManager(["Second?", "Third?"])
+    store.create(old); time.sleep(0.3); store.create(current) # Purged on the first create only
+    answer(current, "One"); store.save(current)
+    assert store.load(old.interview_id).questions == ["First?"]
+    store._next_purge = 0.0 # Interval over: the next save purges
+    answer(current, "Two"); store.save(current)
+    with pytest.raises(InterviewNotFound): store.load(old.interview_id)
+    assert len(store.load(current.interview_id).user_responses) == 2
+
+
+def test_backends_must_implement_the_whole_api():
+    with pytest.raises(TypeError): InterviewStore()
+    class Partial(InterviewStore):
+        def create(self, manager): pass
+    with pytest.raises(TypeError, match="load"): Partial()
+
+
+def test_create_store_urls(tmp_path):
+    assert isinstance(create_store("memory://"), MemoryInterviewStore)
+    store = create_store(f"sqlite:///{tmp_path / 'interviews.db'}", ttl=60)
+    assert isinstance(store, SQLiteInterviewStore) and store.ttl == 60
+    with pytest.raises(ValueError): create_store("postgres://localhost/interviews")
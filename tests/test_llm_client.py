@@ -0,0 +1,170 @@
+# tests/test_llm_client.py (Retries, deadlines, concurrency cap and circuit breaker of the LLM call layer)
+import time
+import asyncio
+import threading
+
+import pytest
+
+from fake_backends import FakeGenerativeModel, ServiceUnavailable as FakeServiceUnavailable
+from llm_client import LLMClient, CircuitBreaker, CircuitOpenError, ConcurrencyLimitError, LLMUnavailableError
+
+
+class ServiceUnavailable(Exception):
+    """Same name as the google.api_core error, which the client retries."""
+
+
+class ScriptedModel:
+    """generate_content raises or returns the next scripted outcome; the last one repeats."""
+
+    def __init__(self, *outcomes, delay=0.0):
+        self.outcomes = list(outcomes); self.delay = delay; self.calls = 0
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls += 1; outcome = self.outcomes[min(self.calls, len(self.outcomes)) - 1]
+        if self.delay: time.sleep(self.delay)
+        if isinstance(outcome, Exception): raise outcome
+        return outcome
+
+
+def client_for(model, **kwargs):
+    kwargs.setdefault("backoff_base", 0.001); kwargs.setdefault("backoff_max", 0.001)
+    return LLMClient(lambda: model, **kwargs)
+
+
+def test_transient_errors_are_retried():
+    model = ScriptedModel(ServiceUnavailable("busy"), ServiceUnavailable("busy"), "answer")
+    client = client_for(model, max_retries=2)
+    assert client.generate_content("greeting", "Hi") == "answer" and model.calls == 3
+    assert client.stats()["calls"]["greeting"] == {"retry": 2, "ok": 1}
+    assert client.stats()["latency"]["greeting"]["count"] == 1
+
+
+def test_retries_give_up_after_max_retries():
+    model = ScriptedModel(ServiceUnavailable("down"))
+    with pytest.raises(ServiceUnavailable): client_for(model, max_retries=1).generate_content("greeting", "Hi")
+    assert model.calls == 2
+
+
+def test_bad_requests_are_not_retried_and_do_not_trip_the_breaker():
+    model = ScriptedModel(ValueError("bad prompt")); breaker = CircuitBreaker(failure_threshold=1)
+    with pytest.raises(ValueError): client_for(model, breaker=breaker).generate_content("questions", "?")
+    assert model.calls == 1 and breaker.state == "closed"
+
+
+def test_slow_attempt_times_out():
+    client = client_for(ScriptedModel("late", delay=0.5), timeout=0.05, deadline=0.1, max_retries=0)
+    started = time.monotonic()
+    with pytest.raises(LLMUnavailableError, match="timed out"): client.generate_content("evaluation", "?")
+    assert time.monotonic() - started < 0.4
+
+
+def test_breaker_opens_fails_fast_and_lets_one_probe_through():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    model = ScriptedModel(ServiceUnavailable("down"), ServiceUnavailable("down"), "back")
+    client = client_for(model, max_retries=0, breaker=breaker)
+    for _ in range(2):
+        with pytest.raises(ServiceUnavailable): client.generate_content("greeting", "Hi")
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError): client.generate_content("greeting", "Hi")
+    assert model.calls == 2 # Not attempted while open
+    time.sleep(0.06); assert breaker.state == "half_open"
+    assert client.generate_content("greeting", "Hi") == "back" and breaker.state == "closed"
+
+
+def test_half_open_allows_a_single_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    assert breaker.allow() and not breaker.allow() # Second caller waits for the probe's outcome
+    breaker.record_failure(); assert breaker.allow()
+
+
+def test_concurrency_is_capped():
+    running = []; peak = []; lock = threading.Lock()
+    class CountingModel:
+        def generate_content(self, prompt, **kwargs):
+            with lock: running.append(1); peak.append(len(running))
+            time.sleep(0.05)
+            with lock: running.pop()
+            return prompt
+    client = client_for(CountingModel(), max_concurrency=2)
+    threads = [threading.Thread(target=client.generate_content, args=("greeting", str(i))) for i in range(6)]
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+    assert max(peak) == 2 and client.stats()["calls"]["greeting"]["ok"] == 6
+
+
+def test_no_model_configured():
+    with pytest.raises(LLMUnavailableError): LLMClient(lambda: None).generate_content("greeting", "Hi")
+
+
+def test_timeout_override_scales_the_deadline():
+    client = client_for(ScriptedModel("done", delay=0.15), timeout=0.1, deadline=0.2, max_retries=0)
+    assert client.generate_content("evaluation_batch", "?", timeout=0.3) == "done"
+
+
+# --- Against the offline Gemini stand-in (fake_backends.py) ---
+def test_fake_model_failures_are_retried_with_exponential_backoff(monkeypatch):
+    import llm_client
+    delays = []
+    monkeypatch.setattr(llm_client.random, "uniform", lambda low, high: high) # Top of each jitter window
+    monkeypatch.setattr(llm_client.time, "sleep", delays.append)
+    model = FakeGenerativeModel(failure_rate=1.0)
+    client = client_for(model, max_retries=3, backoff_base=0.1, backoff_max=0.25)
+    with pytest.raises(FakeServiceUnavailable): client.generate_content("greeting", "Write two opening sentences.")
+    assert delays == [0.1, 0.2, 0.25] and model.stats() == {"greeting": 4}
+    assert client.stats()["calls"]["greeting"] == {"retry": 3, "error": 1}
+
+
+def test_fake_model_outage_opens_the_breaker_until_it_recovers():
+    model = FakeGenerativeModel(failure_rate=1.0); breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    client = client_for(model, max_retries=1, breaker=breaker)
+    with pytest.raises(FakeServiceUnavailable): client.generate_content("greeting", "Write two opening sentences.")
+    assert breaker.state == "closed" # One failed call, however many attempts
+    with pytest.raises(FakeServiceUnavailable): client.generate_content("greeting", "Write two opening sentences.")
+    with pytest.raises(CircuitOpenError): client.generate_content("greeting", "Write two opening sentences.")
+    assert model.stats() == {"greeting": 4}
+    model.failure_rate = 0.0; time.sleep(0.06)
+    assert client.generate_content("greeting", "Write two opening sentences.").text.startswith("Hello") and breaker.state == "closed"
+
+
+def test_waiting_for_a_slot_is_not_a_backend_failure():
+    breaker = CircuitBreaker(failure_threshold=1)
+    client = client_for(FakeGenerativeModel(latency=0.3), max_concurrency=1, timeout=0.05, deadline=0.1, max_retries=0, breaker=breaker)
+    with pytest.raises(LLMUnavailableError, match="timed out"): client.generate_content("greeting", "Hi") # Its thread runs on
+    breaker.record_success()
+    with pytest.raises(ConcurrencyLimitError): client.generate_content("greeting", "Hi")
+    assert breaker.state == "closed" and client.stats()["calls"]["greeting"]["saturated"] == 1
+
+
+def test_saturated_half_open_probe_lets_the_next_caller_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0); breaker.record_failure()
+    client = client_for(FakeGenerativeModel(latency=0.3), max_concurrency=1, timeout=0.05, deadline=0.1, max_retries=0, breaker=CircuitBreaker())
+    with pytest.raises(LLMUnavailableError): client.generate_content("greeting", "Hi") # Occupies the only slot
+    client.breaker = breaker
+    with pytest.raises(ConcurrencyLimitError): client.generate_content("greeting", "Hi")
+    assert breaker.allow() # The probe never reached the backend, so it is still available
+
+
+def test_async_calls_on_the_pool_hold_their_slot_until_the_thread_ends():
+    model = FakeGenerativeModel(latency=0.3)
+    class PoolOnlyModel: # No generate_content_async, so calls run on the client's thread pool
+        generate_content = staticmethod(model.generate_content)
+    client = client_for(PoolOnlyModel(), max_concurrency=1, timeout=0.05, deadline=0.1, max_retries=0)
+    async def scenario():
+        with pytest.raises(LLMUnavailableError, match="timed out"): await client.agenerate_content("greeting", "Hi")
+        with pytest.raises(ConcurrencyLimitError): await client.agenerate_content("greeting", "Hi") # Thread still running
+        model.latency = 0.0; await asyncio.sleep(0.3)
+        return await client.agenerate_content("greeting", "Hi")
+    assert asyncio.run(scenario()).text == "Okay."
+
+
+def test_async_semaphore_caps_concurrency():
+    model = FakeGenerativeModel(latency=0.05); running = []; peak = []
+    class CountingModel:
+        async def generate_content_async(self, prompt, **kwargs):
+            running.append(1); peak.append(len(running))
+            try: return await model.generate_content_async(prompt)
+            finally: running.pop()
+    client = client_for(CountingModel(), max_concurrency=2)
+    async def scenario(): return await asyncio.gather(*(client.agenerate_content("greeting", str(i)) for i in range(6)))
+    assert len(asyncio.run(scenario())) == 6 and max(peak) == 2 and model.stats() == {"other": 6}
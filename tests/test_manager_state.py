@@ -0,0 +1,51 @@
+# tests/test_manager_state.py (Compact interview state: diffs and schema migration)
+import json
+
+import pytest
+
+from interview_manager import STATE_SCHEMA_VERSION, InterviewManager, migrate_state
+
+
+def answered(questions, answers):
+    manager = InterviewManager(questions)
+    for i, text in enumerate(answers):
+        manager.current_question_index = i; manager.state = "PROCESSING_ANSWER"
+        manager.record_answer_and_evaluation(text, None)
+    manager.state = "ASKING_QUESTION"
+    return manager
+
+
+def test_diff_then_apply_patch_reaches_the_target():
+    source = answered(["First?", "Second?", "Third?"], ["One"])
+    target = InterviewManager.from_dict(source.to_dict()); before = target.snapshot()
+    target.set_evaluation(0, "Good")
+    target.current_question_index = 1; target.state = "PROCESSING_ANSWER"; target.record_answer_and_evaluation("Two", None)
+    target.state = "ACKNOWLEDGED_ANSWER"
+    patch = json.loads(json.dumps(target.diff(before))) # As stored: update indices become strings
+    assert set(patch) == {"set", "update", "append"} and patch["update"] == {"0": {"evaluation": "Good"}}
+    source.apply_patch(patch)
+    assert source.to_dict() == target.to_dict()
+
+
+def test_diff_is_empty_without_changes():
+    manager = answered(["First?"], ["One"])
+    assert manager.diff(manager.snapshot()) == {}
+    with pytest.raises(ValueError): manager.apply_patch({"set": {"questions": []}})
+
+
+def test_baseline_session_payload_is_migrated():
+    payload = {"questions": ["Intro?", "Project?", "Intro?"], "current_question_index": 2, "state": "ASKING_QUESTION",
+               "user_responses": [{"question": "Intro?", "answer": "Hi", "evaluation": "Ok", "flag": None, "follow_ups": []},
+                                  {"question": "Project?", "answer": "Built it", "evaluation": None, "flag": "inappropriate"},
+                                  {"question": "Intro?", "answer": "Again", "evaluation": None, "flag": None}]}
+    migrated = migrate_state(json.loads(json.dumps(payload)))
+    assert migrated["schema"] == STATE_SCHEMA_VERSION and "user_responses" not in migrated
+    assert migrated["responses"] == [[0, "Hi", "Ok", None], [1, "Built it", None, "inappropriate"], [2, "Again", None, None]]
+    manager = InterviewManager.from_dict(payload)
+    assert manager.user_responses == [{k: v for k, v in r.items() if k != "follow_ups"} for r in payload["user_responses"]]
+    assert manager.current_question_index == 2 and manager.state == "ASKING_QUESTION"
+    assert InterviewManager.from_dict(manager.to_dict()).to_dict() == manager.to_dict()
+
+
+def test_newer_schema_is_rejected():
+    with pytest.raises(ValueError): migrate_state({"schema": STATE_SCHEMA_VERSION + 1, "questions": ["Q?"]})
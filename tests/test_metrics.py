@@ -0,0 +1,74 @@
+# tests/test_metrics.py (Latency histograms, stage spans, Prometheus export and the slow-request profiler)
+import time
+import threading
+
+import metrics
+from metrics import Histogram, HistogramFamily, SlowRequestProfiler, render_prometheus, span
+
+
+def test_observations_land_in_the_first_bucket_that_fits():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0): histogram.observe(value)
+    snap = histogram.snapshot()
+    assert snap["buckets"] == [(0.1, 2), (1.0, 3), (float("inf"), 4)] # Cumulative, bounds inclusive
+    assert snap["count"] == 4 and snap["sum"] == 2.65
+
+
+def test_quantiles_are_bucket_upper_bounds():
+    histogram = Histogram(buckets=(0.01, 0.1, 1.0))
+    assert histogram.quantile(0.5) is None and histogram.summary()["mean"] is None
+    for _ in range(90): histogram.observe(0.005)
+    for _ in range(9): histogram.observe(0.05)
+    histogram.observe(5.0)
+    assert histogram.quantile(0.5) == 0.01 and histogram.quantile(0.95) == 0.1 and histogram.quantile(1.0) == float("inf")
+    assert histogram.summary()["p99"] == 0.1
+
+
+def test_family_keeps_one_histogram_per_label():
+    family = HistogramFamily(buckets=(1.0,))
+    family.observe("greeting", 0.5); family.observe("greeting", 0.7); family.observe("evaluation", 3.0)
+    counts = {label: h.snapshot()["count"] for label, h in family.items()}
+    assert counts == {"greeting": 2, "evaluation": 1} and family.labels("greeting") is family.labels("greeting")
+
+
+def test_prometheus_exposition():
+    family = HistogramFamily(buckets=(0.1, 1.0), label_names=("stage", "state"))
+    family.observe(("llm", "LISTENING"), 0.05); family.observe(("llm", "LISTENING"), 0.5); family.observe(("tts", 'say "hi"'), 2.0)
+    lines = render_prometheus([("stage_seconds", "Time per stage", family)]).splitlines()
+    assert lines[:2] == ["# HELP stage_seconds Time per stage", "# TYPE stage_seconds histogram"]
+    assert lines[2:7] == ['stage_seconds_bucket{stage="llm",state="LISTENING",le="0.1"} 1',
+                          'stage_seconds_bucket{stage="llm",state="LISTENING",le="1.0"} 2',
+                          'stage_seconds_bucket{stage="llm",state="LISTENING",le="+Inf"} 2',
+                          'stage_seconds_sum{stage="llm",state="LISTENING"} 0.55',
+                          'stage_seconds_count{stage="llm",state="LISTENING"} 2']
+    assert 'stage_seconds_count{stage="tts",state="say \\"hi\\""} 1' in lines # Label values are escaped
+
+
+def test_spans_are_tagged_with_the_current_state():
+    token = metrics.current_state.set("LISTENING")
+    try:
+        with span("test_stage"): pass
+        with span("test_stage", state="UPLOAD"): pass
+    finally: metrics.current_state.reset(token)
+    counts = {label: h.snapshot()["count"] for label, h in metrics.STAGES.items() if label[0] == "test_stage"}
+    assert counts == {("test_stage", "LISTENING"): 1, ("test_stage", "UPLOAD"): 1}
+
+
+def test_only_slow_requests_are_profiled():
+    profiler = SlowRequestProfiler(threshold=0.05, interval=0.005)
+    profiler.start_request("GET /fast"); assert profiler.end_request() is None
+    def slow(): profiler.start_request("POST /slow"); time.sleep(0.2); results.append(profiler.end_request())
+    results = []; worker = threading.Thread(target=slow); worker.start(); worker.join()
+    profile = results[0]
+    assert profile["request"] == "POST /slow" and profile["samples"] > 0 and "test_metrics.py:slow" in profile["top"][0]["stack"]
+    assert list(profiler.profiles) == [profile]
+
+
+def test_metrics_endpoint(client):
+    assert client.get('/ready').status_code in (200, 503)
+    response = client.get('/metrics')
+    assert response.status_code == 200 and response.mimetype == "text/plain"
+    body = response.get_data(as_text=True)
+    for name in ("http_request_seconds", "interview_stage_seconds", "interview_transition_seconds", "llm_call_seconds"):
+        assert f"# TYPE {name} histogram" in body
+    assert 'http_request_seconds_count{endpoint="readiness",method="GET",status="' in body
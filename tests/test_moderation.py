@@ -0,0 +1,51 @@
+# tests/test_moderation.py (Term normalization, matching and answer flags)
+import threading
+
+import pytest
+
+import moderation
+from interview_manager import InterviewManager
+from moderation import TermModerator, normalize
+
+
+@pytest.mark.parametrize("term", ["c++", "f*k", "!!"])
+def test_terms_that_normalize_to_almost_nothing_are_skipped(term):
+    moderator = TermModerator([("blocked", term)])
+    assert moderator.skipped_terms == [term] and moderator.term_count == 0
+    assert moderator.categories("I write C, C++ and some f# k") == []
+
+
+def test_short_plain_and_leetspeak_terms_are_kept():
+    moderator = TermModerator([("insult", "ho"), ("profanity", "a$$")])
+    assert moderator.skipped_terms == [] and moderator.term_count == 2
+    assert moderator.categories("what an a55") == ["profanity"] and moderator.categories("ho ho") == ["insult"]
+
+
+def test_normalize_maps_leetspeak_only_inside_words():
+    assert normalize("B@dword costs $100!") == ["badword", "costs", "100"]
+
+
+def test_term_file_categories_and_phrases(tmp_path):
+    path = tmp_path / "terms.txt"
+    path.write_text("legacy\n# comment\n[profanity]\nbadword\n[harassment]\nshut up # phrase\n", encoding="utf-8")
+    moderator = TermModerator.from_file(str(path))
+    assert moderator.stats()["categories"] == ["harassment", "inappropriate", "profanity"]
+    assert moderator.categories("Just shut up about the B@dword") == ["harassment", "profanity"]
+    assert moderator.categories("Shut the door; up next, badwords") == [] # Phrases in order, whole words only
+    assert [(m.category, m.term) for m in moderator.matches("legacy code")] == [("inappropriate", "legacy")]
+
+
+def test_counters_are_exact_under_concurrency():
+    moderator = TermModerator([("profanity", "badword")])
+    threads = [threading.Thread(target=lambda: [moderator.categories(text) for text in ("fine", "badword") * 500]) for _ in range(8)]
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+    assert moderator.stats()["scanned"] == 8000 and moderator.stats()["flagged"] == 4000
+
+
+def test_answers_are_flagged_with_their_categories():
+    manager = InterviewManager(["Q1?"]); manager.current_question_index = 0; manager.state = "PROCESSING_ANSWER"
+    moderation.set_moderator(TermModerator([("profanity", "badword")]))
+    try: manager.record_answer_and_evaluation("That was a b4dword idea.", None)
+    finally: moderation.set_moderator(None)
+    assert manager.user_responses[0]["flag"] == "profanity"
@@ -0,0 +1,70 @@
+# tests/test_phrase_library.py (Shared phrase library: fingerprints, near-duplicates and the usage log)
+from phrase_library import PhraseLibrary, fingerprint, tokens
+
+
+def test_fingerprint_ignores_case_punctuation_and_contractions():
+    assert tokens("What’s your  GREATEST strength?") == ["what", "is", "your", "greatest", "strength"]
+    assert fingerprint(tokens("What's your greatest strength?")) == fingerprint(tokens("what is your greatest strength"))
+    assert fingerprint(tokens("What is your greatest strength?")) != fingerprint(tokens("What is your greatest weakness?"))
+
+
+def test_resolve_maps_equivalent_lines_to_the_first_wording(tmp_path):
+    library = PhraseLibrary(str(tmp_path / "phrases.db"))
+    assert library.resolve("Tell me about a project you led.") == "Tell me about a project you led."
+    assert library.resolve("tell me about a project you led") == "Tell me about a project you led."
+    assert library.resolve("Okay, so tell me about the project you led.") == "Tell me about a project you led." # Only filler differs
+    assert library.resolve("Tell me about a project you failed.") == "Tell me about a project you failed."
+    assert library.resolve("   ") == "   "
+    assert library.stats()["near_duplicates"] == 1 and library.stats()["new_phrases"] == 2
+
+
+def test_near_duplicates_need_the_threshold(tmp_path):
+    strict = PhraseLibrary(str(tmp_path / "phrases.db"), near_dup_threshold=1.1) # Above 1 disables near-duplicates
+    strict.resolve("Tell me about a project you led.")
+    assert strict.resolve("So tell me about a project you led.") == "So tell me about a project you led."
+    reordered = PhraseLibrary(str(tmp_path / "other.db"))
+    reordered.resolve("Why did you leave your last job?")
+    assert reordered.resolve("Why did you leave your job last?") == "Why did you leave your job last?" # Same words, different sentence
+
+
+def test_usage_log_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "phrases.db")
+    first, second = PhraseLibrary(path, flush_seconds=3600), PhraseLibrary(path, flush_seconds=3600)
+    first.record("Thanks for that answer.", False, audio_seconds=2.0, synth_seconds=1.0)
+    for _ in range(3): first.record("thanks for that answer", True)
+    second.record("Next question.", False, audio_seconds=1.0, synth_seconds=0.5)
+    assert first.stats()["pending"] == 1 and first.top(5, min_uses=1) == ["Thanks for that answer."] # Only its own counts are flushed
+    second.flush()
+    assert first.top(5) == ["Thanks for that answer."] and first.top(5, min_uses=1) == ["Thanks for that answer.", "Next question."]
+    report = PhraseLibrary(path).report()
+    assert (report["phrases"], report["uses"], report["reuses"], report["renders"]) == (2, 5, 3, 2)
+    assert report["tts_seconds_spent"] == 1.5 and report["tts_seconds_saved"] == 3.0 and report["tts_seconds_saved_fraction"] == 0.6667
+
+
+def test_new_instance_loads_representatives_from_the_log(tmp_path):
+    path = str(tmp_path / "phrases.db")
+    first = PhraseLibrary(path); first.record("Let's begin with your background.", False, audio_seconds=2.5); first.flush()
+    second = PhraseLibrary(path)
+    assert second.resolve("Okay, let us begin with your background.") == "Let's begin with your background."
+    assert second.duration("let's begin with your background") == 2.5
+
+
+def test_text_to_speech_reuses_audio_for_equivalent_lines(web, monkeypatch, tmp_path):
+    tts = web.tts_interface
+    library = PhraseLibrary(str(tmp_path / "phrases.db"), flush_seconds=3600)
+    monkeypatch.setattr(tts, "phrase_library", library)
+    first = tts.text_to_speech("Could you walk me through your last release?", "ack")
+    assert first and tts.text_to_speech("could you walk me through your last release", "ack") == first
+    assert tts.cached_audio("So, could you walk me through your last release?") == first
+    stats = library.stats()
+    assert (stats["uses"], stats["renders"], stats["reuses"]) == (3, 1, 2) and tts.get_phrase_stats()["process"]["uses"] == 3
+
+
+def test_prerender_renders_the_most_used_phrases(web, monkeypatch, tmp_path):
+    tts = web.tts_interface; library = PhraseLibrary(str(tmp_path / "phrases.db"))
+    for _ in range(2): library.record("Tell me about your team.", True)
+    library.record("Seen only once.", True)
+    monkeypatch.setattr(tts, "phrase_library", library)
+    assert tts.prerender_phrases(10) == 1 and tts.cached_audio("Tell me about your team.")
+    monkeypatch.setattr(tts, "phrase_library", None)
+    assert tts.prerender_phrases(10) == 0 and tts.get_phrase_stats() is None
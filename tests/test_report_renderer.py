@@ -0,0 +1,90 @@
+# tests/test_report_renderer.py (Reports are rendered once per interview, across workers and restarts)
+import os
+import time
+
+import pytest
+
+from report_renderer import ReportRenderer
+
+REPORT = {"responses": [{"question": "Q1?", "answer": "A1", "evaluation": "Good."}]}
+
+
+class CountingRender:
+    def __init__(self): self.calls = 0
+    def __call__(self, report_data): self.calls += 1; return b"%PDF-1.4 test"
+
+
+def test_pdf_on_disk_is_not_rendered_again(tmp_path):
+    first_render, second_render = CountingRender(), CountingRender()
+    first = ReportRenderer(lambda interview_id: REPORT, first_render, str(tmp_path))
+    assert first.wait("abc123", timeout=5)["status"] == "ready" and first_render.calls == 1
+
+    prepared = []
+    second = ReportRenderer(lambda interview_id: prepared.append(interview_id) or REPORT, second_render, str(tmp_path)) # Another worker, or after a restart
+    job = second.submit("abc123")
+    assert job.done.is_set() and job.status == "ready" # Nothing queued
+    assert prepared == [] and second_render.calls == 0 and second.stats()["submitted"] == 0
+    assert second.status("abc123")["path"] == first.status("abc123")["path"]
+    assert second.report_data("abc123", timeout=5) == REPORT and prepared == ["abc123"] # Prepared on demand, not rendered
+
+
+def test_discarded_report_is_rendered_again(tmp_path):
+    render = CountingRender()
+    renderer = ReportRenderer(lambda interview_id: REPORT, render, str(tmp_path))
+    renderer.wait("abc123", timeout=5); renderer.discard("abc123")
+    assert renderer.wait("abc123", timeout=5)["status"] == "ready" and render.calls == 2
+
+
+def test_expired_reports_are_purged_at_most_once_per_interval(tmp_path):
+    renderer = ReportRenderer(lambda interview_id: REPORT, CountingRender(), str(tmp_path), ttl=60, purge_interval=3600)
+    old = tmp_path / "old123-k.pdf"; old.write_bytes(b"%PDF")
+    os.utime(old, (time.time() - 120, time.time() - 120))
+    renderer.submit("first1")
+    assert not old.exists()
+    old.write_bytes(b"%PDF"); os.utime(old, (time.time() - 120, time.time() - 120))
+    renderer.submit("second2")
+    assert old.exists() # Within the interval: no directory scan
+    renderer._next_purge = 0.0; renderer.submit("third3")
+    assert not old.exists()
+
+
+def test_counters_are_exact_with_parallel_builds(tmp_path):
+    def render(report_data):
+        if report_data["fail"]: raise RuntimeError("no fonts")
+        return b"%PDF-1.4 test"
+    renderer = ReportRenderer(lambda interview_id: {"fail": interview_id.startswith("bad")}, render, str(tmp_path), max_workers=8)
+    ids = [f"{kind}{i}" for i in range(40) for kind in ("ok", "bad")]
+    jobs = [renderer.submit(interview_id) for interview_id in ids]
+    for job in jobs: job.done.wait(5)
+    stats = renderer.stats()
+    assert (stats["submitted"], stats["rendered"], stats["failed"], stats["in_progress"]) == (80, 40, 40, 0)
+
+
+def test_failed_and_unavailable_builds(tmp_path):
+    def broken(report_data): raise RuntimeError("no fonts")
+    renderer = ReportRenderer(lambda interview_id: REPORT, broken, str(tmp_path / "failing"))
+    status = renderer.wait("abc123", timeout=5)
+    assert status["status"] == "failed" and status["error"] == "no fonts" and renderer.report_data("abc123") == REPORT
+    no_pdf = ReportRenderer(lambda interview_id: REPORT, None, str(tmp_path / "no_pdf"))
+    assert no_pdf.wait("abc123", timeout=5)["status"] == "unavailable" and no_pdf.report_data("abc123") == REPORT
+
+
+def test_unsafe_ids_are_rejected(tmp_path):
+    renderer = ReportRenderer(lambda interview_id: REPORT, CountingRender(), str(tmp_path))
+    with pytest.raises(ValueError): renderer.submit("../etc/passwd")
+
+
+def test_download_is_served_from_disk_with_an_etag(web, client, monkeypatch, tmp_path):
+    render = CountingRender()
+    monkeypatch.setattr(web, "WEASYPRINT_AVAILABLE", True); monkeypatch.setattr(web, "get_weasyprint", lambda: object())
+    monkeypatch.setattr(web, "report_renderer", ReportRenderer(web.prepare_report, render, str(tmp_path)))
+    manager = web.InterviewManager(["Only question?"]); manager.state = "FINISHED"; web.interview_store.create(manager)
+    with client.session_transaction() as session: session['interview_id'] = manager.interview_id
+    status = client.get('/report/status').get_json()
+    web.report_renderer.wait(manager.interview_id, timeout=5)
+    assert status["status"] in ("pending", "preparing", "rendering", "ready")
+    assert client.get('/report/status').get_json()["download_url"]
+    response = client.get('/download_report')
+    assert response.status_code == 200 and response.data == b"%PDF-1.4 test" and response.headers["ETag"]
+    assert client.get('/download_report', headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+    assert render.calls == 1
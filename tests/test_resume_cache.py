@@ -0,0 +1,52 @@
+# tests/test_resume_cache.py (Cache for extracted resume text and generated questions)
+import time
+
+import resume_cache
+from resume_cache import ResumeCache
+
+
+def test_keys_depend_on_everything_that_changes_the_result():
+    assert resume_cache.content_key(b"pdf", "pdf", "1") == resume_cache.content_key(b"pdf", "pdf", "1")
+    assert resume_cache.content_key(b"pdf", "pdf", "1") != resume_cache.content_key(b"pdf", "pdf", "2") # Extractor version
+    assert resume_cache.content_key(b"pdf", "pdf", "1") != resume_cache.content_key(b"pdf", "docx", "1")
+    assert resume_cache.text_key("resume", "1") != resume_cache.text_key("resume", "2") # Prompt version
+
+
+def test_both_levels_miss_then_hit(tmp_path):
+    cache = ResumeCache(str(tmp_path / "cache.db"))
+    assert cache.get_text("k") is None and cache.get_questions("k") is None
+    cache.put_text("k", "Extracted text"); cache.put_questions("k", ["Q1?", "Q2?"])
+    assert cache.get_text("k") == "Extracted text" and cache.get_questions("k") == ["Q1?", "Q2?"]
+    stats = cache.stats()
+    assert stats["text"]["hits"] == 1 and stats["text"]["misses"] == 1 and stats["text"]["hit_rate"] == 0.5
+    assert stats["questions"]["entries"] == 1
+
+
+def test_entries_are_shared_between_processes(tmp_path):
+    path = str(tmp_path / "cache.db")
+    ResumeCache(path).put_text("k", "Extracted text")
+    assert ResumeCache(path).get_text("k") == "Extracted text"
+
+
+def test_expired_entries_are_dropped(tmp_path):
+    cache = ResumeCache(str(tmp_path / "cache.db"), ttl=0.05)
+    cache.put_text("k", "Extracted text"); time.sleep(0.1)
+    assert cache.get_text("k") is None and cache.stats()["text"]["entries"] == 0
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResumeCache(str(tmp_path / "cache.db"), max_bytes=250)
+    cache.put_text("old", "x" * 100); cache.put_text("recent", "y" * 100)
+    time.sleep(0.01); cache.get_text("old") # "recent" is now the least recently used
+    cache.put_text("new", "z" * 100)
+    assert cache.get_text("recent") is None and cache.get_text("old") and cache.get_text("new")
+    assert cache.stats()["evictions"] == 1
+
+
+def test_question_generation_uses_the_cache(web, tmp_path, monkeypatch):
+    cache = ResumeCache(str(tmp_path / "cache.db")); monkeypatch.setattr(web, "resume_cache", cache)
+    cache.put_questions(resume_cache.text_key("My resume", web.QUESTION_PROMPT_VERSION), ["Cached Q?"])
+    assert web.generate_questions_with_gemini("My resume") == ["Cached Q?"]
+    monkeypatch.setattr(web, "get_gemini_model", lambda: None)
+    assert web.generate_questions_with_gemini("Another resume") == ["Gemini unavailable.", "Default Q."] # Fallbacks aren't cached
+    assert cache.stats()["questions"]["entries"] == 1
@@ -0,0 +1,51 @@
+# tests/test_resume_extractor.py (Bounded resume text extraction)
+import io
+
+import docx
+import pytest
+
+from resume_extractor import ResumeExtractor, ExtractionTimeout, extract_text
+
+
+def docx_bytes(*paragraphs):
+    document = docx.Document()
+    for paragraph in paragraphs: document.add_paragraph(paragraph)
+    buffer = io.BytesIO(); document.save(buffer)
+    return buffer.getvalue()
+
+
+def test_docx_text_is_normalized():
+    assert extract_text(docx_bytes("Jane  Doe", "", "Backend\tengineer\n"), "docx") == "Jane Doe Backend engineer"
+
+
+def test_text_is_capped_at_max_chars():
+    text = extract_text(docx_bytes(*["word " * 50] * 10), "docx", max_chars=120)
+    assert len(text) == 120 and text.startswith("word word")
+
+
+@pytest.mark.parametrize("data,file_type", [(b"not a docx", "docx"), (b"%PDF-garbage", "pdf"), (b"text", "txt")])
+def test_unreadable_files_raise_value_error(data, file_type):
+    with pytest.raises(ValueError): extract_text(data, file_type)
+
+
+def test_size_and_empty_checks_come_before_extraction():
+    extractor = ResumeExtractor(workers=0, max_bytes=100)
+    with pytest.raises(ValueError, match="too large"): extractor.extract(b"x" * 101, "pdf")
+    with pytest.raises(ValueError, match="empty"): extractor.extract(b"", "pdf")
+    assert extractor.stats()["extractions"] == 0
+
+
+def test_pool_timeout_kills_the_worker_and_recovers():
+    extractor = ResumeExtractor(workers=1, timeout=0.001) # Far less than a spawned worker needs to start
+    try:
+        with pytest.raises(ExtractionTimeout): extractor.extract(docx_bytes("Jane Doe"), "docx")
+        assert extractor._pool is None and extractor.stats()["timeouts"] == 1
+        extractor.timeout = 60
+        assert extractor.extract(docx_bytes("Jane Doe"), "docx") == "Jane Doe" # Fresh pool
+    finally: extractor.close()
+
+
+def test_upload_extracts_in_memory_and_starts_an_interview(web, client):
+    response = client.post('/upload', data={"resume": (io.BytesIO(docx_bytes("Jane Doe", "Backend engineer")), "resume.docx")})
+    assert response.status_code == 302 and response.headers["Location"].endswith("/interview")
+    with client.session_transaction() as session: assert web.interview_store.load(session["interview_id"]).questions
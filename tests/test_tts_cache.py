@@ -0,0 +1,58 @@
+# tests/test_tts_cache.py (Content-addressed TTS audio cache)
+import os
+
+from audio_store import AudioStore
+from tts_cache import TTSAudioCache, normalize_text
+
+
+def new_cache(directory, max_bytes):
+    return TTSAudioCache(AudioStore(str(directory), quota_bytes=10**9), max_bytes)
+
+
+def write_entry(cache, key, size):
+    temp_path = cache.temp_path_for(key)
+    with open(temp_path, "wb") as f: f.write(b"\0" * size)
+    return cache.commit(key, temp_path)
+
+
+def test_key_ignores_whitespace_but_not_voice_or_model():
+    key = TTSAudioCache.make_key("Hello  there\n", "voice", "model")
+    assert key == TTSAudioCache.make_key(" Hello there", "voice", "model")
+    assert key != TTSAudioCache.make_key("Hello there", "other-voice", "model")
+    assert key != TTSAudioCache.make_key("Hello there", "voice", "other-model")
+    assert normalize_text(None) == ""
+
+
+def test_miss_then_hit(tmp_path):
+    cache = new_cache(tmp_path, 10_000)
+    key = cache.make_key("Tell me about yourself.", "voice", "model")
+    assert cache.get(key) is None
+    filename = write_entry(cache, key, 500)
+    assert filename == f"tts_{key}.wav" and cache.store.resolve(filename)
+    assert cache.get(key) == filename
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1 and cache.stats()["entries"] == 1
+
+
+def test_file_written_by_another_worker_is_adopted(tmp_path):
+    writer, reader = new_cache(tmp_path, 10_000), new_cache(tmp_path, 10_000)
+    key = writer.make_key("Shared line", "voice", "model")
+    write_entry(writer, key, 300)
+    assert reader.get(key) == writer.filename_for(key) and reader.stats()["bytes"] == 300
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = new_cache(tmp_path, 1000)
+    old, recent, new = (cache.make_key(text, "v", "m") for text in ("old", "recent", "new"))
+    write_entry(cache, old, 400); write_entry(cache, recent, 400)
+    cache.get(old); cache.get(recent) # "old" is now the least recently used
+    write_entry(cache, new, 400)
+    assert cache.get(old) is None and not os.path.exists(cache.path_for(old))
+    assert cache.get(recent) and cache.get(new) and cache.stats()["evictions"] == 1
+
+
+def test_existing_files_are_indexed_on_startup(tmp_path):
+    first = new_cache(tmp_path, 10_000)
+    key = first.make_key("Persisted", "v", "m"); write_entry(first, key, 200)
+    (tmp_path / "unrelated.wav").write_bytes(b"x")
+    restarted = new_cache(tmp_path, 10_000)
+    assert restarted.stats()["entries"] == 1 and restarted.get(key)
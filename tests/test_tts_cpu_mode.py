@@ -0,0 +1,20 @@
+# tests/test_tts_cpu_mode.py (Accuracy guard of the CPU inference mode)
+import pytest
+
+
+@pytest.mark.parametrize("report,passes", [
+    ({"cosine": 0.99, "length_ratio": 1.02}, True),
+    ({"cosine": 0.90, "length_ratio": 1.0}, False), # Spectrogram drifted
+    ({"cosine": 0.99, "length_ratio": 1.30}, False), # Speech got much longer
+    ({"cosine": 0.99, "length_ratio": 0.80}, False),
+])
+def test_accuracy_guard(web, report, passes):
+    assert web.tts_interface._passes_accuracy_guard(report) is passes
+
+
+def test_compare_spectrograms_over_the_common_length(web):
+    torch = pytest.importorskip("torch")
+    reference = torch.ones(100, 80); candidate = torch.ones(110, 80)
+    report = web.tts_interface.compare_spectrograms(reference, candidate)
+    assert report == {"cosine": 1.0, "mean_abs_error": 0.0, "length_ratio": 1.1}
+    assert web.tts_interface.compare_spectrograms(reference, -candidate)["cosine"] == -1.0
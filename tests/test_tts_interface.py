@@ -0,0 +1,37 @@
+# tests/test_tts_interface.py (Audio encoding, file naming and the audio route)
+import time
+
+import numpy as np
+import soundfile as sf
+
+
+def test_uncached_renders_never_share_a_file(web, monkeypatch):
+    tts = web.tts_interface
+    monkeypatch.setattr(time, "time", lambda: 1700000000.0) # Both renders land in the same millisecond
+    samples = np.zeros(1600, dtype=np.float32)
+    first = tts._save_audio(samples, None, "ack_0", time.perf_counter())
+    second = tts._save_audio(samples, None, "ack_0", time.perf_counter())
+    assert first != second
+    assert tts.wait_for_audio(first) and tts.wait_for_audio(second)
+
+
+def test_audio_is_encoded_off_the_request_thread_as_16_bit_wav(web):
+    tts = web.tts_interface
+    filename = tts._save_audio(np.full(1600, 2.0, dtype=np.float32), None, "greeting", time.perf_counter())
+    assert tts.wait_for_audio(filename) and tts.wait_for_audio("never-rendered.wav") # Nothing pending: nothing to wait for
+    path = tts.get_audio_filepath(filename)
+    samples, rate = sf.read(path, dtype="int16")
+    assert rate == tts.SAMPLE_RATE and len(samples) == 1600 and samples.max() == 32767 # Clipped, not wrapped
+    assert sf.info(path).subtype == "PCM_16"
+
+
+def test_audio_route_supports_etags_and_ranges(web, client):
+    tts = web.tts_interface
+    filename = tts._save_audio(np.zeros(1600, dtype=np.float32), None, "question_0", time.perf_counter())
+    response = client.get(f"/audio/{filename}")
+    assert response.status_code == 200 and response.mimetype == "audio/wav" and response.headers["Accept-Ranges"] == "bytes"
+    assert response.cache_control.max_age == web.AUDIO_MAX_AGE
+    assert client.get(f"/audio/{filename}", headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+    partial = client.get(f"/audio/{filename}", headers={"Range": "bytes=0-99"})
+    assert partial.status_code == 206 and partial.data == response.data[:100]
+    assert client.get("/audio/..%2Fapp.py").status_code in (400, 404)
@@ -0,0 +1,70 @@
+# tests/test_tts_prefetch.py (Background pre-synthesis of question audio)
+import time
+import threading
+
+from tts_prefetch import QuestionAudioPrefetcher
+
+QUESTIONS = ["First question?", "Second question?", "Third question?", "Fourth question?"]
+
+
+class GatedSynth:
+    """Synthesizer that records what it renders and holds each job until released."""
+
+    def __init__(self):
+        self.rendered = []; self.started = threading.Event(); self.release = threading.Event()
+
+    def __call__(self, text, filename_prefix, interview_id=None):
+        self.started.set(); self.release.wait(5)
+        self.rendered.append(text)
+        return f"{filename_prefix}.wav"
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_take_returns_the_prerendered_file():
+    synth = GatedSynth()
+    prefetcher = QuestionAudioPrefetcher(synth, max_workers=1)
+    prefetcher.schedule("interview", QUESTIONS[:1]); synth.started.wait(5)
+    threading.Timer(0.05, synth.release.set).start()
+    assert prefetcher.take("interview", 0, QUESTIONS[0]) == "question_0.wav" # Waits for the render in progress
+    assert prefetcher.take("interview", 0, QUESTIONS[0]) == "question_0.wav"
+    assert prefetcher.take("interview", 0, "Edited question?") is None # Text changed: caller synthesizes
+    assert prefetcher.take("other", 0, QUESTIONS[0]) is None
+    stats = prefetcher.stats()
+    assert stats["rendered"] == 1 and stats["waited"] == 1 and stats["ready_hits"] == 1 and stats["misses"] == 2
+
+
+def test_taking_a_queued_question_claims_it():
+    synth = GatedSynth()
+    prefetcher = QuestionAudioPrefetcher(synth, max_workers=1)
+    prefetcher.schedule("interview", QUESTIONS[:2]); synth.started.wait(5) # Q0 is rendering
+    assert prefetcher.take("interview", 1, QUESTIONS[1]) is None # Still queued: the caller renders it instead
+    synth.release.set()
+    assert prefetcher.take("interview", 0, QUESTIONS[0]) == "question_0.wav"
+    wait_until(lambda: prefetcher.stats()["queued"] == 0); time.sleep(0.05)
+    assert synth.rendered == [QUESTIONS[0]]
+
+
+def test_prioritized_question_is_rendered_next():
+    synth = GatedSynth()
+    prefetcher = QuestionAudioPrefetcher(synth, max_workers=1)
+    prefetcher.schedule("interview", QUESTIONS); synth.started.wait(5)
+    prefetcher.prioritize("interview", 3); synth.release.set()
+    wait_until(lambda: len(synth.rendered) == len(QUESTIONS))
+    assert synth.rendered == [QUESTIONS[0], QUESTIONS[3], QUESTIONS[1], QUESTIONS[2]]
+
+
+def test_cancel_drops_queued_work():
+    synth = GatedSynth()
+    prefetcher = QuestionAudioPrefetcher(synth, max_workers=1)
+    prefetcher.schedule("interview", QUESTIONS); synth.started.wait(5)
+    prefetcher.cancel("interview"); synth.release.set()
+    prefetcher.schedule("next", QUESTIONS[:1])
+    wait_until(lambda: prefetcher.stats()["rendered"] == 2)
+    assert synth.rendered == [QUESTIONS[0], QUESTIONS[0]] # Q0 of each interview; the cancelled rest never ran
+    assert prefetcher.stats()["cancelled"] == 3 and prefetcher.stats()["active_interviews"] == 1
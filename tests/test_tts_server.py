@@ -0,0 +1,83 @@
+# tests/test_tts_server.py (Request batching, connection key and socket permissions of the shared TTS server)
+import os
+import stat
+import sys
+import time
+import threading
+from multiprocessing import AuthenticationError
+
+import numpy as np
+import pytest
+
+import tts_server
+
+posix_only = pytest.mark.skipif(sys.platform == "win32", reason="Unix sockets and file modes")
+
+
+@pytest.fixture
+def key_file(tmp_path, monkeypatch):
+    path = tmp_path / "tts_server.key"
+    monkeypatch.setattr(tts_server, "TTS_SERVER_AUTHKEY", ""); monkeypatch.setattr(tts_server, "TTS_SERVER_AUTHKEY_FILE", str(path))
+    return path
+
+
+def test_client_refuses_to_start_without_a_key(key_file):
+    with pytest.raises(RuntimeError, match="No TTS server key"): tts_server.TTSServerClient()
+    assert not key_file.exists() # Only the server creates one
+
+
+def test_server_refuses_to_start_without_a_usable_key(tmp_path, monkeypatch):
+    monkeypatch.setattr(tts_server, "TTS_SERVER_AUTHKEY", "")
+    monkeypatch.setattr(tts_server, "TTS_SERVER_AUTHKEY_FILE", str(tmp_path / "missing-dir" / "tts_server.key"))
+    with pytest.raises(RuntimeError, match="No TTS server key"): tts_server.TTSInferenceServer() # Never falls back to a built-in key
+
+
+def test_env_key_wins(key_file, monkeypatch):
+    monkeypatch.setattr(tts_server, "TTS_SERVER_AUTHKEY", "from-env")
+    assert tts_server.load_authkey(create=True) == b"from-env" and not key_file.exists()
+
+
+@posix_only
+def test_server_creates_a_private_random_key(key_file):
+    key = tts_server.load_authkey(create=True)
+    assert len(key) == 64 and stat.S_IMODE(key_file.stat().st_mode) == 0o600
+    assert tts_server.load_authkey(create=True) == key == tts_server.load_authkey() # Reused, and shared with clients
+
+
+@posix_only
+def test_key_file_readable_by_others_is_refused(key_file):
+    key_file.write_text("secret"); key_file.chmod(0o644)
+    with pytest.raises(RuntimeError, match="chmod 600"): tts_server.load_authkey()
+
+
+@posix_only
+def test_socket_is_owner_only_and_checks_the_key(key_file, tmp_path, monkeypatch):
+    import tts_interface
+    monkeypatch.setattr(tts_interface, "load_models", lambda: True) # No model needed for "info"
+    address = str(tmp_path / "tts.sock")
+    server = tts_server.TTSInferenceServer(address=address)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    for _ in range(100):
+        if os.path.exists(address): break
+        time.sleep(0.02)
+    time.sleep(0.05) # chmod follows the bind
+    assert stat.S_IMODE(os.stat(address).st_mode) == 0o600
+    assert "voice_id" in tts_server.TTSServerClient(address=address)._call({"op": "info"})
+    with pytest.raises(AuthenticationError): tts_server.TTSServerClient(address=address, authkey=b"wrong")._connection()
+
+
+def test_queued_requests_are_synthesized_as_one_batch():
+    server = tts_server.TTSInferenceServer(authkey=b"test", max_batch_size=4, batch_wait_ms=50)
+    batches = []
+    class FakeTTS:
+        @staticmethod
+        def synthesize_batch(texts): batches.append(list(texts)); return [np.zeros(len(text), dtype=np.float32) for text in texts]
+    server._tts = FakeTTS
+    requests = [tts_server._Request(f"line {i}") for i in range(6)]
+    for request in requests: server._queue.put(request)
+    threading.Thread(target=server._batch_loop, daemon=True).start()
+    assert all(request.done.wait(5) for request in requests)
+    assert batches == [["line 0", "line 1", "line 2", "line 3"], ["line 4", "line 5"]]
+    assert [len(request.audio) for request in requests] == [6] * 6
+    stats = server.get_stats()
+    assert stats["requests"] == 6 and stats["batch_size_counts"] == {4: 1, 2: 1} and stats["mean_batch_size"] == 3.0
@@ -0,0 +1,43 @@
+# tests/test_tts_streaming.py (Sentence-chunked streaming TTS)
+import struct
+
+import numpy as np
+
+
+def test_split_sentences_merges_fragments_and_cuts_long_ones(web):
+    split = web.tts_interface.split_sentences
+    assert split("Thanks. Okay! Next question: tell me about a project you led?") == ["Thanks. Okay!", "Next question: tell me about a project you led?"]
+    assert split("  ") == []
+    chunks = split("First, " + "a" * 150 + ", then " + "b" * 100 + ".", max_chars=200)
+    assert all(len(chunk) <= 200 for chunk in chunks) and chunks[0].endswith(",")
+
+
+def test_stream_wav_yields_header_then_one_chunk_per_sentence(web, monkeypatch):
+    tts = web.tts_interface; rendered = []
+    monkeypatch.setattr(tts, "_models_ready", lambda: True)
+    monkeypatch.setattr(tts, "_synthesize", lambda text: rendered.append(text) or np.full(160, 0.5, dtype=np.float32))
+    monkeypatch.setattr(tts, "audio_cache", None)
+    text = "This is the first sentence of the answer. And this is the second one, a bit longer."
+    parts = list(tts.stream_wav(text))
+    header = parts[0]
+    assert header[:4] == b"RIFF" and header[8:12] == b"WAVE" and len(header) == 44
+    assert struct.unpack("<I", header[24:28])[0] == tts.SAMPLE_RATE
+    assert rendered == tts.split_sentences(text) and len(parts) == 1 + len(rendered)
+    assert all(len(part) == 320 for part in parts[1:]) # 16-bit samples
+
+
+def test_stream_wav_without_models_is_just_a_header(web, monkeypatch):
+    monkeypatch.setattr(web.tts_interface, "_models_ready", lambda: False)
+    assert len(list(web.tts_interface.stream_wav("Hello there."))) == 1
+
+
+def test_stream_endpoint_rejects_bad_tokens(client):
+    assert client.get('/audio/stream/not-a-token').status_code == 404
+
+
+def test_stream_endpoint_serves_signed_text(web, client, monkeypatch):
+    monkeypatch.setattr(web.tts_interface, "ENABLE_HF_TTS", True)
+    monkeypatch.setattr(web.tts_interface, "stream_wav", lambda text: iter([b"RIFF", text.encode()]))
+    response = client.get(f"/audio/stream/{web.stream_token_serializer.dumps('Hello there.')}")
+    assert response.status_code == 200 and response.mimetype == "audio/wav"
+    assert response.headers["Cache-Control"] == "no-store" and response.data == b"RIFFHello there."
@@ -0,0 +1,32 @@
+# tests/test_warmup.py (Lazy loading of heavy dependencies and the readiness endpoint)
+import hashlib
+
+import numpy as np
+
+
+def fail_if_called(*args, **kwargs): raise AssertionError("should not be called")
+
+
+def test_ready_is_503_until_tts_is_warm(web, client, monkeypatch):
+    web.get_gemini_model() # Configured on first use; the fake backend is ready at once
+    monkeypatch.setattr(web.tts_interface, "get_status", lambda: {"enabled": True, "ready": False})
+    response = client.get('/ready')
+    assert response.status_code == 503 and response.json["ready"] is False and response.json["warmup"] == "lazy"
+    monkeypatch.setattr(web.tts_interface, "get_status", lambda: {"enabled": True, "ready": True})
+    response = client.get('/ready')
+    assert response.status_code == 200 and set(response.json["components"]) == {"tts", "gemini", "weasyprint"}
+
+
+def test_gemini_disabled_without_a_key(web, monkeypatch):
+    monkeypatch.setattr(web, "GEMINI_API_KEY", None); monkeypatch.setattr(web, "gemini_model", None)
+    assert web.get_gemini_model() is None
+    assert web.call_gemini(web.greeting_request()) == "Hello! Let's begin." # Fallback line, no import of google.generativeai
+
+
+def test_voice_id_comes_from_the_saved_xvector_without_loading_the_model(web, tmp_path, monkeypatch):
+    tts = web.tts_interface; xvector = np.arange(512, dtype=np.float32)
+    path = tmp_path / "speaker.npy"; np.save(path, xvector)
+    monkeypatch.setattr(tts, "SPEAKER_EMBEDDING_PATH", str(path)); monkeypatch.setattr(tts, "voice_id", None)
+    monkeypatch.setattr(tts, "tts_client", None) # In-process model, as with TTS_BACKEND=local
+    monkeypatch.setattr(tts, "load_models", fail_if_called)
+    assert tts._voice_id() == hashlib.sha1(xvector.tobytes()).hexdigest()[:16]
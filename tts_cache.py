@@ -0,0 +1,115 @@
+# tts_cache.py (Content-addressed cache for synthesized audio)
+import os
+import re
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+
+log = logging.getLogger(__name__)
+
+CACHE_FILE_PREFIX = "tts_"
+
+
+def normalize_text(text):
+    """Collapses whitespace so trivially different strings share one cache entry."""
+    return re.sub(r'\s+', ' ', text or '').strip()
+
+
+class TTSAudioCache:
+    """LRU index over content-addressed audio files kept in the audio store.
+
+    Files are named ``tts_<key>.<ext>`` so they can be served by the normal audio
+    route. The in-memory index only tracks recency and sizes; the files on disk are
+    the source of truth, which lets several worker processes share one directory.
+    """
+
+    def __init__(self, store, max_bytes, extension="wav"):
+        self.store = store # audio_store.AudioStore: paths, sharding and deletion
+        self.max_bytes = max_bytes
+        self.extension = extension
+        self._index = OrderedDict() # key -> size in bytes, oldest first
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0; self.misses = 0; self.evictions = 0
+        self._load_existing()
+
+    def _load_existing(self):
+        """Rebuilds the index from files left by earlier runs (oldest first)."""
+        pattern = re.compile(rf'^{CACHE_FILE_PREFIX}([0-9a-f]+)\.{re.escape(self.extension)}$')
+        found = []
+        for name, path in self.store.list_files():
+            match = pattern.match(name)
+            if not match: continue
+            try: st = os.stat(path)
+            except OSError: continue
+            found.append((st.st_mtime, match.group(1), st.st_size))
+        for _, key, size in sorted(found):
+            self._index[key] = size; self._total_bytes += size
+        if found: log.info("TTS Cache: Indexed %s existing entries (%s bytes).", len(found), self._total_bytes)
+        with self._lock: self._evict_locked(keep=None)
+
+    @staticmethod
+    def make_key(text, voice_id, model_id, *extra):
+        """Hashes normalized text together with everything else that shapes the audio."""
+        parts = [model_id, voice_id, *[str(e) for e in extra], normalize_text(text)]
+        return hashlib.sha256('\x00'.join(parts).encode('utf-8')).hexdigest()[:32]
+
+    def filename_for(self, key): return f"{CACHE_FILE_PREFIX}{key}.{self.extension}"
+    def path_for(self, key): return self.store.path_for(self.filename_for(key))
+
+    def get(self, key):
+        """Returns the cached filename for key, or None on a miss."""
+        path = self.store.resolve(self.filename_for(key))
+        with self._lock:
+            if key in self._index:
+                if path:
+                    self._index.move_to_end(key); self.hits += 1
+                    return self.filename_for(key)
+                # File removed behind our back (another worker evicted it)
+                self._total_bytes -= self._index.pop(key)
+            elif path:
+                # Written by another worker process; adopt it into our index
+                try: size = os.path.getsize(path)
+                except OSError: size = None
+                if size:
+                    self._index[key] = size; self._total_bytes += size; self.hits += 1
+                    self._evict_locked(keep=key)
+                    return self.filename_for(key)
+            self.misses += 1
+            return None
+
+    def temp_path_for(self, key):
+        """Per-writer temp path; rename it into place with commit()."""
+        return f"{self.path_for(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    def commit(self, key, temp_path):
+        """Atomically moves a finished temp file into the cache and enforces the size cap."""
+        path = self.path_for(key)
+        os.replace(temp_path, path)
+        size = os.path.getsize(path)
+        self.store.register(self.filename_for(key))
+        with self._lock:
+            if key in self._index: self._total_bytes -= self._index.pop(key)
+            self._index[key] = size; self._total_bytes += size
+            self._evict_locked(keep=key)
+        return self.filename_for(key)
+
+    def _evict_locked(self, keep):
+        """Drops least-recently-used entries until under max_bytes. Caller holds the lock."""
+        while self._total_bytes > self.max_bytes and self._index:
+            key = next(iter(self._index))
+            if key == keep:
+                if len(self._index) == 1: break
+                self._index.move_to_end(key); continue
+            size = self._index.pop(key); self._total_bytes -= size; self.evictions += 1
+            self.store.delete(self.filename_for(key))
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._index), "bytes": self._total_bytes, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -1,16 +1,66 @@
 # tts_interface.py (Using Speaker Index 6000)
 import os
+import re
 import time
-import torch
+import atexit
+import struct
+import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import soundfile as sf
-from transformers import SpeechT5Processor, SpeechT5ForTextToSpeech, SpeechT5HifiGan
-from datasets import load_dataset
-import traceback # Import traceback
+import hashlib
+import uuid
+from tts_cache import TTSAudioCache
+from phrase_library import PhraseLibrary
+from audio_store import AudioStore
+import tts_server
+from metrics import span
+# torch/transformers/datasets are imported on first model load (see load_models) to keep startup fast
+
+log = logging.getLogger(__name__)
 
 # Configuration
 AUDIO_OUTPUT_DIR = "generated_audio"
 ENABLE_HF_TTS = True # Set to False to disable TTS generation for testing flow
-DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+DEVICE = None # "cuda" if available, else "cpu"; decided when the models load
+TTS_MODEL_ID = "microsoft/speecht5_tts"; VOCODER_MODEL_ID = "microsoft/speecht5_hifigan"
+ENABLE_TTS_CACHE = os.getenv("TTS_CACHE_ENABLED", "1") == "1" # Reuse audio for repeated text
+TTS_CACHE_MAX_MB = int(os.getenv("TTS_CACHE_MAX_MB", "512"))
+# Shared phrase library (needs the cache): equivalent lines share audio, uses are logged fleet-wide, top phrases pre-rendered
+ENABLE_PHRASE_LIBRARY = os.getenv("PHRASE_LIBRARY_ENABLED", "1") == "1"
+PHRASE_LIBRARY_PATH = os.getenv("PHRASE_LIBRARY_PATH", "phrase_library.db")
+PHRASE_NEAR_DUP_THRESHOLD = float(os.getenv("PHRASE_NEAR_DUP_THRESHOLD", "0.8")) # Word-shingle Jaccard; above 1 disables near-duplicates
+PHRASE_PRERENDER_COUNT = int(os.getenv("PHRASE_PRERENDER_COUNT", "50")) # Most used phrases rendered at warm-up
+# Global disk quota for AUDIO_OUTPUT_DIR and lifetimes of per-interview audio (see audio_store.py)
+AUDIO_STORE_QUOTA_MB = int(os.getenv("AUDIO_STORE_QUOTA_MB", "2048"))
+AUDIO_SESSION_TTL = int(os.getenv("AUDIO_SESSION_TTL", "3600")) # Idle interviews expire after this many seconds
+AUDIO_FINISHED_GRACE = int(os.getenv("AUDIO_FINISHED_GRACE", "300")) # Keep audio this long after FINISHED (closing line playback)
+SAMPLE_RATE = 16000 # SpeechT5 output rate
+# Output encoding: "wav16" (16-bit PCM WAV, default), "opus" (OGG/Opus, ~10x smaller), "wav_float" (old 32-bit float WAV)
+AUDIO_FORMATS = {"wav16": ("wav", "WAV", "PCM_16"), "opus": ("ogg", "OGG", "OPUS"), "wav_float": ("wav", "WAV", "FLOAT")}
+AUDIO_FORMAT = os.getenv("TTS_AUDIO_FORMAT", "wav16")
+if AUDIO_FORMAT not in AUDIO_FORMATS:
+    log.warning("TTS Interface: Unknown TTS_AUDIO_FORMAT '%s', using wav16.", AUDIO_FORMAT); AUDIO_FORMAT = "wav16"
+if AUDIO_FORMAT == "opus" and "OPUS" not in sf.available_subtypes("OGG"):
+    log.warning("TTS Interface: This libsndfile build has no Opus support (needs >= 1.0.29); using wav16."); AUDIO_FORMAT = "wav16"
+AUDIO_EXTENSION, _SF_FORMAT, _SF_SUBTYPE = AUDIO_FORMATS[AUDIO_FORMAT]
+TTS_ENCODER_WORKERS = int(os.getenv("TTS_ENCODER_WORKERS", "2")) # Encoding/writing runs off the request thread
+# "local": load the model in this process. "server": send synthesis to the shared tts_server.py process
+# "fake": synthetic tone with configurable latency (fake_backends.py; offline runs and load tests)
+TTS_BACKEND = os.getenv("TTS_BACKEND", "local")
+# CPU inference mode (opt-in): int8 dynamic quantization of Linear layers + optional traced/compiled vocoder
+TTS_CPU_OPTIMIZE = os.getenv("TTS_CPU_OPTIMIZE", "0") == "1"
+TTS_NUM_THREADS = int(os.getenv("TTS_NUM_THREADS", "0")) # intra-op threads per worker; 0 keeps torch's default
+TTS_VOCODER_MODE = os.getenv("TTS_VOCODER_MODE", "eager") # "eager", "trace" or "compile" (used with TTS_CPU_OPTIMIZE)
+# Accuracy guard: optimized output must stay this close to the fp32 spectrogram or it is discarded
+TTS_MIN_SPECTROGRAM_COSINE = float(os.getenv("TTS_MIN_SPECTROGRAM_COSINE", "0.95"))
+TTS_MAX_LENGTH_DRIFT = float(os.getenv("TTS_MAX_LENGTH_DRIFT", "0.15"))
+ACCURACY_REFERENCE_TEXT = "Tell me about a project you are proud of, and what you learned from it."
+SPEAKER_INDEX = 6000 # *** USING SPEAKER INDEX 6000 (Often 'slt' - female) ***
+# The one x-vector we need, saved locally so the datasets library is only touched once
+SPEAKER_EMBEDDING_PATH = os.getenv("TTS_SPEAKER_EMBEDDING", f"speaker_embedding_{SPEAKER_INDEX}.npy")
 
 # Ensure audio directory exists
 if not os.path.exists(AUDIO_OUTPUT_DIR):
@@ -18,96 +68,416 @@ if not os.path.exists(AUDIO_OUTPUT_DIR):
 
 # --- Hugging Face TTS Model Loading ---
 processor = None; model = None; vocoder = None; speaker_embeddings = None
-embeddings_dataset = None # Define it here
+fast_vocoder = None # Traced/compiled vocoder for single (unbatched) spectrograms, if enabled
+voice_id = None # Fingerprint of the speaker embedding, part of the cache key
+_load_lock = threading.Lock()
+_load_state = {"loading": False, "loaded": False, "error": None, "seconds": None, "optimizations": {}}
+
+def _load_speaker_xvector():
+    """Returns the speaker x-vector as float32, reading the local .npy file when present."""
+    if os.path.exists(SPEAKER_EMBEDDING_PATH): return np.load(SPEAKER_EMBEDDING_PATH).astype(np.float32)
+    log.warning("TTS Interface: Speaker embedding file missing; extracting it from the CMU ARCTIC x-vectors dataset (one-time)...")
+    from datasets import load_dataset
+    embeddings_dataset = load_dataset("Matthijs/cmu-arctic-xvectors", split="validation")
+    speaker_index = SPEAKER_INDEX
+    # Validate index and load embedding
+    if speaker_index >= len(embeddings_dataset):
+        log.warning("TTS Interface: Speaker index %s out of bounds (%s available). Using index 0.", speaker_index, len(embeddings_dataset))
+        speaker_index = 0 # Fallback to 0 if index is too high
+    xvector = np.asarray(embeddings_dataset[speaker_index]["xvector"], dtype=np.float32)
+    try: np.save(SPEAKER_EMBEDDING_PATH, xvector); log.info("TTS Interface: Saved speaker embedding to '%s'.", SPEAKER_EMBEDDING_PATH)
+    except OSError as e: log.error("TTS Interface: Could not save speaker embedding: %s", e)
+    return xvector
+
+def load_models():
+    """Loads processor, model, vocoder and speaker embedding once. Safe to call from any thread.
+
+    Returns True when the models are usable. On failure TTS is disabled, as before.
+    """
+    global processor, model, vocoder, speaker_embeddings, voice_id, DEVICE, ENABLE_HF_TTS
+    if _load_state["loaded"] or not ENABLE_HF_TTS or TTS_BACKEND != "local": return _load_state["loaded"]
+    with _load_lock:
+        if _load_state["loaded"] or not ENABLE_HF_TTS: return _load_state["loaded"]
+        _load_state["loading"] = True; start_time = time.time()
+        try:
+            import torch
+            from transformers import SpeechT5Processor, SpeechT5ForTextToSpeech, SpeechT5HifiGan
+            DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+            log.info("TTS Interface: Loading HF TTS models on device: %s...", DEVICE)
+            processor = SpeechT5Processor.from_pretrained(TTS_MODEL_ID)
+            model = SpeechT5ForTextToSpeech.from_pretrained(TTS_MODEL_ID).to(DEVICE)
+            vocoder = SpeechT5HifiGan.from_pretrained(VOCODER_MODEL_ID).to(DEVICE)
+
+            log.info("TTS Interface: Loading speaker embeddings...")
+            xvector = _load_speaker_xvector()
+            speaker_embeddings = torch.from_numpy(xvector).unsqueeze(0).to(DEVICE)
+            voice_id = hashlib.sha1(xvector.tobytes()).hexdigest()[:16]
+            log.info("TTS Interface: Using speaker embedding index: %s", SPEAKER_INDEX)
+
+            if TTS_NUM_THREADS > 0: torch.set_num_threads(TTS_NUM_THREADS); _load_state["optimizations"]["threads"] = TTS_NUM_THREADS
+            if TTS_CPU_OPTIMIZE and DEVICE == "cpu": _apply_cpu_optimizations()
 
-if ENABLE_HF_TTS:
+            _load_state["loaded"] = True; _load_state["seconds"] = round(time.time() - start_time, 2)
+            log.info("TTS Interface: HF TTS models and embeddings loaded successfully in %ss.", _load_state['seconds'])
+
+        except ImportError:
+            log.warning("TTS Interface: Required libraries (transformers, datasets, torch, soundfile) not found. Disabling TTS.")
+            ENABLE_HF_TTS = False; _load_state["error"] = "missing libraries"
+        except Exception as e:
+            log.exception("TTS Interface: Error loading HF TTS model or embeddings: %s. Disabling TTS.", e)
+            ENABLE_HF_TTS = False; _load_state["error"] = str(e)
+        finally:
+            _load_state["loading"] = False
+    return _load_state["loaded"]
+
+def _reference_spectrogram(tts_model, text=ACCURACY_REFERENCE_TEXT):
+    import torch
+    inputs = processor(text=_preprocess(text), return_tensors="pt").to(DEVICE)
+    with torch.inference_mode(): return tts_model.generate_speech(inputs["input_ids"], speaker_embeddings)
+
+def compare_spectrograms(reference, candidate):
+    """Similarity of a candidate spectrogram to the fp32 reference (over their common length)."""
+    import torch
+    frames = min(reference.shape[0], candidate.shape[0])
+    ref = reference[:frames].flatten().float(); cand = candidate[:frames].flatten().float()
+    return {
+        "cosine": round(float(torch.nn.functional.cosine_similarity(ref, cand, dim=0)), 4),
+        "mean_abs_error": round(float((ref - cand).abs().mean()), 4),
+        "length_ratio": round(candidate.shape[0] / max(1, reference.shape[0]), 3),
+    }
+
+def _passes_accuracy_guard(report):
+    return report["cosine"] >= TTS_MIN_SPECTROGRAM_COSINE and abs(1.0 - report["length_ratio"]) <= TTS_MAX_LENGTH_DRIFT
+
+def _apply_cpu_optimizations():
+    """Quantizes the acoustic model and optionally traces/compiles the vocoder, keeping fp32 if accuracy drops."""
+    global model, fast_vocoder
+    import torch
+    applied = _load_state["optimizations"]
+    baseline = _reference_spectrogram(model)
     try:
-        print(f"TTS Interface: Loading HF TTS models on device: {DEVICE}...")
-        # Load models only once
-        if processor is None: processor = SpeechT5Processor.from_pretrained("microsoft/speecht5_tts")
-        if model is None: model = SpeechT5ForTextToSpeech.from_pretrained("microsoft/speecht5_tts").to(DEVICE)
-        if vocoder is None: vocoder = SpeechT5HifiGan.from_pretrained("microsoft/speecht5_hifigan").to(DEVICE)
-
-        print("TTS Interface: Loading speaker embeddings...")
-        # Load dataset only once
-        if embeddings_dataset is None: embeddings_dataset = load_dataset("Matthijs/cmu-arctic-xvectors", split="validation")
-
-        # *** USING SPEAKER INDEX 6000 (Often 'slt' - female) ***
-        speaker_index = 6000 # Changed to 6000
-        # *** END CHANGE ***
-
-        # Validate index and load embedding
-        if speaker_index >= len(embeddings_dataset):
-            print(f"Warning: Speaker index {speaker_index} out of bounds ({len(embeddings_dataset)} available). Using index 0.")
-            speaker_index = 0 # Fallback to 0 if index is too high
-        speaker_embeddings = torch.tensor(embeddings_dataset[speaker_index]["xvector"]).unsqueeze(0).to(DEVICE)
-        print(f"TTS Interface: Using speaker embedding index: {speaker_index}")
-
-        print("TTS Interface: HF TTS models and embeddings loaded successfully.")
-
-    except ImportError:
-        print("TTS Interface: Required libraries (transformers, datasets, torch, soundfile) not found. Disabling TTS.");
-        ENABLE_HF_TTS = False
-    except Exception as e:
-        print(f"TTS Interface: Error loading HF TTS model or embeddings: {e}. Disabling TTS.");
-        traceback.print_exc() # Print full traceback for loading errors
-        ENABLE_HF_TTS = False
-
-def text_to_speech(text_to_speak, filename_prefix="interview_audio"):
-    """Generates audio from text using Hugging Face SpeechT5 TTS and saves it."""
-    if not ENABLE_HF_TTS or not all([processor, model, vocoder, speaker_embeddings is not None]):
-        print("TTS Interface: TTS Disabled or models not loaded. Cannot generate audio.")
+        quantized = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        report = compare_spectrograms(baseline, _reference_spectrogram(quantized))
+        if _passes_accuracy_guard(report): model = quantized; applied["int8_dynamic"] = report
+        else: applied["int8_dynamic"] = dict(report, rejected=True)
+        log.info("TTS Interface: int8 quantization %s: %s", 'applied' if 'rejected' not in applied['int8_dynamic'] else 'REJECTED by accuracy guard', report)
+    except Exception as e: log.error("TTS Interface: Quantization failed, keeping fp32 model: %s", e)
+
+    if TTS_VOCODER_MODE not in ("trace", "compile"): return
+    try:
+        example = baseline.clone() # Normal tensor; tracing doesn't accept inference-mode tensors
+        with torch.no_grad():
+            if TTS_VOCODER_MODE == "trace": candidate = torch.jit.trace(vocoder, example, check_trace=False)
+            else: candidate = torch.compile(vocoder)
+            expected = vocoder(example); actual = candidate(example)
+        if torch.allclose(expected, actual, atol=1e-3): fast_vocoder = candidate; applied["vocoder"] = TTS_VOCODER_MODE
+        else: log.warning("TTS Interface: %sd vocoder output differs from eager; not using it.", TTS_VOCODER_MODE)
+    except Exception as e: log.error("TTS Interface: Could not %s vocoder, using eager: %s", TTS_VOCODER_MODE, e)
+
+def get_status():
+    """Readiness info for the TTS component."""
+    status = {"enabled": ENABLE_HF_TTS, "backend": TTS_BACKEND}
+    if TTS_BACKEND == "local": status.update(_load_state, device=DEVICE, ready=_load_state["loaded"] or not ENABLE_HF_TTS)
+    else: status["ready"] = not ENABLE_HF_TTS or _voice_id() != "default" # Pings the TTS server until it answers
+    return status
+
+audio_store = AudioStore(AUDIO_OUTPUT_DIR, AUDIO_STORE_QUOTA_MB * 1024 * 1024, session_ttl=AUDIO_SESSION_TTL, finished_grace=AUDIO_FINISHED_GRACE)
+audio_cache = TTSAudioCache(audio_store, TTS_CACHE_MAX_MB * 1024 * 1024, extension=AUDIO_EXTENSION) if ENABLE_TTS_CACHE else None
+phrase_library = PhraseLibrary(PHRASE_LIBRARY_PATH, PHRASE_NEAR_DUP_THRESHOLD, flush_seconds=float(os.getenv("PHRASE_FLUSH_SECONDS", "30"))) if audio_cache is not None and ENABLE_PHRASE_LIBRARY else None
+if phrase_library is not None: atexit.register(phrase_library.flush) # Last counts of a worker that shuts down
+_encoder_pool = ThreadPoolExecutor(max_workers=max(1, TTS_ENCODER_WORKERS), thread_name_prefix="tts-encode")
+_pending_encodes = {} # filename -> Future of a write still in progress
+_pending_lock = threading.Lock()
+
+if ENABLE_HF_TTS and TTS_BACKEND == "server": tts_client = tts_server.TTSServerClient()
+elif ENABLE_HF_TTS and TTS_BACKEND == "fake":
+    import fake_backends; tts_client = fake_backends.FakeTTSClient()
+else: tts_client = None
+
+def _voice_id():
+    global voice_id
+    if voice_id is None:
+        if tts_client is not None: voice_id = tts_client.voice_id() # None until the server answers
+        elif os.path.exists(SPEAKER_EMBEDDING_PATH): # Cheap: no need to load the model for cache lookups
+            voice_id = hashlib.sha1(_load_speaker_xvector().tobytes()).hexdigest()[:16]
+        else: load_models()
+    return voice_id or "default"
+
+def _cache_key(text_to_speak):
+    return audio_cache.make_key(text_to_speak, _voice_id(), f"{TTS_MODEL_ID}+{VOCODER_MODEL_ID}", AUDIO_FORMAT)
+
+def _lookup_cached(cache_key):
+    """Cached filename for a key, including files whose encoding is still in flight."""
+    filename = audio_cache.filename_for(cache_key)
+    with _pending_lock:
+        if filename in _pending_encodes: return filename
+    return audio_cache.get(cache_key)
+
+def _models_ready():
+    """True if synthesis can run; loads the local models on first use (lazy mode)."""
+    if tts_client is not None: return ENABLE_HF_TTS # Availability is checked per request
+    return ENABLE_HF_TTS and load_models() and all([processor, model, vocoder, speaker_embeddings is not None])
+
+def _preprocess(text_to_speak):
+    # Add slight modifications for potential pauses (experimental)
+    return text_to_speak.replace("?", "? ...").replace(".", ". ... ")
+
+def _synthesize(text_to_speak):
+    """Runs SpeechT5 + HiFi-GAN for one piece of text and returns float32 samples."""
+    if tts_client is not None:
+        with span("tts_remote"): return tts_client.synthesize(text_to_speak)
+    import torch
+    inputs = processor(text=_preprocess(text_to_speak), return_tensors="pt").to(DEVICE)
+    with torch.inference_mode(): # No autograd bookkeeping during inference
+        with span("tts_model"): spectrogram = model.generate_speech(inputs["input_ids"], speaker_embeddings)
+        with span("tts_vocoder"): speech = (fast_vocoder or vocoder)(spectrogram)
+    # Ensure speech is on CPU for numpy conversion
+    return speech.cpu().numpy()
+
+def synthesize_batch(texts):
+    """Synthesizes several texts in one padded generate_speech/vocoder pass (local model only).
+
+    Returns a list of float32 sample arrays in input order. Falls back to one pass per
+    text if the installed transformers version can't batch generate_speech.
+    """
+    if len(texts) == 1: return [_synthesize(texts[0])]
+    import torch
+    load_models()
+    inputs = processor(text=[_preprocess(t) for t in texts], padding=True, return_tensors="pt").to(DEVICE)
+    try:
+        with torch.inference_mode():
+            spectrograms, spectrogram_lengths = model.generate_speech(
+                inputs["input_ids"], speaker_embeddings.expand(len(texts), -1),
+                attention_mask=inputs["attention_mask"], return_output_lengths=True)
+            waveforms = vocoder(spectrograms) # Eager vocoder: the traced one only takes unbatched input
+    except TypeError: # Older transformers: no batched generate_speech
+        return [_synthesize(t) for t in texts]
+    hop_length = int(np.prod(vocoder.config.upsample_rates)) # Samples per spectrogram frame
+    return [waveforms[i, :int(spectrogram_lengths[i]) * hop_length].cpu().numpy() for i in range(len(texts))]
+
+def _speakable(text_to_speak):
+    """The phrase library's representative wording for text (text itself without the library)."""
+    if phrase_library is None or not text_to_speak: return text_to_speak
+    return phrase_library.resolve(text_to_speak)
+
+def _record_phrase(text_to_speak, filename=None, speech_cpu=None, synth_seconds=0.0):
+    """Logs a use of text in the phrase library: a reuse of cached filename, or a fresh render of speech_cpu."""
+    if phrase_library is None: return
+    try:
+        if speech_cpu is not None: phrase_library.record(text_to_speak, False, len(speech_cpu) / SAMPLE_RATE, synth_seconds); return
+        seconds = phrase_library.duration(text_to_speak)
+        if seconds is None and filename not in _pending_encodes: # Clip rendered before the log knew it: read its header once
+            path = audio_store.resolve(filename)
+            try: seconds = sf.info(path).duration if path else None
+            except Exception: seconds = None
+        phrase_library.record(text_to_speak, True, seconds)
+    except Exception as e: log.warning("TTS Interface: Could not log phrase use: %s", e)
+
+def cached_audio(text_to_speak):
+    """Returns the cached filename for text without synthesizing anything, or None."""
+    if audio_cache is None or not text_to_speak or not text_to_speak.strip(): return None
+    text_to_speak = _speakable(text_to_speak)
+    filename = _lookup_cached(_cache_key(text_to_speak))
+    if filename: _record_phrase(text_to_speak, filename)
+    return filename
+
+def text_to_speech(text_to_speak, filename_prefix="interview_audio", interview_id=None):
+    """Generates audio from text using Hugging Face SpeechT5 TTS and saves it.
+
+    Repeated text is served from the content-addressed audio cache when enabled.
+    interview_id ties the file to an interview so the audio store can reap it later.
+    """
+    if not _models_ready():
+        log.warning("TTS Interface: TTS Disabled or models not loaded. Cannot generate audio.")
         return None
 
+    cache_key = None
+    if audio_cache is not None and text_to_speak and text_to_speak.strip():
+        text_to_speak = _speakable(text_to_speak)
+        cache_key = _cache_key(text_to_speak)
+        cached_filename = _lookup_cached(cache_key)
+        if cached_filename:
+            log.debug("TTS Interface: Cache hit for prefix '%s' -> '%s'", filename_prefix, cached_filename)
+            if interview_id: audio_store.track(interview_id, cached_filename)
+            _record_phrase(text_to_speak, cached_filename)
+            return cached_filename
+
     output_filename = None # Initialize
     output_filepath = None # Initialize
     try:
-        # Add slight modifications for potential pauses (experimental)
-        processed_text = text_to_speak.replace("?", "? ...").replace(".", ". ... ")
-        print(f"TTS Interface: Generating audio for prefix '{filename_prefix}': '{processed_text[:80]}...'")
+        log.debug("TTS Interface: Generating audio for prefix '%s': '%s...'", filename_prefix, text_to_speak[:80])
         start_time = time.time()
+        speech_cpu = _synthesize(text_to_speak)
+        if cache_key: _record_phrase(text_to_speak, speech_cpu=speech_cpu, synth_seconds=time.time() - start_time)
+        return _save_audio(speech_cpu, cache_key, filename_prefix, start_time, interview_id)
+    except Exception as e:
+        log.exception("TTS Interface: Error during TTS generation/saving for '%s': %s", filename_prefix, e)
+        return None
+
+def text_to_speech_batch(texts, filename_prefix="batch_audio", batch_size=8):
+    """Renders many texts into the audio cache, synthesizing uncached ones batch_size at a time.
 
-        inputs = processor(text=processed_text, return_tensors="pt").to(DEVICE)
+    Returns filenames in input order (None where synthesis failed); each distinct text is
+    synthesized once. Without the cache or the local model (TTS server, fake backend) every
+    text just goes through text_to_speech. Used for bulk preparation (batch_prepare.py).
+    """
+    if tts_client is not None or audio_cache is None or batch_size <= 1: return [text_to_speech(t, filename_prefix) for t in texts]
+    if not _models_ready():
+        log.warning("TTS Interface: TTS Disabled or models not loaded. Cannot generate audio.")
+        return [None] * len(texts)
+    texts = [_speakable(t) if t and t.strip() else t for t in texts]
+    results = [None] * len(texts); pending = {} # cache key -> indexes of texts still to synthesize
+    for i, text in enumerate(texts):
+        if not text or not text.strip(): continue
+        cache_key = _cache_key(text)
+        results[i] = _lookup_cached(cache_key)
+        if not results[i]: pending.setdefault(cache_key, []).append(i)
+    keys = list(pending)
+    for start in range(0, len(keys), batch_size):
+        chunk = keys[start:start + batch_size]; start_time = time.time()
+        try: waveforms = synthesize_batch([texts[pending[k][0]] for k in chunk])
+        except Exception as e:
+            log.exception("TTS Interface: Error during batch TTS generation for '%s' (%s texts): %s", filename_prefix, len(chunk), e); continue
+        synth_seconds = (time.time() - start_time) / len(chunk) # Batch time, split evenly
+        for cache_key, speech_cpu in zip(chunk, waveforms):
+            _record_phrase(texts[pending[cache_key][0]], speech_cpu=speech_cpu, synth_seconds=synth_seconds)
+            filename = _save_audio(speech_cpu, cache_key, filename_prefix, start_time)
+            for i in pending[cache_key]: results[i] = filename
+    return results
 
-        with torch.no_grad(): # Disable gradient calculation for inference
-            spectrogram = model.generate_speech(inputs["input_ids"], speaker_embeddings)
-            speech = vocoder(spectrogram)
+def _save_audio(speech_cpu, cache_key, filename_prefix, start_time, interview_id=None):
+    """Queues encoding of samples on the encoder pool and returns the final filename right away.
 
-        # Ensure speech is on CPU for numpy conversion
-        speech_cpu = speech.cpu().numpy()
+    The audio route calls wait_for_audio() before serving, so a client that asks for
+    the file while it is still being written just waits for it.
+    """
+    if cache_key: output_filename = audio_cache.filename_for(cache_key)
+    else: # Unique per render: a shared prefix + timestamp could hand one interview another's pending audio
+        timestamp = int(time.time() * 1000)
+        output_filename = f"{filename_prefix}_{timestamp}_{uuid.uuid4().hex[:12]}.{AUDIO_EXTENSION}"
+    with _pending_lock:
+        if output_filename in _pending_encodes: return output_filename # Same text already being written (cache keys only)
+        # copy_context() carries the interview state tag into the encoder thread's spans
+        future = _encoder_pool.submit(contextvars.copy_context().run, _encode_audio, speech_cpu, cache_key, output_filename, filename_prefix, start_time, interview_id)
+        _pending_encodes[output_filename] = future
+    future.add_done_callback(lambda _f: _clear_pending(output_filename))
+    return output_filename
 
-        timestamp = int(time.time() * 1000) # Use milliseconds for more uniqueness
-        output_filename = f"{filename_prefix}_{timestamp}.wav"
-        output_filepath = os.path.join(AUDIO_OUTPUT_DIR, output_filename)
+def _clear_pending(filename):
+    with _pending_lock: _pending_encodes.pop(filename, None)
 
-        # Save the audio file (use float32, sample rate 16000Hz for SpeechT5)
-        sf.write(output_filepath, speech_cpu, samplerate=16000, format='WAV', subtype='FLOAT') # Specify format/subtype
+def wait_for_audio(filename, timeout=15.0):
+    """Blocks until a pending encode for filename finishes. Returns False if it failed or timed out."""
+    with _pending_lock: future = _pending_encodes.get(filename)
+    if future is None: return True
+    try: return bool(future.result(timeout=timeout))
+    except Exception: return False
+
+def _encode_audio(speech_cpu, cache_key, output_filename, filename_prefix, start_time, interview_id=None):
+    """Encodes and writes samples in the configured format. Runs on the encoder pool."""
+    output_filepath = None
+    try:
+        if cache_key: output_filepath = audio_cache.temp_path_for(cache_key) # Renamed into place once complete
+        else: output_filepath = audio_store.path_for(output_filename) # Sharded subdirectory
+
+        # Save the audio file (sample rate 16000Hz for SpeechT5) in the configured format/subtype
+        if _SF_SUBTYPE != 'FLOAT': speech_cpu = np.clip(speech_cpu, -1.0, 1.0) # Integer/Opus encoders wrap instead of clipping
+        with span("tts_write"): sf.write(output_filepath, speech_cpu, samplerate=SAMPLE_RATE, format=_SF_FORMAT, subtype=_SF_SUBTYPE)
 
         end_time = time.time()
 
         # Verify file creation and size
         if os.path.exists(output_filepath) and os.path.getsize(output_filepath) > 100: # Check for > 100 bytes as sanity check
-             print(f"TTS Interface: SUCCESS - Audio saved to '{output_filepath}' ({os.path.getsize(output_filepath)} bytes) in {end_time - start_time:.2f}s.")
-             return output_filename # Return only filename on success
+             size = os.path.getsize(output_filepath)
+             if cache_key:
+                 audio_cache.commit(cache_key, output_filepath); output_filepath = None
+                 if interview_id: audio_store.track(interview_id, output_filename)
+             else: audio_store.register(output_filename, interview_id)
+             log.debug("TTS Interface: SUCCESS - Audio saved as '%s' (%s bytes, %s) in %.2fs.", output_filename, size, AUDIO_FORMAT, end_time - start_time)
+             return True
         else:
-             print(f"TTS Interface: FAILURE - Audio file NOT created or empty at '{output_filepath}'.")
+             log.error("TTS Interface: FAILURE - Audio file NOT created or empty at '%s'.", output_filepath)
              if os.path.exists(output_filepath): # Attempt cleanup if empty file was created
                   try: os.remove(output_filepath)
                   except OSError: pass
-             return None # Return None if file wasn't created properly
+             return False # File wasn't created properly
 
     except Exception as e:
-        print(f"TTS Interface: Error during TTS generation/saving for '{filename_prefix}': {e}")
-        traceback.print_exc() # Print full traceback
+        log.exception("TTS Interface: Error saving audio for '%s': %s", filename_prefix, e)
         # Attempt cleanup if file exists but might be corrupted
         if output_filepath and os.path.exists(output_filepath):
-            try: os.remove(output_filepath); print(f"TTS Interface: Removed potentially corrupted file: {output_filepath}")
+            try: os.remove(output_filepath); log.info("TTS Interface: Removed potentially corrupted file: %s", output_filepath)
             except OSError: pass
-        return None
+        return False
+
+# --- Streaming (sentence-chunked) synthesis ---
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+def split_sentences(text, max_chars=200):
+    """Splits text at sentence boundaries, merging tiny fragments and cutting overlong ones at commas."""
+    chunks = []
+    for sentence in _SENTENCE_END.split(text.strip()):
+        sentence = sentence.strip()
+        if not sentence: continue
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(',', 0, max_chars)
+            cut = cut + 1 if cut > 0 else max_chars
+            chunks.append(sentence[:cut].strip()); sentence = sentence[cut:].strip()
+        if chunks and len(chunks[-1]) + len(sentence) < 40: chunks[-1] = f"{chunks[-1]} {sentence}" # Avoid choppy one-word chunks
+        elif sentence: chunks.append(sentence)
+    return chunks
+
+def _streaming_wav_header():
+    """16-bit mono WAV header with placeholder sizes (length is unknown while streaming)."""
+    data_size = 0x7FFFF000
+    return (b'RIFF' + struct.pack('<I', data_size + 36) + b'WAVE'
+            + b'fmt ' + struct.pack('<IHHIIHH', 16, 1, 1, SAMPLE_RATE, SAMPLE_RATE * 2, 2, 16)
+            + b'data' + struct.pack('<I', data_size))
+
+def stream_wav(text_to_speak, filename_prefix="stream"):
+    """Yields a WAV stream for text, vocoding one sentence at a time.
+
+    The header goes out immediately and each sentence follows as soon as it is
+    synthesized, so playback can start after the first chunk. The complete audio is
+    added to the cache afterwards so the same text is served as a file next time.
+    """
+    yield _streaming_wav_header()
+    if not _models_ready() or not text_to_speak or not text_to_speak.strip(): return
+    text_to_speak = _speakable(text_to_speak)
+    start_time = time.time(); pieces = []; synth_seconds = 0.0 # Excludes time spent waiting on the client
+    for i, chunk in enumerate(split_sentences(text_to_speak)):
+        chunk_start = time.time()
+        try: speech_cpu = _synthesize(chunk)
+        except Exception as e:
+            log.exception("TTS Interface: Error streaming chunk %s for '%s': %s", i, filename_prefix, e); return
+        if i == 0: log.debug("TTS Interface: First stream chunk for '%s' ready in %.2fs.", filename_prefix, time.time() - start_time)
+        pieces.append(speech_cpu); synth_seconds += time.time() - chunk_start
+        yield (np.clip(speech_cpu, -1.0, 1.0) * 32767).astype('<i2').tobytes()
+    if pieces and audio_cache is not None:
+        speech_cpu = np.concatenate(pieces); _record_phrase(text_to_speak, speech_cpu=speech_cpu, synth_seconds=synth_seconds)
+        _save_audio(speech_cpu, _cache_key(text_to_speak), filename_prefix, start_time)
+
+def prerender_phrases(count=PHRASE_PRERENDER_COUNT):
+    """Renders the fleet's most used phrases into the cache (warm-up). Returns how many are available."""
+    if phrase_library is None or count <= 0 or not _models_ready(): return 0
+    texts = phrase_library.top(count)
+    if not texts: return 0
+    start_time = time.time(); filenames = text_to_speech_batch(texts, "phrase")
+    log.info("TTS Interface: %s of the %s most used phrases ready in %.2fs.", len(texts) - filenames.count(None), len(texts), time.time() - start_time)
+    return len(texts) - filenames.count(None)
+
+def get_cache_stats():
+    """Returns hit/miss counters and size of the TTS audio cache (None if disabled)."""
+    return audio_cache.stats() if audio_cache is not None else None
+
+def get_phrase_stats():
+    """Phrase library counters for this process plus the fleet-wide report (None if disabled)."""
+    if phrase_library is None: return None
+    return {"process": phrase_library.stats(), "fleet": phrase_library.report()}
 
 def get_audio_filepath(filename):
     """Gets the full path for a generated audio file."""
     if not filename or os.path.sep in filename or ".." in filename:
-        print(f"TTS Interface: Invalid or unsafe filename requested: {filename}")
+        log.warning("TTS Interface: Invalid or unsafe filename requested: %s", filename)
         return None
-    return os.path.join(AUDIO_OUTPUT_DIR, filename)
\ No newline at end of file
+    return audio_store.resolve(filename)
\ No newline at end of file
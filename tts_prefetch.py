@@ -0,0 +1,128 @@
+# tts_prefetch.py (Background pre-synthesis of question audio)
+import time
+import heapq
+import itertools
+import logging
+import threading
+
+log = logging.getLogger(__name__)
+
+# Job states
+QUEUED = "queued"; RUNNING = "running"; DONE = "done"; CLAIMED = "claimed"; CANCELLED = "cancelled"
+
+
+class _Job:
+    __slots__ = ("interview_id", "index", "text", "state", "result", "done_event")
+
+    def __init__(self, interview_id, index, text):
+        self.interview_id = interview_id; self.index = index; self.text = text
+        self.state = QUEUED; self.result = None; self.done_event = threading.Event()
+
+
+class QuestionAudioPrefetcher:
+    """Renders question audio on a small worker pool as soon as an interview is set up.
+
+    Jobs are ordered by priority (the upcoming question first, then question order).
+    Request handlers call take() to pick up a finished file instead of synthesizing
+    inline; sessions that go idle for longer than session_ttl are cancelled.
+    """
+
+    def __init__(self, synthesize, max_workers=1, session_ttl=1800):
+        self._synthesize = synthesize # callable(text, filename_prefix, interview_id=...) -> filename | None
+        self.max_workers = max(1, max_workers)
+        self.session_ttl = session_ttl
+        self._jobs = {} # interview_id -> {question_index: _Job}
+        self._last_seen = {} # interview_id -> monotonic time of last activity
+        self._heap = []; self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._workers = []
+        self.stats_counters = {"scheduled": 0, "rendered": 0, "ready_hits": 0, "waited": 0, "misses": 0, "cancelled": 0, "failed": 0}
+
+    def _ensure_workers(self):
+        while len(self._workers) < self.max_workers:
+            worker = threading.Thread(target=self._worker_loop, name=f"tts-prefetch-{len(self._workers)}", daemon=True)
+            self._workers.append(worker); worker.start()
+
+    def _push(self, priority, job):
+        heapq.heappush(self._heap, (priority, next(self._seq), job))
+
+    def schedule(self, interview_id, questions, first_priority_index=0):
+        """Queues audio for every question of an interview."""
+        if not interview_id or not questions: return
+        with self._cond:
+            jobs = self._jobs.setdefault(interview_id, {})
+            self._last_seen[interview_id] = time.monotonic()
+            for index, text in enumerate(questions):
+                if index in jobs or not text: continue
+                job = _Job(interview_id, index, text); jobs[index] = job
+                # Priority 0 is reserved for "asked next"; keep question order otherwise
+                self._push(0 if index == first_priority_index else index + 1, job)
+                self.stats_counters["scheduled"] += 1
+            self._ensure_workers()
+            self._cond.notify_all()
+        log.debug("TTS Prefetch: Scheduled %s questions for interview %s.", len(questions), interview_id[:8])
+
+    def prioritize(self, interview_id, index):
+        """Moves a still-queued question to the front of the queue."""
+        with self._cond:
+            job = self._jobs.get(interview_id, {}).get(index)
+            self._last_seen[interview_id] = time.monotonic()
+            if job is not None and job.state == QUEUED:
+                self._push(0, job); self._cond.notify()
+
+    def take(self, interview_id, index, text, timeout=30.0):
+        """Returns the pre-rendered filename for a question, or None if the caller should synthesize.
+
+        Waits up to timeout for a job that is already being rendered; queued jobs are
+        claimed so the worker does not render them a second time.
+        """
+        with self._cond:
+            self._last_seen[interview_id] = time.monotonic()
+            job = self._jobs.get(interview_id, {}).get(index)
+            if job is None or job.text != text:
+                self.stats_counters["misses"] += 1; return None
+            if job.state == DONE:
+                self.stats_counters["ready_hits"] += 1; return job.result
+            if job.state == QUEUED:
+                job.state = CLAIMED; self.stats_counters["misses"] += 1; return None
+            if job.state != RUNNING:
+                self.stats_counters["misses"] += 1; return None
+            self.stats_counters["waited"] += 1
+        job.done_event.wait(timeout)
+        return job.result if job.state == DONE else None
+
+    def cancel(self, interview_id):
+        """Drops all pending work for an abandoned or finished interview."""
+        with self._cond:
+            jobs = self._jobs.pop(interview_id, None) or {}
+            self._last_seen.pop(interview_id, None)
+            for job in jobs.values():
+                if job.state == QUEUED: job.state = CANCELLED; self.stats_counters["cancelled"] += 1
+        if jobs: log.debug("TTS Prefetch: Cancelled interview %s.", interview_id[:8])
+
+    def _expire_idle_locked(self):
+        cutoff = time.monotonic() - self.session_ttl
+        for interview_id in [i for i, seen in self._last_seen.items() if seen < cutoff]:
+            for job in self._jobs.pop(interview_id, {}).values():
+                if job.state == QUEUED: job.state = CANCELLED; self.stats_counters["cancelled"] += 1
+            self._last_seen.pop(interview_id, None)
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                while not self._heap: self._cond.wait()
+                _, _, job = heapq.heappop(self._heap)
+                self._expire_idle_locked()
+                if job.state != QUEUED: continue
+                job.state = RUNNING
+            result = None
+            try: result = self._synthesize(job.text, f"question_{job.index}", interview_id=job.interview_id)
+            except Exception as e: log.exception("TTS Prefetch: Error rendering Q%s: %s", job.index, e)
+            with self._cond:
+                job.result = result; job.state = DONE
+                self.stats_counters["rendered" if result else "failed"] += 1
+            job.done_event.set()
+
+    def stats(self):
+        with self._cond:
+            return dict(self.stats_counters, queued=len({id(j) for _, _, j in self._heap if j.state == QUEUED}), active_interviews=len(self._jobs))
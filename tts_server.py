@@ -0,0 +1,204 @@
+# tts_server.py (Shared TTS inference process with request batching)
+#
+# Run once per host:   python tts_server.py
+# Then start the web app with TTS_BACKEND=server so workers send synthesis here
+# instead of each loading their own copy of SpeechT5 + HiFi-GAN.
+import os
+import sys
+import time
+import queue
+import logging
+import secrets
+import threading
+from multiprocessing.connection import Listener, Client
+
+log = logging.getLogger(__name__)
+
+DEFAULT_ADDRESS = "tts_server.sock" if sys.platform != "win32" else "127.0.0.1:6011"
+TTS_SERVER_ADDRESS = os.getenv("TTS_SERVER_ADDRESS", DEFAULT_ADDRESS)
+# Connections unpickle what they receive, so anyone holding the key can run code in the server (and in
+# the workers): there is no default. Unset, the server creates a random key in TTS_SERVER_AUTHKEY_FILE
+TTS_SERVER_AUTHKEY = os.getenv("TTS_SERVER_AUTHKEY", "")
+TTS_SERVER_AUTHKEY_FILE = os.getenv("TTS_SERVER_AUTHKEY_FILE", "tts_server.key")
+TTS_SERVER_TIMEOUT = float(os.getenv("TTS_SERVER_TIMEOUT", "60")) # Seconds a client waits for audio
+MAX_BATCH_SIZE = int(os.getenv("TTS_MAX_BATCH_SIZE", "8"))
+BATCH_WAIT_MS = float(os.getenv("TTS_BATCH_WAIT_MS", "20")) # How long to hold a batch open for more requests
+
+
+def _parse_address(address):
+    """'host:port' -> (host, port) for TCP; anything else is a Unix socket path."""
+    host, sep, port = address.rpartition(':')
+    if sep and port.isdigit(): return (host or '127.0.0.1', int(port))
+    return address
+
+
+def load_authkey(create=False):
+    """The shared connection key: TTS_SERVER_AUTHKEY, else the contents of TTS_SERVER_AUTHKEY_FILE.
+
+    create=True (the server) writes a random key to the file, mode 0600, if there is none yet.
+    Raises RuntimeError if there is no key or the key file is readable by other users.
+    """
+    if TTS_SERVER_AUTHKEY: return TTS_SERVER_AUTHKEY.encode("utf-8")
+    path = TTS_SERVER_AUTHKEY_FILE
+    if create:
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            with os.fdopen(fd, "w") as f: f.write(secrets.token_hex(32))
+            log.info("TTS Server: Created connection key %s", path)
+        except FileExistsError: pass
+        except OSError as e: raise RuntimeError(f"No TTS server key: could not create {path}: {e}") from e
+    try:
+        if sys.platform != "win32" and os.stat(path).st_mode & 0o077: raise RuntimeError(f"TTS server key {path} is accessible to other users; chmod 600 it.")
+        with open(path) as f: key = f.read().strip()
+    except FileNotFoundError: key = ""
+    if not key: raise RuntimeError(f"No TTS server key: set TTS_SERVER_AUTHKEY, or start tts_server.py once on this host to create {path}.")
+    return key.encode("utf-8")
+
+
+class _Request:
+    __slots__ = ("text", "enqueued_at", "done", "audio", "error")
+
+    def __init__(self, text):
+        self.text = text; self.enqueued_at = time.monotonic()
+        self.done = threading.Event(); self.audio = None; self.error = None
+
+
+class TTSInferenceServer:
+    """Owns the single model copy and serves synthesis requests from any number of web workers.
+
+    Concurrent requests are gathered into batches of up to max_batch_size (waiting at most
+    batch_wait_ms for stragglers) and run through tts_interface.synthesize_batch together.
+    """
+
+    def __init__(self, address=TTS_SERVER_ADDRESS, authkey=None, max_batch_size=MAX_BATCH_SIZE, batch_wait_ms=BATCH_WAIT_MS):
+        self.address = _parse_address(address); self.authkey = authkey or load_authkey(create=True)
+        self.max_batch_size = max(1, max_batch_size); self.batch_wait = batch_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "batches": 0, "errors": 0, "batch_size_counts": {}, "last_queue_depth": 0, "max_queue_depth": 0,
+                      "total_batch_seconds": 0.0, "max_batch_seconds": 0.0, "total_wait_seconds": 0.0}
+
+    def serve_forever(self):
+        import tts_interface # Loads the model in this process only
+        self._tts = tts_interface
+        if not tts_interface.load_models(): raise RuntimeError("TTS models failed to load; not starting server.")
+        if isinstance(self.address, str) and os.path.exists(self.address): os.remove(self.address) # Stale socket from a previous run
+        threading.Thread(target=self._batch_loop, name="tts-batcher", daemon=True).start()
+        unix_socket = isinstance(self.address, str) and sys.platform != "win32"
+        old_umask = os.umask(0o177) if unix_socket else None # Socket is created owner-only, with no window before the chmod
+        try: listener = Listener(self.address, authkey=self.authkey)
+        finally:
+            if unix_socket: os.umask(old_umask)
+        if unix_socket: os.chmod(self.address, 0o600)
+        with listener:
+            log.info("TTS Server: Listening on %s (max batch %s, wait %.0fms)", self.address, self.max_batch_size, self.batch_wait * 1000)
+            while True:
+                try: conn = listener.accept()
+                except Exception as e: log.error("TTS Server: Rejected connection: %s", e); continue
+                threading.Thread(target=self._handle_connection, args=(conn,), daemon=True).start()
+
+    def _handle_connection(self, conn):
+        """One thread per client connection; a connection carries one request at a time."""
+        try:
+            while True:
+                try: message = conn.recv()
+                except (EOFError, OSError): return
+                op = message.get("op")
+                if op == "synthesize":
+                    request = _Request(message["text"]); self._queue.put(request)
+                    request.done.wait()
+                    if request.error: conn.send({"ok": False, "error": request.error})
+                    else: conn.send({"ok": True, "audio": request.audio.astype("float32").tobytes(), "sample_rate": self._tts.SAMPLE_RATE})
+                elif op == "info": conn.send({"ok": True, "voice_id": self._tts.voice_id, "sample_rate": self._tts.SAMPLE_RATE})
+                elif op == "stats": conn.send({"ok": True, "stats": self.get_stats()})
+                else: conn.send({"ok": False, "error": f"Unknown op: {op}"})
+        finally:
+            conn.close()
+
+    def _batch_loop(self):
+        while True:
+            batch = [self._queue.get()] # Block for the first request
+            deadline = time.monotonic() + self.batch_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0: break
+                try: batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty: break
+            self._run_batch(batch, queue_depth=self._queue.qsize())
+
+    def _run_batch(self, batch, queue_depth):
+        started = time.monotonic()
+        try:
+            results = self._tts.synthesize_batch([r.text for r in batch])
+            for request, audio in zip(batch, results): request.audio = audio
+        except Exception as e:
+            log.exception("TTS Server: Batch of %s failed: %s", len(batch), e)
+            for request in batch: request.error = str(e)
+        elapsed = time.monotonic() - started
+        with self._stats_lock:
+            s = self.stats; size = len(batch)
+            s["requests"] += size; s["batches"] += 1; s["errors"] += size if batch[0].error else 0
+            s["batch_size_counts"][size] = s["batch_size_counts"].get(size, 0) + 1
+            s["last_queue_depth"] = queue_depth; s["max_queue_depth"] = max(s["max_queue_depth"], queue_depth)
+            s["total_batch_seconds"] += elapsed; s["max_batch_seconds"] = max(s["max_batch_seconds"], elapsed)
+            s["total_wait_seconds"] += sum(started - r.enqueued_at for r in batch)
+        log.debug("TTS Server: Batch size=%s queue_depth=%s latency=%.2fs", size, queue_depth, elapsed)
+        for request in batch: request.done.set()
+
+    def get_stats(self):
+        with self._stats_lock:
+            s = dict(self.stats, batch_size_counts=dict(self.stats["batch_size_counts"]))
+        s["queue_depth"] = self._queue.qsize()
+        s["mean_batch_size"] = round(s["requests"] / s["batches"], 2) if s["batches"] else 0.0
+        s["mean_batch_seconds"] = round(s["total_batch_seconds"] / s["batches"], 3) if s["batches"] else 0.0
+        s["mean_wait_seconds"] = round(s["total_wait_seconds"] / s["requests"], 3) if s["requests"] else 0.0
+        return s
+
+
+class TTSServerClient:
+    """Thin client used by web workers. Keeps one connection per thread and reconnects on failure."""
+
+    def __init__(self, address=TTS_SERVER_ADDRESS, authkey=None, timeout=TTS_SERVER_TIMEOUT):
+        self.address = _parse_address(address); self.authkey = authkey or load_authkey(); self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None: conn = self._local.conn = Client(self.address, authkey=self.authkey)
+        return conn
+
+    def _drop_connection(self):
+        conn = getattr(self._local, "conn", None); self._local.conn = None
+        if conn is not None:
+            try: conn.close()
+            except OSError: pass
+
+    def _call(self, message):
+        for attempt in range(2): # One reconnect if the server restarted
+            try:
+                conn = self._connection(); conn.send(message)
+                answered = conn.poll(self.timeout)
+                reply = conn.recv() if answered else None
+            except (EOFError, OSError) as e:
+                self._drop_connection()
+                if attempt: raise ConnectionError(f"TTS server unreachable at {self.address}: {e}")
+                continue
+            if not answered: self._drop_connection(); raise TimeoutError("TTS server did not answer in time") # Late reply would desync the connection
+            if not reply.get("ok"): raise RuntimeError(reply.get("error", "TTS server error"))
+            return reply
+
+    def synthesize(self, text):
+        import numpy as np
+        return np.frombuffer(self._call({"op": "synthesize", "text": text})["audio"], dtype=np.float32)
+
+    def voice_id(self):
+        try: return self._call({"op": "info"}).get("voice_id")
+        except Exception as e: log.error("TTS Client: Could not reach TTS server: %s", e); return None
+
+    def stats(self): return self._call({"op": "stats"})["stats"]
+
+
+if __name__ == '__main__':
+    os.environ["TTS_BACKEND"] = "local" # This process is the one that holds the model
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    TTSInferenceServer().serve_forever()